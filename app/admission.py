@@ -0,0 +1,167 @@
+# app/admission.py
+
+import asyncio
+import math
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Callable, Deque, Optional, Tuple
+
+
+class Overloaded(Exception):
+    """A turn turned away by admission control: 429 when the queue is full, 503 when it waited too long."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+# --- Admission control ---
+
+class AdmissionController:
+    """
+    Bounds the conversation turns a worker runs at once.
+
+    At most `max_in_flight` turns run; up to `max_queued` more wait for a
+    slot, first come first served, for at most `queue_timeout` seconds. A
+    turn that finds the queue full is rejected at once (429); one still
+    waiting after `queue_timeout` is rejected then (503). Both carry a
+    Retry-After estimated from how long recent turns took, so overload turns
+    into quick, bounded rejections instead of an ever-growing backlog of
+    Groq and Calendly calls.
+    """
+
+    def __init__(self, max_in_flight: int = 32, max_queued: int = 64, queue_timeout: float = 10.0):
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.stats = Counter()  # admitted, queued, rejected_full, rejected_timeout
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._turn_seconds = 1.0  # Moving average of admitted turns' duration
+
+    @property
+    def queued(self) -> int:
+        return sum(not waiter.done() for waiter in self._waiters)
+
+    def retry_after(self) -> int:
+        """Seconds until the turns ahead should have drained."""
+        return max(1, math.ceil(self._turn_seconds * (self.queued + 1) / self.max_in_flight))
+
+    def check(self):
+        """Raises Overloaded when a turn arriving now would be rejected outright."""
+        if self.in_flight >= self.max_in_flight and self.queued >= self.max_queued:
+            self.stats["rejected_full"] += 1
+            raise Overloaded(429, "The assistant is handling too many conversations; please try again shortly.", self.retry_after())
+
+    async def _acquire(self):
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            return
+        self.check()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.stats["queued"] += 1
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                self._release()  # Handed a slot just as it gave up: pass it on
+            else:
+                waiter.cancel()
+                if waiter in self._waiters:  # _release may already have skipped past it
+                    self._waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self.stats["rejected_timeout"] += 1
+                raise Overloaded(503, "The assistant is busy; please try again shortly.", self.retry_after()) from None
+            raise
+
+    def _release(self):
+        # The slot passes straight to the longest waiter, so newcomers can't jump the queue
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def admit(self):
+        """Holds a turn slot for the `async with` block; raises Overloaded instead when none can be had."""
+        await self._acquire()
+        self.stats["admitted"] += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._turn_seconds += 0.2 * (time.perf_counter() - start - self._turn_seconds)
+            self._release()
+
+
+# --- Idempotent replies ---
+
+class ReplyCache:
+    """
+    The reply sent for each (session, idempotency key), so a retried or
+    double-sent message gets the same reply instead of running the turn
+    again. Entries expire after `ttl_seconds`; beyond `max_entries` the least
+    recently used are evicted. With `db_path` (multi-worker deployments)
+    replies are kept in SQLite instead, shared by every worker.
+    """
+
+    def __init__(self, max_entries: int = 10_000, ttl_seconds: float = 600.0, db_path: Optional[str] = None,
+                 clock: Callable[[], float] = time.time):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.stats = Counter()  # hit, stored
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Tuple[str, str], Tuple[str, float]] = OrderedDict()
+        self._conn = None
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS replies (session_id TEXT NOT NULL, key TEXT NOT NULL, reply TEXT NOT NULL, "
+                "stored_at REAL NOT NULL, PRIMARY KEY (session_id, key))"
+            )
+
+    def get(self, session_id: str, key: Optional[str]) -> Optional[str]:
+        if not key or not self.max_entries:
+            return None
+        now = self.clock()
+        with self._lock:
+            if self._conn is not None:
+                row = self._conn.execute("SELECT reply FROM replies WHERE session_id = ? AND key = ? AND stored_at > ?",
+                                         (session_id, key, now - self.ttl_seconds)).fetchone()
+                reply = row[0] if row else None
+            else:
+                reply, stored_at = self._entries.get((session_id, key), (None, 0.0))
+                if reply is not None and now - stored_at >= self.ttl_seconds:
+                    del self._entries[(session_id, key)]
+                    reply = None
+                elif reply is not None:
+                    self._entries.move_to_end((session_id, key))
+            if reply is not None:
+                self.stats["hit"] += 1
+        return reply
+
+    def put(self, session_id: str, key: Optional[str], reply: str):
+        if not key or not self.max_entries:
+            return
+        now = self.clock()
+        with self._lock:
+            self.stats["stored"] += 1
+            if self._conn is not None:
+                self._conn.execute("INSERT OR REPLACE INTO replies VALUES (?, ?, ?, ?)", (session_id, key, reply, now))
+                if self.stats["stored"] % 1000 == 0:
+                    self._conn.execute("DELETE FROM replies WHERE stored_at <= ?", (now - self.ttl_seconds,))
+                return
+            self._entries[(session_id, key)] = (reply, now)
+            self._entries.move_to_end((session_id, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
@@ -1,25 +1,37 @@
 # app/agent.py
 
+import asyncio
+import logging
 import operator
-import re
-import json
+import os
+import threading
+import time
+import uuid
 from typing import Annotated, Optional, TypedDict, List, Dict
 
 from langchain_core.messages import AIMessage, AnyMessage, HumanMessage, SystemMessage, ToolMessage, ToolCall # <-- CORRECTED IMPORT
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.graph import END, StateGraph
-from langchain_groq import ChatGroq
+from langchain_core.runnables import RunnableConfig
+from langgraph.constants import END
+from app.decisions import DecisionCache
+from app.history import compact_history, count_tokens
+from app.intents import classify_turn, extract_choice, fast_path_stats
+from app.metrics import REGISTRY, TOOL_ERRORS, TOOL_LATENCY, instrument_node, record_token_usage
+from app.results import ToolError, ToolResult
 
 # Import ALL tools
 from app.tools import (
     book_appointment,
     get_available_slots,
+    find_first_available,
     search_patient_in_emr,
     collect_insurance_details,
     skip_insurance,
     get_doctor_list,
     send_intake_forms,
     schedule_reminders,
+    hold_slots,
+    get_job_queue,
+    SLOTS_SHOWN,
 )
 
 # --- 1. Define the Agent's State ---
@@ -27,16 +39,21 @@ class AgentState(TypedDict):
     messages: Annotated[List[AnyMessage], operator.add]
     patient_status: Optional[str]
     patient_info: Optional[Dict[str, str]]
+    patient_candidates: Optional[List[str]]  # Near-miss EMR names awaiting the patient's confirmation
     insurance_info: Optional[str]
     doctor_list: Optional[List[Dict[str, str]]]
     doctor_name: Optional[str]
     available_slots: Optional[List[str]]
+    first_available: Optional[List[Dict[str, str]]]  # {"doctor_name", "slot"} across doctors
     confirmed_time: Optional[str]
+    intake_forms_job: Optional[int]
+    reminders_job: Optional[int]
 
 # --- 2. Setup Tools and LLM ---
 tools = [
     search_patient_in_emr,
     get_available_slots,
+    find_first_available,
     book_appointment,
     collect_insurance_details,
     skip_insurance,
@@ -46,53 +63,108 @@ tools = [
 ]
 tool_map = {t.name: t for t in tools}
 
-llm = ChatGroq(model_name="openai/gpt-oss-20b", temperature=0)
-llm_with_tools = llm.bind_tools(tools)
+# Rule-based intents below this confidence are handed to the LLM instead
+FAST_PATH_MIN_CONFIDENCE = float(os.getenv("FAST_PATH_MIN_CONFIDENCE", "0.8"))
+# Prompt history: latest turns kept verbatim, everything older summarized
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "3"))
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "2000"))
+# Per tool call; a call that runs longer is reported to the model as an error
+TOOL_TIMEOUT_SECONDS = float(os.getenv("TOOL_TIMEOUT_SECONDS", "30"))
+# Tools whose effects later calls in the same message rely on; they run on their own
+BARRIER_TOOLS = {"book_appointment"}
+# agent_brain decisions reused across conversations (0 turns the cache off)
+DECISION_CACHE_SIZE = int(os.getenv("DECISION_CACHE_SIZE", "1024"))
+DECISION_CACHE_TTL_SECONDS = float(os.getenv("DECISION_CACHE_TTL_SECONDS", "3600"))
+
+LLM_MODEL = "openai/gpt-oss-20b"
+
+log = logging.getLogger(__name__)
+
+# The chat model and the compiled graph are built on first use, not at import;
+# assign llm_with_tools to substitute the model
+llm = None
+llm_with_tools = None
+decision_cache = DecisionCache(max_entries=DECISION_CACHE_SIZE, ttl_seconds=DECISION_CACHE_TTL_SECONDS)
+
+def get_llm_with_tools():
+    """The tool-bound chat model. Building it is what needs GROQ_API_KEY."""
+    global llm, llm_with_tools
+    if llm_with_tools is None:
+        from langchain_groq import ChatGroq
+        llm = ChatGroq(model_name=LLM_MODEL, temperature=0)
+        llm_with_tools = llm.bind_tools(tools)
+    return llm_with_tools
 
 # --- 3. Define the Agent's Nodes ---
 
-def agent_brain(state: AgentState):
+async def agent_brain(state: AgentState):
     """The 'brain'. Decides which tool to call based on the user's last message."""
-    print("---NODE: AGENT BRAIN---")
     system_prompt = "You are an autonomous medical scheduling assistant. Based on the user's last message, decide which tool to call. Do not respond conversationally."
-    messages = [SystemMessage(content=system_prompt)] + state["messages"]
-    response = llm_with_tools.invoke(messages)
+    # At temperature 0 the same state and message get the same decision; reuse it
+    decision = decision_cache.decision(state, f"{LLM_MODEL}\n{system_prompt}\n{','.join(tool_map)}")
+    cached = decision_cache.get(decision)
+    if cached is not None:
+        log.debug("Decision cache hit", extra={"tool_calls": [call["name"] for call in cached.tool_calls]})
+        return {"messages": [cached]}
+    system_message = SystemMessage(content=system_prompt)
+    # Older turns are folded into a state summary so the prompt stays within budget
+    history = compact_history(state, keep_turns=HISTORY_KEEP_TURNS, token_budget=HISTORY_TOKEN_BUDGET,
+                              system_tokens=count_tokens([system_message]))
+    messages = [system_message] + history
+    start = time.perf_counter()
+    response = await get_llm_with_tools().ainvoke(messages)
+    decision_cache.put(decision, response, time.perf_counter() - start)
+    record_token_usage(LLM_MODEL, response)
     return {"messages": [response]}
 
-def call_tool_and_update_state(state: AgentState):
+def _tool_batches(tool_calls: List[ToolCall]) -> List[List[ToolCall]]:
+    """Splits a message's tool calls into batches that can run concurrently, keeping their order."""
+    batches: List[List[ToolCall]] = []
+    for tool_call in tool_calls:
+        if tool_call["name"] in BARRIER_TOOLS or not batches or batches[-1][-1]["name"] in BARRIER_TOOLS:
+            batches.append([])
+        batches[-1].append(tool_call)
+    return batches
+
+async def _run_tool_call(tool_call: ToolCall, config: RunnableConfig) -> ToolResult:
+    """Runs one tool call; failures and timeouts come back as a ToolError instead of failing the turn."""
+    name = tool_call["name"]
+    if name not in tool_map:
+        return ToolError(f"ERROR: Unknown tool '{name}'.")
+    log.debug("Tool called", extra={"tool": name, "tool_args": tool_call["args"]})
+    start = time.perf_counter()
+    try:
+        # Async tools use the pooled HTTP client; sync ones run in a worker thread
+        # (a sync tool that times out finishes in its thread; its result is dropped)
+        result = await asyncio.wait_for(tool_map[name].ainvoke(tool_call["args"], config=config), timeout=TOOL_TIMEOUT_SECONDS)
+        if isinstance(result, ToolError):
+            TOOL_ERRORS.labels(name, "error_result").inc()
+        return result
+    except asyncio.TimeoutError:
+        TOOL_ERRORS.labels(name, "timeout").inc()
+        log.warning("Tool timed out", extra={"tool": name, "timeout_seconds": TOOL_TIMEOUT_SECONDS})
+        return ToolError(f"ERROR: {name} did not finish within {TOOL_TIMEOUT_SECONDS:g} seconds.")
+    except Exception as e:
+        TOOL_ERRORS.labels(name, "exception").inc()
+        log.warning("Tool failed", extra={"tool": name, "error": str(e)})
+        return ToolError(f"ERROR: {name} failed. Reason: {str(e)}")
+    finally:
+        TOOL_LATENCY.labels(name).observe(time.perf_counter() - start)
+
+async def call_tool_and_update_state(state: AgentState, config: RunnableConfig):
     """The 'hands'. Executes tools and updates the agent's state."""
-    print("---NODE: CALLING TOOL & UPDATING STATE---")
     last_message = state["messages"][-1]
     
+    outputs = []
+    for batch in _tool_batches(last_message.tool_calls):
+        # Independent calls run concurrently; the turn waits for the slowest
+        outputs += await asyncio.gather(*(_run_tool_call(tool_call, config) for tool_call in batch))
+
+    # Merged in the order the calls were made, so a later call wins on the same key
     updates = {}
-    for tool_call in last_message.tool_calls:
-        tool_to_call = tool_map[tool_call["name"]]
-        tool_output = tool_to_call.invoke(tool_call["args"])
-        
-        if tool_call["name"] == "search_patient_in_emr":
-            if "new patient" in tool_output.lower():
-                updates["patient_status"] = "NEW"
-                updates["patient_info"] = tool_call.get("args", {})
-            elif "returning patient" in tool_output.lower():
-                updates["patient_status"] = "RETURNING"
-                match = re.search(r"({.*})", tool_output.replace("'", '"'))
-                if match:
-                    patient_details = json.loads(match.group(1))
-                    updates["patient_info"] = patient_details
-                    updates["doctor_name"] = patient_details.get("last_visit_doctor")
-        elif tool_call["name"] == "skip_insurance":
-            updates["insurance_info"] = "Not Provided"
-        elif tool_call["name"] == "collect_insurance_details":
-            updates["insurance_info"] = tool_output
-        elif tool_call["name"] == "get_doctor_list":
-            match = re.search(r"(\[.*\])", tool_output)
-            if match:
-                valid_json_string = match.group(1).replace("'", '"')
-                updates["doctor_list"] = json.loads(valid_json_string)
-        elif tool_call["name"] == "get_available_slots":
-            if "SUCCESS: The following slots are available" in tool_output:
-                slots_text = tool_output.split("SUCCESS: The following slots are available")[1]
-                updates["available_slots"] = [s.strip() for s in slots_text.split(":")[-1].split(",")]
+    for tool_call, tool_output in zip(last_message.tool_calls, outputs):
+        # Tools return typed results (app/results.py); state comes straight off their fields
+        updates.update(tool_output.state_updates(tool_call["args"]))
         
         updates.setdefault("messages", []).append(
             ToolMessage(content=str(tool_output), tool_call_id=tool_call["id"])
@@ -101,74 +173,97 @@ def call_tool_and_update_state(state: AgentState):
 
 def extract_user_choice(state: AgentState):
     """Parses the user's last message to update the state."""
-    print("---NODE: EXTRACTING USER CHOICE---")
-    last_message = state["messages"][-1].content
-    updates = {}
+    return extract_choice(state, state["messages"][-1].content)
 
-    if state.get("patient_status") == "RETURNING" and not state.get("insurance_info"):
-        if "different" in last_message.lower() or "choose" in last_message.lower():
-            updates["doctor_name"] = None
-            updates["doctor_list"] = None
-        else: # Assumes confirmation
-            updates["insurance_info"] = "Confirmed"
-
-    if state.get("doctor_list") and not state.get("doctor_name"):
-        for doctor in state["doctor_list"]:
-            if doctor["name"].lower() in last_message.lower():
-                updates["doctor_name"] = doctor["name"]
-                break
-    
-    if state.get("available_slots") and not state.get("confirmed_time"):
-        for slot in state["available_slots"]:
-            time_part = slot.split(" at ")[-1]
-            if time_part.lower() in last_message.lower():
-                updates["confirmed_time"] = slot
-                break
-    return updates
+def fast_path(state: AgentState):
+    """
+    Resolves structured turns (name + DOB, insurance skip, doctor and slot
+    picks, post-booking notifications) straight into tool calls. Anything the
+    rules can't classify confidently is left to agent_brain.
+    """
+    intent = classify_turn(state)
+    if intent is None or intent.confidence < FAST_PATH_MIN_CONFIDENCE:
+        fast_path_stats["llm"] += 1
+        return {}
+    fast_path_stats[intent.label] += 1
+    tool_calls = [ToolCall(name=call["name"], args=call["args"], id=f"fast_{uuid.uuid4().hex[:12]}") for call in intent.tool_calls]
+    return {**intent.state_updates, "messages": [AIMessage(content="", tool_calls=tool_calls)]}
+
+def route_fast_path(state: AgentState):
+    last_message = state["messages"][-1]
+    return "call_tool" if isinstance(last_message, AIMessage) and last_message.tool_calls else "agent_brain"
     
 # --- Nodes for reliable, hardcoded tasks ---
+def confirm_patient(state: AgentState):
+    names = list(dict.fromkeys(state.get("patient_candidates") or []))
+    if not names:
+        return {"messages": [AIMessage(content="I couldn't look you up with those details. Could you please give me your full name and date of birth (YYYY-MM-DD)?")]}
+    return {"messages": [AIMessage(content=f"I couldn't find a patient with exactly those details. Did you mean {' or '.join(names)}? If so, please re-enter your full name and date of birth exactly as registered with us. Otherwise, just let me know you're a new patient.")]}
+
 def ask_for_insurance(state: AgentState):
-    print("---NODE: ASK FOR INSURANCE---")
     return {"messages": [AIMessage(content="To proceed, could you please provide your insurance carrier, member ID, and group number? If you don't have insurance, just let me know.")]}
 
 def ask_or_confirm_doctor(state: AgentState):
-    print("---NODE: ASK/CONFIRM DOCTOR---")
-    if state.get("patient_status") == "RETURNING":
+    if state.get("patient_status") == "RETURNING" and state.get("doctor_name"):
         doctor_name = state.get("doctor_name")
         return {"messages": [AIMessage(content=f"Welcome back! Your last visit was with {doctor_name}. Would you like to schedule with them again or see a different doctor?")]}
     else:
-        doctor_options = "\n".join([f"- {d['name']} ({d['specialty']})" for d in state.get("doctor_list", [])])
+        doctor_options = "\n".join([f"- {d['name']} ({d['specialty']})" for d in state.get("doctor_list") or []])
         return {"messages": [AIMessage(content=f"Thank you. Here are our available doctors. Please choose one:\n{doctor_options}")]}
 
-def present_slots(state: AgentState):
-    print("---NODE: PRESENT SLOTS---")
-    slots = state.get("available_slots")
+def present_slots(state: AgentState, config: RunnableConfig):
+    # Hold what we show; slots booked or held by other sessions are left out
+    slots = hold_slots(state.get("doctor_name"), state.get("available_slots") or [],
+                       config["configurable"].get("thread_id"), state.get("patient_status") == "NEW", limit=SLOTS_SHOWN)
     if not slots:
-        return {"messages": [AIMessage(content="I'm sorry, but there are no available slots for that doctor in the near future. Would you like to try a different doctor?")]}
-    return {"messages": [AIMessage(content=f"Great, here are the available slots: {', '.join(slots)}. Please choose your preferred time.")]}
+        return {"available_slots": [], "messages": [AIMessage(content="I'm sorry, but there are no available slots for that doctor in the near future. Would you like to try a different doctor?")]}
+    return {"available_slots": slots, "messages": [AIMessage(content=f"Great, here are the available slots: {', '.join(slots)}. Please choose your preferred time.")]}
+
+def present_first_available(state: AgentState, config: RunnableConfig):
+    # The earliest slots can belong to several doctors; each doctor's are held separately
+    offered = state.get("first_available") or []
+    by_doctor = {}
+    for entry in offered:
+        by_doctor.setdefault(entry["doctor_name"], []).append(entry["slot"])
+    held = {doctor_name: set(hold_slots(doctor_name, slots, config["configurable"].get("thread_id"), state.get("patient_status") == "NEW"))
+            for doctor_name, slots in by_doctor.items()}
+    offered = [entry for entry in offered if entry["slot"] in held[entry["doctor_name"]]]
+    if not offered:
+        return {"first_available": [], "messages": [AIMessage(content="I'm sorry, but none of our doctors has an available slot in the near future.")]}
+    options = "\n".join(f"- {entry['slot']} with {entry['doctor_name']}" for entry in offered)
+    return {"first_available": offered, "messages": [AIMessage(content=f"Here are the earliest available appointments:\n{options}\nPlease choose your preferred time.")]}
+
+# What final_confirmation says about each post-booking job: (once it has run, while it is queued)
+NOTIFICATION_NOTICES = {
+    "intake_forms_job": ("sent the intake forms to your email", "queued the intake forms for your email"),
+    "reminders_job": ("scheduled reminders", "queued your reminders"),
+}
 
 def final_confirmation(state: AgentState):
-    print("---NODE: FINAL CONFIRMATION---")
     tool_messages = [msg.content for msg in state.get("messages", []) if isinstance(msg, ToolMessage)]
     final_booking_message = tool_messages[-3] # Assuming book_appointment is the first of the last three tools
-    return {"messages": [AIMessage(content=f"Excellent, we're all set! {final_booking_message} We've also sent the intake forms to your email and scheduled reminders.")]}
+    # The notifications run as background jobs; report whether each has gone out yet
+    notices = []
+    for key, (sent, queued) in NOTIFICATION_NOTICES.items():
+        job = get_job_queue().status(state[key]) if state.get(key) is not None else None
+        notices.append(sent if job is None or job.status == "done" else queued)
+    return {"messages": [AIMessage(content=f"Excellent, we're all set! {final_booking_message} We've also {' and '.join(notices)}.")]}
 
 def call_get_doctor_list_node(state: AgentState):
     """A dedicated node to call the get_doctor_list tool."""
-    print("---NODE: GETTING DOCTOR LIST---")
     return {"messages": [AIMessage(content="", tool_calls=[ToolCall(name="get_doctor_list", args={}, id="get_docs")])]}
     
 def call_get_available_slots_node(state: AgentState):
     """A dedicated node to call the get_available_slots tool."""
-    print("---NODE: GETTING SLOTS---")
-    is_new = state.get("patient_status") == "NEW"
-    return {"messages": [AIMessage(content="", tool_calls=[ToolCall(name="get_available_slots", args={"is_new_patient": is_new}, id="get_slots")])]}
+    args = {"is_new_patient": state.get("patient_status") == "NEW", "doctor_name": state.get("doctor_name")}
+    return {"messages": [AIMessage(content="", tool_calls=[ToolCall(name="get_available_slots", args=args, id="get_slots")])]}
+
+# Nodes whose AIMessage is the reply shown to the user
+RESPONSE_NODES = ("confirm_patient", "ask_for_insurance", "ask_or_confirm_doctor", "present_slots", "present_first_available", "final_confirmation")
 
 # --- 4. The Main Router ---
 def router(state: AgentState):
     """The main router. It inspects the state and decides the next step."""
-    print("---NODE: ROUTER---")
-    
     last_message = state["messages"][-1]
     
     if isinstance(last_message, HumanMessage):
@@ -179,47 +274,98 @@ def router(state: AgentState):
         last_tool_name = parent_ai_message.tool_calls[-1]["name"]
         
         if last_tool_name == "search_patient_in_emr":
-            return "ask_for_insurance" if state.get("patient_status") == "NEW" else "ask_or_confirm_doctor"
+            if not state.get("patient_status"):  # Near-misses to confirm, or the lookup failed
+                return "confirm_patient"
+            if state.get("patient_status") == "NEW":
+                return "ask_for_insurance"
+            # A returning patient with no last-visit doctor picks one from the list
+            return "ask_or_confirm_doctor" if state.get("doctor_name") else "call_get_doctor_list"
         if last_tool_name in ["collect_insurance_details", "skip_insurance"]:
             return "call_get_doctor_list" if state.get("patient_status") == "NEW" else "call_get_available_slots"
         if last_tool_name == "get_doctor_list":
             return "ask_or_confirm_doctor"
         if last_tool_name == "get_available_slots":
             return "present_slots"
+        if last_tool_name == "find_first_available":
+            return "present_first_available"
         if last_tool_name == "book_appointment":
-            return "agent_brain"
+            return "fast_path"
         if last_tool_name in ["send_intake_forms", "schedule_reminders"]:
             return "final_confirmation"
             
     return END
 
 # --- 5. Build the Final Graph ---
-workflow = StateGraph(AgentState)
+def build_graph():
+    """Compiles the agent graph with the configured checkpointer."""
+    from langgraph.graph import StateGraph
+    from app.checkpoint import create_checkpointer
+
+    workflow = StateGraph(AgentState)
+
+    workflow.add_node("fast_path", instrument_node("fast_path", fast_path))
+    workflow.add_node("agent_brain", instrument_node("agent_brain", agent_brain))
+    workflow.add_node("call_tool", instrument_node("call_tool", call_tool_and_update_state))
+    workflow.add_node("extract_user_choice", instrument_node("extract_user_choice", extract_user_choice))
+    workflow.add_node("confirm_patient", instrument_node("confirm_patient", confirm_patient))
+    workflow.add_node("ask_for_insurance", instrument_node("ask_for_insurance", ask_for_insurance))
+    workflow.add_node("ask_or_confirm_doctor", instrument_node("ask_or_confirm_doctor", ask_or_confirm_doctor))
+    workflow.add_node("present_slots", instrument_node("present_slots", present_slots))
+    workflow.add_node("present_first_available", instrument_node("present_first_available", present_first_available))
+    workflow.add_node("final_confirmation", instrument_node("final_confirmation", final_confirmation))
+    workflow.add_node("call_get_doctor_list", instrument_node("call_get_doctor_list", call_get_doctor_list_node))
+    workflow.add_node("call_get_available_slots", instrument_node("call_get_available_slots", call_get_available_slots_node))
+
+    workflow.set_entry_point("fast_path")
+
+    # Structured turns skip the LLM; everything else goes to the brain
+    workflow.add_conditional_edges("fast_path", route_fast_path)
+
+    workflow.add_conditional_edges("agent_brain", lambda x: "call_tool")
+    workflow.add_edge("call_get_doctor_list", "call_tool")
+    workflow.add_edge("call_get_available_slots", "call_tool")
+
+    # This is the central routing logic after a tool is called
+    workflow.add_conditional_edges("call_tool", router)
 
-workflow.add_node("agent_brain", agent_brain)
-workflow.add_node("call_tool", call_tool_and_update_state)
-workflow.add_node("extract_user_choice", extract_user_choice)
-workflow.add_node("ask_for_insurance", ask_for_insurance)
-workflow.add_node("ask_or_confirm_doctor", ask_or_confirm_doctor)
-workflow.add_node("present_slots", present_slots)
-workflow.add_node("final_confirmation", final_confirmation)
-workflow.add_node("call_get_doctor_list", call_get_doctor_list_node)
-workflow.add_node("call_get_available_slots", call_get_available_slots_node)
+    # A question ends the turn; the user's reply re-enters at the fast path
+    workflow.add_edge("confirm_patient", END)
+    workflow.add_edge("ask_for_insurance", END)
+    workflow.add_edge("ask_or_confirm_doctor", END)
+    workflow.add_edge("present_slots", END)
+    workflow.add_edge("present_first_available", END)
 
-workflow.set_entry_point("agent_brain")
+    workflow.add_edge("final_confirmation", END)
 
-workflow.add_conditional_edges("agent_brain", lambda x: "call_tool")
-workflow.add_edge("call_get_doctor_list", "call_tool")
-workflow.add_edge("call_get_available_slots", "call_tool")
+    return workflow.compile(checkpointer=create_checkpointer())
 
-# This is the central routing logic after a tool is called
-workflow.add_conditional_edges("call_tool", router)
+_app_graph = None
+_app_graph_lock = threading.Lock()
 
-# After the user replies to a question, we extract their choice, then go to the brain
-workflow.add_edge("ask_for_insurance", "agent_brain")
-workflow.add_edge("ask_or_confirm_doctor", "agent_brain")
-workflow.add_edge("present_slots", "agent_brain")
+def get_app_graph():
+    """The compiled graph, built once on first use (the API builds it at startup)."""
+    global _app_graph
+    if _app_graph is None:
+        with _app_graph_lock:
+            if _app_graph is None:
+                _app_graph = build_graph()
+    return _app_graph
 
-workflow.add_edge("final_confirmation", END)
+def __getattr__(name):
+    # `from app.agent import app_graph` still works; it builds the graph on access
+    if name == "app_graph":
+        return get_app_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-app_graph = workflow.compile(checkpointer=MemorySaver())
\ No newline at end of file
+# Turns served by the rule-based fast path vs. handed to the LLM, read at scrape time
+REGISTRY.register_collector(lambda: [
+    "# HELP agent_fast_path_turns_total Turns classified by the fast path, by intent (llm = sent to agent_brain).",
+    "# TYPE agent_fast_path_turns_total counter",
+    *(f'agent_fast_path_turns_total{{intent="{label}"}} {count}' for label, count in sorted(fast_path_stats.items())),
+    "# HELP agent_decision_cache_total agent_brain decisions served from the cache (hit) or the LLM (miss), and LLM decisions not cached.",
+    "# TYPE agent_decision_cache_total counter",
+    *(f'agent_decision_cache_total{{result="{result}"}} {decision_cache.stats[result]}' for result in ("hit", "miss", "uncacheable")),
+    "# HELP agent_decision_cache_saved_seconds_total LLM time saved by decision cache hits, as measured when each decision was made.",
+    "# TYPE agent_decision_cache_saved_seconds_total counter",
+    f"agent_decision_cache_saved_seconds_total {decision_cache.stats['saved_seconds']:g}",
+])
\ No newline at end of file
@@ -0,0 +1,259 @@
+# app/availability.py
+
+import calendar
+import math
+import re
+import threading
+import time
+from datetime import date, datetime, timezone
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.doctors import DoctorDirectory
+from app.reservations import ReservationBook
+
+MINUTES_PER_DAY = 24 * 60
+DAY_NAMES = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+# Used when a doctor's row leaves the column empty
+DEFAULT_DAYS = "Monday-Friday"
+DEFAULT_HOURS = "09:00-17:00"
+DEFAULT_BREAKS = "12:00-13:00"
+
+_CLOCK = r"(\d{1,2})(?:[:.](\d{2}))?(?:\s*([ap])\.?m\.?)?"
+_CLOCK_RANGE_RE = re.compile(rf"{_CLOCK}\s*(?:-|–|to)\s*{_CLOCK}", re.IGNORECASE)
+_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+class _Compiled(NamedTuple):
+    names: List[str]
+    rows: Dict[str, int]       # Lowercased name -> row
+    weeks: np.ndarray          # (doctors, 7, blocks per day) open blocks
+    time_off: Tuple[np.ndarray, np.ndarray, np.ndarray]  # (row, starts_at, ends_at)
+
+
+class DoctorSchedule(NamedTuple):
+    """A doctor's weekly schedule; times are minutes after midnight, clinic time (UTC, like every slot)."""
+    days: Tuple[int, ...]                      # Weekdays worked, Monday = 0
+    hours: Tuple[Tuple[int, int], ...]         # Working hours on those days
+    breaks: Tuple[Tuple[int, int], ...]        # Taken out of the working hours every day
+    time_off: Tuple[Tuple[float, float], ...]  # (starts_at, ends_at) POSIX timestamps
+
+
+# --- Parsing the schedule workbook ---
+
+def _weekday(token: str) -> int:
+    letters = re.sub(r"[^a-z]", "", token.lower())
+    for number, name in enumerate(DAY_NAMES):
+        # Three letters are enough, which also forgives typos like 'Thurday'
+        if len(letters) >= 3 and name.startswith(letters[:3]):
+            return number
+    raise ValueError(f"Unknown weekday '{token.strip()}'")
+
+
+def parse_days(text: str) -> Tuple[int, ...]:
+    """'Monday-Friday', 'Tue, Thu', 'Thursday-Sunday' (wraps around) -> sorted weekday numbers."""
+    days = set()
+    for part in re.split(r"[,;/&]|\band\b", text):
+        ends = [_weekday(token) for token in re.split(r"-|–|\bto\b", part) if token.strip()]
+        if len(ends) == 1:
+            days.add(ends[0])
+        elif len(ends) == 2:
+            days.update((ends[0] + i) % 7 for i in range((ends[1] - ends[0]) % 7 + 1))
+        elif ends:
+            raise ValueError(f"Can't read the days '{part.strip()}'")
+    return tuple(sorted(days))
+
+
+def _minutes(hour: str, minute: Optional[str], meridiem: Optional[str]) -> int:
+    hour, minute = int(hour), int(minute or 0)
+    if meridiem:
+        hour = hour % 12 + (12 if meridiem.lower() == "p" else 0)
+    value = hour * 60 + minute
+    if minute > 59 or value > MINUTES_PER_DAY:
+        raise ValueError(f"Invalid time {hour}:{minute:02d}")
+    return value
+
+
+def parse_ranges(text: str) -> Tuple[Tuple[int, int], ...]:
+    """'09:00-12:00, 1pm-5pm' -> ((540, 720), (780, 1020)); minutes after midnight. 'none' -> ()."""
+    ranges = []
+    if text.strip().lower() == "none":
+        return ()
+    for part in re.split(r"[,;]", text):
+        if not part.strip():
+            continue
+        match = _CLOCK_RANGE_RE.fullmatch(part.strip())
+        if not match:
+            raise ValueError(f"Can't read the time range '{part.strip()}'")
+        start, end = _minutes(*match.group(1, 2, 3)), _minutes(*match.group(4, 5, 6))
+        if end <= start:
+            raise ValueError(f"Time range '{part.strip()}' ends before it starts")
+        ranges.append((start, end))
+    return tuple(ranges)
+
+
+def _day_start(text: str) -> float:
+    return calendar.timegm(date.fromisoformat(text).timetuple())
+
+
+def parse_time_off(text: str) -> Tuple[Tuple[float, float], ...]:
+    """
+    '2026-12-24, 2026-12-28..2026-12-31, 2026-11-02 13:00-17:00' -> (starts_at,
+    ends_at) timestamps: whole days, inclusive day ranges, or part of a day.
+    """
+    periods = []
+    for part in re.split(r"[,;]", text):
+        dates = _DATE_RE.findall(part)
+        if not dates:
+            if part.strip():
+                raise ValueError(f"Can't read the time off '{part.strip()}'")
+            continue
+        first = _day_start(dates[0])
+        hours = _CLOCK_RANGE_RE.search(_DATE_RE.sub(" ", part))
+        if hours and len(dates) == 1:
+            start, end = _minutes(*hours.group(1, 2, 3)), _minutes(*hours.group(4, 5, 6))
+            periods.append((first + start * 60, first + end * 60))
+        else:
+            periods.append((first, _day_start(dates[-1]) + MINUTES_PER_DAY * 60))
+    return tuple(periods)
+
+
+def parse_schedule(record: Dict[str, str]) -> DoctorSchedule:
+    """The schedule in a doctor's workbook row ('availability', 'hours', 'breaks', 'time_off' columns)."""
+    try:
+        return DoctorSchedule(
+            days=parse_days(record.get("availability") or DEFAULT_DAYS),
+            hours=parse_ranges(record.get("hours") or DEFAULT_HOURS),
+            breaks=parse_ranges(record.get("breaks") or DEFAULT_BREAKS),
+            time_off=parse_time_off(record.get("time_off") or ""),
+        )
+    except ValueError as e:
+        raise ValueError(f"{record.get('name')}: {e}") from None
+
+
+# --- The engine ---
+
+class AvailabilityEngine:
+    """
+    Free appointment slots computed locally from the doctors' schedules.
+
+    Each doctor's week is compiled once at minute resolution (working hours
+    minus breaks, a (7, 1440) boolean array) and reduced to `step_minutes`
+    blocks; a block is open only if every minute in it is. A query lays the
+    weeks over the requested days, one row per doctor, and clears every
+    block that time off, a booking or another session's hold touches, using
+    a difference array (+1 where an interval starts, -1 after it ends) and a
+    cumulative sum along the row. A slot is a run of open blocks long enough
+    for the appointment. Everything is NumPy array arithmetic across all the
+    requested doctors at once.
+    """
+
+    def __init__(self, directory: DoctorDirectory, reservations: Optional[ReservationBook] = None,
+                 step_minutes: int = 30, clock: Callable[[], float] = time.time):
+        if MINUTES_PER_DAY % step_minutes:
+            raise ValueError("step_minutes must divide a day")
+        self.directory = directory
+        self.reservations = reservations
+        self.step_minutes = step_minutes
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._source = None
+        self._compiled: Optional[_Compiled] = None
+
+    def refresh(self) -> _Compiled:
+        """Recompiles the weekly arrays if the doctor directory changed."""
+        doctors = self.directory.get_doctors()
+        source = [tuple(doctor.get(key, "") for key in ("name", "availability", "hours", "breaks", "time_off")) for doctor in doctors]
+        if source == self._source:
+            return self._compiled
+        with self._lock:
+            if source == self._source:
+                return self._compiled
+            blocks_per_day = MINUTES_PER_DAY // self.step_minutes
+            weeks = np.zeros((len(doctors), 7, blocks_per_day), dtype=bool)
+            working_days = {}  # Doctors often share hours and breaks; build each working day once
+            off_rows, off_starts, off_ends = [], [], []
+            for row, doctor in enumerate(doctors):
+                schedule = parse_schedule(doctor)
+                day = working_days.get((schedule.hours, schedule.breaks))
+                if day is None:
+                    minutes = np.zeros(MINUTES_PER_DAY, dtype=bool)
+                    for start, end in schedule.hours:
+                        minutes[start:end] = True
+                    for start, end in schedule.breaks:
+                        minutes[start:end] = False
+                    day = working_days[(schedule.hours, schedule.breaks)] = minutes.reshape(blocks_per_day, -1).all(axis=1)
+                weeks[row, list(schedule.days)] = day
+                for start, end in schedule.time_off:
+                    off_rows.append(row)
+                    off_starts.append(start)
+                    off_ends.append(end)
+            names = [doctor["name"] for doctor in doctors]
+            self._compiled = _Compiled(
+                names, {name.strip().lower(): row for row, name in enumerate(names)}, weeks,
+                (np.array(off_rows, dtype=np.int64), np.array(off_starts, dtype=float), np.array(off_ends, dtype=float)),
+            )
+            self._source = source
+            return self._compiled
+
+    def _busy(self, compiled: _Compiled, rows: np.ndarray, starts_at: float, ends_at: float, session_id: Optional[str]):
+        """(row, starts_at, ends_at) arrays of time off, bookings and other sessions' holds in the window."""
+        off_rows, off_starts, off_ends = compiled.time_off
+        wanted = np.isin(off_rows, rows) & (off_starts < ends_at) & (off_ends > starts_at)
+        busy_rows, busy_starts, busy_ends = [off_rows[wanted]], [off_starts[wanted]], [off_ends[wanted]]
+        if self.reservations is not None:
+            taken = self.reservations.busy([compiled.names[row] for row in rows], starts_at, ends_at, session_id=session_id)
+            for doctor_name, (starts, ends) in taken.items():
+                busy_rows.append(np.full(len(starts), compiled.rows[doctor_name.strip().lower()], dtype=np.int64))
+                busy_starts.append(np.array(starts, dtype=float))
+                busy_ends.append(np.array(ends, dtype=float))
+        return np.concatenate(busy_rows), np.concatenate(busy_starts), np.concatenate(busy_ends)
+
+    def free_slots(self, doctor_names: Optional[Sequence[str]] = None, minutes: int = 30, days: int = 7,
+                   start: Optional[date] = None, not_before: Optional[float] = None,
+                   session_id: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """
+        Free `minutes`-long slots per doctor over `days` days from `start`
+        (default: today), as ascending POSIX start times. Slots before
+        `not_before` (default: now) are left out; `session_id`'s own holds
+        don't hide slots. Raises KeyError for a doctor not in the directory.
+        """
+        compiled = self.refresh()
+        not_before = self.clock() if not_before is None else not_before
+        start = start or datetime.fromtimestamp(not_before, timezone.utc).date()
+        origin = calendar.timegm(start.timetuple())
+        block_seconds = self.step_minutes * 60
+        span = days * (MINUTES_PER_DAY // self.step_minutes)
+        if doctor_names is None:
+            rows = np.arange(len(compiled.names))
+        else:
+            rows = np.array([compiled.rows[name.strip().lower()] for name in doctor_names], dtype=np.int64)
+
+        # Open blocks: the compiled weeks laid over the requested days
+        weekdays = (start.weekday() + np.arange(days)) % 7
+        free = compiled.weeks[rows[:, None], weekdays].reshape(len(rows), span)
+
+        # Busy blocks: every block an interval touches, from a difference array summed along each row
+        busy_rows, busy_starts, busy_ends = self._busy(compiled, rows, origin, origin + span * block_seconds, session_id)
+        if len(busy_rows):
+            position = np.full(len(compiled.names), -1, dtype=np.int64)
+            position[rows] = np.arange(len(rows))
+            first = np.clip(np.floor((busy_starts - origin) / block_seconds), 0, span).astype(np.int64)
+            last = np.clip(np.ceil((busy_ends - origin) / block_seconds), 0, span).astype(np.int64)
+            offsets = position[busy_rows] * (span + 1)
+            size = len(rows) * (span + 1)
+            marks = np.bincount(offsets + first, minlength=size) - np.bincount(offsets + last, minlength=size)
+            free &= np.cumsum(marks.reshape(len(rows), span + 1)[:, :span], axis=1) == 0
+
+        # A slot needs `length` open blocks in a row, starting no earlier than not_before
+        length = math.ceil(minutes / self.step_minutes)
+        count = span - length + 1
+        if count <= 0:
+            return {compiled.names[row]: np.zeros(0, dtype=np.int64) for row in rows}
+        fits = free[:, :count].copy()
+        for offset in range(1, length):
+            fits &= free[:, offset:offset + count]
+        fits[:, :max(0, math.ceil((not_before - origin) / block_seconds))] = False
+        starts = origin + np.arange(count, dtype=np.int64) * block_seconds
+        return {compiled.names[row]: starts[fits[i]] for i, row in enumerate(rows)}
@@ -0,0 +1,397 @@
+# app/bookings.py
+
+import asyncio
+import calendar
+import csv
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bookings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    patient_name TEXT NOT NULL,
+    doctor_name TEXT NOT NULL,
+    appointment_time TEXT NOT NULL,
+    booking_date TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    starts_at INTEGER,
+    ends_at INTEGER
+);
+"""
+# Sorted indexes for range queries: one doctor's bookings, and every doctor's by start time
+# (covering, so daily utilization never reads the table)
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS bookings_doctor_start ON bookings (doctor_name, starts_at);
+CREATE INDEX IF NOT EXISTS bookings_start ON bookings (starts_at, doctor_name, ends_at);
+"""
+COLUMNS = ("patient_name", "doctor_name", "appointment_time", "booking_date")
+# No appointment is longer than this; bounds the overlap query on starts_at
+MAX_APPOINTMENT_SECONDS = 4 * 3600
+# bookings.csv never recorded durations
+LEGACY_APPOINTMENT_MINUTES = 30
+# Formats appointment_time has been stored in (slot format first); ISO 8601 is also accepted
+APPOINTMENT_TIME_FORMATS = ('%A, %B %d, %Y at %I:%M %p', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %I:%M %p', '%Y-%m-%d %H:%M')
+DAY_SECONDS = 86400
+# The slot format, parsed without strptime: "Monday, September 08, 2025 at 03:30 AM"
+_SLOT_RE = re.compile(r"([A-Za-z]+), ([A-Za-z]+) (\d{1,2}), (\d{4}) at (\d{1,2}):(\d{2}) ([AaPp])[Mm]")
+_WEEKDAYS = {name.lower() for name in calendar.day_name}
+_MONTHS = {name.lower(): number for number, name in enumerate(calendar.month_name) if name}
+
+
+class BookedInterval(NamedTuple):
+    booking_id: int
+    patient_name: str
+    doctor_name: str
+    starts_at: int    # UTC epoch seconds
+    ends_at: int
+
+
+class DailyUtilization(NamedTuple):
+    doctor_name: str
+    day: int             # UTC epoch seconds of the day's midnight
+    bookings: int
+    booked_seconds: int
+
+
+class BookingResult(NamedTuple):
+    booking_id: Optional[int]
+    created: bool            # False when the key was already booked or the slot was taken
+    conflict: bool = False   # True when another booking overlaps the requested interval
+
+
+@lru_cache(maxsize=8192)
+def appointment_timestamp(appointment_time: str) -> Optional[int]:
+    """
+    Parses an appointment time in any stored format to UTC epoch seconds.
+    Naive times are read as UTC; ISO 8601 times with an offset are converted.
+    Returns None when there is no date and time to parse.
+    """
+    text = appointment_time.strip()
+    match = _SLOT_RE.fullmatch(text)
+    if match and match[1].lower() in _WEEKDAYS and match[2].lower() in _MONTHS and 1 <= int(match[5]) <= 12:
+        fields = (int(match[4]), _MONTHS[match[2].lower()], int(match[3]), int(match[5]) % 12 + (12 if match[7] in "Pp" else 0), int(match[6]))
+        try:
+            datetime(*fields)  # Validates the day of the month and the minute
+        except ValueError:
+            return None
+        return calendar.timegm(fields + (0,))
+    when = None
+    if text[10:11] in ("T", " "):  # ISO 8601 (a date alone is not an appointment time)
+        try:
+            when = datetime.fromisoformat(text)
+        except ValueError:
+            pass
+    for fmt in APPOINTMENT_TIME_FORMATS if when is None else ():
+        try:
+            when = datetime.strptime(text, fmt)
+            break
+        except ValueError:
+            pass
+    if when is None:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return int(when.timestamp())
+
+
+def appointment_label(timestamp: float) -> str:
+    """Renders a POSIX timestamp the way slots are shown to patients (the inverse of appointment_timestamp)."""
+    return time.strftime(APPOINTMENT_TIME_FORMATS[0], time.gmtime(timestamp))
+
+
+def idempotency_key(session_id: Optional[str], *parts: str) -> str:
+    """
+    One operation per session and `parts` (a booking is keyed by doctor and
+    slot); without a session every call is a new operation.
+    """
+    if not session_id:
+        return f"anon:{uuid.uuid4().hex}"
+    return "|".join((session_id, *parts))
+
+
+class _Pending(NamedTuple):
+    key: str
+    row: tuple
+    interval: Optional[tuple]    # (starts_at, ends_at) to check for overlaps, or None
+    future: Future
+
+
+class BookingLedger:
+    """
+    An append-only booking ledger in SQLite (WAL mode).
+
+    All writes in a process go through one writer thread that owns the write
+    connection. It drains queued bookings into a single transaction (group
+    commit: up to `batch_size` rows, waiting at most `max_delay_seconds` for
+    more after the first), so concurrent bookings share one fsync. Across
+    worker processes SQLite's write lock serializes the batches. Every row
+    carries a unique idempotency key; recording a key that already exists
+    returns the original booking instead of inserting a duplicate. Bookings
+    given an interval are rejected, inside the same write transaction, when
+    they overlap an existing booking for the doctor. Intervals are UTC epoch
+    seconds; sorting, range queries and conflict checks use them, never the
+    appointment_time text.
+    """
+
+    def __init__(self, db_path: str, batch_size: int = 256, max_delay_seconds: float = 0.002):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.max_delay_seconds = max_delay_seconds
+        self._queue: "queue.Queue[Optional[_Pending]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._lock = threading.Lock()  # Guards the reader connection
+        self._conn = self._connect()
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(bookings)")}
+        if "starts_at" not in columns:
+            self._add_intervals()
+        self._conn.executescript(_INDEXES)
+
+    def _add_intervals(self):
+        """Migrates a ledger created before intervals were tracked."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            if "starts_at" in {row[1] for row in self._conn.execute("PRAGMA table_info(bookings)")}:
+                self._conn.execute("COMMIT")  # Another worker migrated it first
+                return
+            self._conn.execute("ALTER TABLE bookings ADD COLUMN starts_at INTEGER")
+            self._conn.execute("ALTER TABLE bookings ADD COLUMN ends_at INTEGER")
+            updates = []
+            for booking_id, appointment_time in self._conn.execute("SELECT id, appointment_time FROM bookings"):
+                starts_at = appointment_timestamp(appointment_time)
+                if starts_at is not None:
+                    updates.append((starts_at, starts_at + LEGACY_APPOINTMENT_MINUTES * 60, booking_id))
+            self._conn.executemany("UPDATE bookings SET starts_at = ?, ends_at = ? WHERE id = ?", updates)
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # --- Writes ---
+
+    def record(self, patient_name: str, doctor_name: str, appointment_time: str, key: Optional[str] = None,
+               booking_date: Optional[str] = None, interval: Optional[tuple] = None) -> BookingResult:
+        """Appends a booking and blocks until it is committed."""
+        return self.submit(patient_name, doctor_name, appointment_time, key, booking_date, interval).result()
+
+    async def arecord(self, patient_name: str, doctor_name: str, appointment_time: str, key: Optional[str] = None,
+                      booking_date: Optional[str] = None, interval: Optional[tuple] = None) -> BookingResult:
+        return await asyncio.wrap_future(self.submit(patient_name, doctor_name, appointment_time, key, booking_date, interval))
+
+    def submit(self, patient_name: str, doctor_name: str, appointment_time: str, key: Optional[str] = None,
+               booking_date: Optional[str] = None, interval: Optional[tuple] = None) -> Future:
+        """
+        Queues a booking for the writer thread; the future resolves to a
+        BookingResult. `interval` is the (starts_at, ends_at) the booking
+        occupies; when given, overlapping bookings for the doctor are refused.
+        """
+        self._ensure_writer()
+        row = (patient_name, doctor_name, appointment_time, booking_date or datetime.now().strftime("%Y-%m-%d"))
+        pending = _Pending(key or idempotency_key(None, appointment_time), row, interval, Future())
+        self._queue.put(pending)
+        return pending.future
+
+    def _ensure_writer(self):
+        if self._writer is None:
+            with self._start_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name="booking-ledger-writer", daemon=True)
+                    self._writer.start()
+
+    def _next_batch(self) -> List[Optional[_Pending]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_delay_seconds
+        while len(batch) < self.batch_size and batch[-1] is not None:
+            try:
+                batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write_loop(self):
+        conn = self._connect()
+        try:
+            while True:
+                batch = self._next_batch()
+                stop = batch[-1] is None
+                pending = [p for p in batch if p is not None]
+                if pending:
+                    self._commit(conn, pending)
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    def _commit(self, conn: sqlite3.Connection, batch: List[_Pending]):
+        results = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                for pending in batch:
+                    existing = conn.execute("SELECT id FROM bookings WHERE idempotency_key = ?", (pending.key,)).fetchone()
+                    if existing:
+                        results.append(BookingResult(existing[0], False))
+                        continue
+                    starts_at, ends_at = pending.interval or (None, None)
+                    if pending.interval and self._overlapping(conn, pending.row[1], starts_at, ends_at):
+                        results.append(BookingResult(None, False, conflict=True))
+                        continue
+                    cursor = conn.execute(
+                        "INSERT INTO bookings (idempotency_key, patient_name, doctor_name, appointment_time, booking_date, created_at, starts_at, ends_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (pending.key, *pending.row, now, starts_at, ends_at),
+                    )
+                    results.append(BookingResult(cursor.lastrowid, True))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except Exception as e:
+            for pending in batch:
+                pending.future.set_exception(e)
+            return
+        for pending, result in zip(batch, results):
+            pending.future.set_result(result)
+
+    @staticmethod
+    def _overlapping(conn: sqlite3.Connection, doctor_name: str, starts_at: float, ends_at: float) -> bool:
+        return conn.execute(
+            "SELECT 1 FROM bookings WHERE doctor_name = ? AND starts_at > ? AND starts_at < ? AND ends_at > ? LIMIT 1",
+            (doctor_name, starts_at - MAX_APPOINTMENT_SECONDS, ends_at, starts_at),
+        ).fetchone() is not None
+
+    # --- Reads ---
+
+    def find(self, key: str) -> Optional[BookedInterval]:
+        """The booking recorded under an idempotency key, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, patient_name, doctor_name, CAST(starts_at AS INTEGER), CAST(ends_at AS INTEGER) FROM bookings "
+                "WHERE idempotency_key = ?",
+                (key,),
+            ).fetchone()
+        return BookedInterval(*row) if row else None
+
+    def intervals(self, after_id: int = 0) -> List[tuple]:
+        """(id, doctor_name, starts_at, ends_at) of bookings with a known interval, oldest first."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, doctor_name, CAST(starts_at AS INTEGER), CAST(ends_at AS INTEGER) FROM bookings "
+                "WHERE id > ? AND starts_at IS NOT NULL ORDER BY id",
+                (after_id,),
+            ).fetchall()
+
+    def bookings_between(self, doctor_name: str, starts_at: float, ends_at: float) -> List[BookedInterval]:
+        """
+        The doctor's bookings overlapping [starts_at, ends_at), by start time.
+        A range scan of the (doctor_name, starts_at) index: O(log n + k).
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, patient_name, doctor_name, CAST(starts_at AS INTEGER), CAST(ends_at AS INTEGER) FROM bookings "
+                "WHERE doctor_name = ? AND starts_at > ? AND starts_at < ? AND ends_at > ? ORDER BY starts_at, id",
+                (doctor_name, starts_at - MAX_APPOINTMENT_SECONDS, ends_at, starts_at),
+            ).fetchall()
+        return [BookedInterval(*row) for row in rows]
+
+    def daily_utilization(self, starts_at: float, ends_at: float, doctor_name: Optional[str] = None) -> List[DailyUtilization]:
+        """
+        Bookings and booked seconds per doctor and UTC day, for bookings
+        starting in [starts_at, ends_at); every doctor unless `doctor_name` is
+        given. A range scan of a sorted index: O(log n + k).
+        """
+        where, params = "starts_at >= ? AND starts_at < ?", [starts_at, ends_at]
+        if doctor_name is not None:
+            where, params = f"doctor_name = ? AND {where}", [doctor_name, *params]
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT doctor_name, CAST(starts_at AS INTEGER) / {DAY_SECONDS} * {DAY_SECONDS} AS day, COUNT(*), "
+                f"CAST(SUM(ends_at - starts_at) AS INTEGER) FROM bookings WHERE {where} GROUP BY doctor_name, day ORDER BY doctor_name, day",
+                params,
+            ).fetchall()
+        return [DailyUtilization(*row) for row in rows]
+
+    def records(self) -> List[Dict[str, str]]:
+        """All bookings in the order they were recorded."""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {', '.join(COLUMNS)} FROM bookings ORDER BY id").fetchall()
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def export_rows(self, columns: Sequence[str] = COLUMNS, after_id: int = 0, limit: int = 10_000) -> List[tuple]:
+        """(id, *columns) of up to `limit` bookings recorded after `after_id`, oldest first; for chunked exports."""
+        unknown = set(columns) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown booking columns: {sorted(unknown)}")
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT id, {', '.join(columns)} FROM bookings WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit)
+            ).fetchall()
+
+    def count(self, after_id: int = 0) -> int:
+        """Bookings recorded after `after_id` (all of them by default)."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM bookings WHERE id > ?", (after_id,)).fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    # --- Migration ---
+
+    def import_csv(self, csv_path: str) -> int:
+        """
+        Copies bookings from the legacy bookings.csv into the ledger. Rows are
+        keyed by their line number, so importing the same file again is a no-op.
+        Legacy rows carry no duration and are given `LEGACY_APPOINTMENT_MINUTES`;
+        they are imported as-is, without the overlap check. Returns the number
+        of rows added.
+        """
+        if not os.path.exists(csv_path):
+            return 0
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            rows = []
+            for line, row in enumerate(csv.DictReader(f), start=2):
+                appointment_time = row.get("appointment_time") or ""
+                starts_at = appointment_timestamp(appointment_time)
+                rows.append((f"legacy-csv:{line}", row.get("patient_name") or "", row.get("doctor_name") or "",
+                             appointment_time, row.get("booking_date") or "", time.time(), starts_at,
+                             starts_at + LEGACY_APPOINTMENT_MINUTES * 60 if starts_at is not None else None))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                before = self._conn.total_changes
+                self._conn.executemany(
+                    "INSERT INTO bookings (idempotency_key, patient_name, doctor_name, appointment_time, booking_date, created_at, starts_at, ends_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (idempotency_key) DO NOTHING",
+                    rows,
+                )
+                added = self._conn.total_changes - before
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return added
+
+    def close(self):
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+        self._conn.close()
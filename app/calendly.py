@@ -0,0 +1,221 @@
+# app/calendly.py
+
+import asyncio
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.metrics import CALENDLY_LATENCY
+
+# (user URI, event type URI, time window bucket)
+CacheKey = Tuple[str, str, int]
+
+
+class _InFlight:
+    """A fetch that other callers for the same key can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[List[str]] = None
+        self.error: Optional[BaseException] = None
+
+
+class AvailabilityCache:
+    """
+    A short-lived cache for Calendly `event_type_available_times` results.
+
+    Entries are keyed by (user URI, event type URI, time window bucket) and
+    expire after `ttl_seconds`. Concurrent misses for the same key are
+    coalesced: the first caller performs the upstream request and every other
+    caller waits for its result (single-flight).
+    """
+
+    def __init__(self, ttl_seconds: float = 30.0, bucket_seconds: int = 300, clock: Callable[[], float] = time.time):
+        self.ttl_seconds = ttl_seconds
+        self.bucket_seconds = bucket_seconds
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries: Dict[CacheKey, Tuple[float, List[str]]] = {}
+        self._inflight: Dict[CacheKey, _InFlight] = {}
+        self._ainflight: Dict[CacheKey, asyncio.Future] = {}
+
+    def _key(self, user_uri: str, event_type_uri: str, now: float) -> CacheKey:
+        return (user_uri, event_type_uri, int(now // self.bucket_seconds))
+
+    @staticmethod
+    def _upcoming(slot_times: List[str], now: float) -> List[str]:
+        """Drops slots that started since the entry was fetched."""
+        return [s for s in slot_times if datetime.fromisoformat(s.replace("Z", "+00:00")).timestamp() > now]
+
+    def get(self, user_uri: str, event_type_uri: str, fetch: Callable[[str, str], List[str]]) -> List[str]:
+        """
+        Returns the available slot start times (ISO 8601 strings) for the
+        event type, calling `fetch(user_uri, event_type_uri)` only on a miss.
+        """
+        now = self.clock()
+        key = self._key(user_uri, event_type_uri, now)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[0] < self.ttl_seconds:
+                return self._upcoming(entry[1], now)
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _InFlight()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return self._upcoming(call.result, self.clock())
+
+        try:
+            call.result = fetch(user_uri, event_type_uri)
+            with self._lock:
+                if self._inflight.get(key) is call:  # Not invalidated while fetching
+                    self._entries[key] = (now, call.result)
+            return list(call.result)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is call:
+                    del self._inflight[key]
+            call.done.set()
+
+    async def aget(self, user_uri: str, event_type_uri: str, fetch: Callable[[str, str], Awaitable[List[str]]]) -> List[str]:
+        """Async counterpart of `get`; concurrent misses await a single `fetch` coroutine."""
+        now = self.clock()
+        key = self._key(user_uri, event_type_uri, now)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[0] < self.ttl_seconds:
+                return self._upcoming(entry[1], now)
+            future = self._ainflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._ainflight[key] = asyncio.get_running_loop().create_future()
+
+        if not leader:
+            result = await asyncio.shield(future)
+            return self._upcoming(result, self.clock())
+
+        try:
+            result = await fetch(user_uri, event_type_uri)
+            with self._lock:
+                if self._ainflight.get(key) is future:
+                    self._entries[key] = (now, result)
+            future.set_result(result)
+            return list(result)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark as retrieved when nobody else was waiting
+            raise
+        finally:
+            with self._lock:
+                if self._ainflight.get(key) is future:
+                    del self._ainflight[key]
+
+    def invalidate(self, user_uri: Optional[str] = None, event_type_uri: Optional[str] = None):
+        """Drops cached entries, optionally only those for one user / event type."""
+        with self._lock:
+            for store in (self._entries, self._inflight, self._ainflight):
+                for key in list(store):
+                    if (user_uri is None or key[0] == user_uri) and (event_type_uri is None or key[1] == event_type_uri):
+                        del store[key]
+
+
+def format_slot(iso_time: str) -> str:
+    """Renders a Calendly ISO 8601 start time the way slots are shown to patients."""
+    return datetime.fromisoformat(iso_time.replace("Z", "+00:00")).astimezone(timezone.utc).strftime('%A, %B %d, %Y at %I:%M %p')
+
+
+class CalendlyClient:
+    """
+    A shared, connection-pooled async client for the Calendly API.
+
+    One instance is created per process (see `app.tools.get_calendly_client`)
+    so every request reuses pooled keep-alive connections instead of paying a
+    fresh TCP+TLS handshake. Requests are bounded by a concurrency limit and
+    retried with exponential backoff on 429/5xx responses and transport errors.
+    A Retry-After is honored up to `max_retry_delay`, and no retry starts
+    unless it (wait plus a full request timeout) would end within
+    `retry_budget_seconds` of the first attempt, so one call stays well
+    inside the tool timeout.
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, base_url: str, api_key: Optional[str], timeout: float = 10.0, max_retries: int = 3,
+                 backoff_seconds: float = 0.5, max_concurrency: int = 20, max_retry_delay: float = 5.0,
+                 retry_budget_seconds: float = 20.0):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_retry_delay = max_retry_delay
+        self.retry_budget_seconds = retry_budget_seconds
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+        )
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.max_retry_delay)
+        return min(self.backoff_seconds * (2 ** attempt) * (0.5 + random.random() / 2), self.max_retry_delay)
+
+    def _can_retry(self, attempt: int, delay: float, deadline: float) -> bool:
+        return attempt < self.max_retries and time.monotonic() + delay + self.timeout <= deadline
+
+    async def get_json(self, path: str, params: dict) -> dict:
+        """GETs `path`, retrying transient failures within the retry budget; raises httpx.HTTPStatusError otherwise."""
+        deadline = time.monotonic() + self.retry_budget_seconds
+        attempt = 0
+        while True:
+            response = None
+            try:
+                async with self._semaphore:
+                    start = time.perf_counter()
+                    try:
+                        response = await self._client.get(path, params=params)
+                    finally:
+                        CALENDLY_LATENCY.labels(str(response.status_code) if response is not None else "error").observe(time.perf_counter() - start)
+                if response.status_code not in self.RETRY_STATUSES:
+                    response.raise_for_status()
+                    return response.json()
+                delay = self._retry_delay(attempt, response)
+                if not self._can_retry(attempt, delay, deadline):
+                    response.raise_for_status()
+            except httpx.TransportError:
+                delay = self._retry_delay(attempt, None)
+                if not self._can_retry(attempt, delay, deadline):
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def available_times(self, user_uri: str, event_type_uri: str) -> List[str]:
+        """Fetches the next 7 days of available start times for an event type."""
+        start_time = datetime.now(timezone.utc) + timedelta(minutes=1)
+        end_time = start_time + timedelta(days=7)
+        data = await self.get_json("/event_type_available_times", {
+            "user": user_uri,
+            "event_type": event_type_uri,
+            "start_time": start_time.strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+            "end_time": end_time.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+        })
+        return [slot['start_time'] for slot in data.get('collection', [])]
+
+    async def aclose(self):
+        await self._client.aclose()
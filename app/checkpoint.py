@@ -0,0 +1,365 @@
+# app/checkpoint.py
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    copy_checkpoint,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import MemorySaver
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS threads_updated_at ON threads (updated_at);
+"""
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver[int]):
+    """
+    A durable, bounded LangGraph checkpointer backed by SQLite in WAL mode.
+
+    - Only the latest `max_checkpoints` checkpoints (and their pending writes)
+      are kept per thread; older ones are deleted as new ones are written.
+    - Threads that have not been written to for `ttl_seconds` are expired.
+    - The latest checkpoint of recently used threads is served from a bounded
+      in-process LRU cache, so hot sessions skip the read + deserialization.
+    - With `shared=True` several worker processes can use the same database:
+      a cached checkpoint is only served after a cheap index lookup confirms
+      no other process has written to the thread since it was cached.
+    """
+
+    def __init__(self, db_path: str, *, ttl_seconds: float = 86400.0, max_checkpoints: int = 10,
+                 cache_size: int = 1024, expire_interval_seconds: float = 60.0, shared: bool = False, serde=None):
+        super().__init__(serde=serde)
+        self.db_path = db_path
+        self.shared = shared
+        self.ttl_seconds = ttl_seconds
+        self.max_checkpoints = max_checkpoints
+        self.cache_size = cache_size
+        self.expire_interval_seconds = expire_interval_seconds
+        self._lock = threading.RLock()
+        self._cache: OrderedDict = OrderedDict()
+        self._last_expiry = 0.0
+        # Other workers may hold the write lock briefly; wait for it instead of failing
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _transaction(self):
+        """An explicit write transaction; callers must hold `self._lock`."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    # --- LRU cache of the latest checkpoint per (thread, namespace) ---
+
+    def _cache_get(self, key) -> Optional[CheckpointTuple]:
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+        return cached
+
+    def _cache_put(self, key, value: CheckpointTuple):
+        if not self.cache_size:
+            return
+        with self._lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _cache_drop(self, thread_id: str):
+        with self._lock:
+            for key in [k for k in self._cache if k[0] == thread_id]:
+                del self._cache[key]
+
+    @staticmethod
+    def _copy(value: CheckpointTuple) -> CheckpointTuple:
+        return value._replace(checkpoint=copy_checkpoint(value.checkpoint),
+                              pending_writes=list(value.pending_writes or []))
+
+    # --- Reads ---
+
+    def _row_to_tuple(self, thread_id, checkpoint_ns, row) -> CheckpointTuple:
+        checkpoint_id, parent_checkpoint_id, type_, checkpoint, metadata_type, metadata = row
+        writes = self._conn.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}},
+            checkpoint=self.serde.loads_typed((type_, checkpoint)),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_checkpoint_id}}
+                if parent_checkpoint_id else None
+            ),
+            pending_writes=[(task_id, channel, self.serde.loads_typed((t, v))) for task_id, channel, t, v in writes],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        key = (thread_id, checkpoint_ns)
+
+        cached = self._cache_get(key)
+        if cached is not None and checkpoint_id in (None, cached.config["configurable"]["checkpoint_id"]):
+            if not self.shared or self._is_current(cached):
+                return self._copy(cached)
+            cached = None
+
+        columns = "checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+        with self._lock:
+            if checkpoint_id:
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+            value = self._row_to_tuple(thread_id, checkpoint_ns, row)
+        if not checkpoint_id:
+            self._cache_put(key, value)
+            return self._copy(value)
+        return value
+
+    def _is_current(self, cached: CheckpointTuple) -> bool:
+        """True if `cached` is still the thread's newest checkpoint with the same pending writes."""
+        configurable = cached.config["configurable"]
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT checkpoint_id, (SELECT COUNT(*) FROM writes w WHERE w.thread_id = c.thread_id "
+                "AND w.checkpoint_ns = c.checkpoint_ns AND w.checkpoint_id = c.checkpoint_id) "
+                "FROM checkpoints c WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1",
+                (configurable["thread_id"], configurable["checkpoint_ns"]),
+            ).fetchone()
+        return row == (configurable["checkpoint_id"], len(cached.pending_writes or []))
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        clauses, params = [], []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if config["configurable"].get("checkpoint_ns") is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(config["configurable"]["checkpoint_ns"])
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        limit_clause = ""
+        if limit is not None and not filter:
+            limit_clause = " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata "
+                f"FROM checkpoints {where} ORDER BY checkpoint_id DESC{limit_clause}",
+                params,
+            ).fetchall()
+        for thread_id, checkpoint_ns, *row in rows:
+            if limit is not None and limit <= 0:
+                break
+            with self._lock:
+                value = self._row_to_tuple(thread_id, checkpoint_ns, row)
+            if filter and not all(value.metadata.get(k) == v for k, v in filter.items()):
+                continue
+            if limit is not None:
+                limit -= 1
+            yield value
+
+    # --- Writes ---
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        parent_checkpoint_id = config["configurable"].get("checkpoint_id")
+        metadata = get_checkpoint_metadata(config, metadata)
+        type_, blob = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_blob = self.serde.dumps_typed(metadata)
+        now = time.time()
+
+        with self._lock:
+            with self._transaction():
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (thread_id, checkpoint_ns, checkpoint["id"], parent_checkpoint_id, type_, blob, metadata_type, metadata_blob),
+                )
+                self._conn.execute("INSERT OR REPLACE INTO threads VALUES (?, ?)", (thread_id, now))
+                self._prune_thread(thread_id, checkpoint_ns)
+            self._cache_put((thread_id, checkpoint_ns), CheckpointTuple(
+                config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}},
+                checkpoint=copy_checkpoint(checkpoint),
+                metadata=metadata,
+                parent_config=(
+                    {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_checkpoint_id}}
+                    if parent_checkpoint_id else None
+                ),
+                pending_writes=[],
+            ))
+        if now - self._last_expiry >= self.expire_interval_seconds:
+            self.expire(now)
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}}
+
+    def _prune_thread(self, thread_id: str, checkpoint_ns: str):
+        """Deletes all but the newest `max_checkpoints` checkpoints of a thread."""
+        row = self._conn.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?",
+            (thread_id, checkpoint_ns, self.max_checkpoints - 1),
+        ).fetchone()
+        if row:
+            for table in ("checkpoints", "writes"):
+                self._conn.execute(
+                    f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+                    (thread_id, checkpoint_ns, row[0]),
+                )
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, blob = self.serde.dumps_typed(value)
+            rows.append((thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx), channel, type_, blob, task_path))
+        # Special writes (errors, interrupts...) overwrite; regular writes are only stored once
+        verb = "INSERT OR REPLACE" if all(channel in WRITES_IDX_MAP for channel, _ in writes) else "INSERT OR IGNORE"
+        with self._lock:
+            with self._transaction():
+                self._conn.executemany(f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            # Pending writes changed; the cached latest tuple is stale
+            self._cache.pop((thread_id, checkpoint_ns), None)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            with self._transaction():
+                for table in ("checkpoints", "writes", "threads"):
+                    self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+            self._cache_drop(thread_id)
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Deletes every thread idle for longer than `ttl_seconds`; returns how many."""
+        now = now or time.time()
+        self._last_expiry = now
+        with self._lock:
+            expired = [row[0] for row in self._conn.execute(
+                "SELECT thread_id FROM threads WHERE updated_at < ?", (now - self.ttl_seconds,)
+            ).fetchall()]
+            if expired:
+                with self._transaction():
+                    for table in ("checkpoints", "writes", "threads"):
+                        self._conn.executemany(f"DELETE FROM {table} WHERE thread_id = ?", [(t,) for t in expired])
+                for thread_id in expired:
+                    self._cache_drop(thread_id)
+        return len(expired)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # --- Async variants: SQLite calls are short, run them off the event loop ---
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        for value in await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit))):
+            yield value
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+def create_checkpointer(data_dir: str = "./data") -> BaseCheckpointSaver:
+    """
+    Builds the checkpointer selected by CHECKPOINT_BACKEND ("sqlite" or "memory").
+    With more than one worker (WEB_CONCURRENCY > 1) the SQLite store runs in
+    shared mode so every worker sees the other workers' writes.
+    """
+    backend = os.getenv("CHECKPOINT_BACKEND", "sqlite").lower()
+    # uvicorn reads its worker count from WEB_CONCURRENCY as well
+    multi_worker = int(os.getenv("WEB_CONCURRENCY", "1")) > 1
+    if backend == "memory":
+        if multi_worker:
+            raise ValueError("CHECKPOINT_BACKEND=memory cannot be shared between workers; use 'sqlite'.")
+        return MemorySaver()
+    if backend != "sqlite":
+        raise ValueError(f"Unknown CHECKPOINT_BACKEND '{backend}'. Use 'sqlite' or 'memory'.")
+    os.makedirs(data_dir, exist_ok=True)
+    return SqliteCheckpointSaver(
+        os.getenv("CHECKPOINT_DB_PATH", os.path.join(data_dir, "checkpoints.db")),
+        ttl_seconds=float(os.getenv("CHECKPOINT_TTL_SECONDS", "86400")),
+        max_checkpoints=int(os.getenv("CHECKPOINT_MAX_PER_THREAD", "10")),
+        cache_size=int(os.getenv("CHECKPOINT_CACHE_SIZE", "1024")),
+        shared=multi_worker,
+    )
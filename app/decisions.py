@@ -0,0 +1,214 @@
+# app/decisions.py
+
+import hashlib
+import json
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from langchain_core.messages import AIMessage, ToolCall
+
+from app.intents import find_dob, find_full_name, find_insurance, match_doctor, match_first_available, match_slot
+
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_PHONE_RE = re.compile(r"(?<![\w{])\+?\d[\d ().x-]{6,}\d\b")
+_PLACEHOLDER_RE = re.compile(r"\{(name|dob|email|phone|member_id|group_number|doctor|slot)\}")
+# Insurance values that say how insurance was settled rather than carrying details
+_INSURANCE_KINDS = ("Confirmed", "Not Provided")
+
+
+class Decision(NamedTuple):
+    """What a state looks like to the cache: its key, the values templated out, and the normalized last message."""
+    key: str
+    values: Dict[str, str]
+    text: str
+
+
+class _Entry(NamedTuple):
+    stored_at: float
+    content: str
+    tool_calls: List[Tuple[str, Dict[str, Any]]]
+    latency: float  # Seconds the LLM took to make the decision
+
+
+# --- Templating ---
+
+def _state_values(state: Dict) -> Dict[str, str]:
+    info = state.get("patient_info") or {}
+    return {
+        "name": info.get("name") or info.get("full_name"),
+        "dob": info.get("dob"),
+        "email": info.get("email"),
+        "phone": info.get("phone"),
+        "doctor": state.get("doctor_name"),
+        "slot": state.get("confirmed_time"),
+    }
+
+
+def _message_values(state: Dict, text: str) -> Dict[str, str]:
+    """Patient details in the user's message. A bare name only counts next to a date of birth."""
+    values = {}
+    email = _EMAIL_RE.search(text)
+    dob = find_dob(text)
+    name, confidence = find_full_name(text)
+    insurance = find_insurance(text)
+    phone = _PHONE_RE.search(_EMAIL_RE.sub(" ", text.replace(dob or "\0", " ")))
+    values.update(
+        email=email and email.group(0), dob=dob, name=name if confidence >= 0.95 or dob else None,
+        member_id=insurance["member_id"], group_number=insurance["group_number"], phone=phone and phone.group(0),
+    )
+    if state.get("doctor_list"):
+        values["doctor"] = match_doctor(text, state["doctor_list"])[0]
+    if state.get("available_slots"):
+        values["slot"] = match_slot(text, state["available_slots"])[0]
+    if state.get("first_available"):
+        entry = match_first_available(text, state["first_available"])[0]
+        values["slot"] = entry and entry["slot"]
+    return values
+
+
+def template(text: str, values: Dict[str, str]) -> str:
+    """Replaces every occurrence of a value (longest first, any case) with its {placeholder}."""
+    for placeholder, value in sorted(values.items(), key=lambda item: -len(item[1])):
+        text = re.sub(re.escape(value), "{" + placeholder + "}", text, flags=re.IGNORECASE)
+    return text
+
+
+def fill(text: str, values: Dict[str, str]) -> str:
+    """Puts the values back; raises KeyError for a placeholder with no value."""
+    return _PLACEHOLDER_RE.sub(lambda match: values[match.group(1)], text)
+
+
+def normalize(text: str, values: Dict[str, str]) -> str:
+    text = template(text.replace("{", "(").replace("}", ")"), values).lower()
+    return " ".join(text.split()).strip(" .!?")
+
+
+def _derivable(value: str, text: str) -> bool:
+    """Whether a templated argument is rebuilt from placeholders and words of the key's message."""
+    return all(word in text for word in re.findall(r"[a-z0-9]+", _PLACEHOLDER_RE.sub(" ", value).lower()))
+
+
+# --- The cache ---
+
+class DecisionCache:
+    """
+    Caches agent_brain's decisions (tool calls or a reply) at temperature 0.
+
+    The key is a hash of the prompt context (model, system prompt, tools),
+    the conversation state that steers the decision (patient status, what
+    has been settled, the doctors offered), the assistant's last question
+    and the last message, with patient details (name, date of birth, email,
+    phone, insurance IDs, doctor and slot picks) templated out. A hit fills
+    the cached tool calls back in with this conversation's values. A
+    decision is only stored when every argument, and the text of a reply,
+    can be rebuilt that way, so one patient's details never leak into
+    another's conversation. Entries
+    expire after `ttl_seconds`; the least recently used are evicted beyond
+    `max_entries`.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600.0, clock: Callable[[], float] = time.time):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.stats = {"hit": 0, "miss": 0, "stored": 0, "uncacheable": 0, "saved_seconds": 0.0}
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def decision(self, state: Dict, context: str) -> Decision:
+        messages = state["messages"]
+        last = messages[-1]
+        text = str(last.content)
+        values = {**_state_values(state), **{k: v for k, v in _message_values(state, text).items() if v}}
+        values = {k: v for k, v in values.items() if isinstance(v, str) and len(v) >= 3}
+        asked = next((m for m in reversed(messages[:-1]) if isinstance(m, AIMessage) and m.content), None)
+        insurance = state.get("insurance_info")
+        info = state.get("patient_info") or {}
+        normalized = normalize(text, values)
+        fingerprint = {
+            "context": context,
+            "status": state.get("patient_status"),
+            "candidates": bool(state.get("patient_candidates")),
+            "insurance": insurance if insurance in _INSURANCE_KINDS or not insurance else "provided",
+            "contact": sorted(key for key in ("email", "phone") if info.get(key)),
+            "doctor_chosen": bool(state.get("doctor_name")),
+            "doctors": [doctor["name"] for doctor in state.get("doctor_list") or []],
+            "slots_offered": len(state.get("available_slots") or []),
+            "first_available_offered": len(state.get("first_available") or []),
+            "confirmed": bool(state.get("confirmed_time")),
+            "asked": normalize(str(asked.content), values)[:300] if asked else None,
+            "last": [last.type, normalized],
+        }
+        key = hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode()).hexdigest()
+        return Decision(key, values, normalized)
+
+    def get(self, decision: Decision) -> Optional[AIMessage]:
+        """The cached decision filled in for this conversation, or None."""
+        if not self.max_entries:
+            return None
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(decision.key)
+            if entry is not None and now - entry.stored_at >= self.ttl_seconds:
+                del self._entries[decision.key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(decision.key)
+        try:
+            if entry is None:
+                raise KeyError(decision.key)
+            tool_calls = [
+                ToolCall(name=name, id=f"cached_{uuid.uuid4().hex[:12]}",
+                         args={k: fill(v, decision.values) if isinstance(v, str) else v for k, v in args.items()})
+                for name, args in entry.tool_calls
+            ]
+            message = AIMessage(content=fill(entry.content, decision.values), tool_calls=tool_calls)
+        except KeyError:
+            with self._lock:
+                self.stats["miss"] += 1
+            return None
+        with self._lock:
+            self.stats["hit"] += 1
+            self.stats["saved_seconds"] += entry.latency
+        return message
+
+    def put(self, decision: Decision, message: AIMessage, latency: float) -> bool:
+        """Stores the LLM's decision; returns False when it can't be rebuilt from the key."""
+        if not self.max_entries:
+            return False
+        tool_calls = []
+        cacheable = isinstance(message, AIMessage) and not message.invalid_tool_calls and bool(message.content or message.tool_calls)
+        for call in message.tool_calls if cacheable else []:
+            args = {}
+            for name, value in call["args"].items():
+                if isinstance(value, str):
+                    value = template(value, decision.values)
+                    cacheable = cacheable and _derivable(value, decision.text)
+                elif not isinstance(value, (bool, int, float, type(None))):
+                    cacheable = False
+                args[name] = value
+            tool_calls.append((call["name"], args))
+        # A reply is held to the same test as the arguments: free-form text is never reused
+        content = template(str(message.content), decision.values) if cacheable else ""
+        cacheable = cacheable and _derivable(content, decision.text)
+        with self._lock:
+            if not cacheable:
+                self.stats["uncacheable"] += 1
+                return False
+            self._entries[decision.key] = _Entry(self.clock(), content, tool_calls, latency)
+            self._entries.move_to_end(decision.key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self.stats["stored"] += 1
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
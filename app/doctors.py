@@ -0,0 +1,81 @@
+# app/doctors.py
+
+import os
+import pickle
+import threading
+from typing import Dict, List, Optional
+
+# Bump whenever the record layout changes so stale sidecars are ignored
+SIDECAR_VERSION = 1
+
+
+class DoctorDirectory:
+    """
+    A cached view of the doctor schedule workbook.
+
+    The workbook is parsed once and re-read only when its mtime changes.
+    Parsing with openpyxl is slow, so the parsed records are optionally
+    compiled to a pickle sidecar stamped with a format version and the
+    source file's mtime/size; a fresh process loads the sidecar instead of
+    the workbook whenever the stamp still matches.
+    """
+
+    def __init__(self, xlsx_path: str, sidecar_path: Optional[str] = None):
+        self.xlsx_path = xlsx_path
+        self.sidecar_path = sidecar_path
+        self._lock = threading.Lock()
+        self._doctors: List[Dict[str, str]] = []
+        self._stamp = None
+
+    def _source_stamp(self):
+        stat = os.stat(self.xlsx_path)
+        return (SIDECAR_VERSION, stat.st_mtime_ns, stat.st_size)
+
+    def _read_workbook(self) -> List[Dict[str, str]]:
+        import pandas as pd  # Deferred: not needed at all while the sidecar is fresh
+        doctors_df = pd.read_excel(self.xlsx_path, dtype=str).fillna("")
+        doctors_df.columns = [str(col).strip() for col in doctors_df.columns]
+        doctors = []
+        for record in doctors_df.to_dict('records'):
+            record = {key: value.strip() for key, value in record.items()}
+            if record.get('name'):
+                doctors.append(record)
+        return doctors
+
+    def _read_sidecar(self, stamp):
+        try:
+            with open(self.sidecar_path, "rb") as f:
+                payload = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        if payload.get("stamp") != stamp:
+            return None
+        return payload["doctors"]
+
+    def _write_sidecar(self, stamp, doctors):
+        tmp_path = f"{self.sidecar_path}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump({"stamp": stamp, "doctors": doctors}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.sidecar_path)
+        except OSError:
+            pass  # The sidecar is only an accelerator
+
+    def get_doctors(self) -> List[Dict[str, str]]:
+        """Returns the doctor records, re-reading the workbook only if it changed."""
+        stamp = self._source_stamp()  # Raises FileNotFoundError if the workbook is missing
+        if stamp != self._stamp:
+            with self._lock:
+                if stamp != self._stamp:
+                    doctors = self._read_sidecar(stamp) if self.sidecar_path else None
+                    if doctors is None:
+                        doctors = self._read_workbook()
+                        if self.sidecar_path:
+                            self._write_sidecar(stamp, doctors)
+                    self._doctors, self._stamp = doctors, stamp
+        return [dict(doctor) for doctor in self._doctors]
+
+    def find(self, doctor_name: str) -> Optional[Dict[str, str]]:
+        """Case-insensitive lookup of a single doctor by name."""
+        wanted = doctor_name.strip().lower()
+        return next((d for d in self.get_doctors() if d['name'].lower() == wanted), None)
@@ -0,0 +1,98 @@
+# app/fanout.py
+
+import asyncio
+import heapq
+import logging
+import math
+from itertools import islice, repeat
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+log = logging.getLogger(__name__)
+
+
+class Slot(NamedTuple):
+    starts_at: float    # POSIX timestamp
+    doctor_name: str
+
+
+class FirstAvailable(NamedTuple):
+    slots: List[Slot]               # Earliest first
+    answered: int                   # Doctors whose lookup finished
+    skipped: int                    # Not needed once the earliest slots were certain
+    errors: Dict[str, BaseException]
+
+
+def earliest(slots_by_doctor: Dict[str, Sequence[float]], limit: int) -> List[Slot]:
+    """The `limit` earliest slots across doctors, from each doctor's ascending start times."""
+    runs = (zip(starts, repeat(rank), repeat(name)) for rank, (name, starts) in enumerate(slots_by_doctor.items()))
+    return [Slot(starts_at, name) for starts_at, _, name in islice(heapq.merge(*runs), limit)]
+
+
+async def first_available(doctor_names: Sequence[str], fetch: Callable[[str], Awaitable[Sequence[float]]], limit: int,
+                          max_concurrency: int = 8, lower_bounds: Optional[Dict[str, float]] = None) -> FirstAvailable:
+    """
+    Looks up every doctor's free start times concurrently (`fetch(name)`
+    returns them ascending), at most `max_concurrency` at a time, and returns
+    the `limit` earliest across all of them.
+
+    `lower_bounds` gives the earliest start each doctor could possibly have
+    (e.g. their first open slot in the local schedule). Doctors are looked up
+    in that order, and the search stops as soon as `limit` slots are found
+    that no unanswered doctor can beat; lookups still waiting or in flight
+    are cancelled. Without bounds every lookup is awaited, so the wall time
+    is that of the slowest one. The result is the same either way: ties go
+    to the doctor listed first. A failed lookup is logged and left out.
+    """
+    if limit <= 0:
+        return FirstAvailable([], 0, len(doctor_names), {})
+    bounds = lower_bounds or {}
+    rank = {name: i for i, name in enumerate(doctor_names)}
+    # Stable, so the order is also by (bound, rank): the first unanswered doctor is the one to beat
+    order = sorted(doctor_names, key=lambda name: bounds.get(name, -math.inf))
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def lookup(name):
+        async with semaphore:
+            return await fetch(name)
+
+    # Tasks queue on the semaphore in creation order, so the most promising doctors go first
+    tasks = {asyncio.create_task(lookup(name)): name for name in order}
+    best = []  # Max-heap of the `limit` earliest (starts_at, rank) found so far, negated
+    answered, errors = set(), {}
+    first_unanswered = 0
+    try:
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = tasks[task]
+                answered.add(name)
+                try:
+                    starts = task.result()
+                except Exception as e:
+                    log.warning("Availability lookup failed", extra={"doctor": name, "error": str(e)})
+                    errors[name] = e
+                    continue
+                for starts_at in starts:
+                    entry = (-starts_at, -rank[name], name)
+                    if len(best) < limit:
+                        heapq.heappush(best, entry)
+                    elif entry > best[0]:
+                        heapq.heapreplace(best, entry)
+                    else:
+                        break  # Ascending: the rest of this doctor's slots are later still
+            while first_unanswered < len(order) and order[first_unanswered] in answered:
+                first_unanswered += 1
+            if pending and len(best) == limit:
+                # Certain once the latest kept slot sorts before anything the next doctor in line could offer
+                latest = (-best[0][0], -best[0][1])
+                name = order[first_unanswered]
+                if latest < (bounds.get(name, -math.inf), rank[name]):
+                    break
+    finally:
+        unfinished = [task for task in tasks if not task.done()]
+        for task in unfinished:
+            task.cancel()
+        await asyncio.gather(*unfinished, return_exceptions=True)
+    slots = [Slot(-negated, name) for negated, _, name in sorted(best, reverse=True)]
+    return FirstAvailable(slots, len(answered), len(order) - len(answered), errors)
@@ -0,0 +1,96 @@
+# app/history.py
+
+from typing import Dict, List
+
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+TRUNCATION_MARKER = " ...[truncated]"
+
+
+def count_tokens(messages: List[AnyMessage]) -> int:
+    """Approximate prompt tokens (~4 characters per token plus per-message overhead)."""
+    return count_tokens_approximately(messages)
+
+
+def _turn_starts(messages: List[AnyMessage]) -> List[int]:
+    """Indexes of the messages that open a turn (every HumanMessage)."""
+    return [i for i, message in enumerate(messages) if isinstance(message, HumanMessage)]
+
+
+def summarize_state(state: Dict, omitted: int) -> str:
+    """A compact, structured summary of what older messages established."""
+    lines = [f"Summary of the earlier conversation ({omitted} messages omitted):"]
+    if state.get("patient_status"):
+        lines.append(f"- Patient status: {state['patient_status']}")
+    info = state.get("patient_info") or {}
+    name = info.get("name") or info.get("full_name")
+    if name:
+        details = ", ".join(f"{key} {info[key]}" for key in ("dob", "email", "phone") if info.get(key))
+        lines.append(f"- Patient: {name}" + (f" ({details})" if details else ""))
+    if state.get("patient_candidates"):
+        lines.append("- Possible EMR matches, not yet confirmed: " + ", ".join(state["patient_candidates"]))
+    if state.get("insurance_info"):
+        lines.append(f"- Insurance: {state['insurance_info']}")
+    if state.get("doctor_name"):
+        lines.append(f"- Doctor: {state['doctor_name']}")
+    elif state.get("doctor_list"):
+        lines.append("- Doctors offered: " + ", ".join(d["name"] for d in state["doctor_list"]))
+    if state.get("confirmed_time"):
+        lines.append(f"- Confirmed time: {state['confirmed_time']}")
+    elif state.get("available_slots"):
+        lines.append("- Slots offered: " + "; ".join(state["available_slots"]))
+    elif state.get("first_available"):
+        lines.append("- Earliest slots offered: " + "; ".join(f"{e['slot']} with {e['doctor_name']}" for e in state["first_available"]))
+    return "\n".join(lines)
+
+
+def _truncate_tool_outputs(messages: List[AnyMessage], token_budget: int) -> List[AnyMessage]:
+    """Shortens the largest tool outputs until the messages fit in `token_budget`."""
+    messages = list(messages)
+    by_size = sorted((i for i, m in enumerate(messages) if isinstance(m, ToolMessage)),
+                     key=lambda i: len(messages[i].content), reverse=True)
+    for i in by_size:
+        excess_tokens = count_tokens(messages) - token_budget
+        if excess_tokens <= 0:
+            break
+        content = messages[i].content
+        # +1 token of slack for the per-message rounding in count_tokens
+        keep_chars = max(len(content) - (excess_tokens + 1) * 4 - len(TRUNCATION_MARKER), 0)
+        messages[i] = messages[i].model_copy(update={"content": content[:keep_chars] + TRUNCATION_MARKER})
+    return messages
+
+
+def compact_history(state: Dict, keep_turns: int = 3, token_budget: int = 2000, system_tokens: int = 0) -> List[AnyMessage]:
+    """
+    The messages to send after the system prompt.
+
+    The latest `keep_turns` turns (a turn starts at a HumanMessage) are kept
+    verbatim, together with the question the first kept turn answers. Older
+    messages are replaced by a summary built from the agent state. If the
+    result is still over `token_budget` (including `system_tokens` for the
+    caller's system prompt), the oldest kept turns are dropped and finally the
+    largest tool outputs of the latest turn are truncated. Turns are never
+    split, so every tool call stays paired with its ToolMessage.
+    """
+    messages = state["messages"]
+    starts = _turn_starts(messages)
+    if len(starts) <= keep_turns and count_tokens(messages) + system_tokens <= token_budget:
+        return list(messages)
+
+    starts = starts[-keep_turns:] if keep_turns > 0 else starts[-1:]
+    while True:
+        cut = starts[0] if starts else 0
+        # Keep the assistant's question the first kept turn is answering
+        if cut and isinstance(messages[cut - 1], AIMessage) and not messages[cut - 1].tool_calls:
+            cut -= 1
+        kept = messages[cut:]
+        summary = [SystemMessage(content=summarize_state(state, cut))] if cut else []
+        total = count_tokens(summary + kept) + system_tokens
+        if total <= token_budget or len(starts) <= 1:
+            break
+        starts = starts[1:]
+
+    if total > token_budget:
+        kept = _truncate_tool_outputs(kept, token_budget - system_tokens - count_tokens(summary))
+    return summary + kept
@@ -0,0 +1,302 @@
+# app/intents.py
+
+import re
+from collections import Counter
+from datetime import date, datetime, timezone
+from typing import Dict, List, NamedTuple, Optional
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from app.bookings import appointment_timestamp
+
+# Turns resolved by the fast path vs. handed to the LLM, by intent label
+fast_path_stats = Counter()
+
+_DATE_RE = re.compile(r"\b(\d{4}-\d{1,2}-\d{1,2}|\d{1,2}-\d{1,2}-\d{4}|\d{1,2}/\d{1,2}/\d{4})\b")
+_NAME_INTRO_RE = re.compile(r"\b(?:my name is|name is|name:|i am|i'm|this is)\s+([a-z][a-z'\-]*(?:\s+[a-z][a-z'\-]*){1,3})", re.IGNORECASE)
+_NAME_STOP_WORDS = {"and", "born", "dob", "date", "my", "birth", "on", "with", "i", "was", "is", "the", "of", "birthday"}
+# Words that show a bare "<words> <date>" message is not a name ("Need appointment 10/20/2025")
+_NOT_NAME_WORDS = {
+    "a", "an", "to", "for", "at", "in", "me", "please", "hi", "hello", "hey", "need", "want", "like", "book", "booking",
+    "appointment", "appointments", "schedule", "reschedule", "cancel", "visit", "checkup", "doctor", "dr", "see", "next",
+    "this", "today", "tomorrow", "week", "day", "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+}
+_DOB_FORMATS = ("%Y-%m-%d", "%d-%m-%Y", "%m/%d/%Y")  # As search_patient_in_emr accepts them
+_TIME_12H_RE = re.compile(r"\b(\d{1,2})(?::(\d{2}))?\s*([ap])\.?\s?m\b\.?", re.IGNORECASE)
+_TIME_24H_RE = re.compile(r"\b([01]?\d|2[0-3]):([0-5]\d)\b")
+_SKIP_INSURANCE_RE = re.compile(
+    r"\b(?:no|don'?t have|do not have|without|skip|not? (?:providing|provide|share))\b[^.]*\binsurance\b"
+    r"|^\s*(?:no|nope|none|skip|n/?a)\s*[.!]?\s*$"
+    r"|\b(?:uninsured|self[- ]pay)\b",
+    re.IGNORECASE,
+)
+_MEMBER_ID_RE = re.compile(r"\bmember\s*(?:id|#|number|no\.?)?\s*(?:is|:|#)?\s*([A-Z0-9][A-Z0-9\-]{2,})", re.IGNORECASE)
+_GROUP_RE = re.compile(r"\bgroup\s*(?:id|#|number|no\.?)?\s*(?:is|:|#)?\s*([A-Z0-9][A-Z0-9\-]{1,})", re.IGNORECASE)
+_CARRIER_RE = re.compile(r"^\s*(?:my\s+)?(?:insurance\s+(?:carrier\s+)?is|carrier\s*(?:is|:)|i have|it'?s)?\s*([A-Za-z][A-Za-z&.' ]{1,40}?)\s*(?:,|;|\bmember\b|\binsurance\b)", re.IGNORECASE)
+_AFFIRM_RE = re.compile(r"^\s*(?:yes|yeah|yep|sure|ok|okay|please|same|sounds good|that works|absolutely|of course)\b|\bsame doctor\b|\bagain\b", re.IGNORECASE)
+_DIFFERENT_RE = re.compile(r"\b(?:different|choose|another|other doctor|someone else|new doctor|switch)\b", re.IGNORECASE)
+_SOONEST_RE = re.compile(r"\b(?:soonest|earliest|first available|next available|whoever|any doctor|anyone|doesn'?t matter|no preference)\b", re.IGNORECASE)
+_NEW_PATIENT_RE = re.compile(
+    r"(?<!not a )\bnew patient\b|\bfirst (?:time|visit)\b|\bnone of (?:them|those|these)\b|\bnot me\b",
+    re.IGNORECASE,
+)
+_WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+
+class Intent(NamedTuple):
+    label: str
+    tool_calls: List[Dict]          # [{"name": ..., "args": {...}}]
+    state_updates: Dict
+    confidence: float
+
+
+# --- Parsing helpers (shared with extract_user_choice) ---
+
+def find_dob(text: str) -> Optional[str]:
+    match = _DATE_RE.search(text)
+    return match.group(1) if match else None
+
+
+def is_plausible_dob(text: str) -> bool:
+    """Whether `text` parses as a date of birth, i.e. one that is not in the future."""
+    for fmt in _DOB_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date() <= date.today()
+        except ValueError:
+            pass
+    return False
+
+
+def find_insurance(text: str) -> Dict[str, Optional[str]]:
+    """The insurance carrier, member ID and group number in `text`; None for any it doesn't give."""
+    carrier, member_id, group = _CARRIER_RE.search(text), _MEMBER_ID_RE.search(text), _GROUP_RE.search(text)
+    return {"carrier": carrier and carrier.group(1).strip(), "member_id": member_id and member_id.group(1),
+            "group_number": group and group.group(1)}
+
+
+def find_full_name(text: str):
+    """
+    Returns (name, confidence) for 'my name is X' style or bare '<Name>, <date>'
+    messages. A bare name is a guess: its confidence stays below the fast
+    path's bar, so the LLM makes the call.
+    """
+    match = _NAME_INTRO_RE.search(text)
+    if match:
+        tokens = []
+        for token in match.group(1).split():
+            if token.lower() in _NAME_STOP_WORDS:
+                break
+            tokens.append(token)
+        if len(tokens) >= 2:
+            return " ".join(t.capitalize() if t.islower() else t for t in tokens), 0.95
+    leftover = _DATE_RE.sub(" ", text)
+    tokens = re.findall(r"[A-Za-z][A-Za-z'\-]*|\S", leftover)
+    words = [t for t in tokens if t not in {",", ".", ";", "-"}]
+    if 2 <= len(words) <= 4 and all(w[0].isalpha() and w.lower() not in _NAME_STOP_WORDS | _NOT_NAME_WORDS for w in words):
+        return " ".join(words), 0.75
+    return None, 0.0
+
+
+def match_doctor(text: str, doctor_list: List[Dict]):
+    """Returns (doctor_name, confidence) for a doctor mentioned in `text`."""
+    lowered = text.lower()
+    for doctor in doctor_list:
+        if doctor["name"].lower() in lowered:
+            return doctor["name"], 0.95
+    # Unique surname match ("Chen", "dr chen")
+    words = set(re.findall(r"[a-z]+", lowered))
+    hits = []
+    for doctor in doctor_list:
+        name_words = re.findall(r"[a-z]+", doctor["name"].lower())
+        if len(name_words) > 1 and name_words[-1] in words:
+            hits.append(doctor["name"])
+    if len(hits) == 1:
+        return hits[0], 0.85
+    return None, 0.0
+
+
+def _requested_times(text: str):
+    times = set()
+    for hour, minute, meridiem in _TIME_12H_RE.findall(text):
+        hour = int(hour) % 12 + (12 if meridiem.lower() == "p" else 0)
+        times.add((hour, int(minute or 0)))
+    for hour, minute in _TIME_24H_RE.findall(text):
+        times.add((int(hour), int(minute)))
+    return times
+
+
+def match_slot(text: str, slots: List[str]):
+    """Returns (slot, confidence) for the offered slot the user picked."""
+    lowered = text.lower()
+    # Exact rendering of the time part, as extract_user_choice always matched it
+    exact = [slot for slot in slots if slot.split(" at ")[-1].lower() in lowered]
+    if len(exact) == 1:
+        return exact[0], 0.95
+
+    times = _requested_times(text)
+    if not times:
+        return None, 0.0
+    candidates = []
+    for slot in slots:
+        starts_at = appointment_timestamp(slot)
+        if starts_at is None:
+            continue
+        when = datetime.fromtimestamp(starts_at, timezone.utc)
+        if (when.hour, when.minute) in times:
+            candidates.append((slot, when))
+    if len(candidates) > 1:
+        # Same time on several days: narrow down by weekday or day of month
+        days = {d for d in _WEEKDAYS if d in lowered}
+        numbers = {int(n) for n in re.findall(r"\b(\d{1,2})(?:st|nd|rd|th)?\b", _TIME_12H_RE.sub(" ", _TIME_24H_RE.sub(" ", lowered)))}
+        candidates = [(s, w) for s, w in candidates if (days and w.strftime("%A").lower() in days) or (w.day in numbers)]
+    if len(candidates) == 1:
+        return candidates[0][0], 0.9
+    return None, 0.0
+
+
+def match_first_available(text: str, offered: List[Dict]):
+    """Returns (entry, confidence) for the {"doctor_name", "slot"} the user picked from a cross-doctor list."""
+    slot, confidence = match_slot(text, list(dict.fromkeys(entry["slot"] for entry in offered)))
+    if not slot:
+        return None, 0.0
+    entries = [entry for entry in offered if entry["slot"] == slot]
+    if len(entries) > 1:  # Same time with several doctors: the user has to name one
+        doctor_name, doctor_confidence = match_doctor(text, [{"name": entry["doctor_name"]} for entry in entries])
+        entries = [entry for entry in entries if entry["doctor_name"] == doctor_name]
+        confidence = min(confidence, doctor_confidence)
+    return (entries[0], confidence) if len(entries) == 1 else (None, 0.0)
+
+
+def extract_choice(state: Dict, text: str) -> Dict:
+    """State updates implied by the user's reply to the last question."""
+    updates = {}
+    if state.get("patient_status") == "RETURNING" and not state.get("insurance_info") and state.get("doctor_name"):
+        if "different" in text.lower() or "choose" in text.lower():
+            updates["doctor_name"] = None
+            updates["doctor_list"] = None
+        else:  # Assumes confirmation
+            updates["insurance_info"] = "Confirmed"
+
+    if state.get("doctor_list") and not state.get("doctor_name"):
+        doctor_name, _ = match_doctor(text, state["doctor_list"])
+        if doctor_name:
+            updates["doctor_name"] = doctor_name
+
+    if state.get("available_slots") and not state.get("confirmed_time"):
+        slot, _ = match_slot(text, state["available_slots"])
+        if slot:
+            updates["confirmed_time"] = slot
+    return updates
+
+
+# --- The classifier ---
+
+def _patient_name(state: Dict) -> Optional[str]:
+    info = state.get("patient_info") or {}
+    return info.get("name") or info.get("full_name")
+
+
+def _classify_human_turn(state: Dict, text: str) -> Optional[Intent]:
+    status = state.get("patient_status")
+
+    if not status:
+        dob = find_dob(text)
+        if dob and not is_plausible_dob(dob):
+            return None  # A future date is an appointment date, not a DOB
+        info = state.get("patient_info") or {}
+        if not dob and state.get("patient_candidates") and _NEW_PATIENT_RE.search(text) and info.get("full_name") and info.get("dob"):
+            # None of the suggested near-matches is them
+            args = {"full_name": info["full_name"], "dob": info["dob"], "new_patient": True}
+            return Intent("new_patient", [{"name": "search_patient_in_emr", "args": args}], {}, 0.9)
+        if not dob:
+            return None
+        full_name, confidence = find_full_name(text)
+        if not full_name:
+            return None
+        return Intent("patient_lookup", [{"name": "search_patient_in_emr", "args": {"full_name": full_name, "dob": dob}}], {}, confidence)
+
+    if status == "NEW" and not state.get("insurance_info"):
+        if _SKIP_INSURANCE_RE.search(text):
+            return Intent("insurance_skip", [{"name": "skip_insurance", "args": {}}], {}, 0.95)
+        args = find_insurance(text)
+        if all(args.values()):
+            return Intent("insurance_details", [{"name": "collect_insurance_details", "args": args}], {}, 0.85)
+        return None
+
+    if status == "RETURNING" and not state.get("insurance_info") and state.get("doctor_name"):
+        if _DIFFERENT_RE.search(text):
+            return Intent("change_doctor", [{"name": "get_doctor_list", "args": {}}],
+                          {"doctor_name": None, "doctor_list": None, "insurance_info": "Confirmed"}, 0.9)
+        if _AFFIRM_RE.search(text) or (state.get("doctor_name") and state["doctor_name"].lower() in text.lower()):
+            args = {"is_new_patient": False, "doctor_name": state.get("doctor_name")}
+            return Intent("keep_doctor", [{"name": "get_available_slots", "args": args}],
+                          {"insurance_info": "Confirmed"}, 0.9)
+        return None
+
+    if state.get("first_available") and not state.get("confirmed_time"):
+        entry, confidence = match_first_available(text, state["first_available"])
+        patient_name = _patient_name(state)
+        if not entry or not patient_name:
+            return None
+        args = {"patient_name": patient_name, "doctor_name": entry["doctor_name"], "appointment_time": entry["slot"],
+                "is_new_patient": status == "NEW"}
+        # doctor_name and confirmed_time are set by the booking's result, once it has succeeded
+        return Intent("first_available_pick", [{"name": "book_appointment", "args": args}], {}, confidence)
+
+    if state.get("doctor_list") and not state.get("doctor_name"):
+        doctor_name, confidence = match_doctor(text, state["doctor_list"])
+        if not doctor_name and _SOONEST_RE.search(text):
+            # "Whoever is free soonest": one search across the doctors (of a specialty, if named)
+            lowered = text.lower()
+            specialty = next((d["specialty"] for d in state["doctor_list"] if d.get("specialty") and d["specialty"].lower() in lowered), None)
+            args = {"is_new_patient": status == "NEW", "specialty": specialty}
+            return Intent("first_available", [{"name": "find_first_available", "args": args}], {}, 0.9)
+        if not doctor_name:
+            return None
+        args = {"is_new_patient": status == "NEW", "doctor_name": doctor_name}
+        return Intent("doctor_pick", [{"name": "get_available_slots", "args": args}],
+                      {"doctor_name": doctor_name}, confidence)
+
+    if state.get("available_slots") and not state.get("confirmed_time"):
+        slot, confidence = match_slot(text, state["available_slots"])
+        patient_name, doctor_name = _patient_name(state), state.get("doctor_name")
+        if not slot or not patient_name or not doctor_name:
+            return None
+        args = {"patient_name": patient_name, "doctor_name": doctor_name, "appointment_time": slot, "is_new_patient": status == "NEW"}
+        return Intent("slot_pick", [{"name": "book_appointment", "args": args}], {}, confidence)
+
+    return None
+
+
+def _classify_after_booking(state: Dict, booking_call: Dict, result: str) -> Optional[Intent]:
+    """After a successful booking, send intake forms + reminders without asking the LLM."""
+    if not result.startswith("SUCCESS"):
+        return None
+    info = state.get("patient_info") or {}
+    name, email, phone = _patient_name(state), info.get("email"), info.get("phone")
+    appointment_time = booking_call["args"].get("appointment_time")
+    if not (name and email and phone and appointment_time):
+        return None
+    return Intent("post_booking", [
+        {"name": "send_intake_forms", "args": {"patient_name": name, "patient_email": email, "appointment_time": appointment_time}},
+        {"name": "schedule_reminders", "args": {"patient_name": name, "patient_email": email, "patient_phone": phone,
+                                                "appointment_time": appointment_time}},
+    ], {}, 1.0)
+
+
+def classify_turn(state: Dict) -> Optional[Intent]:
+    """
+    Rule-based intent classification of the latest message. Returns None when
+    no rule applies; callers fall back to the LLM below their confidence bar.
+    """
+    messages = state.get("messages") or []
+    if not messages:
+        return None
+    last_message = messages[-1]
+    if isinstance(last_message, HumanMessage):
+        return _classify_human_turn(state, str(last_message.content))
+    if isinstance(last_message, ToolMessage):
+        parent = next((m for m in reversed(messages) if isinstance(m, AIMessage) and m.tool_calls), None)
+        if parent and parent.tool_calls[-1]["name"] == "book_appointment":
+            return _classify_after_booking(state, parent.tool_calls[-1], str(last_message.content))
+    return None
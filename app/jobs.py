@@ -0,0 +1,226 @@
+# app/jobs.py
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dedupe_key TEXT UNIQUE,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    run_after REAL NOT NULL,
+    lease_until REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_run_after ON jobs (status, run_after);
+"""
+# 'queued' -> 'running' -> 'done', or back to 'queued' for a retry, or 'dead' once retries run out
+JOB_STATUSES = ("queued", "running", "done", "dead")
+
+log = logging.getLogger(__name__)
+
+
+class Job(NamedTuple):
+    id: int
+    kind: str
+    payload: Dict[str, Any]
+    attempts: int
+
+
+class JobStatus(NamedTuple):
+    id: int
+    kind: str
+    status: str
+    attempts: int
+    error: Optional[str]
+
+
+JobHandler = Callable[[Job], Awaitable[None]]
+
+
+class JobQueue:
+    """
+    Background jobs for side effects that should not hold up a turn.
+
+    `enqueue()` persists the job to SQLite and hands its id to a bounded
+    asyncio queue served by `workers` tasks, then returns at once; it is
+    safe to call from tool threads. A job is claimed with a conditional
+    UPDATE and a lease, so it runs once even with several worker processes
+    on one database. A failing job is retried with exponential backoff and
+    kept as 'dead', with its last error, after `max_attempts`. Jobs that
+    did not fit in the queue, are due for a retry, were enqueued by another
+    process or lost their worker to a crash are picked up by a poll every
+    `poll_seconds`.
+    """
+
+    def __init__(self, db_path: str, handlers: Dict[str, JobHandler], workers: int = 4, maxsize: int = 1000,
+                 max_attempts: int = 3, retry_seconds: float = 1.0, lease_seconds: float = 300.0,
+                 poll_seconds: float = 5.0, clock: Callable[[], float] = time.time):
+        self.db_path = db_path
+        self.handlers = handlers
+        self.workers = workers
+        self.maxsize = maxsize
+        self.max_attempts = max_attempts
+        self.retry_seconds = retry_seconds
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.clock = clock
+        self._lock = threading.Lock()  # Guards the connection
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    # --- Producers ---
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], key: Optional[str] = None) -> int:
+        """
+        Stores a job and returns its id without waiting for it to run. A job
+        whose `key` was enqueued before is not added again; the existing id
+        is returned.
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"No handler for job kind '{kind}'")
+        now = self.clock()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (dedupe_key, kind, payload, run_after, created_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (dedupe_key) DO NOTHING",
+                (key, kind, json.dumps(payload), now, now),
+            )
+            if cursor.rowcount:
+                job_id = cursor.lastrowid
+            else:
+                return self._conn.execute("SELECT id FROM jobs WHERE dedupe_key = ?", (key,)).fetchone()[0]
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._offer, job_id)
+        return job_id
+
+    def _offer(self, job_id: int):
+        try:
+            self._queue.put_nowait(job_id)
+        except asyncio.QueueFull:
+            pass  # Still 'queued' in the database; the poll picks it up
+
+    # --- Status ---
+
+    def status(self, job_id: int) -> Optional[JobStatus]:
+        with self._lock:
+            row = self._conn.execute("SELECT id, kind, status, attempts, last_error FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return JobStatus(*row) if row else None
+
+    def dead_letters(self, limit: int = 100) -> List[JobStatus]:
+        """Jobs that ran out of retries, newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, kind, status, attempts, last_error FROM jobs WHERE status = 'dead' ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [JobStatus(*row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    # --- Workers ---
+
+    def _claim(self, job_id: int) -> Optional[Job]:
+        now = self.clock()
+        with self._lock:
+            row = self._conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_until = ? "
+                "WHERE id = ? AND status = 'queued' AND run_after <= ? RETURNING id, kind, payload, attempts",
+                (now + self.lease_seconds, job_id, now),
+            ).fetchone()
+        return Job(row[0], row[1], json.loads(row[2]), row[3]) if row else None
+
+    def _finish(self, job: Job, error: Optional[str]) -> Optional[float]:
+        """Records the outcome; returns the retry delay when the job goes back to the queue."""
+        now = self.clock()
+        delay = None
+        with self._lock:
+            if error is None:
+                self._conn.execute("UPDATE jobs SET status = 'done', finished_at = ?, lease_until = NULL, last_error = NULL WHERE id = ?", (now, job.id))
+            elif job.attempts < self.max_attempts:
+                delay = self.retry_seconds * 2 ** (job.attempts - 1)
+                self._conn.execute("UPDATE jobs SET status = 'queued', run_after = ?, lease_until = NULL, last_error = ? WHERE id = ?",
+                                   (now + delay, error, job.id))
+            else:
+                self._conn.execute("UPDATE jobs SET status = 'dead', finished_at = ?, lease_until = NULL, last_error = ? WHERE id = ?",
+                                   (now, error, job.id))
+        return delay
+
+    async def _run(self, job: Job):
+        error = None
+        try:
+            await self.handlers[job.kind](job)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            log.warning("Job failed", extra={"job_id": job.id, "kind": job.kind, "attempt": job.attempts, "error": error})
+        delay = await asyncio.to_thread(self._finish, job, error)
+        if delay is not None:
+            self._loop.call_later(delay, self._offer, job.id)
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = await asyncio.to_thread(self._claim, job_id)
+                if job is not None:
+                    await self._run(job)
+            except Exception:
+                log.exception("Job worker error")
+            finally:
+                self._queue.task_done()
+
+    def _due(self, limit: int) -> List[int]:
+        now = self.clock()
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status = 'queued', lease_until = NULL WHERE status = 'running' AND lease_until < ?", (now,))
+            return [row[0] for row in self._conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' AND run_after <= ? ORDER BY run_after LIMIT ?", (now, limit)
+            )]
+
+    async def _poll(self):
+        while True:
+            try:
+                for job_id in await asyncio.to_thread(self._due, self.maxsize - self._queue.qsize()):
+                    self._offer(job_id)
+            except Exception as e:
+                log.warning("Job poll failed", extra={"error": str(e)})
+            await asyncio.sleep(self.poll_seconds)
+
+    async def start(self):
+        """Starts the workers on the running event loop; queued jobs from earlier runs are resumed."""
+        if not self._tasks:
+            self._loop = asyncio.get_running_loop()
+            self._queue = asyncio.Queue(maxsize=self.maxsize)
+            self._tasks = [asyncio.create_task(self._worker(), name=f"job-worker-{i}") for i in range(self.workers)]
+            self._tasks.append(asyncio.create_task(self._poll(), name="job-poll"))
+
+    async def join(self):
+        """Waits until every job handed to the workers has been processed."""
+        await self._queue.join()
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
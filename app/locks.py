@@ -0,0 +1,83 @@
+# app/locks.py
+
+import asyncio
+import hashlib
+import os
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking is available
+    fcntl = None
+
+
+class SessionLockManager:
+    """
+    Serializes conversation turns per session.
+
+    Within a process every session gets an asyncio.Lock, created on demand
+    and dropped once nobody holds or waits for it. When `lock_dir` is set
+    (multi-worker deployments) the holder additionally takes an exclusive
+    `flock` on one of `stripes` lock files, so two workers can never run a
+    turn for the same session at the same time. Striping keeps the number of
+    lock files fixed; unrelated sessions that share a stripe just queue.
+    """
+
+    def __init__(self, lock_dir: Optional[str] = None, stripes: int = 1024, poll_interval: float = 0.05):
+        self.lock_dir = lock_dir if fcntl is not None else None
+        self.stripes = stripes
+        self.poll_interval = poll_interval
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._users: Dict[str, int] = {}
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, exist_ok=True)
+
+    def __len__(self):
+        return len(self._locks)
+
+    def waiting(self, session_id: str) -> int:
+        """Turns of the session holding or queued for its lock in this process."""
+        return self._users.get(session_id, 0)
+
+    def _stripe_path(self, session_id: str) -> str:
+        stripe = int(hashlib.sha1(session_id.encode()).hexdigest()[:8], 16) % self.stripes
+        return os.path.join(self.lock_dir, f"session-{stripe:04d}.lock")
+
+    async def _acquire_file_lock(self, session_id: str) -> int:
+        fd = os.open(self._stripe_path(session_id), os.O_RDWR | os.O_CREAT, 0o644)
+        delay = 0.001
+        try:
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return fd
+                except BlockingIOError:
+                    # Poll instead of blocking a thread; back off up to poll_interval
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.poll_interval)
+        except BaseException:
+            os.close(fd)
+            raise
+
+    @asynccontextmanager
+    async def hold(self, session_id: str):
+        """Holds the session's lock for the duration of the `async with` block."""
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = self._locks[session_id] = asyncio.Lock()
+        self._users[session_id] = self._users.get(session_id, 0) + 1
+        try:
+            async with lock:
+                fd = await self._acquire_file_lock(session_id) if self.lock_dir else None
+                try:
+                    yield
+                finally:
+                    if fd is not None:
+                        fcntl.flock(fd, fcntl.LOCK_UN)
+                        os.close(fd)
+        finally:
+            self._users[session_id] -= 1
+            if not self._users[session_id]:
+                del self._users[session_id]
+                del self._locks[session_id]
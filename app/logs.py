@@ -0,0 +1,58 @@
+# app/logs.py
+
+import json
+import logging
+import os
+import sys
+
+# Attributes every LogRecord has; anything else was passed in `extra=`
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and any `extra=` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_FIELDS})
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """`LEVEL logger: message key=value ...` for reading in a terminal."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = " ".join(f"{key}={value}" for key, value in vars(record).items() if key not in _RECORD_FIELDS)
+        line = f"{record.levelname:<7} {record.name}: {record.getMessage()}" + (f" {fields}" if fields else "")
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+def configure_logging(level: str | None = None, fmt: str | None = None):
+    """
+    Sets up the `app` loggers from LOG_LEVEL (DEBUG, INFO, WARNING, ... or OFF,
+    default INFO) and LOG_FORMAT (`text` or `json`, default text). Node and
+    tool traces are logged at DEBUG.
+    """
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    fmt = (fmt or os.getenv("LOG_FORMAT", "text")).lower()
+    logger = logging.getLogger("app")
+    logger.handlers.clear()
+    logger.propagate = False
+    if level == "OFF":
+        logger.disabled = True
+        return logger
+    logger.disabled = False
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    return logger
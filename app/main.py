@@ -1,16 +1,81 @@
 # app/main.py
 
+import asyncio
+import json
+import os
 import uuid
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from langchain_core.messages import HumanMessage
-from app.agent import app_graph
+from app.agent import RESPONSE_NODES, get_app_graph
+from app.tools import (
+    close_calendly_client,
+    get_admin_report,
+    get_calendly_client,
+    get_job_queue,
+    get_reminder_scheduler,
+    get_reply_cache,
+    get_session_locks,
+    open_stores,
+    warm_caches,
+)
+from app.admission import AdmissionController, Overloaded
+from app.logs import configure_logging
+from app.metrics import REGISTRY
+
+configure_logging()
+
+# --- Request governor ---
+# Per worker: at most MAX_CONCURRENT_TURNS turns run at once and MAX_QUEUED_TURNS
+# wait, each for up to TURN_QUEUE_TIMEOUT_SECONDS; beyond that requests get a
+# fast 429/503. A session's turns run one at a time, in arrival order, and at
+# most MAX_TURNS_PER_SESSION of them may be running or waiting.
+admission = AdmissionController(
+    max_in_flight=int(os.getenv("MAX_CONCURRENT_TURNS", "32")),
+    max_queued=int(os.getenv("MAX_QUEUED_TURNS", "64")),
+    queue_timeout=float(os.getenv("TURN_QUEUE_TIMEOUT_SECONDS", "10")),
+)
+MAX_TURNS_PER_SESSION = int(os.getenv("MAX_TURNS_PER_SESSION", "3"))
+
+def _check_session(session_id: str):
+    if get_session_locks().waiting(session_id) >= MAX_TURNS_PER_SESSION:
+        admission.stats["rejected_session"] += 1
+        raise Overloaded(429, "Please wait for the reply to your previous message.", 1)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled Calendly client per worker process, closed on shutdown
+    get_calendly_client()
+    # Nothing heavy is built at import; the stores and the graph are opened here, off the event loop
+    await asyncio.to_thread(open_stores)
+    await asyncio.to_thread(get_app_graph)
+    # Reminder dispatcher; with several workers each one claims disjoint reminders
+    reminder_scheduler = get_reminder_scheduler()
+    await reminder_scheduler.start()
+    # Post-booking side effects (intake forms, reminders) run off the request path
+    job_queue = get_job_queue()
+    await job_queue.start()
+    # The patient index and doctor directory load in the background; requests are served meanwhile
+    warming = asyncio.create_task(asyncio.to_thread(warm_caches))
+    yield
+    await asyncio.gather(warming, return_exceptions=True)
+    await job_queue.stop()
+    await reminder_scheduler.stop()
+    await close_calendly_client()
 
 app = FastAPI(
     title="AI Scheduling Agent API",
     description="An API for the AI-powered medical appointment scheduling agent.",
+    lifespan=lifespan,
 )
 
+@app.exception_handler(Overloaded)
+async def overloaded(request: Request, exc: Overloaded):
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail},
+                        headers={"Retry-After": str(exc.retry_after)})
+
 # Pydantic models for request and response
 class ChatRequest(BaseModel):
     message: str
@@ -20,24 +85,138 @@ class ChatResponse(BaseModel):
     response: str
     session_id: str
 
+FALLBACK_RESPONSE = "I'm sorry, I'm having trouble responding. Could you please try again?"
+
 @app.post("/chat", response_model=ChatResponse)
-async def chat_with_agent(request: ChatRequest):
+async def chat_with_agent(request: ChatRequest, idempotency_key: str | None = Header(default=None)):
     """Handles a conversation turn by invoking the LangGraph agent."""
     config = {"configurable": {"thread_id": request.session_id}}
     inputs = {"messages": [HumanMessage(content=request.message)]}
-    
-    # Use ainvoke() to run the graph until it stops (at an interrupt)
-    # and returns the final state.
-    final_state = await app_graph.ainvoke(inputs, config=config)
-    
-    # Extract the content of the very last message from the final state
-    final_response_message = final_state["messages"][-1].content
-    
-    if not final_response_message:
-        final_response_message = "I'm sorry, I'm having trouble responding. Could you please try again?"
+
+    final_response_message = get_reply_cache().get(request.session_id, idempotency_key)
+    if final_response_message is None:
+        _check_session(request.session_id)
+        # Only one turn per session runs at a time
+        async with get_session_locks().hold(request.session_id):
+            # A duplicate queued behind the original gets the original's reply
+            final_response_message = get_reply_cache().get(request.session_id, idempotency_key)
+            if final_response_message is None:
+                # Use ainvoke() to run the graph until it stops (at an interrupt)
+                # and returns the final state.
+                async with admission.admit():
+                    final_state = await get_app_graph().ainvoke(inputs, config=config)
+                # Extract the content of the very last message from the final state
+                final_response_message = final_state["messages"][-1].content or FALLBACK_RESPONSE
+                get_reply_cache().put(request.session_id, idempotency_key, final_response_message)
 
     return ChatResponse(response=final_response_message, session_id=request.session_id)
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _stream_turn(request: ChatRequest, idempotency_key: str | None = None):
+    """
+    Runs one turn and yields server-sent events as the graph progresses:
+    `node` when a graph node starts, `token` for LLM tokens and hardcoded
+    or cached replies, `tool` when a tool finishes, and a final `done` carrying the
+    same response /chat would have returned. A message already answered
+    (same Idempotency-Key) gets its reply again as a single `token`.
+    """
+    config = {"configurable": {"thread_id": request.session_id}}
+    inputs = {"messages": [HumanMessage(content=request.message)]}
+    async with get_session_locks().hold(request.session_id):
+        final_response_message = get_reply_cache().get(request.session_id, idempotency_key)
+        if final_response_message is not None:
+            yield _sse("token", {"text": final_response_message, "node": None})
+        else:
+            try:
+                async with admission.admit():
+                    streamed = False  # Whether the current node has sent LLM tokens
+                    async for event in get_app_graph().astream_events(inputs, config=config, version="v2"):
+                        kind, name = event["event"], event["name"]
+                        node = event.get("metadata", {}).get("langgraph_node")
+                        if kind == "on_chain_start" and name == node:
+                            streamed = False
+                            yield _sse("node", {"node": node})
+                        elif kind == "on_chat_model_stream" and event["data"]["chunk"].content:
+                            streamed = True
+                            yield _sse("token", {"text": event["data"]["chunk"].content, "node": node})
+                        elif kind == "on_chain_end" and name == node and (node in RESPONSE_NODES or (node == "agent_brain" and not streamed)):
+                            # Hardcoded and cached replies arrive whole; send them as a single token
+                            for message in (event["data"].get("output") or {}).get("messages", []):
+                                if message.content:
+                                    yield _sse("token", {"text": message.content, "node": node})
+                        elif kind == "on_tool_end":
+                            yield _sse("tool", {"tool": name, "output": str(event["data"].get("output"))})
+                final_state = await get_app_graph().aget_state(config)
+                final_response_message = final_state.values["messages"][-1].content or FALLBACK_RESPONSE
+            except Overloaded as e:
+                # Headers are already sent; the rejection arrives as an event
+                yield _sse("error", {"detail": e.detail, "status": e.status_code, "retry_after": e.retry_after})
+                return
+            except Exception as e:
+                yield _sse("error", {"detail": str(e)})
+                return
+            get_reply_cache().put(request.session_id, idempotency_key, final_response_message)
+    yield _sse("done", {"response": final_response_message, "session_id": request.session_id})
+
+async def _replayed_turn(request: ChatRequest, reply: str):
+    yield _sse("token", {"text": reply, "node": None})
+    yield _sse("done", {"response": reply, "session_id": request.session_id})
+
+@app.post("/chat/stream")
+async def chat_with_agent_stream(request: ChatRequest, idempotency_key: str | None = Header(default=None)):
+    """Streams a conversation turn as server-sent events (see `_stream_turn`)."""
+    reply = get_reply_cache().get(request.session_id, idempotency_key)
+    if reply is not None:
+        events = _replayed_turn(request, reply)
+    else:
+        # Reject with a status code while we still can; a turn that then waits too long gets an `error` event
+        _check_session(request.session_id)
+        admission.check()
+        events = _stream_turn(request, idempotency_key)
+    return StreamingResponse(events, media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# --- Admin report ---
+
+@app.post("/admin/report")
+def start_admin_report():
+    """Queues an incremental rebuild of the admin review workbook; poll GET /admin/report/{job_id} for progress."""
+    return {"job_id": get_job_queue().enqueue("admin_report", {})}
+
+@app.get("/admin/report/{job_id}")
+def admin_report_status(job_id: int):
+    """The job's status plus the report's progress: `stage` is export (bookings) or render (bytes), then done."""
+    job = get_job_queue().status(job_id)
+    if job is None or job.kind != "admin_report":
+        raise HTTPException(status_code=404, detail="No such report job")
+    report = get_admin_report()
+    return {"job_id": job.id, "status": job.status, "error": job.error,
+            "progress": report.progress(), "path": report.path}
+
+# Admission control, read at scrape time
+REGISTRY.register_collector(lambda: [
+    "# HELP chat_turns_in_flight Conversation turns running in this worker.",
+    "# TYPE chat_turns_in_flight gauge",
+    f"chat_turns_in_flight {admission.in_flight}",
+    "# HELP chat_turns_queued Conversation turns waiting for a slot.",
+    "# TYPE chat_turns_queued gauge",
+    f"chat_turns_queued {admission.queued}",
+    "# HELP chat_turns_total Conversation turns admitted, or rejected by reason (queue full, queue timeout, session busy).",
+    "# TYPE chat_turns_total counter",
+    *(f'chat_turns_total{{result="{result}"}} {admission.stats[result]}'
+      for result in ("admitted", "rejected_full", "rejected_timeout", "rejected_session")),
+    "# HELP chat_idempotent_replays_total Messages answered from the reply cache (same Idempotency-Key).",
+    "# TYPE chat_idempotent_replays_total counter",
+    f"chat_idempotent_replays_total {get_reply_cache().stats['hit']}",
+])
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Node, tool, LLM token and Calendly metrics of this worker process, in the Prometheus text format."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/")
 def read_root():
     return {"status": "AI Scheduling Agent API is running."}
\ No newline at end of file
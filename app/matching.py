@@ -0,0 +1,133 @@
+# app/matching.py
+
+import threading
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, List, NamedTuple
+
+from app.patients import PatientRepository
+
+# --- Configuration ---
+NAME_WEIGHT = 0.8
+DOB_WEIGHT = 0.2
+DEFAULT_MIN_SCORE = 0.6
+
+_SOUNDEX_CODES = {}
+for _letters, _digit in (("BFPV", "1"), ("CGJKQSXZ", "2"), ("DT", "3"), ("L", "4"), ("MN", "5"), ("R", "6")):
+    for _letter in _letters:
+        _SOUNDEX_CODES[_letter] = _digit
+
+
+class Candidate(NamedTuple):
+    score: float
+    record: Dict[str, str]
+
+
+def soundex(word: str) -> str:
+    """Classic American Soundex code (e.g. 'Robert' -> 'R163')."""
+    letters = [c for c in word.upper() if c.isalpha()]
+    if not letters:
+        return ""
+    code = letters[0]
+    previous = _SOUNDEX_CODES.get(letters[0], "")
+    for letter in letters[1:]:
+        digit = _SOUNDEX_CODES.get(letter, "")
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        if letter not in "HW":  # H and W do not separate letters with the same code
+            previous = digit
+    return code.ljust(4, "0")
+
+
+def normalize_name(full_name: str) -> str:
+    return " ".join("".join(c if c.isalnum() else " " for c in full_name.lower()).split())
+
+
+def _blocking_keys(normalized_name: str, dob: str):
+    """Keys a record is filed under; a query only scores records sharing one of them."""
+    tokens = normalized_name.split()
+    if not tokens:
+        return []
+    keys = [("last", soundex(tokens[-1]), dob[:4])]
+    if len(tokens) > 1:
+        # Second pass keyed on the first name catches typos in the surname's first letter
+        keys.append(("first", soundex(tokens[0]), dob))
+    return keys
+
+
+def _dob_similarity(a: str, b: str) -> float:
+    if a == b:
+        return 1.0
+    if a[:4] != b[:4]:
+        return 0.0
+    # Same year: swapped day/month or a single-field typo is still a likely match
+    if a[5:7] == b[8:10] and a[8:10] == b[5:7]:
+        return 0.8
+    if a[5:7] == b[5:7] or a[8:10] == b[8:10]:
+        return 0.5
+    return 0.2
+
+
+class PatientMatcher:
+    """
+    Fuzzy / phonetic patient matching over a prebuilt blocking index.
+
+    Every patient is filed under Soundex-based blocking keys (surname + DOB year,
+    first name + full DOB). A query is only scored against the records in its
+    own buckets, so lookups stay cheap regardless of the size of the EMR.
+    """
+
+    def __init__(self, repository: PatientRepository):
+        self.repository = repository
+        self._lock = threading.Lock()
+        self._records: List[Dict[str, str]] = []
+        self._names: List[str] = []
+        self._blocks: Dict[tuple, List[int]] = {}
+        self._version = None
+
+    def _rebuild(self):
+        records = self.repository.records()
+        names = []
+        blocks = defaultdict(list)
+        for position, record in enumerate(records):
+            name = normalize_name(record['name'])
+            names.append(name)
+            for key in _blocking_keys(name, record['dob']):
+                blocks[key].append(position)
+        self._records, self._names, self._blocks = records, names, dict(blocks)
+        self._version = self.repository.version
+
+    def _ensure_index(self):
+        self.repository.refresh()
+        if self._version != self.repository.version:
+            with self._lock:
+                if self._version != self.repository.version:
+                    self._rebuild()
+
+    def search(self, full_name: str, normalized_dob: str, limit: int = 5, min_score: float = DEFAULT_MIN_SCORE) -> List[Candidate]:
+        """Returns up to `limit` candidates scoring at least `min_score`, best first."""
+        self._ensure_index()
+        query = normalize_name(full_name)
+        positions = set()
+        for key in _blocking_keys(query, normalized_dob):
+            positions.update(self._blocks.get(key, ()))
+
+        candidates = []
+        matcher = SequenceMatcher(autojunk=False)
+        matcher.set_seq2(query)
+        for position in positions:
+            dob_score = _dob_similarity(normalized_dob, self._records[position]['dob'])
+            matcher.set_seq1(self._names[position])
+            # Cheap upper bounds first; only compute the full ratio when it could still qualify
+            if NAME_WEIGHT * matcher.real_quick_ratio() + DOB_WEIGHT * dob_score < min_score:
+                continue
+            if NAME_WEIGHT * matcher.quick_ratio() + DOB_WEIGHT * dob_score < min_score:
+                continue
+            score = NAME_WEIGHT * matcher.ratio() + DOB_WEIGHT * dob_score
+            if score >= min_score:
+                candidates.append(Candidate(round(score, 4), self._records[position]))
+
+        candidates.sort(key=lambda c: c.score, reverse=True)
+        return candidates[:limit]
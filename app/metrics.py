@@ -0,0 +1,243 @@
+# app/metrics.py
+
+import functools
+import inspect
+import logging
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+log = logging.getLogger(__name__)
+
+# Latency buckets in seconds: sub-millisecond nodes up to slow LLM/Calendly calls
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+# --- Metric Types ---
+#
+# A small in-process registry rendered in the Prometheus text format; the
+# metric classes mirror prometheus_client's (`labels(...)`, `inc()`,
+# `observe()`). Values are per process.
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "values", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...], keep_values: bool = False):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.values: Optional[List[float]] = [] if keep_values else None
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            if self.values is not None:
+                self.values.append(value)
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: "Registry" = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """The child for one combination of label values (created on first use)."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(tuple(str(v) for v in values), self._new_child())
+        return child
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, values)} {child.value:g}" for values, child in list(self._children.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: "Registry" = None):
+        self.buckets = tuple(sorted(buckets))
+        self._keep_values = False
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets, self._keep_values)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def keep_values(self, enabled: bool = True):
+        """
+        Starts (or stops) keeping every observed value, from now on, for exact
+        percentiles in offline load tests. Unbounded; not meant for production.
+        """
+        with self._lock:
+            self._keep_values = enabled
+            for child in self._children.values():
+                with child._lock:
+                    child.values = [] if enabled else None
+
+    def values(self) -> Dict[Tuple[str, ...], List[float]]:
+        """Observed values by label values, while `keep_values` is on."""
+        result = {}
+        for labels, child in list(self._children.items()):
+            with child._lock:
+                if child.values is not None:
+                    result[labels] = list(child.values)
+        return result
+
+    def samples(self) -> List[str]:
+        lines = []
+        for values, child in list(self._children.items()):
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound:g}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, values)} {total:g}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, values)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], List[str]]] = []
+
+    def register(self, metric: _Metric):
+        self._metrics.append(metric)
+
+    def register_collector(self, collect: Callable[[], List[str]]):
+        """Adds a callable returning ready-made exposition lines (e.g. gauges read at scrape time)."""
+        self._collectors.append(collect)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        parts = [metric.render() for metric in self._metrics]
+        for collect in self._collectors:
+            try:
+                parts.extend(collect())
+            except Exception as e:
+                log.warning("Metrics collector failed", extra={"error": str(e)})
+        return "\n".join(parts) + "\n"
+
+
+REGISTRY = Registry()
+
+# --- Application Metrics ---
+
+NODE_LATENCY = Histogram("agent_node_duration_seconds", "Time spent in each graph node.", ["node"])
+NODE_ERRORS = Counter("agent_node_errors_total", "Graph node invocations that raised.", ["node"])
+TOOL_LATENCY = Histogram("agent_tool_duration_seconds", "Time spent in each tool call.", ["tool"])
+TOOL_ERRORS = Counter("agent_tool_errors_total", "Tool calls that failed, by reason (exception, timeout, error_result).", ["tool", "reason"])
+LLM_TOKENS = Counter("llm_tokens_total", "LLM tokens used, by model and direction (input/output).", ["model", "direction"])
+CALENDLY_LATENCY = Histogram("calendly_request_duration_seconds", "Latency of Calendly API requests, by status code.", ["status"])
+
+
+def instrument_node(name: str, func: Callable) -> Callable:
+    """
+    Wraps a graph node to record its latency and errors. The wrapper keeps
+    the node's signature, so LangGraph still passes `config` to nodes that
+    ask for it.
+    """
+    latency, errors = NODE_LATENCY.labels(name), NODE_ERRORS.labels(name)
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                latency.observe(elapsed)
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug("Node finished", extra={"node": name, "duration_ms": round(elapsed * 1e3, 3)})
+    else:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                latency.observe(elapsed)
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug("Node finished", extra={"node": name, "duration_ms": round(elapsed * 1e3, 3)})
+    return wrapper
+
+
+def record_token_usage(model: str, message) -> None:
+    """Adds an LLM reply's `usage_metadata` (when the provider sent it) to the token counters."""
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        LLM_TOKENS.labels(model, "input").inc(usage.get("input_tokens", 0))
+        LLM_TOKENS.labels(model, "output").inc(usage.get("output_tokens", 0))
@@ -0,0 +1,70 @@
+# app/patients.py
+
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+
+class PatientRepository:
+    """
+    An in-memory, indexed view of the patients CSV.
+
+    The file is parsed once and every row is stored in a hash index keyed on
+    (lowercased name, YYYY-MM-DD dob), so a lookup is a single dict access.
+    The index is rebuilt automatically when the file's mtime changes.
+    """
+
+    def __init__(self, csv_path: str):
+        self.csv_path = csv_path
+        self._lock = threading.Lock()
+        self._index: Dict[Tuple[str, str], Dict[str, str]] = {}
+        self._mtime: Optional[float] = None
+        self.version = 0  # Bumped on every reload so dependent indexes can follow
+
+    @staticmethod
+    def make_key(full_name: str, normalized_dob: str) -> Tuple[str, str]:
+        return (" ".join(full_name.split()).lower(), normalized_dob)
+
+    def _current_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.csv_path).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def _load(self, mtime: Optional[float]):
+        index = {}
+        if mtime is not None:
+            import pandas as pd  # Deferred: pandas is only needed to parse the CSV, not to import the app
+            patients_df = pd.read_csv(self.csv_path, encoding='utf-8', dtype=str, keep_default_na=False)
+            # Parse the whole dob column in one vectorized pass instead of per lookup
+            patients_df['dob'] = pd.to_datetime(patients_df['dob'], errors='coerce').dt.strftime('%Y-%m-%d')
+            patients_df = patients_df.dropna(subset=['dob'])
+            for record in patients_df.to_dict('records'):
+                # First occurrence wins, matching the original "first matching row" behaviour
+                index.setdefault(self.make_key(record['name'], record['dob']), record)
+        self._index = index
+        self._mtime = mtime
+        self.version += 1
+
+    def refresh(self):
+        """Reloads the index if the underlying file changed since the last load."""
+        mtime = self._current_mtime()
+        if self.version and mtime == self._mtime:
+            return
+        with self._lock:
+            if not self.version or mtime != self._mtime:
+                self._load(mtime)
+
+    def find(self, full_name: str, normalized_dob: str) -> Optional[Dict[str, str]]:
+        """Returns the patient record for an exact name + dob match, or None."""
+        self.refresh()
+        return self._index.get(self.make_key(full_name, normalized_dob))
+
+    def records(self):
+        """Returns all indexed patient records."""
+        self.refresh()
+        return list(self._index.values())
+
+    def __len__(self):
+        self.refresh()
+        return len(self._index)
@@ -0,0 +1,373 @@
+# app/reminders.py
+
+import asyncio
+import heapq
+import json
+import logging
+import os
+import smtplib
+import sqlite3
+import threading
+import time
+from email.message import EmailMessage
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Protocol, Tuple
+
+from app.bookings import appointment_timestamp
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reminders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dedupe_key TEXT NOT NULL UNIQUE,
+    due_at REAL NOT NULL,
+    channel TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    message TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_until REAL,
+    sent_at REAL
+);
+CREATE INDEX IF NOT EXISTS reminders_status_due ON reminders (status, due_at);
+"""
+# Hours before the appointment each reminder goes out, and the channels used
+REMINDER_OFFSETS_HOURS = (24, 3, 1)
+REMINDER_CHANNELS = ("email", "sms")
+# Row ids per claim/update statement (well under SQLite's variable limit)
+_CHUNK = 500
+
+log = logging.getLogger(__name__)
+
+
+class Reminder(NamedTuple):
+    key: str          # Unique per (appointment, offset, channel); scheduling it again is a no-op
+    due_at: float     # POSIX timestamp
+    channel: str
+    recipient: str
+    message: str
+
+
+class Delivery(NamedTuple):
+    """A claimed reminder handed to a sender. `id` doubles as the delivery's idempotency key."""
+    id: int
+    channel: str
+    recipient: str
+    message: str
+    attempts: int
+
+
+def reminders_for_appointment(appointment_key: str, patient_name: str, patient_email: str, patient_phone: str,
+                              appointment_time: str, now: Optional[float] = None) -> List[Reminder]:
+    """The email and SMS reminders for one appointment; offsets that have already passed are skipped."""
+    starts_at = appointment_timestamp(appointment_time)
+    if starts_at is None:
+        return []
+    now = time.time() if now is None else now
+    recipients = {"email": patient_email, "sms": patient_phone}
+    reminders = []
+    for hours in REMINDER_OFFSETS_HOURS:
+        due_at = starts_at - hours * 3600
+        if due_at <= now:
+            continue
+        if hours == REMINDER_OFFSETS_HOURS[0]:
+            message = f"Reminder: {patient_name}, you have an appointment on {appointment_time}."
+        elif hours == REMINDER_OFFSETS_HOURS[-1]:
+            message = f"Final reminder: {patient_name}, your appointment is in {hours} hour(s), on {appointment_time}."
+        else:
+            message = f"Reminder: {patient_name}, your appointment is on {appointment_time}. Please complete your intake forms if you haven't already."
+        for channel in REMINDER_CHANNELS:
+            if recipients[channel]:
+                reminders.append(Reminder(f"{appointment_key}|{hours}h|{channel}", due_at, channel, recipients[channel], message))
+    return reminders
+
+
+# --- Senders ---
+
+class ReminderSender(Protocol):
+    async def send(self, delivery: Delivery) -> None:
+        """Delivers one reminder; raises to have it retried."""
+
+
+class OutboxSender:
+    """
+    Local stand-in for an email or SMS provider: appends each delivery to a
+    JSONL outbox file. Like a provider's idempotency key, a delivery id that
+    is already in the outbox is not written again, so a reminder re-sent
+    after a crash reaches the patient once.
+    """
+
+    def __init__(self, channel: str, outbox_path: str, echo: bool = True):
+        self.channel = channel
+        self.outbox_path = outbox_path
+        self.echo = echo
+        self.suppressed = 0
+        self._delivered = set()
+        if os.path.exists(outbox_path):
+            with open(outbox_path, encoding="utf-8") as f:
+                self._delivered = {json.loads(line)["id"] for line in f if line.strip()}
+
+    async def send(self, delivery: Delivery):
+        if delivery.id in self._delivered:
+            self.suppressed += 1
+            return
+        with open(self.outbox_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"id": delivery.id, "to": delivery.recipient, "message": delivery.message, "sent_at": time.time()}) + "\n")
+        self._delivered.add(delivery.id)
+        if self.echo:
+            log.info("Message sent", extra={"channel": self.channel, "to": delivery.recipient, "delivery_id": delivery.id})
+
+
+class SmtpSender:
+    """Sends email through an SMTP server, one connection per message, off the event loop."""
+
+    def __init__(self, host: str, port: int = 25, from_address: str = "clinic@example.com",
+                 subject: str = "A message about your appointment", timeout: float = 30.0):
+        self.host = host
+        self.port = port
+        self.from_address = from_address
+        self.subject = subject
+        self.timeout = timeout
+
+    async def send(self, delivery: Delivery):
+        await asyncio.to_thread(self._send, delivery)
+
+    def _send(self, delivery: Delivery):
+        message = EmailMessage()
+        message["From"] = self.from_address
+        message["To"] = delivery.recipient
+        message["Subject"] = self.subject
+        message.set_content(delivery.message)
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            smtp.send_message(message)
+
+
+# --- Scheduler ---
+
+class ReminderScheduler:
+    """
+    A durable reminder queue in SQLite with an in-memory min-heap of due times.
+
+    Reminders are rows keyed by a dedupe key, so scheduling the same booking
+    twice adds nothing. Only reminders due within `horizon_seconds` are kept
+    in the heap; the window is topped up with a range query on the
+    (status, due_at) index as time moves on, so a million reminders weeks
+    out cost neither memory nor a scan per tick.
+
+    `start()` runs an asyncio dispatcher that sleeps until the heap top is
+    due (or a new, earlier reminder arrives), claims due rows by flipping
+    them to 'sending' with a lease, hands them to the channel's sender and
+    marks them 'sent'. A claim is a conditional UPDATE, so dispatchers in
+    several worker processes never send the same row. If a process dies
+    mid-send the lease expires and the row is sent again with the same
+    delivery id, which senders use to drop the duplicate. Failed sends are
+    retried with backoff, up to `max_attempts`.
+    """
+
+    def __init__(self, db_path: str, senders: Dict[str, ReminderSender], horizon_seconds: float = 3600.0,
+                 poll_seconds: float = 5.0, lease_seconds: float = 60.0, max_attempts: int = 5,
+                 batch_size: int = _CHUNK, clock: Callable[[], float] = time.time):
+        self.db_path = db_path
+        self.senders = senders
+        self.horizon_seconds = horizon_seconds
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.batch_size = batch_size
+        self.clock = clock
+        self._lock = threading.Lock()  # Guards the connection and the heap
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._heap: List[Tuple[float, int]] = []
+        self._loaded_until = float("-inf")  # Pending rows due up to here are in the heap
+        self._last_seen_id = 0
+        self._next_poll = float("-inf")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"sent": 0, "retried": 0, "failed": 0}
+
+    # --- Scheduling ---
+
+    def schedule(self, reminders: Iterable[Reminder]) -> int:
+        """Persists reminders (skipping known dedupe keys) and returns how many were added."""
+        rows = [(r.key, r.due_at, r.channel, r.recipient, r.message) for r in reminders]
+        if not rows:
+            return 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                before = self._conn.total_changes
+                first_id = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM reminders").fetchone()[0]
+                self._conn.executemany(
+                    "INSERT INTO reminders (dedupe_key, due_at, channel, recipient, message) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (dedupe_key) DO NOTHING",
+                    rows,
+                )
+                added = self._conn.total_changes - before
+                # We hold the write lock, so every id above first_id is ours
+                soon = self._conn.execute(
+                    "SELECT due_at, id FROM reminders WHERE id > ? AND due_at <= ?", (first_id, self._loaded_until)
+                ).fetchall() if added else []
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            earliest = self._heap[0][0] if self._heap else float("inf")
+            self._push(soon)
+        if soon and min(soon)[0] < earliest:
+            self._notify()
+        return added
+
+    def _push(self, entries: List[Tuple[float, int]]):
+        for entry in entries:
+            heapq.heappush(self._heap, entry)
+            self._last_seen_id = max(self._last_seen_id, entry[1])
+
+    def _notify(self):
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM reminders WHERE status IN ('pending', 'sending')").fetchone()[0]
+
+    def status_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM reminders GROUP BY status").fetchall())
+
+    # --- Loading ---
+
+    def _poll(self, now: float):
+        """
+        Tops up the heap: pending rows entering the horizon, rows other
+        processes scheduled inside it, and rows whose sending lease expired.
+        Every query is a range on an index, never a full scan.
+        """
+        with self._lock:
+            entries = self._conn.execute(
+                "UPDATE reminders SET status = 'pending', lease_until = NULL "
+                "WHERE status = 'sending' AND lease_until < ? RETURNING due_at, id",
+                (now,),
+            ).fetchall()
+            entries += self._conn.execute(
+                "SELECT due_at, id FROM reminders WHERE id > ? AND status = 'pending' AND due_at <= ?",
+                (self._last_seen_id, self._loaded_until),
+            ).fetchall()
+            if now + self.horizon_seconds / 2 >= self._loaded_until:
+                until = now + self.horizon_seconds
+                entries += self._conn.execute(
+                    "SELECT due_at, id FROM reminders WHERE status = 'pending' AND due_at > ? AND due_at <= ?",
+                    (self._loaded_until, until),
+                ).fetchall()
+                self._loaded_until = until
+            self._push(entries)
+        self._next_poll = now + self.poll_seconds
+
+    def _pop_due(self, now: float) -> List[int]:
+        with self._lock:
+            due = []
+            while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+                due.append(heapq.heappop(self._heap)[1])
+            return due
+
+    # --- Dispatch ---
+
+    def _claim(self, ids: List[int], now: float) -> List[Delivery]:
+        with self._lock:
+            return [Delivery(*row) for row in self._conn.execute(
+                f"UPDATE reminders SET status = 'sending', lease_until = ?, attempts = attempts + 1 "
+                f"WHERE id IN ({', '.join('?' * len(ids))}) AND status = 'pending' AND due_at <= ? "
+                f"RETURNING id, channel, recipient, message, attempts",
+                (now + self.lease_seconds, *ids, now),
+            ).fetchall()]
+
+    def _finish(self, sent: List[int], failed: List[Delivery], now: float):
+        retries = [(now + min(2 ** d.attempts, 3600), d.id) for d in failed if d.attempts < self.max_attempts]
+        dead = [d.id for d in failed if d.attempts >= self.max_attempts]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if sent:
+                    self._conn.execute(
+                        f"UPDATE reminders SET status = 'sent', sent_at = ?, lease_until = NULL WHERE id IN ({', '.join('?' * len(sent))})",
+                        (now, *sent),
+                    )
+                self._conn.executemany(
+                    "UPDATE reminders SET status = 'pending', due_at = ?, lease_until = NULL WHERE id = ?", retries
+                )
+                if dead:
+                    self._conn.execute(
+                        f"UPDATE reminders SET status = 'failed', lease_until = NULL WHERE id IN ({', '.join('?' * len(dead))})",
+                        dead,
+                    )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            self._push([entry for entry in retries if entry[0] <= self._loaded_until])
+        self.stats["sent"] += len(sent)
+        self.stats["retried"] += len(retries)
+        self.stats["failed"] += len(dead)
+
+    async def _send(self, delivery: Delivery) -> bool:
+        try:
+            await self.senders[delivery.channel].send(delivery)
+            return True
+        except Exception as e:
+            log.warning("Reminder failed", extra={"reminder_id": delivery.id, "channel": delivery.channel, "attempt": delivery.attempts, "error": str(e)})
+            return False
+
+    async def dispatch_due(self) -> int:
+        """Sends one batch of due reminders; returns how many were claimed."""
+        now = self.clock()
+        if now >= self._next_poll:
+            await asyncio.to_thread(self._poll, now)
+        ids = self._pop_due(now)
+        if not ids:
+            return 0
+        claimed = await asyncio.to_thread(self._claim, ids, now)
+        results = await asyncio.gather(*(self._send(delivery) for delivery in claimed))
+        sent = [d.id for d, ok in zip(claimed, results) if ok]
+        failed = [d for d, ok in zip(claimed, results) if not ok]
+        await asyncio.to_thread(self._finish, sent, failed, self.clock())
+        return len(claimed) or len(ids)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                if await self.dispatch_due():
+                    continue
+            except Exception as e:
+                # A locked or unavailable database must not kill the dispatcher
+                log.warning("Reminder dispatcher error", extra={"error": str(e)})
+            now = self.clock()
+            with self._lock:
+                next_due = self._heap[0][0] if self._heap else float("inf")
+            delay = max(min(next_due, self._next_poll, now + self.poll_seconds) - now, 0)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self):
+        """Starts the dispatcher on the running event loop."""
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="reminder-dispatcher")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._loop = None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,242 @@
+# app/reports.py
+
+import json
+import os
+import re
+import threading
+import zipfile
+from contextlib import contextmanager
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+from app.bookings import BookingLedger
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking is available
+    fcntl = None
+
+# Report columns, in the order the sheet shows them
+REPORT_COLUMNS = ("booking_date", "patient_name", "doctor_name", "appointment_time")
+# Excel's limit is 1,048,576 rows per sheet; after the header, longer reports continue on "Bookings (2)", ...
+SHEET_CAPACITY = 1_048_575
+# Bump whenever the staged row format changes so old staging files are rebuilt
+STATE_VERSION = 1
+COPY_BYTES = 1 << 20
+
+# progress(stage, done, total): "export" counts bookings, "render" counts bytes of sheet XML
+Progress = Callable[[str, int, int], None]
+
+
+class ReportResult(NamedTuple):
+    path: str
+    rows: int       # Bookings in the report
+    added: int      # Bookings exported by this run
+    rendered: bool  # False when the workbook was already up to date
+
+
+# --- SpreadsheetML ---
+#
+# The smallest workbook Excel, LibreOffice and openpyxl all open: inline
+# string cells, no shared strings table, one default style. Each row is
+# rendered to XML once, when it is exported; building the .xlsx is then a
+# streaming copy of the staged rows into the zip. (openpyxl's write-only
+# mode spends ~100 µs a row, which at 1M bookings is minutes per click.)
+
+_XML_HEAD = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_ILLEGAL_XML_RE = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+_STYLES = (
+    f'{_XML_HEAD}<styleSheet xmlns="{_MAIN_NS}"><fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles></styleSheet>'
+)
+
+
+def sheet_row(values: Sequence) -> bytes:
+    """One <row> of inline-string cells."""
+    cells = "".join(f'<c t="inlineStr"><is><t xml:space="preserve">{escape(_ILLEGAL_XML_RE.sub("", "" if value is None else str(value)))}</t></is></c>'
+                    for value in values)
+    return f"<row>{cells}</row>".encode("utf-8")
+
+
+def _package_parts(sheet_names: List[str]) -> Dict[str, str]:
+    count = range(1, len(sheet_names) + 1)
+    sheet_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"
+    return {
+        "[Content_Types].xml": (
+            f'{_XML_HEAD}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            + "".join(f'<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType="{sheet_type}"/>' for i in count)
+            + "</Types>"
+        ),
+        "_rels/.rels": (
+            f'{_XML_HEAD}<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'<Relationship Id="rId1" Type="{_REL_NS}/officeDocument" Target="xl/workbook.xml"/></Relationships>'
+        ),
+        "xl/workbook.xml": (
+            f'{_XML_HEAD}<workbook xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}"><sheets>'
+            + "".join(f'<sheet name="{escape(name)}" sheetId="{i}" r:id="rId{i}"/>' for i, name in zip(count, sheet_names))
+            + "</sheets></workbook>"
+        ),
+        "xl/_rels/workbook.xml.rels": (
+            f'{_XML_HEAD}<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + "".join(f'<Relationship Id="rId{i}" Type="{_REL_NS}/worksheet" Target="worksheets/sheet{i}.xml"/>' for i in count)
+            + f'<Relationship Id="rId{len(sheet_names) + 1}" Type="{_REL_NS}/styles" Target="styles.xml"/></Relationships>'
+        ),
+        "xl/styles.xml": _STYLES,
+    }
+
+
+def write_workbook(path: str, rows_path: str, sheets: List[Tuple[int, int]], header: bytes,
+                   progress: Optional[Callable[[int, int], None]] = None):
+    """
+    Writes the .xlsx at `path` (atomically) with one sheet per (start, end)
+    byte range of the staged rows file, each starting with `header`.
+    """
+    names = ["Bookings"] + [f"Bookings ({i})" for i in range(2, len(sheets) + 1)]
+    total, copied = sum(end - start for start, end in sheets), 0
+    tmp_path = f"{path}.tmp"
+    with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as workbook, \
+            open(rows_path, "rb") as rows:
+        for name, content in _package_parts(names).items():
+            workbook.writestr(name, content)
+        for i, (start, end) in enumerate(sheets, 1):
+            with workbook.open(f"xl/worksheets/sheet{i}.xml", "w", force_zip64=True) as sheet:
+                sheet.write(f'{_XML_HEAD}<worksheet xmlns="{_MAIN_NS}"><sheetData>'.encode())
+                sheet.write(header)
+                rows.seek(start)
+                while rows.tell() < end:
+                    chunk = rows.read(min(COPY_BYTES, end - rows.tell()))
+                    sheet.write(chunk)
+                    copied += len(chunk)
+                    if progress:
+                        progress(copied, total)
+                sheet.write(b"</sheetData></worksheet>")
+    os.replace(tmp_path, path)
+
+
+# --- The incremental report ---
+
+class AdminReport:
+    """
+    The admin review workbook, kept up to date incrementally.
+
+    Bookings recorded since the last run (ledger ids are assigned in commit
+    order) are read in chunks of `chunk_size` and appended, already rendered
+    as sheet rows, to a staging file next to the report. A state file
+    records the last exported id and the staged size after every chunk, so
+    an interrupted run resumes where it stopped and a half-written chunk is
+    cut off. The workbook is then rebuilt from the staged rows by a
+    streaming copy, only when rows were added. Memory stays flat whatever
+    the ledger's size, and the state file carries the current run's
+    progress so any process can report it.
+    """
+
+    def __init__(self, ledger: BookingLedger, path: str, chunk_size: int = 10_000):
+        self.ledger = ledger
+        self.path = path
+        self.chunk_size = chunk_size
+        directory, name = os.path.split(path)
+        stem = os.path.splitext(name)[0]
+        self.rows_path = os.path.join(directory, f".{stem}.rows.xml")
+        self.state_path = os.path.join(directory, f".{stem}.state.json")
+        self.lock_path = os.path.join(directory, f".{stem}.lock")
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _fresh_state() -> Dict:
+        return {"version": STATE_VERSION, "last_id": 0, "rows": 0, "size": 0, "sheets": [0], "rendered": None, "progress": None}
+
+    def _load_state(self) -> Dict:
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+            if state.get("version") == STATE_VERSION:
+                return state
+        except (OSError, ValueError):
+            pass
+        return self._fresh_state()
+
+    def _save_state(self, state: Dict):
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def progress(self) -> Optional[Dict]:
+        """{"stage", "done", "total"} of the current or last run, as last saved; None before the first."""
+        return self._load_state().get("progress")
+
+    @contextmanager
+    def _exclusive(self):
+        """One run at a time, across worker processes too."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, "w") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _export(self, state: Dict, progress: Optional[Progress]) -> Tuple[Dict, int]:
+        staged = os.path.getsize(self.rows_path) if os.path.exists(self.rows_path) else 0
+        # Everything up to last_id must be exactly what was staged; otherwise the ledger was replaced: start over
+        if staged < state["size"] or self.ledger.count() - self.ledger.count(after_id=state["last_id"]) != state["rows"]:
+            state = self._fresh_state()
+        pending, added = self.ledger.count(after_id=state["last_id"]), 0
+        with open(self.rows_path, "r+b" if staged else "wb") as rows:
+            rows.truncate(state["size"])  # Drops a chunk written after the last saved state
+            rows.seek(state["size"])
+            while True:
+                chunk = self.ledger.export_rows(REPORT_COLUMNS, after_id=state["last_id"], limit=self.chunk_size)
+                if not chunk:
+                    break
+                parts = []
+                for booking_id, *values in chunk:
+                    if state["rows"] == len(state["sheets"]) * SHEET_CAPACITY:
+                        state["sheets"].append(state["size"])
+                    row = sheet_row(values)
+                    parts.append(row)
+                    state["size"] += len(row)
+                    state["rows"] += 1
+                rows.write(b"".join(parts))
+                rows.flush()
+                os.fsync(rows.fileno())
+                state["last_id"] = chunk[-1][0]
+                added += len(chunk)
+                self._report(state, progress, "export", added, max(pending, added))
+        return state, added
+
+    def _render(self, state: Dict, progress: Optional[Progress]) -> bool:
+        if state["rendered"] == state["rows"] and os.path.exists(self.path):
+            return False
+        bounds = state["sheets"] + [state["size"]]
+        write_workbook(self.path, self.rows_path, list(zip(bounds, bounds[1:])), sheet_row(REPORT_COLUMNS),
+                       progress=lambda done, total: self._report(state, progress, "render", done, total))
+        state["rendered"] = state["rows"]
+        return True
+
+    def _report(self, state: Dict, progress: Optional[Progress], stage: str, done: int, total: int):
+        state["progress"] = {"stage": stage, "done": done, "total": total}
+        self._save_state(state)
+        if progress:
+            progress(stage, done, total)
+
+    def generate(self, progress: Optional[Progress] = None) -> ReportResult:
+        """Exports the bookings added since the last run and rebuilds the workbook if anything changed."""
+        with self._exclusive():
+            state, added = self._export(self._load_state(), progress)
+            rendered = self._render(state, progress)
+            self._report(state, progress, "done", state["rows"], state["rows"])
+        return ReportResult(self.path, state["rows"], added, rendered)
@@ -0,0 +1,161 @@
+# app/reservations.py
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.bookings import MAX_APPOINTMENT_SECONDS
+
+# (starts_at, ends_at) as POSIX timestamps
+Interval = Tuple[float, float]
+
+
+class _DoctorCalendar:
+    """Booked intervals of one doctor, sorted by start, plus live holds."""
+
+    __slots__ = ("starts", "ends", "holds")
+
+    def __init__(self):
+        self.starts: List[float] = []
+        self.ends: List[float] = []
+        self.holds: Dict[float, Tuple[float, str, float]] = {}  # start -> (end, session_id, expires_at)
+
+    def add(self, starts_at: float, ends_at: float):
+        i = bisect_left(self.starts, starts_at)
+        self.starts.insert(i, starts_at)
+        self.ends.insert(i, ends_at)
+
+    def booked(self, starts_at: float, ends_at: float) -> bool:
+        # Only bookings starting in (start - longest appointment, end) can overlap
+        lo = bisect_left(self.starts, starts_at - MAX_APPOINTMENT_SECONDS)
+        hi = bisect_left(self.starts, ends_at)
+        return any(self.ends[i] > starts_at for i in range(hi - 1, lo - 1, -1))
+
+
+class ReservationBook:
+    """
+    An in-memory per-doctor interval index of booked appointments, with
+    short-lived holds on slots that have been shown to a patient.
+
+    Bookings are kept as sorted start/end arrays per doctor, so a conflict
+    check is a binary search plus a look at the few intervals that can reach
+    the requested start. Holds expire `hold_seconds` after they were placed;
+    a held slot is hidden from, and cannot be booked by, other sessions. The
+    booking ledger stays the source of truth: `sync()` pulls bookings other
+    processes have committed since the last call.
+    """
+
+    def __init__(self, hold_seconds: float = 120.0, clock: Callable[[], float] = time.time):
+        self.hold_seconds = hold_seconds
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._calendars: Dict[str, _DoctorCalendar] = {}
+        self._last_booking_id = 0
+
+    def __len__(self):
+        return sum(len(calendar.starts) for calendar in self._calendars.values())
+
+    def _calendar(self, doctor_name: str) -> _DoctorCalendar:
+        calendar = self._calendars.get(doctor_name)
+        if calendar is None:
+            calendar = self._calendars[doctor_name] = _DoctorCalendar()
+        return calendar
+
+    # --- Bookings ---
+
+    def load(self, rows: Iterable[Tuple[int, str, float, float]]):
+        """Adds (booking id, doctor, starts_at, ends_at) rows, e.g. from `BookingLedger.intervals()`."""
+        by_doctor: Dict[str, List[Interval]] = {}
+        last_id = self._last_booking_id
+        for booking_id, doctor_name, starts_at, ends_at in rows:
+            by_doctor.setdefault(doctor_name, []).append((starts_at, ends_at))
+            last_id = max(last_id, booking_id)
+        with self._lock:
+            for doctor_name, intervals in by_doctor.items():
+                calendar = self._calendar(doctor_name)
+                if not calendar.starts and len(intervals) > 1:
+                    intervals.sort()
+                    calendar.starts = [start for start, _ in intervals]
+                    calendar.ends = [end for _, end in intervals]
+                else:
+                    for starts_at, ends_at in intervals:
+                        calendar.add(starts_at, ends_at)
+            self._last_booking_id = last_id
+
+    def sync(self, ledger):
+        """Loads bookings committed to `ledger` since the last sync."""
+        self.load(ledger.intervals(after_id=self._last_booking_id))
+
+    def add_booking(self, booking_id: int, doctor_name: str, starts_at: float, ends_at: float):
+        self.load([(booking_id, doctor_name, starts_at, ends_at)])
+
+    def _held_by_other(self, calendar: _DoctorCalendar, starts_at: float, ends_at: float, session_id: Optional[str], now: float) -> bool:
+        for start in [s for s, (_, _, expires_at) in calendar.holds.items() if expires_at <= now]:
+            del calendar.holds[start]
+        return any(holder != session_id and start < ends_at and end > starts_at
+                   for start, (end, holder, _) in calendar.holds.items())
+
+    def is_free(self, doctor_name: str, starts_at: float, ends_at: float, session_id: Optional[str] = None) -> bool:
+        """True if the interval is neither booked nor held by another session."""
+        with self._lock:
+            calendar = self._calendars.get(doctor_name)
+            if calendar is None:
+                return True
+            return not calendar.booked(starts_at, ends_at) and \
+                not self._held_by_other(calendar, starts_at, ends_at, session_id, self.clock())
+
+    def busy(self, doctor_names: Iterable[str], starts_at: float, ends_at: float,
+             session_id: Optional[str] = None) -> Dict[str, Tuple[List[float], List[float]]]:
+        """
+        Per doctor, (starts, ends) of the bookings and other sessions' live
+        holds that can overlap the window. Bookings that started up to the
+        longest appointment before it are included; callers clip.
+        """
+        now = self.clock()
+        taken = {}
+        with self._lock:
+            for doctor_name in doctor_names:
+                calendar = self._calendars.get(doctor_name)
+                if calendar is None:
+                    continue
+                lo = bisect_left(calendar.starts, starts_at - MAX_APPOINTMENT_SECONDS)
+                hi = bisect_left(calendar.starts, ends_at)
+                starts, ends = calendar.starts[lo:hi], calendar.ends[lo:hi]
+                for start, (end, holder, expires_at) in calendar.holds.items():
+                    if holder != session_id and expires_at > now and start < ends_at and end > starts_at:
+                        starts.append(start)
+                        ends.append(end)
+                if starts:
+                    taken[doctor_name] = (starts, ends)
+        return taken
+
+    # --- Holds ---
+
+    def hold(self, doctor_name: str, intervals: List[Interval], session_id: str, limit: Optional[int] = None) -> List[bool]:
+        """
+        Places (or refreshes) holds for `session_id` on every free interval,
+        or on the first `limit` free ones. The session's earlier holds for the
+        doctor are released first. Returns, per interval, whether it is now
+        held by this session.
+        """
+        now = self.clock()
+        with self._lock:
+            calendar = self._calendar(doctor_name)
+            for start in [s for s, (_, holder, _) in calendar.holds.items() if holder == session_id]:
+                del calendar.holds[start]
+            held = []
+            for starts_at, ends_at in intervals:
+                free = (limit is None or sum(held) < limit) and not calendar.booked(starts_at, ends_at) and \
+                    not self._held_by_other(calendar, starts_at, ends_at, session_id, now)
+                if free:
+                    calendar.holds[starts_at] = (ends_at, session_id, now + self.hold_seconds)
+                held.append(free)
+            return held
+
+    def release(self, session_id: str):
+        """Drops every hold placed by `session_id`."""
+        with self._lock:
+            for calendar in self._calendars.values():
+                for start in [s for s, (_, holder, _) in calendar.holds.items() if holder == session_id]:
+                    del calendar.holds[start]
@@ -0,0 +1,165 @@
+# app/results.py
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+# --- Typed Tool Results ---
+#
+# Tools return these instead of pre-formatted strings. The graph reads state
+# straight off the fields via `state_updates()`; the text the LLM sees is only
+# rendered by `str()` when the ToolMessage is built.
+
+class ToolResult:
+    __slots__ = ()
+
+    def state_updates(self, args: Dict) -> Dict:
+        """Agent state changes implied by this result; `args` are the tool call's arguments."""
+        return {}
+
+
+@dataclass(slots=True)
+class ToolError(ToolResult):
+    message: str
+
+    def __str__(self):
+        return self.message
+
+
+@dataclass(slots=True)
+class PatientLookup(ToolResult):
+    patient: Optional[Dict] = None      # EMR record when the patient is known (exact name and DOB)
+    candidates: List = field(default_factory=list)  # Near-misses (score, record), best first, for the patient to confirm
+
+    def state_updates(self, args: Dict) -> Dict:
+        info = {key: value for key, value in args.items() if key != "new_patient"}
+        if self.candidates:
+            # Unsettled until the patient confirms: a similar name is not the same person
+            return {"patient_status": None, "patient_info": info,
+                    "patient_candidates": [candidate.record["name"] for candidate in self.candidates]}
+        if self.patient is None:
+            return {"patient_status": "NEW", "patient_info": info, "patient_candidates": None}
+        return {"patient_status": "RETURNING", "patient_info": self.patient,
+                "doctor_name": self.patient.get("last_visit_doctor"), "patient_candidates": None}
+
+    def __str__(self):
+        if self.candidates:
+            # Names only: the other records' details are not this patient's to see
+            names = ", ".join(dict.fromkeys(candidate.record["name"] for candidate in self.candidates))
+            return (f"SUCCESS: No patient matches this name and date of birth exactly. Possible matches: {names}. "
+                    "The patient must confirm their details or say they are a new patient.")
+        if self.patient is None:
+            return "SUCCESS: This is a new patient."
+        return f"SUCCESS: Found returning patient. Details: {self.patient}"
+
+
+@dataclass(slots=True)
+class DoctorList(ToolResult):
+    doctors: List[Dict]
+
+    def state_updates(self, args: Dict) -> Dict:
+        return {"doctor_list": self.doctors}
+
+    def __str__(self):
+        return str(self.doctors)
+
+
+@dataclass(slots=True)
+class AvailableSlots(ToolResult):
+    slots: List[str] = field(default_factory=list)  # Already formatted for patients
+    shown: Optional[int] = None  # How many the model sees; present_slots picks the free ones from all
+
+    def state_updates(self, args: Dict) -> Dict:
+        return {"available_slots": self.slots}
+
+    def __str__(self):
+        if not self.slots:
+            return "SUCCESS: No available slots found in the next 7 days."
+        listed = self.slots[:self.shown]
+        more = f" (and {len(self.slots) - len(listed)} more)" if len(listed) < len(self.slots) else ""
+        return f"SUCCESS: The following slots are available: {', '.join(listed)}{more}."
+
+
+@dataclass(slots=True)
+class FirstAvailableSlots(ToolResult):
+    slots: List[Dict[str, str]] = field(default_factory=list)  # {"doctor_name", "slot"}, earliest first
+
+    def state_updates(self, args: Dict) -> Dict:
+        return {"first_available": self.slots}
+
+    def __str__(self):
+        if not self.slots:
+            return "SUCCESS: No doctor has an available slot in the next 7 days."
+        listed = ", ".join(f"{entry['slot']} with {entry['doctor_name']}" for entry in self.slots)
+        return f"SUCCESS: The earliest available slots are: {listed}."
+
+
+@dataclass(slots=True)
+class Booking(ToolResult):
+    patient_name: str
+    doctor_name: str
+    appointment_time: str
+
+    def state_updates(self, args: Dict) -> Dict:
+        # Only a booking that went through settles the slot; a failed one leaves the offer open
+        return {"doctor_name": self.doctor_name, "confirmed_time": self.appointment_time}
+
+    def __str__(self):
+        return f"SUCCESS: The appointment has been successfully booked for {self.patient_name} with {self.doctor_name} at {self.appointment_time}."
+
+
+@dataclass(slots=True)
+class InsuranceDetails(ToolResult):
+    carrier: str
+    member_id: str
+    group_number: str
+
+    def state_updates(self, args: Dict) -> Dict:
+        return {"insurance_info": str(self)}
+
+    def __str__(self):
+        return f"SUCCESS: Insurance details for {self.carrier} have been collected and stored."
+
+
+@dataclass(slots=True)
+class InsuranceSkipped(ToolResult):
+
+    def state_updates(self, args: Dict) -> Dict:
+        return {"insurance_info": "Not Provided"}
+
+    def __str__(self):
+        return "SUCCESS: Insurance step has been skipped."
+
+
+@dataclass(slots=True)
+class IntakeFormsSent(ToolResult):
+    patient_name: str
+    patient_email: str
+    job_id: Optional[int] = None    # Background job delivering the forms
+    status: str = "sent"            # "queued" until the job has run
+
+    def state_updates(self, args: Dict) -> Dict:
+        return {"intake_forms_job": self.job_id} if self.job_id is not None else {}
+
+    def __str__(self):
+        if self.status == "queued":
+            return f"SUCCESS: Intake forms for {self.patient_name} are queued for delivery via EMAIL to {self.patient_email}."
+        return f"SUCCESS: Intake forms have been sent via EMAIL to {self.patient_name} at {self.patient_email}."
+
+
+@dataclass(slots=True)
+class RemindersScheduled(ToolResult):
+    patient_name: str
+    patient_email: str
+    patient_phone: str
+    count: int = 3
+    job_id: Optional[int] = None    # Background job queueing the reminders
+    status: str = "sent"
+
+    def state_updates(self, args: Dict) -> Dict:
+        return {"reminders_job": self.job_id} if self.job_id is not None else {}
+
+    def __str__(self):
+        if self.status == "queued":
+            return f"SUCCESS: {self.count} reminders for {self.patient_name} are queued for scheduling via EMAIL ({self.patient_email}) and SMS ({self.patient_phone})."
+        return f"SUCCESS: {self.count} reminders have been scheduled for {self.patient_name} via EMAIL ({self.patient_email}) and SMS ({self.patient_phone})."
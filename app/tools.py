@@ -1,29 +1,301 @@
 # app/tools.py
 
+import asyncio
 import os
-import re
-import pandas as pd
+import threading
+import time
 from pydantic.v1 import BaseModel, Field 
 from datetime import datetime, timedelta, timezone
-import requests
-from langchain_core.tools import tool
+import httpx
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import StructuredTool, tool
 from dotenv import load_dotenv
+from app.patients import PatientRepository
+from app.matching import PatientMatcher
+from app.doctors import DoctorDirectory
+from app.calendly import AvailabilityCache, CalendlyClient, format_slot
+from app.bookings import BookingLedger, appointment_label, appointment_timestamp, idempotency_key
+from app.reservations import ReservationBook
+from app.fanout import FirstAvailable, earliest, first_available
+from app.reminders import Delivery, OutboxSender, ReminderScheduler, SmtpSender, reminders_for_appointment
+from app.jobs import Job, JobQueue
+from app.reports import AdminReport
+from app.metrics import CALENDLY_LATENCY
+from app.admission import ReplyCache
+from app.locks import SessionLockManager
+from app.results import (
+    AvailableSlots,
+    Booking,
+    DoctorList,
+    FirstAvailableSlots,
+    InsuranceDetails,
+    InsuranceSkipped,
+    IntakeFormsSent,
+    PatientLookup,
+    RemindersScheduled,
+    ToolError,
+)
 
 load_dotenv()
 
 # --- Configuration ---
 DATA_DIR = "./data"
 PATIENT_DB_PATH = os.path.join(DATA_DIR, "patients.csv")
-BOOKINGS_DB_PATH = os.path.join(DATA_DIR, "bookings.csv")
+BOOKINGS_DB_PATH = os.path.join(DATA_DIR, "bookings.csv")  # Legacy log, imported into the ledger
+BOOKINGS_LEDGER_PATH = os.getenv("BOOKINGS_LEDGER_PATH", os.path.join(DATA_DIR, "bookings.db"))
+# How long slots shown to a patient stay reserved for their session
+SLOT_HOLD_SECONDS = float(os.getenv("SLOT_HOLD_SECONDS", "120"))
+# Appointment length in minutes, keyed by is_new_patient
+APPOINTMENT_MINUTES = {True: 60, False: 30}
+# Slots shown to a patient, picked from the first SLOT_CANDIDATES Calendly returns
+# that are not already booked or held locally
+SLOTS_SHOWN = 5
+SLOT_CANDIDATES = 100
+# Where get_available_slots finds free time: "schedule" (the doctors' schedules
+# minus bookings and holds), "calendly" (Calendly only) or "overlay" (schedule
+# slots that Calendly also offers)
+AVAILABILITY_SOURCE = os.getenv("AVAILABILITY_SOURCE", "schedule").lower()
+AVAILABILITY_DAYS = int(os.getenv("AVAILABILITY_DAYS", "7"))
+# "First available" searches look up this many doctors at a time
+FIRST_AVAILABLE_CONCURRENCY = int(os.getenv("FIRST_AVAILABLE_CONCURRENCY", "8"))
+REMINDERS_DB_PATH = os.getenv("REMINDERS_DB_PATH", os.path.join(DATA_DIR, "reminders.db"))
+# Local stand-in senders append delivered reminders here
+REMINDER_OUTBOX_DIR = os.getenv("REMINDER_OUTBOX_DIR", os.path.join(DATA_DIR, "outbox"))
+# Post-booking side effects run as background jobs
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", os.path.join(DATA_DIR, "jobs.db"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Outgoing email goes through SMTP when a host is set, otherwise to the local outbox
+SMTP_HOST = os.getenv("SMTP_HOST")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "25"))
+SMTP_FROM = os.getenv("SMTP_FROM", "clinic@example.com")
+# Admin review workbook, brought up to date by an "admin_report" background job
+ADMIN_REPORT_PATH = os.getenv("ADMIN_REPORT_PATH", os.path.join(DATA_DIR, "admin_review_report.xlsx"))
 DOCTOR_SCHEDULE_PATH = os.path.join(DATA_DIR, "dr schedules.xlsx")
+DOCTOR_SCHEDULE_SIDECAR_PATH = os.path.join(DATA_DIR, ".dr_schedules.cache.pkl")
+# Minimum fuzzy score (name + DOB) for suggesting a near-miss; the patient has to confirm it
+PATIENT_MATCH_THRESHOLD = float(os.getenv("PATIENT_MATCH_THRESHOLD", "0.9"))
+PATIENT_MATCH_SUGGESTIONS = 3
 
-os.makedirs(DATA_DIR, exist_ok=True)
 CALENDLY_API_KEY = os.getenv("CALENDLY_API_KEY")
+CALENDLY_API_BASE = os.getenv("CALENDLY_API_BASE", "https://api.calendly.com")
+CALENDLY_CACHE_TTL_SECONDS = float(os.getenv("CALENDLY_CACHE_TTL_SECONDS", "30"))
+CALENDLY_TIMEOUT_SECONDS = float(os.getenv("CALENDLY_TIMEOUT_SECONDS", "10"))
+CALENDLY_MAX_RETRIES = int(os.getenv("CALENDLY_MAX_RETRIES", "3"))
+CALENDLY_MAX_CONCURRENCY = int(os.getenv("CALENDLY_MAX_CONCURRENCY", "20"))
+# Longest wait between retries (Retry-After included), and the total time a
+# call may spend retrying; keep the budget under the agent's TOOL_TIMEOUT_SECONDS
+CALENDLY_MAX_RETRY_DELAY_SECONDS = float(os.getenv("CALENDLY_MAX_RETRY_DELAY_SECONDS", "5"))
+CALENDLY_RETRY_BUDGET_SECONDS = float(os.getenv("CALENDLY_RETRY_BUDGET_SECONDS", "20"))
+# With several uvicorn workers (WEB_CONCURRENCY > 1) a session's turns can land on
+# any process: turns are serialized with file locks too, and replies kept in SQLite
+MULTI_WORKER = int(os.getenv("WEB_CONCURRENCY", "1")) > 1
+SESSION_LOCK_DIR = os.getenv("SESSION_LOCK_DIR", os.path.join(DATA_DIR, "locks"))
+IDEMPOTENCY_DB_PATH = os.getenv("IDEMPOTENCY_DB_PATH", os.path.join(DATA_DIR, "replies.db"))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "600"))
 HEADERS = {
     "Authorization": f"Bearer {CALENDLY_API_KEY}",
     "Content-Type": "application/json"
 }
 
+# --- Shared Data Stores ---
+# Built on first use (the API builds them in its lifespan), so importing this
+# module neither touches the data directory nor loads pandas or requests.
+# Each name stays None until then; assign one to substitute a store.
+availability_cache = AvailabilityCache(ttl_seconds=CALENDLY_CACHE_TTL_SECONDS)
+patient_repository: PatientRepository | None = None
+patient_matcher: PatientMatcher | None = None
+doctor_directory: DoctorDirectory | None = None
+booking_ledger: BookingLedger | None = None
+reservation_book: ReservationBook | None = None
+reminder_scheduler: ReminderScheduler | None = None
+intake_forms_sender = None
+job_queue: JobQueue | None = None
+session_locks: SessionLockManager | None = None
+reply_cache: ReplyCache | None = None
+admin_report: AdminReport | None = None
+availability_engine = None
+http_session = None
+_stores_lock = threading.RLock()
+
+def _shared(name: str, build):
+    """Returns the module-level store `name`, building it once with `build()`."""
+    store = globals()[name]
+    if store is None:
+        with _stores_lock:
+            store = globals()[name]
+            if store is None:
+                store = globals()[name] = build()
+    return store
+
+def _parent_dir(path: str) -> str:
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+def get_patient_repository() -> PatientRepository:
+    return _shared("patient_repository", lambda: PatientRepository(PATIENT_DB_PATH))
+
+def get_patient_matcher() -> PatientMatcher:
+    return _shared("patient_matcher", lambda: PatientMatcher(get_patient_repository()))
+
+def get_doctor_directory() -> DoctorDirectory:
+    return _shared("doctor_directory", lambda: DoctorDirectory(
+        DOCTOR_SCHEDULE_PATH,
+        sidecar_path=DOCTOR_SCHEDULE_SIDECAR_PATH if os.getenv("DOCTOR_SCHEDULE_SIDECAR", "1") == "1" else None,
+    ))
+
+def _open_booking_ledger() -> BookingLedger:
+    _parent_dir(BOOKINGS_LEDGER_PATH)
+    ledger = BookingLedger(BOOKINGS_LEDGER_PATH)
+    ledger.import_csv(BOOKINGS_DB_PATH)
+    return ledger
+
+def get_booking_ledger() -> BookingLedger:
+    return _shared("booking_ledger", _open_booking_ledger)
+
+def _open_reservation_book() -> ReservationBook:
+    book = ReservationBook(hold_seconds=SLOT_HOLD_SECONDS)
+    book.sync(get_booking_ledger())
+    return book
+
+def get_reservation_book() -> ReservationBook:
+    return _shared("reservation_book", _open_reservation_book)
+
+def _open_availability_engine():
+    from app.availability import AvailabilityEngine  # Deferred: NumPy loads with the first slot lookup
+    return AvailabilityEngine(get_doctor_directory(), get_reservation_book())
+
+def get_availability_engine():
+    return _shared("availability_engine", _open_availability_engine)
+
+def _email_sender(outbox_name: str):
+    if SMTP_HOST:
+        return SmtpSender(SMTP_HOST, SMTP_PORT, SMTP_FROM)
+    return OutboxSender("email", os.path.join(REMINDER_OUTBOX_DIR, outbox_name))
+
+def _open_reminder_scheduler() -> ReminderScheduler:
+    os.makedirs(REMINDER_OUTBOX_DIR, exist_ok=True)
+    _parent_dir(REMINDERS_DB_PATH)
+    return ReminderScheduler(REMINDERS_DB_PATH, senders={
+        "email": _email_sender("email.jsonl"),
+        "sms": OutboxSender("sms", os.path.join(REMINDER_OUTBOX_DIR, "sms.jsonl")),
+    })
+
+def get_reminder_scheduler() -> ReminderScheduler:
+    return _shared("reminder_scheduler", _open_reminder_scheduler)
+
+def _open_intake_forms_sender():
+    os.makedirs(REMINDER_OUTBOX_DIR, exist_ok=True)
+    return _email_sender("intake_forms.jsonl")
+
+def get_intake_forms_sender():
+    return _shared("intake_forms_sender", _open_intake_forms_sender)
+
+async def _send_intake_forms_job(job: Job):
+    message = (f"Dear {job.payload['patient_name']},\n\nThank you for booking with us. Please complete the attached "
+               f"patient intake forms before your appointment.\n\nSincerely,\nThe Clinic")
+    await get_intake_forms_sender().send(Delivery(job.id, "email", job.payload["patient_email"], message, job.attempts))
+
+async def _schedule_reminders_job(job: Job):
+    await asyncio.to_thread(get_reminder_scheduler().schedule, reminders_for_appointment(**job.payload))
+
+def _open_admin_report() -> AdminReport:
+    _parent_dir(ADMIN_REPORT_PATH)
+    return AdminReport(get_booking_ledger(), ADMIN_REPORT_PATH)
+
+def get_admin_report() -> AdminReport:
+    return _shared("admin_report", _open_admin_report)
+
+async def _admin_report_job(job: Job):
+    await asyncio.to_thread(get_admin_report().generate)
+
+def _open_job_queue() -> JobQueue:
+    _parent_dir(JOBS_DB_PATH)
+    return JobQueue(JOBS_DB_PATH, handlers={
+        "intake_forms": _send_intake_forms_job,
+        "reminders": _schedule_reminders_job,
+        "admin_report": _admin_report_job,
+    }, workers=JOB_WORKERS, max_attempts=JOB_MAX_ATTEMPTS)
+
+def get_job_queue() -> JobQueue:
+    return _shared("job_queue", _open_job_queue)
+
+def _open_session_locks() -> SessionLockManager:
+    if not MULTI_WORKER:
+        return SessionLockManager()
+    os.makedirs(SESSION_LOCK_DIR, exist_ok=True)
+    return SessionLockManager(lock_dir=SESSION_LOCK_DIR)
+
+def get_session_locks() -> SessionLockManager:
+    return _shared("session_locks", _open_session_locks)
+
+def _open_reply_cache() -> ReplyCache:
+    # Replies by Idempotency-Key header, so a retried or double-sent message doesn't run twice
+    if MULTI_WORKER:
+        _parent_dir(IDEMPOTENCY_DB_PATH)
+    return ReplyCache(max_entries=IDEMPOTENCY_CACHE_SIZE, ttl_seconds=IDEMPOTENCY_TTL_SECONDS,
+                      db_path=IDEMPOTENCY_DB_PATH if MULTI_WORKER else None)
+
+def get_reply_cache() -> ReplyCache:
+    return _shared("reply_cache", _open_reply_cache)
+
+def open_stores():
+    """Builds the stores the API needs to take requests (cheap: SQLite files, no CSV or workbook parsing)."""
+    get_booking_ledger()
+    get_reservation_book()
+    get_reminder_scheduler()
+    get_intake_forms_sender()
+    get_job_queue()
+    get_session_locks()
+    get_reply_cache()
+
+def warm_caches():
+    """Loads the patient index, doctor directory and schedules ahead of the first lookup that needs them."""
+    get_patient_repository().refresh()
+    get_patient_matcher()
+    try:
+        get_doctor_directory().get_doctors()
+        if AVAILABILITY_SOURCE != "calendly":
+            get_availability_engine().refresh()
+    except FileNotFoundError:
+        pass  # get_doctor_list reports it when asked
+
+# --- Shared HTTP Clients ---
+# Sync tools reuse one keep-alive session; async tools use a pooled client
+# that the FastAPI lifespan opens and closes. Both are created on first use.
+def _open_http_session():
+    import requests  # Deferred: only the sync Calendly path uses it
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    return session
+
+def get_http_session():
+    return _shared("http_session", _open_http_session)
+
+_calendly_client: CalendlyClient | None = None
+
+def get_calendly_client() -> CalendlyClient:
+    global _calendly_client
+    if _calendly_client is None:
+        _calendly_client = CalendlyClient(
+            CALENDLY_API_BASE,
+            CALENDLY_API_KEY,
+            timeout=CALENDLY_TIMEOUT_SECONDS,
+            max_retries=CALENDLY_MAX_RETRIES,
+            max_concurrency=CALENDLY_MAX_CONCURRENCY,
+            max_retry_delay=CALENDLY_MAX_RETRY_DELAY_SECONDS,
+            retry_budget_seconds=CALENDLY_RETRY_BUDGET_SECONDS,
+        )
+    return _calendly_client
+
+async def close_calendly_client():
+    global _calendly_client
+    if _calendly_client is not None:
+        await _calendly_client.aclose()
+        _calendly_client = None
+
 # --- Helper Function for Date Validation ---
 def _validate_and_normalize_date(date_string: str) -> str | None:
     """Attempts to parse a date string into YYYY-MM-DD format."""
@@ -34,127 +306,337 @@ def _validate_and_normalize_date(date_string: str) -> str | None:
             pass
     return None
 
+def _fetch_available_times(user_uri: str, event_type_uri: str) -> list[str]:
+    """Fetches the next 7 days of available start times from Calendly."""
+    url = f"{CALENDLY_API_BASE}/event_type_available_times"
+    start_time = datetime.now(timezone.utc) + timedelta(minutes=1)
+    end_time = start_time + timedelta(days=7)
+    params = {
+        "user": user_uri,
+        "event_type": event_type_uri,
+        "start_time": start_time.strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+        "end_time": end_time.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+    }
+    import requests
+
+    start = time.perf_counter()
+    try:
+        response = get_http_session().get(url, params=params, timeout=CALENDLY_TIMEOUT_SECONDS)
+    except requests.exceptions.RequestException:
+        CALENDLY_LATENCY.labels("error").observe(time.perf_counter() - start)
+        raise
+    CALENDLY_LATENCY.labels(str(response.status_code)).observe(time.perf_counter() - start)
+    response.raise_for_status()
+    return [slot['start_time'] for slot in response.json().get('collection', [])]
+
 # --- Tool Definitions ---
 
 
 @tool
-def search_patient_in_emr(full_name: str, dob: str) -> str:
-    """Looks up a patient by their full name and date of birth in the EMR."""
-    print(f"🛠️ Tool Called: search_patient_in_emr(full_name='{full_name}', dob='{dob}')")
+def search_patient_in_emr(full_name: str, dob: str, new_patient: bool = False) -> PatientLookup | ToolError:
+    """
+    Looks up a patient by their full name and date of birth in the EMR. Set
+    new_patient to true only when the patient has said none of the suggested
+    matches is them.
+    """
     
     normalized_dob = _validate_and_normalize_date(dob)
     if not normalized_dob:
-        return f"ERROR: The date of birth '{dob}' is not in a recognized format. Please use YYYY-MM-DD."
+        return ToolError(f"ERROR: The date of birth '{dob}' is not in a recognized format. Please use YYYY-MM-DD.")
 
     try:
-        patients_df = pd.read_csv(PATIENT_DB_PATH, encoding='utf-8')
-        patients_df['dob'] = pd.to_datetime(patients_df['dob']).dt.strftime('%Y-%m-%d')
-        
-        patient = patients_df[
-            (patients_df['name'].str.lower() == full_name.lower()) & 
-            (patients_df['dob'] == normalized_dob)
-        ]
-        
-        if not patient.empty:
-            return f"SUCCESS: Found returning patient. Details: {patient.to_dict('records')[0]}"
-        else:
-            return "SUCCESS: This is a new patient."
-    except FileNotFoundError:
-        return "SUCCESS: This is a new patient."
+        patient = get_patient_repository().find(full_name, normalized_dob)
+        if patient:
+            return PatientLookup(patient)
+        if new_patient:
+            return PatientLookup()
+
+        # No exact hit: near-duplicates (e.g. 'Jon Smith' vs 'John Smith') are
+        # offered for the patient to confirm, never taken as the same person
+        candidates = get_patient_matcher().search(full_name, normalized_dob, limit=PATIENT_MATCH_SUGGESTIONS,
+                                                  min_score=PATIENT_MATCH_THRESHOLD)
+        return PatientLookup(candidates=candidates)
     except Exception as e:
-        return f"ERROR: An unexpected error occurred while searching the EMR: {str(e)}"
+        return ToolError(f"ERROR: An unexpected error occurred while searching the EMR: {str(e)}")
 
 @tool
-def get_doctor_list() -> str:
+def get_doctor_list() -> DoctorList | ToolError:
     """Gets the list of available doctors and their specialties from an Excel file."""
-    print("🛠️ Tool Called: get_doctor_list()")
     try:
-        doctors_df = pd.read_excel(DOCTOR_SCHEDULE_PATH)
-        doctors = doctors_df.to_dict('records')
-        # ... (rest of the code)
+        return DoctorList(get_doctor_directory().get_doctors())
     except FileNotFoundError:
-        return f"ERROR: The doctor schedule file was not found at {DOCTOR_SCHEDULE_PATH}."
+        return ToolError(f"ERROR: The doctor schedule file was not found at {DOCTOR_SCHEDULE_PATH}.")
     except Exception as e:
-        return f"ERROR: An unexpected error occurred while reading the doctor schedule: {str(e)}"
+        return ToolError(f"ERROR: An unexpected error occurred while reading the doctor schedule: {str(e)}")
 class GetSlotsInput(BaseModel):
     is_new_patient: bool = Field(..., description="Set to true for a new patient (60 min), false for a returning patient (30 min).")
+    doctor_name: str | None = Field(None, description="The doctor the patient chose; slots come from that doctor's schedule.")
 
-@tool(args_schema=GetSlotsInput)
-def get_available_slots(is_new_patient: bool) -> str:
-    """Gets real-time available appointment slots from the Calendly API."""
-    print(f"🛠️ Tool Called: get_available_slots(is_new_patient={is_new_patient})")
-    
+def _calendly_event_type(is_new_patient: bool, doctor: dict | None = None):
+    """
+    Returns (user_uri, event_type_uri, error) for the appointment length. A
+    doctor's workbook row may carry its own Calendly URIs (`calendly_user_uri`,
+    `calendly_event_type_30_min_uri`, `calendly_event_type_60_min_uri`); the
+    .env values are used otherwise.
+    """
     if not CALENDLY_API_KEY:
-        return "ERROR: Calendly API key is not configured."
-        
+        return None, None, ToolError("ERROR: Calendly API key is not configured.")
+    doctor = doctor or {}
+    # Business logic: 60min for new patients, 30min for returning
+    event_type = f"CALENDLY_EVENT_TYPE_{APPOINTMENT_MINUTES[is_new_patient]}_MIN_URI"
+    event_type_uri = doctor.get(event_type.lower()) or os.getenv(event_type)
+    user_uri = doctor.get("calendly_user_uri") or os.getenv("CALENDLY_USER_URI")
+    if not user_uri or not event_type_uri:
+        return None, None, ToolError("ERROR: Calendly User or Event URI is not configured in .env file.")
+    return user_uri, event_type_uri, None
+
+def _calendly_doctor(doctor_name: str | None) -> dict | None:
+    """The doctor's workbook row, for per-doctor Calendly URIs; None when unknown."""
+    if not doctor_name:
+        return None
     try:
-        # Business logic: 60min for new patients, 30min for returning
-        event_type_uri = os.getenv("CALENDLY_EVENT_TYPE_60_MIN_URI") if is_new_patient else os.getenv("CALENDLY_EVENT_TYPE_30_MIN_URI")
-        user_uri = os.getenv("CALENDLY_USER_URI")
-        
-        if not user_uri or not event_type_uri:
-            return "ERROR: Calendly User or Event URI is not configured in .env file."
-
-        url = "https://api.calendly.com/event_type_available_times"
-        start_time = datetime.now(timezone.utc) + timedelta(minutes=1)
-        end_time = start_time + timedelta(days=7)
-        params = {
-            "user": user_uri,
-            "event_type": event_type_uri,
-            "start_time": start_time.strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
-            "end_time": end_time.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
-        }
-        response = requests.get(url, headers=HEADERS, params=params)
-        response.raise_for_status()
-        data = response.json()
-        slots = [datetime.fromisoformat(slot['start_time'].replace("Z", "+00:00")).strftime('%A, %B %d, %Y at %I:%M %p') for slot in data.get('collection', [])]
-        
-        if not slots:
-            return "SUCCESS: No available slots found in the next 7 days."
-        return f"SUCCESS: The following slots are available: {', '.join(slots[:5])}."
+        return get_doctor_directory().find(doctor_name)
+    except FileNotFoundError:
+        return None
+
+def _format_available_slots(slot_times: list[str]) -> AvailableSlots:
+    return AvailableSlots([format_slot(slot_time) for slot_time in slot_times[:SLOT_CANDIDATES]], shown=SLOTS_SHOWN)
+
+def _schedule_slots(doctor_name: str | None, is_new_patient: bool, session_id: str | None,
+                    offered: list[str] | None = None) -> AvailableSlots | ToolError:
+    """
+    Free slots from the doctor's schedule over the next AVAILABILITY_DAYS,
+    minus bookings and other sessions' holds; with `offered` (Calendly's
+    start times) only the ones Calendly also offers.
+    """
+    if not doctor_name:
+        return ToolError("ERROR: A doctor_name is required; slots are computed from the chosen doctor's schedule.")
+    try:
+        get_reservation_book().sync(get_booking_ledger())
+        free = get_availability_engine().free_slots(
+            [doctor_name], minutes=APPOINTMENT_MINUTES[is_new_patient], days=AVAILABILITY_DAYS, session_id=session_id,
+        )
+    except KeyError:
+        return ToolError(f"ERROR: There is no doctor named '{doctor_name}' in the schedule.")
+    except FileNotFoundError:
+        return ToolError(f"ERROR: The doctor schedule file was not found at {DOCTOR_SCHEDULE_PATH}.")
+    except Exception as e:
+        return ToolError(f"ERROR: Could not compute available slots. Reason: {str(e)}")
+    starts = next(iter(free.values())).tolist()
+    if offered is not None:
+        offered_at = {appointment_timestamp(format_slot(slot_time)) for slot_time in offered}
+        starts = [start for start in starts if start in offered_at]
+    return AvailableSlots([appointment_label(start) for start in starts[:SLOT_CANDIDATES]], shown=SLOTS_SHOWN)
+
+def _get_available_slots(is_new_patient: bool, doctor_name: str | None = None, config: RunnableConfig = None) -> AvailableSlots | ToolError:
+    """Gets available appointment slots from the doctor's schedule and/or the Calendly API."""
+    import requests
+
+    session_id = (config or {}).get("configurable", {}).get("thread_id")
+    if AVAILABILITY_SOURCE == "schedule":
+        return _schedule_slots(doctor_name, is_new_patient, session_id)
+    user_uri, event_type_uri, error = _calendly_event_type(is_new_patient, _calendly_doctor(doctor_name))
+    if error:
+        return error
+    try:
+        slot_times = availability_cache.get(user_uri, event_type_uri, _fetch_available_times)
+        if AVAILABILITY_SOURCE != "overlay":
+            return _format_available_slots(slot_times)
     except requests.exceptions.HTTPError as e:
-        return f"ERROR: Could not retrieve slots from Calendly. API Error: {e.response.text}"
+        return ToolError(f"ERROR: Could not retrieve slots from Calendly. API Error: {e.response.text}")
+    except Exception as e:
+        return ToolError(f"ERROR: Could not retrieve slots from Calendly. Reason: {str(e)}")
+    return _schedule_slots(doctor_name, is_new_patient, session_id, offered=slot_times)
+
+async def _aget_available_slots(is_new_patient: bool, doctor_name: str | None = None, config: RunnableConfig = None) -> AvailableSlots | ToolError:
+    """Async variant of get_available_slots using the shared pooled client."""
+    session_id = (config or {}).get("configurable", {}).get("thread_id")
+    if AVAILABILITY_SOURCE == "schedule":
+        return await asyncio.to_thread(_schedule_slots, doctor_name, is_new_patient, session_id)
+    user_uri, event_type_uri, error = _calendly_event_type(is_new_patient, await asyncio.to_thread(_calendly_doctor, doctor_name))
+    if error:
+        return error
+    try:
+        slot_times = await availability_cache.aget(user_uri, event_type_uri, get_calendly_client().available_times)
+        if AVAILABILITY_SOURCE != "overlay":
+            return _format_available_slots(slot_times)
+    except httpx.HTTPStatusError as e:
+        return ToolError(f"ERROR: Could not retrieve slots from Calendly. API Error: {e.response.text}")
     except Exception as e:
-        return f"ERROR: Could not retrieve slots from Calendly. Reason: {str(e)}"
+        return ToolError(f"ERROR: Could not retrieve slots from Calendly. Reason: {str(e)}")
+    return await asyncio.to_thread(_schedule_slots, doctor_name, is_new_patient, session_id, slot_times)
+
+get_available_slots = StructuredTool.from_function(
+    func=_get_available_slots,
+    coroutine=_aget_available_slots,
+    name="get_available_slots",
+    description="Gets available appointment slots for the chosen doctor, from their schedule and bookings.",
+    args_schema=GetSlotsInput,
+)
+
+class FirstAvailableInput(BaseModel):
+    is_new_patient: bool = Field(..., description="Set to true for a new patient (60 min), false for a returning patient (30 min).")
+    specialty: str | None = Field(None, description="Only doctors with this specialty, e.g. 'Cardiology'. Any doctor when omitted.")
+
+async def _calendly_starts(doctor: dict, is_new_patient: bool, session_id: str | None) -> list[float]:
+    """One doctor's Calendly start times that are not booked or held by another session here, ascending."""
+    user_uri, event_type_uri, error = _calendly_event_type(is_new_patient, doctor)
+    if error:
+        raise LookupError(error.message)
+    slot_times = await availability_cache.aget(user_uri, event_type_uri, get_calendly_client().available_times)
+    reservation_book, length = get_reservation_book(), APPOINTMENT_MINUTES[is_new_patient] * 60
+    starts = sorted(datetime.fromisoformat(slot_time.replace("Z", "+00:00")).timestamp() for slot_time in slot_times)
+    return [start for start in starts if reservation_book.is_free(doctor["name"], start, start + length, session_id=session_id)]
+
+async def _afind_first_available(is_new_patient: bool, specialty: str | None = None, config: RunnableConfig = None) -> FirstAvailableSlots | ToolError:
+    """
+    The earliest free slots across every doctor (or one specialty). With
+    Calendly in the loop, the doctors' lookups run concurrently, at most
+    FIRST_AVAILABLE_CONCURRENCY at a time; in overlay mode a doctor's schedule
+    bounds their earliest slot, so the search can stop before every lookup
+    has answered.
+    """
+    session_id = (config or {}).get("configurable", {}).get("thread_id")
+    minutes = APPOINTMENT_MINUTES[is_new_patient]
+    try:
+        doctors = await asyncio.to_thread(get_doctor_directory().get_doctors)
+    except FileNotFoundError:
+        return ToolError(f"ERROR: The doctor schedule file was not found at {DOCTOR_SCHEDULE_PATH}.")
+    if specialty:
+        doctors = [doctor for doctor in doctors if specialty.strip().lower() in doctor.get("specialty", "").lower()]
+        if not doctors:
+            return ToolError(f"ERROR: No doctor has the specialty '{specialty}'.")
+    by_name = {doctor["name"]: doctor for doctor in doctors}
+    try:
+        await asyncio.to_thread(get_reservation_book().sync, get_booking_ledger())
+        schedule = None
+        if AVAILABILITY_SOURCE != "calendly":
+            schedule = await asyncio.to_thread(get_availability_engine().free_slots, list(by_name), minutes=minutes,
+                                               days=AVAILABILITY_DAYS, session_id=session_id)
+        if AVAILABILITY_SOURCE == "schedule":
+            found = FirstAvailable(earliest({name: starts.tolist() for name, starts in schedule.items()}, SLOTS_SHOWN), len(by_name), 0, {})
+        elif schedule is not None:
+            # Overlay: only doctors with schedule slots, each one's first slot bounding what Calendly can add
+            allowed = {name: set(starts.tolist()) for name, starts in schedule.items() if len(starts)}
+
+            async def overlay_starts(name):
+                return [start for start in await _calendly_starts(by_name[name], is_new_patient, session_id) if start in allowed[name]]
+
+            found = await first_available(list(allowed), overlay_starts, SLOTS_SHOWN, max_concurrency=FIRST_AVAILABLE_CONCURRENCY,
+                                          lower_bounds={name: float(schedule[name][0]) for name in allowed})
+        else:
+            found = await first_available(list(by_name), lambda name: _calendly_starts(by_name[name], is_new_patient, session_id),
+                                          SLOTS_SHOWN, max_concurrency=FIRST_AVAILABLE_CONCURRENCY)
+    except Exception as e:
+        return ToolError(f"ERROR: Could not find the first available slots. Reason: {str(e)}")
+    if found.errors and len(found.errors) == found.answered:
+        return ToolError(f"ERROR: Could not retrieve slots from Calendly. Reason: {next(iter(found.errors.values()))}")
+    return FirstAvailableSlots([{"doctor_name": slot.doctor_name, "slot": appointment_label(slot.starts_at)} for slot in found.slots])
+
+find_first_available = StructuredTool.from_function(
+    coroutine=_afind_first_available,
+    name="find_first_available",
+    description="Finds the earliest available slots across all doctors, or the doctors of one specialty, for a patient who wants whoever is free soonest.",
+    args_schema=FirstAvailableInput,
+)
+
+def hold_slots(doctor_name: str | None, slots: list[str], session_id: str | None, is_new_patient: bool,
+               limit: int | None = None) -> list[str]:
+    """
+    Places short-lived holds on the slots about to be shown to a patient and
+    returns the ones still free (not booked, not held by another session),
+    at most `limit` of them.
+    """
+    if not doctor_name or not session_id:
+        return slots[:limit]
+    reservation_book = get_reservation_book()
+    reservation_book.sync(get_booking_ledger())
+    parsed = [(slot, appointment_timestamp(slot)) for slot in slots]
+    length = APPOINTMENT_MINUTES[is_new_patient] * 60
+    held = iter(reservation_book.hold(doctor_name, [(start, start + length) for _, start in parsed if start is not None], session_id, limit))
+    return [slot for slot, start in parsed if start is None or next(held)][:limit]
 
 @tool
-def book_appointment(patient_name: str, doctor_name: str, appointment_time: str) -> str:
-    """Logs the confirmed appointment details to a CSV file."""
-    print(f"🛠️ Tool Called: book_appointment(patient_name='{patient_name}', appointment_time='{appointment_time}')")
+def book_appointment(patient_name: str, doctor_name: str, appointment_time: str, is_new_patient: bool,
+                     config: RunnableConfig) -> Booking | ToolError:
+    """Logs the confirmed appointment details to the booking ledger. Set is_new_patient to true for a new patient (60 min), false for a returning patient (30 min)."""
     
-    if not re.search(r'\d{1,2}:\d{2}\s*(?:AM|PM)', appointment_time, re.IGNORECASE):
-        return f"ERROR: The appointment time '{appointment_time}' is invalid."
+    starts_at = appointment_timestamp(appointment_time)
+    if starts_at is None:
+        return ToolError(f"ERROR: The appointment time '{appointment_time}' is invalid.")
+    # Stored and confirmed in the slot format, whichever format the time came in
+    appointment_time = appointment_label(starts_at)
+    taken = ToolError(f"ERROR: {appointment_time} with {doctor_name} is no longer available. Please choose another time.")
     try:
-        new_booking = pd.DataFrame([{"patient_name": patient_name, "doctor_name": doctor_name, "appointment_time": appointment_time, "booking_date": datetime.now().strftime("%Y-%m-%d")}])
-        new_booking.to_csv(BOOKINGS_DB_PATH, mode='a', header=not os.path.exists(BOOKINGS_DB_PATH), index=False)
-        return f"SUCCESS: The appointment has been successfully booked for {patient_name} with {doctor_name} at {appointment_time}."
+        # A retried turn in the same session books the same slot only once
+        session_id = (config or {}).get("configurable", {}).get("thread_id")
+        reservation_book, booking_ledger = get_reservation_book(), get_booking_ledger()
+        interval = (starts_at, starts_at + APPOINTMENT_MINUTES[is_new_patient] * 60)
+        key = idempotency_key(session_id, doctor_name, appointment_time)
+        existing = booking_ledger.find(key)
+        if existing is None:
+            reservation_book.sync(booking_ledger)
+            if not reservation_book.is_free(doctor_name, *interval, session_id=session_id):
+                return taken
+            # The ledger re-checks for overlaps inside its write transaction (other workers)
+            result = booking_ledger.record(patient_name, doctor_name, appointment_time, key=key, interval=interval)
+            if result.conflict:
+                return taken
+            if result.created:
+                reservation_book.add_booking(result.booking_id, doctor_name, *interval)
+                if session_id:
+                    reservation_book.release(session_id)
+                # The booked slot is no longer free; make the next availability lookup go upstream
+                availability_cache.invalidate()
+            else:
+                existing = booking_ledger.find(key)
+        # A retry confirms the original booking only if it is the same appointment
+        if existing is not None and (existing.patient_name, existing.doctor_name) != (patient_name, doctor_name):
+            return ToolError(f"ERROR: {appointment_time} with {doctor_name} is already booked for another patient in this session. "
+                             "Please choose another time.")
+        return Booking(patient_name, doctor_name, appointment_time)
     except Exception as e:
-        return f"ERROR: Could not log the appointment booking. Reason: {str(e)}"
+        return ToolError(f"ERROR: Could not log the appointment booking. Reason: {str(e)}")
 
 
 @tool
-def collect_insurance_details(carrier: str, member_id: str, group_number: str) -> str:
+def collect_insurance_details(carrier: str, member_id: str, group_number: str) -> InsuranceDetails:
     """Collects the patient's insurance information."""
-    print(f"🛠️ Tool Called: collect_insurance_details(carrier='{carrier}', member_id='{member_id}')")
-    return f"SUCCESS: Insurance details for {carrier} have been collected and stored."
+    return InsuranceDetails(carrier, member_id, group_number)
 
 @tool
-def skip_insurance() -> str:
+def skip_insurance() -> InsuranceSkipped:
     """Call this tool when the user indicates they do not have or do not want to provide insurance information."""
-    print(f"🛠️ Tool Called: skip_insurance()")
-    return "SUCCESS: Insurance step has been skipped."
+    return InsuranceSkipped()
 
 @tool
-def send_intake_forms(patient_name: str, patient_email: str) -> str:
+def send_intake_forms(patient_name: str, patient_email: str, appointment_time: str, config: RunnableConfig) -> IntakeFormsSent | ToolError:
     """Emails the required intake forms to a patient after their appointment is confirmed."""
-    print(f"🛠️ Tool Called: send_intake_forms(patient_name='{patient_name}', email='{patient_email}')")
-    # In a real app, this would use an email library.
-    return f"SUCCESS: Intake forms have been sent via EMAIL to {patient_name} at {patient_email}."
+    if appointment_timestamp(appointment_time) is None:
+        return ToolError(f"ERROR: Could not send the intake forms; the appointment time '{appointment_time}' is invalid.")
+    try:
+        # Sent in the background; keyed like the booking, so a retried turn reuses the job
+        session_id = (config or {}).get("configurable", {}).get("thread_id")
+        payload = {"appointment_key": idempotency_key(session_id, appointment_time), "patient_name": patient_name,
+                   "patient_email": patient_email, "appointment_time": appointment_time}
+        job_id = get_job_queue().enqueue("intake_forms", payload, key=f"intake_forms|{payload['appointment_key']}")
+    except Exception as e:
+        return ToolError(f"ERROR: Could not send the intake forms. Reason: {str(e)}")
+    return IntakeFormsSent(patient_name, patient_email, job_id=job_id, status="queued")
 
 
 @tool
-def schedule_reminders(patient_name: str, patient_email: str, patient_phone: str, appointment_time: str) -> str:
+def schedule_reminders(patient_name: str, patient_email: str, patient_phone: str, appointment_time: str, config: RunnableConfig) -> RemindersScheduled | ToolError:
     """Schedules 3 automated reminders for the patient via email and SMS."""
-    print(f"🛠️ Tool Called: schedule_reminders for {patient_name} at {appointment_time}")
-    # In a real app, this would integrate with a task scheduler like Celery or APScheduler.
-    return f"SUCCESS: 3 reminders have been scheduled for {patient_name} via EMAIL ({patient_email}) and SMS ({patient_phone})."
\ No newline at end of file
+    if appointment_timestamp(appointment_time) is None:
+        return ToolError(f"ERROR: Could not schedule reminders; the appointment time '{appointment_time}' is invalid.")
+    try:
+        # Keyed like the booking, so a retried turn does not queue the reminders twice
+        session_id = (config or {}).get("configurable", {}).get("thread_id")
+        payload = {"appointment_key": idempotency_key(session_id, appointment_time), "patient_name": patient_name,
+                   "patient_email": patient_email, "patient_phone": patient_phone, "appointment_time": appointment_time}
+        count = len({r.due_at for r in reminders_for_appointment(**payload)})
+        job_id = get_job_queue().enqueue("reminders", payload, key=f"reminders|{payload['appointment_key']}")
+    except Exception as e:
+        return ToolError(f"ERROR: Could not schedule reminders. Reason: {str(e)}")
+    return RemindersScheduled(patient_name, patient_email, patient_phone, count=count, job_id=job_id, status="queued")
@@ -1,31 +1,33 @@
 # app/utils.py
 
-import pandas as pd
 import os
-from datetime import datetime
+from app.bookings import BookingLedger
+from app.reports import AdminReport
 
 def generate_admin_report(): # <-- Corrected function name
     """
-    Reads the bookings.csv file and exports its content to an Excel file
-    for administrative review, as required by the case study.
+    Brings the admin review Excel file up to date with the booking ledger,
+    as required by the case study. Only bookings added since the last run
+    are exported (see app/reports.py); the API runs this as a background
+    job (POST /admin/report) so the UI can show its progress.
     """
     bookings_csv_path = os.path.join("data", "bookings.csv")
+    bookings_ledger_path = os.getenv("BOOKINGS_LEDGER_PATH", os.path.join("data", "bookings.db"))
     # Save the report to the data directory for organization
-    report_excel_path = os.path.join("data", "admin_review_report.xlsx")
+    report_excel_path = os.getenv("ADMIN_REPORT_PATH", os.path.join("data", "admin_review_report.xlsx"))
 
-    if not os.path.exists(bookings_csv_path):
-        return "No bookings.csv file found to export."
+    if not os.path.exists(bookings_ledger_path) and not os.path.exists(bookings_csv_path):
+        return "No bookings found to export."
 
     try:
-        df = pd.read_csv(bookings_csv_path, encoding='utf-8')
-        
-        desired_columns = ['booking_date', 'patient_name', 'doctor_name', 'appointment_time']
-        existing_columns = [col for col in desired_columns if col in df.columns]
-        df_report = df[existing_columns]
-        
-        df_report.to_excel(report_excel_path, index=False, sheet_name="Bookings")
-        
-        return f"✅ Report successfully generated: {report_excel_path}"
+        ledger = BookingLedger(bookings_ledger_path)
+        try:
+            # Bookings made before the ledger existed are still in bookings.csv
+            ledger.import_csv(bookings_csv_path)
+            result = AdminReport(ledger, report_excel_path).generate()
+        finally:
+            ledger.close()
+        return f"✅ Report successfully generated: {result.path} ({result.rows} bookings, {result.added} new)"
     except Exception as e:
         return f"❌ Failed to generate report. Error: {str(e)}"
 
@@ -0,0 +1,226 @@
+# benchmarks/bench_admin_report.py
+#
+# Admin review report over a large booking ledger (1M bookings by default),
+# each step in a fresh process so its peak memory is its own:
+#
+#   before: generate_admin_report as it was - every booking into pandas, then
+#           DataFrame.to_excel - timed on LEGACY_ROWS bookings and extrapolated
+#   after:  AdminReport - the first full export, a click after a thousand new
+#           bookings, and a click with nothing new
+#
+# The workbook is read back with openpyxl and must hold every booking in
+# ledger order. A run interrupted mid-export (with a torn chunk on disk)
+# must resume to the same workbook, and long reports must roll over to a
+# second sheet:
+#
+#   python -m benchmarks.bench_admin_report [bookings]
+
+import multiprocessing
+import os
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+import zipfile
+
+from app import reports
+from app.bookings import BookingLedger, idempotency_key
+from app.reports import REPORT_COLUMNS, AdminReport
+
+LEGACY_ROWS = 50_000
+NEW_BOOKINGS = 1_000
+INCREMENTAL_TARGET_SECONDS = 3.0
+PEAK_GROWTH_TARGET_MB = 100
+
+def _booking(i):
+    return (f"Patient {i:07d}", f"Dr. Doctor {i % 23}",
+            f"Monday, October {19 + i % 7}, 2026 at {1 + i % 12:02d}:{(i * 7) % 60:02d} PM", "2026-10-18")
+
+def build_ledger(db_path, count, start=0):
+    """Bulk-loads `count` bookings straight into the ledger's table."""
+    BookingLedger(db_path).close()  # Creates the schema
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.executemany(
+            "INSERT INTO bookings (idempotency_key, patient_name, doctor_name, appointment_time, booking_date, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            ((f"bench:{i}", *_booking(i), time.time()) for i in range(start, start + count)),
+        )
+    conn.close()
+
+def _rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+def _measured(step, *args):
+    """Runs in a fresh process: (seconds, baseline RSS MB, peak RSS MB, result)."""
+    baseline = _rss_mb()
+    start = time.perf_counter()
+    result = step(*args)
+    return time.perf_counter() - start, baseline, _rss_mb(), result
+
+def measure(step, *args):
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(_measured, (step, *args))
+
+def legacy_report(db_path, report_path):
+    """generate_admin_report before this change."""
+    import pandas as pd
+    ledger = BookingLedger(db_path)
+    try:
+        df = pd.DataFrame(ledger.records())
+    finally:
+        ledger.close()
+    df[list(REPORT_COLUMNS)].to_excel(report_path, index=False, sheet_name="Bookings")
+    return len(df)
+
+def incremental_report(db_path, report_path):
+    ledger = BookingLedger(db_path)
+    try:
+        return AdminReport(ledger, report_path).generate()
+    finally:
+        ledger.close()
+
+def add_bookings(db_path, start, count):
+    """New bookings through the ledger's normal write path."""
+    ledger = BookingLedger(db_path)
+    try:
+        futures = [ledger.submit(*_booking(i)[:3], key=idempotency_key(f"new-{i}", *_booking(i)[1:3])) for i in range(start, start + count)]
+        assert all(future.result().created for future in futures)
+    finally:
+        ledger.close()
+
+def sheet_rows(report_path):
+    """Rows per sheet, counted straight from the sheet XML (openpyxl would take minutes at 1M)."""
+    counts = []
+    with zipfile.ZipFile(report_path) as workbook:
+        sheets = sorted((n for n in workbook.namelist() if n.startswith("xl/worksheets/")), key=lambda n: int(n[19:-4]))
+        for name in sheets:
+            count, tail = 0, b""
+            with workbook.open(name) as sheet:
+                while chunk := sheet.read(1 << 20):
+                    count += (tail + chunk).count(b"<row>")
+                    tail = chunk[-4:]
+            counts.append(count - 1)  # Header
+    return counts
+
+def check_workbook(report_path, db_path, sample=3):
+    """openpyxl opens the workbook; header, the first and last rows and the row count match the ledger."""
+    from openpyxl import load_workbook
+    ledger = BookingLedger(db_path)
+    try:
+        expected = ledger.count()
+        first = [row[1:] for row in ledger.export_rows(REPORT_COLUMNS, limit=sample)]
+        last = [row[1:] for row in ledger.export_rows(REPORT_COLUMNS, after_id=ledger.count() - sample)]
+    finally:
+        ledger.close()
+    workbook = load_workbook(report_path, read_only=True)
+    sheet = workbook["Bookings"]
+    rows = [tuple(row) for row in sheet.iter_rows(max_row=sample + 1, values_only=True)]
+    assert rows[0] == REPORT_COLUMNS, rows[0]
+    assert rows[1:] == first, (rows[1:], first)
+    last_sheet = workbook[workbook.sheetnames[-1]]
+    counts = sheet_rows(report_path)
+    tail = [tuple(row) for row in last_sheet.iter_rows(min_row=counts[-1] + 2 - sample, values_only=True)]
+    workbook.close()
+    assert tail == last, (tail, last)
+    assert sum(counts) == expected, (counts, expected)
+    return counts
+
+def read_all(report_path):
+    from openpyxl import load_workbook
+    workbook = load_workbook(report_path, read_only=True)
+    rows = [tuple(row) for name in workbook.sheetnames for row in list(workbook[name].iter_rows(values_only=True))[1:]]
+    workbook.close()
+    return rows
+
+def check_resume(workdir):
+    """A run stopped mid-export, with half a chunk on disk, resumes to the full workbook."""
+    db_path, report_path = os.path.join(workdir, "resume.db"), os.path.join(workdir, "resume.xlsx")
+    build_ledger(db_path, 2_500)
+    ledger = BookingLedger(db_path)
+    try:
+        report = AdminReport(ledger, report_path, chunk_size=1_000)
+        report.generate()
+        build_ledger(db_path, 4_500, start=2_500)
+
+        def crash(stage, done, total):
+            if stage == "export" and done >= 2_000:
+                raise KeyboardInterrupt("worker killed")
+        try:
+            report.generate(progress=crash)
+        except KeyboardInterrupt:
+            pass
+        with open(report.rows_path, "ab") as rows:
+            rows.write(reports.sheet_row(("torn", "write"))[:17])  # A chunk cut off by the crash
+        assert report.progress()["stage"] == "export"
+        result = report.generate()
+        assert result.rows == 7_000 and result.added == 2_500, result
+        assert read_all(report_path) == [row[1:] for row in ledger.export_rows(REPORT_COLUMNS)]
+    finally:
+        ledger.close()
+    print("✅ An interrupted export resumes from its last saved chunk; the torn write is discarded.")
+
+def check_rollover(workdir):
+    db_path, report_path = os.path.join(workdir, "rollover.db"), os.path.join(workdir, "rollover.xlsx")
+    build_ledger(db_path, 2_345)
+    ledger = BookingLedger(db_path)
+    capacity = reports.SHEET_CAPACITY
+    reports.SHEET_CAPACITY = 1_000
+    try:
+        AdminReport(ledger, report_path, chunk_size=700).generate()
+        build_ledger(db_path, 1_000, start=2_345)
+        AdminReport(ledger, report_path, chunk_size=700).generate()
+        assert sheet_rows(report_path) == [1_000, 1_000, 1_000, 345]
+        assert read_all(report_path) == [row[1:] for row in ledger.export_rows(REPORT_COLUMNS)]
+    finally:
+        reports.SHEET_CAPACITY = capacity
+        ledger.close()
+    print("✅ Rows past a sheet's capacity continue on 'Bookings (2)', ... across runs.")
+
+def report_line(label, seconds, baseline, peak, note=""):
+    print(f"{label:<34} | {seconds:8.2f} s | peak RSS {peak:7.1f} MB (+{peak - baseline:6.1f} MB over imports) {note}")
+
+def main(count):
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path, report_path = os.path.join(workdir, "bookings.db"), os.path.join(workdir, "admin_review_report.xlsx")
+        start = time.perf_counter()
+        build_ledger(db_path, count)
+        print(f"Ledger with {count:,} bookings built in {time.perf_counter() - start:.1f} s")
+
+        # Before: pandas + to_excel on a slice, extrapolated to the full ledger
+        legacy_rows = min(count, LEGACY_ROWS)
+        legacy_db = os.path.join(workdir, "legacy.db")
+        build_ledger(legacy_db, legacy_rows)
+        seconds, baseline, peak, _ = measure(legacy_report, legacy_db, os.path.join(workdir, "legacy.xlsx"))
+        report_line(f"pandas to_excel, {legacy_rows:,} rows", seconds, baseline, peak,
+                    f"~ {seconds * count / legacy_rows:.0f} s per click at {count:,}")
+
+        # After: first full export, then clicks
+        seconds, baseline, peak, result = measure(incremental_report, db_path, report_path)
+        report_line(f"first run, {count:,} rows", seconds, baseline, peak,
+                    f"| {os.path.getsize(report_path) / 2**20:.1f} MB workbook")
+        assert result.rows == count and result.added == count and result.rendered
+        first_growth = peak - baseline
+
+        measure(add_bookings, db_path, count, NEW_BOOKINGS)
+        seconds, baseline, peak, result = measure(incremental_report, db_path, report_path)
+        report_line(f"click after {NEW_BOOKINGS:,} new bookings", seconds, baseline, peak)
+        assert result.added == NEW_BOOKINGS and result.rows == count + NEW_BOOKINGS and result.rendered
+        assert seconds < INCREMENTAL_TARGET_SECONDS, f"incremental click took {seconds:.1f} s"
+
+        seconds, baseline, peak, result = measure(incremental_report, db_path, report_path)
+        report_line("click with nothing new", seconds, baseline, peak)
+        assert result.added == 0 and not result.rendered
+
+        counts = check_workbook(report_path, db_path)
+        assert first_growth < PEAK_GROWTH_TARGET_MB, f"first run grew {first_growth:.0f} MB"
+        print(f"✅ openpyxl reads back all {sum(counts):,} bookings in ledger order; memory stays flat "
+              f"(+{first_growth:.0f} MB for the first run).")
+        check_resume(workdir)
+        check_rollover(workdir)
+
+if __name__ == "__main__":
+    print("--- Starting Admin Report Benchmark ---")
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
+    print("\n--- Benchmark Complete ---")
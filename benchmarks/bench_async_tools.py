@@ -0,0 +1,86 @@
+# benchmarks/bench_async_tools.py
+#
+# Load test of Calendly I/O in a conversation turn, against a local stub:
+#
+#   before: the sync tool path as the async graph ran it - a fresh requests.get
+#           per call, executed on the event loop's default thread pool
+#   after:  the async tool path - one pooled httpx.AsyncClient with retries
+#
+#   python -m benchmarks.bench_async_tools [sessions]
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import requests
+
+from app.results import AvailableSlots
+from benchmarks.bench_availability_cache import configure_environment
+from benchmarks.calendly_stub import CalendlyStub
+
+UPSTREAM_LATENCY = 0.5
+
+def _percentiles(latencies):
+    latencies = sorted(latencies)
+    return statistics.median(latencies) * 1e3, latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1e3
+
+async def _run_sessions(turn, sessions):
+    async def timed():
+        start = time.perf_counter()
+        await turn()
+        return time.perf_counter() - start
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(timed() for _ in range(sessions)))
+    return latencies, time.perf_counter() - start
+
+async def main(sessions):
+    with CalendlyStub(latency=UPSTREAM_LATENCY) as stub:
+        configure_environment(stub)
+        os.environ["CALENDLY_MAX_CONCURRENCY"] = str(sessions)
+        os.environ["CALENDLY_MAX_RETRIES"] = "3"
+        from app import tools
+
+        user_uri = os.environ["CALENDLY_USER_URI"]
+        event_uri = os.environ["CALENDLY_EVENT_TYPE_30_MIN_URI"]
+        params = {"user": user_uri, "event_type": event_uri,
+                  "start_time": "2030-01-01T00:00:00.000000Z", "end_time": "2030-01-08T00:00:00.000000Z"}
+
+        def legacy_fetch():
+            response = requests.get(f"{stub.base_url}/event_type_available_times", headers=tools.HEADERS, params=params)
+            response.raise_for_status()
+            return response.json()
+
+        loop = asyncio.get_running_loop()
+        before, before_wall = await _run_sessions(lambda: loop.run_in_executor(None, legacy_fetch), sessions)
+        before_concurrency = stub.max_concurrent
+        stub.reset()
+
+        client = tools.get_calendly_client()
+        after, after_wall = await _run_sessions(lambda: client.get_json("/event_type_available_times", params), sessions)
+        after_concurrency = stub.max_concurrent
+
+        for label, latencies, wall, concurrency in (("before (sync, thread pool)", before, before_wall, before_concurrency),
+                                                    ("after  (async, pooled)    ", after, after_wall, after_concurrency)):
+            p50, p99 = _percentiles(latencies)
+            print(f"{label} | p50 {p50:8.1f} ms | p99 {p99:8.1f} ms | wall {wall:6.2f} s | "
+                  f"max concurrent upstream requests {concurrency}")
+
+        # Retries: two injected 429s should be absorbed transparently
+        stub.reset()
+        stub.fail_next(2, status=429)
+        client.backoff_seconds = 0.01
+        data = await client.get_json("/event_type_available_times", params)
+        assert data["collection"] and stub.calls == 3, f"expected 2 retries, saw {stub.calls} calls"
+        print("✅ 429 responses were retried with backoff.")
+
+        # The async tool end to end
+        result = await tools.get_available_slots.ainvoke({"is_new_patient": True})
+        assert isinstance(result, AvailableSlots), result
+        await tools.close_calendly_client()
+
+if __name__ == "__main__":
+    print("--- Starting Async Tool Layer Load Test ---")
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100))
+    print("\n--- Test Complete ---")
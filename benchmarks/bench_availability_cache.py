@@ -0,0 +1,72 @@
+# benchmarks/bench_availability_cache.py
+#
+# Offline check of the Calendly availability cache against a local stub:
+# N concurrent patients asking for slots should cost one upstream call, and a
+# successful booking should invalidate the cached entry.
+#
+#   python -m benchmarks.bench_availability_cache [concurrency]
+
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.bookings import BookingLedger
+from app.results import AvailableSlots, Booking
+from benchmarks.calendly_stub import CalendlyStub
+
+def configure_environment(stub):
+    """Points the app at the stub before app.tools is imported."""
+    os.environ.setdefault("AVAILABILITY_SOURCE", "calendly")  # Slots come from Calendly, not the doctors' schedules
+    os.environ["CALENDLY_API_BASE"] = stub.base_url
+    os.environ["CALENDLY_API_KEY"] = "stub-key"
+    os.environ["CALENDLY_USER_URI"] = f"{stub.base_url}/users/stub"
+    os.environ["CALENDLY_EVENT_TYPE_30_MIN_URI"] = f"{stub.base_url}/event_types/30min"
+    os.environ["CALENDLY_EVENT_TYPE_60_MIN_URI"] = f"{stub.base_url}/event_types/60min"
+
+def _burst(fn, concurrency):
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(lambda _: fn(), range(concurrency)))
+        return results, time.perf_counter() - start
+
+def main(concurrency):
+    with CalendlyStub(latency=0.2) as stub:
+        configure_environment(stub)
+        from app import tools
+
+        user_uri = os.environ["CALENDLY_USER_URI"]
+        event_uri = os.environ["CALENDLY_EVENT_TYPE_30_MIN_URI"]
+
+        _, uncached_time = _burst(lambda: tools._fetch_available_times(user_uri, event_uri), concurrency)
+        uncached_calls = stub.calls
+        stub.reset()
+
+        results, cached_time = _burst(lambda: tools.get_available_slots.invoke({"is_new_patient": False}), concurrency)
+        cached_calls = stub.calls
+        assert all(isinstance(r, AvailableSlots) and r.slots for r in results), results[0]
+        assert len({tuple(r.slots) for r in results}) == 1, "concurrent callers saw different slots"
+
+        print(f"{concurrency} concurrent lookups without cache: {uncached_calls} upstream calls in {uncached_time:.2f} s")
+        print(f"{concurrency} concurrent lookups with cache:    {cached_calls} upstream call(s) in {cached_time:.2f} s")
+        assert cached_calls == 1, f"expected a single coalesced upstream call, saw {cached_calls}"
+
+        stub.reset()
+        tools.get_available_slots.invoke({"is_new_patient": False})
+        assert stub.calls == 0, "warm cache should not go upstream"
+
+        with tempfile.TemporaryDirectory() as workdir:
+            tools.booking_ledger = BookingLedger(os.path.join(workdir, "bookings.db"))
+            booking = tools.book_appointment.invoke({"patient_name": "Stub Patient", "doctor_name": "Dr. Chen",
+                                                     "appointment_time": "Monday, September 08, 2025 at 09:00 AM", "is_new_patient": False})
+            assert isinstance(booking, Booking), booking
+            tools.booking_ledger.close()
+        tools.get_available_slots.invoke({"is_new_patient": False})
+        assert stub.calls == 1, "booking should invalidate the cached availability"
+        print("✅ Booking invalidated the cached availability.")
+
+if __name__ == "__main__":
+    print("--- Starting Availability Cache Test ---")
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
+    print("\n--- Test Complete ---")
@@ -0,0 +1,134 @@
+# benchmarks/bench_availability_engine.py
+#
+# Local availability engine: free 30/60-minute slots for 7 days across many
+# doctors (synthetic schedule workbook with working days, hours, breaks and
+# time off), with thousands of booked appointments and live holds. Checks
+# the NumPy engine against a per-minute pure-Python reference on a sample of
+# doctors, then times the full computation against TARGET_MS:
+#
+#   python -m benchmarks.bench_availability_engine [num_doctors] [bookings]
+
+import calendar
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+from app.availability import AvailabilityEngine, parse_schedule
+from app.doctors import DoctorDirectory
+from app.reservations import ReservationBook
+
+TARGET_MS = 50.0
+DAYS = 7
+START = date(2026, 11, 2)  # A Monday
+REFERENCE_DOCTORS = 25
+REPEATS = 20
+WORKING_DAYS = ["Monday-Friday", "Monday, Wednesday", "Tuesday,Thursday", "Thursday-Sunday", "Monday-Saturday", "Mon-Wed"]
+HOURS = ["", "08:00-18:00", "9am-1pm, 2pm-6pm", "07:30-15:30", "10:00-19:00"]
+BREAKS = ["", "12:30-13:15", "none"]
+
+def schedule_workbook(path, count, rng):
+    rows = []
+    for i in range(count):
+        time_off = ""
+        if i % 5 == 0:
+            day = START + timedelta(days=rng.randrange(DAYS))
+            time_off = rng.choice([day.isoformat(), f"{day.isoformat()} 13:00-17:00",
+                                   f"{day.isoformat()}..{(day + timedelta(days=2)).isoformat()}"])
+        rows.append({"name": f"Dr. Synthetic {i}", "specialty": "General Health", "availability": rng.choice(WORKING_DAYS),
+                     "hours": rng.choice(HOURS), "breaks": rng.choice(BREAKS), "time_off": time_off})
+    pd.DataFrame(rows).to_excel(path, index=False)
+
+def reservations(doctors, bookings, origin, rng):
+    book = ReservationBook(hold_seconds=120)
+    rows = []
+    for booking_id in range(1, bookings + 1):
+        starts_at = origin + rng.randrange(DAYS * 96) * 900  # Quarter-hour starts, off the 30-minute grid too
+        rows.append((booking_id, rng.choice(doctors)["name"], starts_at, starts_at + rng.choice([1800, 3600])))
+    book.load(rows)
+    for session in range(200):
+        doctor = rng.choice(doctors)["name"]
+        starts_at = origin + rng.randrange(DAYS * 48) * 1800
+        book.hold(doctor, [(starts_at, starts_at + 3600)], f"session-{session}")
+    return book
+
+def reference(doctor, book, origin, minutes, not_before, session_id):
+    """Slot starts by checking every minute of every candidate slot in Python."""
+    schedule = parse_schedule(doctor)
+    busy = [(start, end) for start, end in schedule.time_off]
+    taken = book.busy([doctor["name"]], origin, origin + DAYS * 86400, session_id=session_id).get(doctor["name"])
+    busy += list(zip(*taken)) if taken else []
+    def free(at):
+        day, minute = divmod(int(at - origin) // 60, 1440)
+        weekday = (START.weekday() + day) % 7
+        return weekday in schedule.days and any(s <= minute < e for s, e in schedule.hours) and \
+            not any(s <= minute < e for s, e in schedule.breaks) and not any(s <= at < e for s, e in busy)
+    starts = []
+    for slot in range(DAYS * 48):
+        starts_at = origin + slot * 1800
+        if starts_at >= not_before and starts_at + minutes * 60 <= origin + DAYS * 86400 and \
+                all(free(starts_at + m * 60) for m in range(minutes)):
+            starts.append(starts_at)
+    return starts
+
+def run(num_doctors, bookings):
+    rng = random.Random(7)
+    origin = calendar.timegm(START.timetuple())
+    not_before = origin + 10 * 3600  # "Now" is 10:00 on the first day
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "dr schedules.xlsx")
+        schedule_workbook(path, num_doctors, rng)
+        directory = DoctorDirectory(path)
+        doctors = directory.get_doctors()
+        book = reservations(doctors, bookings, origin, rng)
+        engine = AvailabilityEngine(directory, book, clock=lambda: not_before)
+        start = time.perf_counter()
+        engine.refresh()
+        compile_ms = (time.perf_counter() - start) * 1e3
+
+        # Correctness: the engine against the per-minute reference, for both appointment lengths
+        sample = rng.sample(doctors, min(REFERENCE_DOCTORS, len(doctors)))
+        reference_seconds = 0.0
+        for minutes in (30, 60):
+            session_id = "session-3"
+            slots = engine.free_slots([d["name"] for d in sample], minutes=minutes, days=DAYS, start=START, session_id=session_id)
+            for doctor in sample:
+                start = time.perf_counter()
+                expected = reference(doctor, book, origin, minutes, not_before, session_id)
+                reference_seconds += time.perf_counter() - start
+                got = slots[doctor["name"]].tolist()
+                assert got == expected, f"{doctor['name']} ({minutes} min): {len(got)} slots, expected {len(expected)}"
+        print(f"✅ Engine slots match the per-minute reference for {len(sample)} doctors, 30 and 60 minutes "
+              f"(reference: {reference_seconds / (2 * len(sample)) * 1e3:.1f} ms per doctor).")
+
+        # Speed: every doctor, 7 days
+        for minutes in (30, 60):
+            timings, total = [], 0
+            for _ in range(REPEATS):
+                start = time.perf_counter()
+                slots = engine.free_slots(minutes=minutes, days=DAYS, start=START)
+                timings.append((time.perf_counter() - start) * 1e3)
+                total = sum(len(starts) for starts in slots.values())
+            median = statistics.median(timings)
+            print(f"{num_doctors} doctors x {DAYS} days, {minutes}-min slots | {bookings} bookings + holds | "
+                  f"median {median:6.2f} ms (min {min(timings):.2f}) | {total} free slots | schedules compiled in {compile_ms:.1f} ms")
+            assert median < TARGET_MS, f"{minutes}-minute slots took {median:.1f} ms"
+        one = statistics.median(_timed(lambda: engine.free_slots([doctors[0]["name"]], minutes=60, days=DAYS, start=START))
+                                for _ in range(REPEATS))
+        print(f"one doctor, 7 days | median {one:.3f} ms")
+    print(f"✅ {num_doctors} doctors' week of slots computed in under {TARGET_MS:g} ms.")
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1e3
+
+if __name__ == "__main__":
+    print("--- Starting Availability Engine Benchmark ---")
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 500, int(sys.argv[2]) if len(sys.argv) > 2 else 20_000)
+    print("\n--- Benchmark Complete ---")
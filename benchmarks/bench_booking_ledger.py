@@ -0,0 +1,103 @@
+# benchmarks/bench_booking_ledger.py
+#
+# Stress test of concurrent bookings: N bookings from a thread pool (plus
+# retried duplicates) spread over several worker processes, written with the
+# legacy pandas CSV append and with the group-commit booking ledger. Checks
+# that no row is lost, duplicated or corrupted and reports throughput:
+#
+#   python -m benchmarks.bench_booking_ledger [bookings] [processes] [threads]
+
+import csv
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+from app.bookings import BookingLedger, idempotency_key
+
+def _booking(i):
+    return (f"Patient {i:05d}", f"Dr. Doctor {i % 11}", f"Monday, October {19 + i % 7}, 2026 at {1 + i % 12:02d}:{(i * 7) % 60:02d} PM")
+
+def legacy_append(csv_path, patient_name, doctor_name, appointment_time):
+    """The pandas append book_appointment used before the ledger."""
+    new_booking = pd.DataFrame([{"patient_name": patient_name, "doctor_name": doctor_name, "appointment_time": appointment_time, "booking_date": datetime.now().strftime("%Y-%m-%d")}])
+    new_booking.to_csv(csv_path, mode='a', header=not os.path.exists(csv_path), index=False)
+
+def _legacy_worker(csv_path, indexes, threads, barrier):
+    barrier.wait()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(lambda i: legacy_append(csv_path, *_booking(i)), indexes))
+
+def _ledger_worker(db_path, indexes, threads, barrier):
+    ledger = BookingLedger(db_path)
+    barrier.wait()
+
+    def book(i):
+        patient_name, doctor_name, appointment_time = _booking(i)
+        key = idempotency_key(f"session-{i}", doctor_name, appointment_time)
+        first = ledger.record(patient_name, doctor_name, appointment_time, key=key)
+        if i % 10 == 0:  # A client retry of the same turn must not book twice
+            retry = ledger.record(patient_name, doctor_name, appointment_time, key=key)
+            assert retry == first._replace(created=False), (first, retry)
+
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(book, indexes))
+    ledger.close()
+
+def _run(target, path, bookings, processes, threads):
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(processes + 1)
+    workers = [ctx.Process(target=target, args=(path, range(p, bookings, processes), threads, barrier)) for p in range(processes)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0, f"worker failed with exit code {worker.exitcode}"
+    return time.perf_counter() - start
+
+def check_rows(rows, bookings):
+    """Returns (lost, duplicated, corrupted) counts against the expected bookings."""
+    expected = {_booking(i) for i in range(bookings)}
+    seen, duplicated, corrupted = set(), 0, 0
+    for row in rows:
+        key = (row.get("patient_name"), row.get("doctor_name"), row.get("appointment_time"))
+        if key not in expected:
+            corrupted += 1
+        elif key in seen:
+            duplicated += 1
+        seen.add(key)
+    return len(expected - seen), duplicated, corrupted
+
+def main(bookings, processes, threads):
+    with tempfile.TemporaryDirectory() as workdir:
+        csv_path = os.path.join(workdir, "bookings.csv")
+        elapsed = _run(_legacy_worker, csv_path, bookings, processes, threads)
+        with open(csv_path, newline="") as f:
+            rows = list(csv.DictReader(f))
+        lost, duplicated, corrupted = check_rows(rows, bookings)
+        print(f"pandas CSV append | {bookings / elapsed:7.0f} bookings/s | lost {lost} | duplicated {duplicated} | "
+              f"corrupted/extra header rows {corrupted}")
+
+        db_path = os.path.join(workdir, "bookings.db")
+        elapsed = _run(_ledger_worker, db_path, bookings, processes, threads)
+        ledger = BookingLedger(db_path)
+        rows = ledger.records()
+        ledger.close()
+        lost, duplicated, corrupted = check_rows(rows, bookings)
+        print(f"booking ledger    | {bookings / elapsed:7.0f} bookings/s | lost {lost} | duplicated {duplicated} | "
+              f"corrupted {corrupted}   ({bookings // 10} retried bookings deduplicated)")
+        assert (lost, duplicated, corrupted) == (0, 0, 0) and len(rows) == bookings
+        print(f"✅ {bookings} concurrent bookings from {processes} processes x {threads} threads all recorded exactly once.")
+
+if __name__ == "__main__":
+    print("--- Starting Booking Ledger Stress Test ---")
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*(args + [1000, 4, 16][len(args):]))
+    print("\n--- Test Complete ---")
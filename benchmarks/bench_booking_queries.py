@@ -0,0 +1,165 @@
+# benchmarks/bench_booking_queries.py
+#
+# Range queries over a large booking ledger (1M bookings by default, 200
+# doctors over a year, appointment times in the mixed formats bookings.csv
+# holds):
+#
+#   1. Parsing appointment times: the strptime loop the ledger used before
+#      vs. appointment_timestamp.
+#   2. "Bookings for doctor X between T1 and T2" and "daily utilization per
+#      doctor": the ledger's sorted indexes vs. scanning the bookings in
+#      pandas, both from the strings and from pre-parsed timestamps.
+#
+# Results must match the pandas scan, and the query plans must be index
+# range searches:
+#
+#   python -m benchmarks.bench_booking_queries [bookings]
+
+import calendar
+import csv
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from app.bookings import (APPOINTMENT_TIME_FORMATS, DAY_SECONDS, LEGACY_APPOINTMENT_MINUTES, BookingLedger,
+                          appointment_label, appointment_timestamp)
+
+DOCTORS = 200
+START = calendar.timegm((2026, 1, 1, 0, 0, 0))
+DAYS = 365
+PROBES = 200
+SCAN_PROBES = 10
+STRING_SCAN_ROWS = 100_000
+RANGE_TARGET_MS = 5.0
+
+def legacy_timestamp(appointment_time):
+    """appointment_timestamp before this change: strptime each format in turn."""
+    for fmt in APPOINTMENT_TIME_FORMATS:
+        try:
+            return calendar.timegm(datetime.strptime(appointment_time.strip(), fmt).timetuple())
+        except ValueError:
+            pass
+    return None
+
+def write_csv(path, count, rng):
+    """Legacy bookings.csv rows; half the times ISO, half in the slot format."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["patient_name", "doctor_name", "appointment_time", "booking_date"])
+        for i in range(count):
+            starts_at = START + rng.randrange(DAYS) * DAY_SECONDS + rng.randrange(16, 36) * 1800
+            text = appointment_label(starts_at) if i % 2 else time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(starts_at))
+            writer.writerow([f"Patient {i:07d}", f"Dr. Doctor {rng.randrange(DOCTORS)}", text, "2025-12-01"])
+
+def timed_ms(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return (time.perf_counter() - start) * 1e3, result
+
+def parse_speed(texts):
+    """µs per appointment time: the old strptime loop vs. appointment_timestamp (uncached)."""
+    parse = appointment_timestamp.__wrapped__
+    legacy_ms, expected = timed_ms(lambda: [legacy_timestamp(text) for text in texts])
+    new_ms, parsed = timed_ms(lambda: [parse(text) for text in texts])
+    assert parsed == expected
+    assert parse("2026-03-02T09:30:00+02:00") == parse("2026-03-02T07:30:00Z") == parse("Monday, March 02, 2026 at 07:30 AM")
+    assert parse("2026-03-02") is None and parse("next Tuesday at 10:00 AM") is None
+    print(f"parse {len(texts):,} mixed-format times | strptime loop {legacy_ms * 1e3 / len(texts):.2f} µs/row | "
+          f"appointment_timestamp {new_ms * 1e3 / len(texts):.2f} µs/row")
+    print("✅ ISO times with offsets are converted to UTC; dates without a time are rejected.")
+
+def query_plan(ledger, sql, params):
+    with ledger._lock:
+        return " / ".join(row[-1] for row in ledger._conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+
+def scan_between(df, doctor_name, starts_at, ends_at):
+    """The pandas equivalent of bookings_between, on pre-parsed timestamps."""
+    hits = df[(df.doctor_name == doctor_name) & (df.starts_at < ends_at) & (df.ends_at > starts_at)]
+    return sorted(zip(hits.starts_at, hits.id))
+
+def scan_between_strings(df, doctor_name, starts_at, ends_at):
+    """The same scan when all there is are the appointment_time strings."""
+    when = pd.to_datetime(df.appointment_time, format="mixed", utc=True).astype("int64") // 10**9
+    hits = df[(df.doctor_name == doctor_name) & (when < ends_at) & (when + LEGACY_APPOINTMENT_MINUTES * 60 > starts_at)]
+    return len(hits)
+
+def scan_utilization(df, starts_at, ends_at, doctor_name=None):
+    rows = df[(df.starts_at >= starts_at) & (df.starts_at < ends_at)]
+    if doctor_name is not None:
+        rows = rows[rows.doctor_name == doctor_name]
+    grouped = rows.assign(day=rows.starts_at // DAY_SECONDS * DAY_SECONDS, length=rows.ends_at - rows.starts_at) \
+        .groupby(["doctor_name", "day"]).agg(bookings=("id", "size"), booked_seconds=("length", "sum")).reset_index()
+    return [tuple(row) for row in grouped.itertuples(index=False)]
+
+def compare(label, indexed, scanned):
+    print(f"{label:<44} | index p50 {statistics.median(indexed):7.3f} ms | pandas scan p50 {statistics.median(scanned):8.1f} ms "
+          f"| {statistics.median(scanned) / statistics.median(indexed):6.0f}x")
+
+def main(count):
+    rng = random.Random(11)
+    with tempfile.TemporaryDirectory() as workdir:
+        csv_path, db_path = os.path.join(workdir, "bookings.csv"), os.path.join(workdir, "bookings.db")
+        write_csv(csv_path, count, rng)
+        df = pd.read_csv(csv_path)
+        parse_speed(df.appointment_time.sample(min(count, 100_000), random_state=1).tolist())
+
+        ledger = BookingLedger(db_path)
+        import_ms, added = timed_ms(ledger.import_csv, csv_path)
+        assert added == count
+        print(f"imported {count:,} legacy rows into the ledger in {import_ms / 1e3:.1f} s")
+        rows = ledger.export_rows(("doctor_name",), limit=count)
+        intervals = {row[0]: (row[2], row[3]) for row in ledger.intervals()}
+        df = pd.DataFrame({"id": [row[0] for row in rows], "doctor_name": [row[1] for row in rows],
+                           "appointment_time": df.appointment_time,
+                           "starts_at": [intervals[row[0]][0] for row in rows], "ends_at": [intervals[row[0]][1] for row in rows]})
+        assert all(isinstance(value, int) for value in next(iter(intervals.values())))
+
+        # One doctor's bookings over a week
+        probes = [(f"Dr. Doctor {rng.randrange(DOCTORS)}", START + rng.randrange(DAYS - 7) * DAY_SECONDS) for _ in range(PROBES)]
+        indexed, scanned = [], []
+        for i, (doctor_name, starts_at) in enumerate(probes):
+            ms, found = timed_ms(ledger.bookings_between, doctor_name, starts_at, starts_at + 7 * DAY_SECONDS)
+            indexed.append(ms)
+            if i < SCAN_PROBES:
+                ms, expected = timed_ms(scan_between, df, doctor_name, starts_at, starts_at + 7 * DAY_SECONDS)
+                scanned.append(ms)
+                assert [(b.starts_at, b.booking_id) for b in found] == expected
+        compare(f"bookings for one doctor over a week (~{len(found)})", indexed, scanned)
+        # Parsing every string on every query; timed on a slice, it grows linearly
+        sliced = min(count, STRING_SCAN_ROWS)
+        strings_ms, _ = timed_ms(scan_between_strings, df.head(sliced), *probes[0][:2], probes[0][1] + 7 * DAY_SECONDS)
+        print(f"{'  ... scanning the appointment_time strings':<44} | {strings_ms * count / sliced:8.0f} ms per query "
+              f"(from {sliced:,} rows)")
+        assert statistics.median(indexed) < RANGE_TARGET_MS
+
+        # Daily utilization: one doctor over 30 days, every doctor over one day
+        for label, args in (("daily utilization, one doctor, 30 days", lambda s: (s, s + 30 * DAY_SECONDS, probes[0][0])),
+                            ("daily utilization, every doctor, one day", lambda s: (s, s + DAY_SECONDS))):
+            indexed, scanned = [], []
+            for i, (_, starts_at) in enumerate(probes[:50]):
+                ms, found = timed_ms(ledger.daily_utilization, *args(starts_at))
+                indexed.append(ms)
+                if i < SCAN_PROBES:
+                    ms, expected = timed_ms(scan_utilization, df, *args(starts_at))
+                    scanned.append(ms)
+                    assert [tuple(row) for row in found] == expected, (found[:3], expected[:3])
+            compare(label, indexed, scanned)
+        print("✅ Indexed range queries and daily utilization match the pandas scan.")
+
+        for sql, params in (("SELECT id FROM bookings WHERE doctor_name = ? AND starts_at > ? AND starts_at < ? AND ends_at > ?", ("x", 0, 1, 0)),
+                            ("SELECT doctor_name FROM bookings WHERE starts_at >= ? AND starts_at < ?", (0, 1))):
+            plan = query_plan(ledger, sql, params)
+            assert "SEARCH" in plan and "INDEX" in plan, plan
+        print("✅ Both queries are index range searches: O(log n + k).")
+        ledger.close()
+
+if __name__ == "__main__":
+    print("--- Starting Booking Queries Benchmark ---")
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
+    print("\n--- Benchmark Complete ---")
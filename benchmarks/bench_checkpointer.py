@@ -0,0 +1,86 @@
+# benchmarks/bench_checkpointer.py
+#
+# Soak test of the conversation checkpointer: drives N synthetic sessions
+# through a few turns each and reports process RSS and per-turn checkpoint
+# write latency for the in-memory saver and the bounded SQLite saver.
+#
+#   python -m benchmarks.bench_checkpointer [sessions] [turns_per_session]
+
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.base import create_checkpoint, empty_checkpoint
+from langgraph.checkpoint.base.id import uuid6
+from langgraph.checkpoint.memory import MemorySaver
+
+from app.checkpoint import SqliteCheckpointSaver
+
+STEPS_PER_TURN = 3  # input, agent_brain, call_tool
+
+def rss_mb():
+    """Current resident set size in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _turn_messages(turn):
+    call_id = f"call_{turn}"
+    return [
+        HumanMessage(content=f"My name is Patient {turn} and I was born on 1990-01-0{turn % 9 + 1}"),
+        AIMessage(content="", tool_calls=[{"name": "search_patient_in_emr", "args": {"full_name": f"Patient {turn}", "dob": "1990-01-01"}, "id": call_id}]),
+        ToolMessage(content="SUCCESS: This is a new patient.", tool_call_id=call_id),
+    ]
+
+def soak(saver, sessions, turns):
+    latencies = []
+    start_rss = rss_mb()
+    start = time.perf_counter()
+    for session in range(sessions):
+        config = {"configurable": {"thread_id": f"session-{session}", "checkpoint_ns": ""}}
+        checkpoint = empty_checkpoint()
+        messages = []
+        for turn in range(turns):
+            t0 = time.perf_counter()
+            for step, message in enumerate(_turn_messages(turn)):
+                messages = messages + [message]
+                checkpoint["channel_values"] = {"messages": messages, "patient_status": "NEW"}
+                checkpoint["channel_versions"] = {"messages": len(messages), "patient_status": 1}
+                checkpoint = create_checkpoint(checkpoint, None, turn * STEPS_PER_TURN + step, id=str(uuid6(clock_seq=turn * STEPS_PER_TURN + step)))
+                config = saver.put(config, checkpoint, {"source": "loop", "step": step}, {"messages": len(messages)})
+            latencies.append(time.perf_counter() - t0)
+        if session and session % 20_000 == 0:
+            print(f"   ... {session:,} sessions, RSS {rss_mb():,.0f} MB")
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "rss_growth_mb": rss_mb() - start_rss,
+        "p50_ms": statistics.median(latencies) * 1e3,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1e3,
+        "turns_per_sec": len(latencies) / elapsed,
+    }
+
+def report(label, result):
+    print(f"{label:<28} | RSS growth {result['rss_growth_mb']:8.1f} MB | write p50 {result['p50_ms']:6.3f} ms | "
+          f"p99 {result['p99_ms']:6.3f} ms | {result['turns_per_sec']:8,.0f} turns/s")
+
+if __name__ == "__main__":
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    turns = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    print(f"--- Starting Checkpointer Soak Test ({sessions:,} sessions x {turns} turns) ---")
+    with tempfile.TemporaryDirectory() as workdir:
+        saver = SqliteCheckpointSaver(os.path.join(workdir, "checkpoints.db"), max_checkpoints=2, cache_size=1024)
+        report("SqliteCheckpointSaver", soak(saver, sessions, turns))
+        print(f"   database size {os.path.getsize(saver.db_path) / 2**20:,.1f} MB")
+        saver.close()
+    report("MemorySaver (unbounded)", soak(MemorySaver(), sessions, turns))
+    print("\n--- Test Complete ---")
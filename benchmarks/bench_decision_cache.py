@@ -0,0 +1,159 @@
+# benchmarks/bench_decision_cache.py
+#
+# Hit rate and LLM time saved by agent_brain's decision cache on the replay
+# corpus (benchmarks/replay_corpus.json), played by many sessions that each
+# have a different patient (name, date of birth, contact details). The LLM
+# is a scripted stub that answers what a correct model would: the fast
+# path's tool calls where it has a rule, a clarifying question otherwise.
+#
+# Two modes: with the fast path in front (only turns it can't serve reach
+# agent_brain) and LLM-only (every turn does). Every cache hit must equal
+# the decision the LLM would have made for that session, and no free-form
+# reply may be stored, or the run fails:
+#
+#   python -m benchmarks.bench_decision_cache [--sessions 20] [--llm-latency-ms 200]
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import re
+import time
+
+os.environ.setdefault("CHECKPOINT_BACKEND", "memory")
+
+from langchain_core.messages import AIMessage
+
+from app import agent
+from app.decisions import DecisionCache
+from app.intents import classify_turn
+from benchmarks.bench_fast_path import CORPUS_PATH, MIN_CONFIDENCE, build_state
+from benchmarks.fake_llm import ScriptedChatModel
+
+CLARIFY = "Could you tell me a bit more so I can help with that?"
+# As search_patient_in_emr reads them: dashes are day-month-year, slashes month/day/year
+DATE_FORMATS = {r"\d{4}-\d{2}-\d{2}": "{y}-{m}-{d}", r"\d{2}/\d{2}/\d{4}": "{m}/{d}/{y}", r"\d{2}-\d{2}-\d{4}": "{d}-{m}-{y}"}
+
+def patients(count):
+    with open("data/patients.csv", newline="") as f:
+        rows = [row for row in csv.DictReader(f) if re.fullmatch(r"[A-Z][a-z]+ [A-Z][a-z]+", row["name"])]
+    return [rows[i % len(rows)] for i in range(count)]
+
+def as_patient(text, old_name, old_dob, patient):
+    """Rewrites a corpus message for another patient, keeping the case and date format it used."""
+    if old_name and old_name.lower() in text.lower():
+        name = patient["name"].lower() if old_name.islower() or old_name.lower() in text else patient["name"]
+        text = re.sub(re.escape(old_name), name, text, flags=re.IGNORECASE)
+    if old_dob and old_dob in text:
+        y, m, d = patient["dob"].split("-")
+        layout = next(fmt for pattern, fmt in DATE_FORMATS.items() if re.fullmatch(pattern, old_dob))
+        text = text.replace(old_dob, layout.format(y=y, m=m, d=d))
+    return text
+
+def session_state(contexts, turn, patient):
+    """The corpus turn's state, played by `patient`."""
+    turn = dict(turn)
+    if "message" in turn:
+        args = turn.get("args") or {}
+        turn["message"] = as_patient(turn["message"], args.get("full_name"), args.get("dob"), patient)
+    state = build_state(contexts, turn)
+    info = state.get("patient_info")
+    if info:
+        state["patient_info"] = {**info, **{key: patient[key] for key in ("dob", "email", "phone")},
+                                 ("name" if "name" in info else "full_name"): patient["name"]}
+        for message in state["messages"]:
+            if isinstance(message.content, str) and info.get("name", info.get("full_name")):
+                message.content = message.content.replace(info.get("name", info.get("full_name")), patient["name"])
+    return state
+
+def oracle(state):
+    """What a correct model decides: the fast path's tool calls where it has a rule, otherwise a question."""
+    intent = classify_turn(state)
+    if intent is None or intent.confidence < MIN_CONFIDENCE:
+        return {"reply": CLARIFY}
+    return {"tool_calls": intent.tool_calls}
+
+def same(message, expected):
+    calls = [(call["name"], call["args"]) for call in message.tool_calls]
+    if "reply" in expected:
+        return not calls and message.content == expected["reply"]
+    return calls == [(call["name"], call["args"]) for call in expected["tool_calls"]]
+
+async def replay(corpus, sessions, latency, fast_path):
+    model = ScriptedChatModel(latency=latency)
+    agent.llm_with_tools = model
+    agent.decision_cache = cache = DecisionCache()
+    hit_times, miss_times, wrong, brain_turns = [], [], [], 0
+    for patient in patients(sessions):
+        for turn in corpus["turns"]:
+            state = session_state(corpus["contexts"], turn, patient)
+            expected = oracle(state)
+            if fast_path and "tool_calls" in expected:
+                continue  # Served by the fast path; agent_brain never sees it
+            brain_turns += 1
+            model.reset()
+            model.script(None, [expected])
+            hits = cache.stats["hit"]
+            start = time.perf_counter()
+            message = (await agent.agent_brain(state))["messages"][0]
+            elapsed = time.perf_counter() - start
+            if cache.stats["hit"] > hits:
+                hit_times.append(elapsed)
+                if not same(message, expected):
+                    wrong.append((turn.get("message") or turn.get("tool_result"), message.tool_calls or message.content, expected))
+            else:
+                miss_times.append(elapsed)
+    return cache, brain_turns, hit_times, miss_times, wrong
+
+async def main(sessions, latency):
+    with open(CORPUS_PATH) as f:
+        corpus = json.load(f)
+    for fast_path in (True, False):
+        cache, turns, hit_times, miss_times, wrong = await replay(corpus, sessions, latency, fast_path)
+        stats = cache.stats
+        hit_ms = sum(hit_times) / len(hit_times) * 1e3 if hit_times else 0.0
+        print(f"{'fast path + LLM' if fast_path else 'LLM only':<16}| {sessions} sessions, {turns} agent_brain turns | "
+              f"hits {stats['hit']} ({stats['hit'] / turns:.0%}), misses {stats['miss']}, uncacheable {stats['uncacheable']}, "
+              f"{len(cache)} entries | hit {hit_ms:.2f} ms vs LLM {latency * 1e3:.0f} ms | saved {stats['saved_seconds']:.1f} s")
+        for message, got, expected in wrong[:5]:
+            print(f"   WRONG: {message!r} -> {got}, expected {expected}")
+        assert not wrong, f"{len(wrong)} cache hits differ from the LLM's decision"
+        if fast_path:
+            # What reaches agent_brain past the fast path is a free-form question, which is never cached
+            assert stats["stored"] == 0
+        else:
+            assert stats["hit"] > 0
+    print("✅ Cache hits match what the LLM decides for each session; patient details are filled in, never reused.")
+
+    # Bounded: least recently used entries go first, and entries expire
+    now = [0.0]
+    cache = DecisionCache(max_entries=2, ttl_seconds=60, clock=lambda: now[0])
+    state = session_state(corpus["contexts"], corpus["turns"][5], patients(1)[0])
+    decisions = [cache.decision({**state, "patient_status": status}, "bench") for status in ("A", "B", "C")]
+    call = AIMessage(content="", tool_calls=[{"name": "get_doctor_list", "id": "x", "args": {}}])
+    cache.put(decisions[0], call, 0.1)
+    cache.put(decisions[1], call, 0.1)
+    assert cache.get(decisions[0]) is not None  # Now the most recently used
+    cache.put(decisions[2], call, 0.1)
+    assert cache.get(decisions[1]) is None and cache.get(decisions[0]) is not None and len(cache) == 2
+    now[0] = 61
+    assert cache.get(decisions[0]) is None and cache.get(decisions[2]) is None
+    print("✅ LRU eviction at max_entries and TTL expiry.")
+
+    # A decision carrying a detail the key does not template (here an email the model made up) is not stored
+    guess = AIMessage(content="", tool_calls=[{"name": "send_intake_forms", "id": "x",
+                                               "args": {"patient_name": "Jane Doe", "patient_email": "jane@example.com",
+                                                        "appointment_time": "Monday, October 19, 2026 at 09:00 AM"}}])
+    decision = cache.decision(state, "bench")
+    assert not cache.put(decision, guess, 0.1) and cache.get(decision) is None
+    print("✅ Decisions that can't be rebuilt from the key are not cached.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    args = parser.parse_args()
+    print("--- Starting Decision Cache Benchmark ---")
+    asyncio.run(main(args.sessions, args.llm_latency_ms / 1000))
+    print("\n--- Benchmark Complete ---")
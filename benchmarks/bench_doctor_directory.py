@@ -0,0 +1,56 @@
+# benchmarks/bench_doctor_directory.py
+#
+# Cold (openpyxl parse) vs. sidecar vs. warm (in-memory) latency of the
+# doctor directory:
+#
+#   python -m benchmarks.bench_doctor_directory [num_doctors]
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from app.doctors import DoctorDirectory
+
+SOURCE_WORKBOOK = os.path.join("data", "dr schedules.xlsx")
+REPEATS = 20
+
+def _mean_ms(fn, repeats=REPEATS):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1e3
+
+def run(workdir, num_doctors):
+    xlsx_path = os.path.join(workdir, "dr schedules.xlsx")
+    sidecar_path = os.path.join(workdir, ".dr_schedules.cache.pkl")
+    if num_doctors:
+        doctors_df = pd.read_excel(SOURCE_WORKBOOK)
+        doctors_df = pd.concat([doctors_df] * (num_doctors // len(doctors_df) + 1)).head(num_doctors)
+        doctors_df['name'] = [f"{name} #{i}" for i, name in enumerate(doctors_df['name'])]
+        doctors_df.to_excel(xlsx_path, index=False)
+    else:
+        shutil.copy(SOURCE_WORKBOOK, xlsx_path)
+
+    legacy = _mean_ms(lambda: pd.read_excel(xlsx_path).to_dict('records'))
+    cold = _mean_ms(lambda: DoctorDirectory(xlsx_path).get_doctors())
+    DoctorDirectory(xlsx_path, sidecar_path=sidecar_path).get_doctors()  # compile the sidecar
+    sidecar = _mean_ms(lambda: DoctorDirectory(xlsx_path, sidecar_path=sidecar_path).get_doctors())
+    directory = DoctorDirectory(xlsx_path, sidecar_path=sidecar_path)
+    directory.get_doctors()
+    warm = _mean_ms(directory.get_doctors, repeats=10_000)
+    count = len(directory.get_doctors())
+
+    print(f"{count:>6} doctors | read_excel per call {legacy:8.2f} ms | cold parse {cold:8.2f} ms | "
+          f"sidecar load {sidecar:6.3f} ms | warm {warm * 1e3:7.2f} µs")
+
+if __name__ == "__main__":
+    print("--- Starting Doctor Directory Benchmark ---")
+    sizes = [int(arg) for arg in sys.argv[1:]] or [0, 500]
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as workdir:
+            run(workdir, size)
+    print("\n--- Benchmark Complete ---")
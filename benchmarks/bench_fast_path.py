@@ -0,0 +1,100 @@
+# benchmarks/bench_fast_path.py
+#
+# Replays a corpus of conversation turns through the rule-based fast path
+# (app/intents.py) and reports how many turns it serves without an LLM call,
+# whether the tool calls it emits are the ones expected, and the latency
+# saved at an assumed LLM round-trip time:
+#
+#   python -m benchmarks.bench_fast_path [--llm-latency-ms 1200] [--corpus path]
+#
+# Turns expected to need the LLM ("expected": null) must fall back; a wrong
+# tool call is worse than an LLM round trip, so any mismatch fails the run.
+
+import argparse
+import json
+import os
+import statistics
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolCall, ToolMessage
+
+from app.intents import classify_turn
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "replay_corpus.json")
+MIN_CONFIDENCE = float(os.getenv("FAST_PATH_MIN_CONFIDENCE", "0.8"))
+REPEATS = 200
+
+def build_state(contexts, turn):
+    state = dict(contexts[turn["context"]])
+    booking_call = state.pop("booking_call", None)
+    if "tool_result" in turn:
+        state["messages"] = [AIMessage(content="", tool_calls=[ToolCall(id="book", **booking_call)]),
+                             ToolMessage(content=turn["tool_result"], tool_call_id="book")]
+    else:
+        state["messages"] = [HumanMessage(content=turn["message"])]
+    return state
+
+def served(intent):
+    return intent is not None and intent.confidence >= MIN_CONFIDENCE
+
+def check(turn, intent):
+    """Returns an error string, or None when the fast path did the right thing."""
+    expected = turn["expected"]
+    if not served(intent):
+        return None  # Falling back to the LLM is always safe
+    names = "+".join(call["name"] for call in intent.tool_calls)
+    if expected is None:
+        return f"should fall back to the LLM, got {names}"
+    if names != expected:
+        return f"expected {expected}, got {names}"
+    args = intent.tool_calls[0]["args"]
+    for key, value in turn.get("args", {}).items():
+        if args.get(key) != value:
+            return f"{key}={args.get(key)!r}, expected {value!r}"
+    return None
+
+def run(corpus_path, llm_latency_ms):
+    with open(corpus_path) as f:
+        corpus = json.load(f)
+    turns = corpus["turns"]
+
+    served_turns, missed, errors, timings = 0, 0, [], []
+    for turn in turns:
+        state = build_state(corpus["contexts"], turn)
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            intent = classify_turn(state)
+        timings.append((time.perf_counter() - start) / REPEATS * 1e6)
+
+        error = check(turn, intent)
+        if error:
+            errors.append(f"{turn.get('message') or turn.get('tool_result')!r}: {error}")
+        elif served(intent):
+            served_turns += 1
+        elif turn["expected"] is not None:
+            missed += 1
+
+    total = len(turns)
+    structured = sum(1 for turn in turns if turn["expected"] is not None)
+    saved_ms = served_turns * llm_latency_ms
+    print(f"Turns replayed:           {total} ({structured} structured, {total - structured} free-form)")
+    print(f"Served without the LLM:   {served_turns}/{total} ({served_turns / total:.0%} of all turns, "
+          f"{served_turns / structured:.0%} of structured turns)")
+    print(f"Structured turns missed:  {missed} (fell back to the LLM)")
+    print(f"Classifier latency:       p50 {statistics.median(timings):.1f} µs | max {max(timings):.1f} µs")
+    print(f"Latency saved @ {llm_latency_ms:.0f} ms/LLM call: {saved_ms / 1e3:.1f} s total, "
+          f"{saved_ms / total:.0f} ms per turn on average")
+    for error in errors:
+        print(f"❌ {error}")
+    assert not errors, f"{len(errors)} turns were routed to the wrong tool"
+    print("✅ Every fast-path tool call matched the expected one.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm-latency-ms", type=float, default=1200.0, help="assumed agent_brain round trip")
+    parser.add_argument("--corpus", default=CORPUS_PATH)
+    args = parser.parse_args()
+
+    print("--- Starting Fast Path Replay ---")
+    run(args.corpus, args.llm_latency_ms)
+    print("\n--- Replay Complete ---")
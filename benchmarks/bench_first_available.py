@@ -0,0 +1,124 @@
+# benchmarks/bench_first_available.py
+#
+# "First available across doctors" against a local Calendly stub where every
+# doctor is their own Calendly user with their own latency:
+#
+#   before: one get_available_slots call per doctor, one after another (what
+#           the LLM had to do, a turn per doctor)
+#   after:  find_first_available - every doctor's lookup at once, merged into
+#           one time-ordered list
+#
+# The fan-out must cost about the slowest single lookup, not the sum, return
+# exactly the earliest slots a full per-doctor search finds, and keep no more
+# than FIRST_AVAILABLE_CONCURRENCY lookups in flight. In overlay mode, slow
+# doctors whose schedules can't beat the slots already found are not waited on:
+#
+#   python -m benchmarks.bench_first_available [doctors]
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from benchmarks.bench_availability_cache import configure_environment
+from benchmarks.calendly_stub import CalendlyStub
+
+CONFIG = {"configurable": {"thread_id": "bench"}}
+LATENCY_RANGE = (0.05, 0.3)
+SLOW_LATENCY = 0.6
+CAPPED_CONCURRENCY = 4
+
+def doctor_rows(stub, count, rng):
+    """One Calendly user per doctor; the last third are slow and off for the next three days."""
+    today = datetime.now(timezone.utc).date()
+    rows = []
+    for i in range(count):
+        user_uri = f"{stub.base_url}/users/doctor-{i}"
+        slow = i >= count - count // 3
+        stub.user_latency[user_uri] = SLOW_LATENCY if slow else rng.uniform(*LATENCY_RANGE)
+        stub.user_first_hour[user_uri] = rng.choice([9, 9.5, 10, 11, 13])
+        rows.append({"name": f"Dr. Stub {i}", "specialty": "Cardiology" if i % 2 else "General Health",
+                     "availability": "Monday-Sunday", "hours": "08:00-18:00", "breaks": "none",
+                     "time_off": f"{today.isoformat()}..{(today + timedelta(days=3)).isoformat()}" if slow else "",
+                     "calendly_user_uri": user_uri})
+    return rows
+
+async def sequential(tools, names, is_new_patient):
+    """Every doctor's slots, one lookup after another, merged the way find_first_available ranks them."""
+    found = []
+    for rank, name in enumerate(names):
+        result = await tools.get_available_slots.ainvoke({"is_new_patient": is_new_patient, "doctor_name": name}, config=CONFIG)
+        found += [(tools.appointment_timestamp(slot), rank, name) for slot in result.slots]
+    return [{"doctor_name": name, "slot": tools.appointment_label(starts_at)} for starts_at, _, name in sorted(found)[:tools.SLOTS_SHOWN]]
+
+async def timed(coro):
+    start = time.perf_counter()
+    result = await coro
+    return time.perf_counter() - start, result
+
+async def main(count):
+    rng = random.Random(3)
+    with CalendlyStub() as stub, tempfile.TemporaryDirectory() as workdir:
+        configure_environment(stub)
+        os.environ["BOOKINGS_LEDGER_PATH"] = os.path.join(workdir, "bookings.db")
+        os.environ["FIRST_AVAILABLE_CONCURRENCY"] = str(count)
+        from app import tools
+        from app.doctors import DoctorDirectory
+
+        rows = doctor_rows(stub, count, rng)
+        pd.DataFrame(rows).to_excel(os.path.join(workdir, "doctors.xlsx"), index=False)
+        tools.doctor_directory = DoctorDirectory(os.path.join(workdir, "doctors.xlsx"))
+        names = [row["name"] for row in rows]
+        latencies = [stub.user_latency[row["calendly_user_uri"]] for row in rows]
+        ask = {"is_new_patient": False}
+
+        # Calendly only: every doctor has to answer
+        tools.AVAILABILITY_SOURCE = "calendly"
+        await tools.find_first_available.ainvoke(ask, config=CONFIG)  # Warm up: workbook, pooled connections
+        tools.availability_cache.invalidate()
+        before, expected = await timed(sequential(tools, names, False))
+        tools.availability_cache.invalidate()
+        stub.reset()
+        after, result = await timed(tools.find_first_available.ainvoke(ask, config=CONFIG))
+        print(f"calendly | {count} doctors, lookups {min(latencies) * 1e3:.0f}-{max(latencies) * 1e3:.0f} ms | "
+              f"one by one {before * 1e3:7.0f} ms | fan-out {after * 1e3:6.0f} ms | {stub.max_concurrent} in flight")
+        assert result.slots == expected, (result.slots, expected)
+        assert after < max(latencies) * 1.3 + 0.1, f"fan-out took {after:.2f} s, slowest lookup {max(latencies):.2f} s"
+        print("✅ Fan-out costs the slowest lookup, not the sum, and finds the same earliest slots.")
+
+        # Bounded: never more lookups in flight than FIRST_AVAILABLE_CONCURRENCY
+        tools.FIRST_AVAILABLE_CONCURRENCY = CAPPED_CONCURRENCY
+        tools.availability_cache.invalidate()
+        stub.reset()
+        capped, result = await timed(tools.find_first_available.ainvoke(ask, config=CONFIG))
+        print(f"calendly | concurrency {CAPPED_CONCURRENCY} | fan-out {capped * 1e3:6.0f} ms | {stub.max_concurrent} in flight")
+        assert result.slots == expected and stub.max_concurrent <= CAPPED_CONCURRENCY
+        tools.FIRST_AVAILABLE_CONCURRENCY = count
+        print(f"✅ At most {CAPPED_CONCURRENCY} lookups in flight when capped.")
+
+        # Overlay: schedules bound each doctor's earliest slot; the slow doctors are off for days
+        tools.AVAILABILITY_SOURCE = "overlay"
+        tools.availability_cache.invalidate()
+        before, expected = await timed(sequential(tools, names, True))
+        tools.availability_cache.invalidate()
+        after, result = await timed(tools.find_first_available.ainvoke({"is_new_patient": True}, config=CONFIG))
+        print(f"overlay  | {count // 3} slow doctors ({SLOW_LATENCY * 1e3:.0f} ms) off for 3 days | "
+              f"one by one {before * 1e3:7.0f} ms | fan-out {after * 1e3:6.0f} ms")
+        assert result.slots == expected, (result.slots, expected)
+        assert after < SLOW_LATENCY, "the search should stop before the slow doctors answer"
+        print("✅ Stops once the earliest slots are certain; slower doctors' lookups are cancelled.")
+
+        result = await tools.find_first_available.ainvoke({"is_new_patient": True, "specialty": "cardiology"}, config=CONFIG)
+        assert result.slots and all(int(entry["doctor_name"].split()[-1]) % 2 for entry in result.slots), result.slots
+        print("✅ A specialty narrows the search to its doctors.")
+        await tools.close_calendly_client()
+
+if __name__ == "__main__":
+    print("--- Starting First Available Benchmark ---")
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 12))
+    print("\n--- Benchmark Complete ---")
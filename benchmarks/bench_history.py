@@ -0,0 +1,126 @@
+# benchmarks/bench_history.py
+#
+# Prompt size of agent_brain over 20-turn conversations, with the full
+# message history vs. the compacted history (app/history.py). LLM latency is
+# modeled as a fixed overhead plus a per-prompt-token prefill cost, since the
+# benchmark does not call a real model:
+#
+#   python -m benchmarks.bench_history [--conversations 50] [--turns 20]
+#                                      [--base-ms 300] [--ms-per-token 0.2]
+
+import argparse
+import random
+import statistics
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolCall, ToolMessage
+
+from app.doctors import DoctorDirectory
+from app.history import compact_history, count_tokens
+from app.results import AvailableSlots, DoctorList, PatientLookup
+
+SYSTEM_PROMPT = SystemMessage(content="You are an autonomous medical scheduling assistant. Based on the user's last message, decide which tool to call. Do not respond conversationally.")
+PATIENT = {"name": "Michael Good", "dob": "2011-02-11", "email": "lewisjames@example.org",
+           "phone": "467.489.3549x8565", "last_visit_doctor": "Dr. Adams"}
+WEEKS = ["October 19", "October 26", "November 02", "November 09"]
+FOLLOW_UPS = [
+    "Do you have anything later in the day?",
+    "Actually, could I see a different doctor?",
+    "What about the week after?",
+    "Is there anything on a weekend?",
+    "Can you show me the list of doctors again?",
+    "Hmm, none of those work for me, any other times?",
+]
+
+def _exchange(state, text, tool_name, args, result, question):
+    """Appends one turn: user message, tool call, tool output and the follow-up question."""
+    call_id = f"call_{len(state['messages'])}"
+    state["messages"] += [
+        HumanMessage(content=text),
+        AIMessage(content="", tool_calls=[ToolCall(name=tool_name, args=args, id=call_id)]),
+        ToolMessage(content=str(result), tool_call_id=call_id),
+        AIMessage(content=question),
+    ]
+    state.update(result.state_updates(args))
+
+def _slots(rng):
+    week = rng.choice(WEEKS)
+    return AvailableSlots([f"Monday, {week}, 2026 at {hour:02d}:{rng.choice(['00', '30'])} {'AM' if hour < 12 else 'PM'}"
+                           .replace(f"{hour:02d}:", f"{hour if hour <= 12 else hour - 12:02d}:") for hour in rng.sample(range(8, 18), 5)])
+
+def conversation(rng, doctors, turns):
+    """Yields the agent state as agent_brain would see it on each turn of a long conversation."""
+    state = {"messages": []}
+    _exchange(state, "Hi, I'm Michael Good, born 2011-02-11", "search_patient_in_emr",
+              {"full_name": "Michael Good", "dob": "2011-02-11"}, PatientLookup(PATIENT),
+              "Welcome back! Your last visit was with Dr. Adams. Would you like to schedule with them again or see a different doctor?")
+    yield state
+    for _ in range(turns - 1):
+        text = rng.choice(FOLLOW_UPS)
+        if "doctor" in text:
+            result = DoctorList(doctors)
+            options = "\n".join(f"- {d['name']} ({d['specialty']})" for d in doctors)
+            _exchange(state, text, "get_doctor_list", {}, result, f"Thank you. Here are our available doctors. Please choose one:\n{options}")
+            state["doctor_name"] = rng.choice(doctors)["name"]
+        else:
+            result = _slots(rng)
+            _exchange(state, text, "get_available_slots", {"is_new_patient": False}, result,
+                      f"Great, here are the available slots: {', '.join(result.slots)}. Please choose your preferred time.")
+        yield state
+
+def tool_calls_paired(messages):
+    pending = set()
+    for message in messages:
+        if isinstance(message, AIMessage) and message.tool_calls:
+            if pending:
+                return False
+            pending = {call["id"] for call in message.tool_calls}
+        elif isinstance(message, ToolMessage):
+            if message.tool_call_id not in pending:
+                return False
+            pending.discard(message.tool_call_id)
+    return not pending
+
+def main(args):
+    doctors = DoctorDirectory("data/dr schedules.xlsx").get_doctors()
+    system_tokens = count_tokens([SYSTEM_PROMPT])
+    full_tokens = [[] for _ in range(args.turns)]
+    compact_tokens = [[] for _ in range(args.turns)]
+    compaction_us = []
+    for seed in range(args.conversations):
+        for turn, state in enumerate(conversation(random.Random(seed), doctors, args.turns)):
+            full_tokens[turn].append(system_tokens + count_tokens(state["messages"]))
+            start = time.perf_counter()
+            history = compact_history(state, keep_turns=args.keep_turns, token_budget=args.budget, system_tokens=system_tokens)
+            compaction_us.append((time.perf_counter() - start) * 1e6)
+            tokens = system_tokens + count_tokens(history)
+            compact_tokens[turn].append(tokens)
+            assert tokens <= args.budget, f"turn {turn + 1}: {tokens} tokens over the {args.budget} budget"
+            assert tool_calls_paired(history), f"turn {turn + 1}: a tool call lost its ToolMessage"
+            assert isinstance(history[-1], AIMessage) and history[-4].content == state["messages"][-4].content
+
+    latency = lambda tokens: args.base_ms + tokens * args.ms_per_token
+    print(f"{'turn':>4} | {'full history':>20} | {'compacted':>20}")
+    for turn in range(args.turns):
+        full, compact = statistics.mean(full_tokens[turn]), statistics.mean(compact_tokens[turn])
+        if turn in (0, 1, 4, 9, 14, args.turns - 1):
+            print(f"{turn + 1:>4} | {full:6.0f} tok {latency(full):7.0f} ms | {compact:6.0f} tok {latency(compact):7.0f} ms")
+    total_full = sum(map(statistics.mean, full_tokens))
+    total_compact = sum(map(statistics.mean, compact_tokens))
+    print(f"Per conversation: {total_full:.0f} -> {total_compact:.0f} prompt tokens ({1 - total_compact / total_full:.0%} fewer), "
+          f"modeled LLM time {latency(total_full / args.turns) * args.turns / 1e3:.1f} s -> "
+          f"{latency(total_compact / args.turns) * args.turns / 1e3:.1f} s")
+    print(f"Compaction overhead: p50 {statistics.median(compaction_us):.0f} µs per turn")
+    print(f"✅ All compacted prompts fit in {args.budget} tokens with tool calls paired.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conversations", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--keep-turns", type=int, default=3)
+    parser.add_argument("--budget", type=int, default=2000)
+    parser.add_argument("--base-ms", type=float, default=300.0, help="modeled fixed LLM overhead")
+    parser.add_argument("--ms-per-token", type=float, default=0.2, help="modeled prefill cost per prompt token")
+    print("--- Starting History Compaction Benchmark ---")
+    main(parser.parse_args())
+    print("\n--- Benchmark Complete ---")
@@ -0,0 +1,126 @@
+# benchmarks/bench_multiworker.py
+#
+# Multi-worker mode check: 4 worker processes share one SQLite checkpoint
+# store and serialize turns per session with SessionLockManager.
+#
+#   1. Correctness - every worker fires concurrent turns at the same small set
+#      of sessions; afterwards each session must contain every turn exactly
+#      once (a lost update would drop messages). The same run without session
+#      locks is shown as a control.
+#   2. Throughput - distinct sessions with 1 vs. 4 workers.
+#
+#   python -m benchmarks.bench_multiworker [workers]
+
+import asyncio
+import multiprocessing
+import operator
+import os
+import sys
+import tempfile
+import time
+from typing import Annotated, List, TypedDict
+
+LLM_LATENCY = 0.02   # simulated model round trip per turn
+CPU_WORK = 0.002     # simulated per-turn CPU (serialization, routing, ...)
+
+class TurnState(TypedDict):
+    messages: Annotated[List, operator.add]
+
+def _build_graph(db_path):
+    from langchain_core.messages import AIMessage
+    from langgraph.graph import END, StateGraph
+    from app.checkpoint import SqliteCheckpointSaver
+
+    async def respond(state: TurnState):
+        await asyncio.sleep(LLM_LATENCY)
+        deadline = time.perf_counter() + CPU_WORK
+        while time.perf_counter() < deadline:
+            pass
+        return {"messages": [AIMessage(content=f"reply to {state['messages'][-1].content}")]}
+
+    workflow = StateGraph(TurnState)
+    workflow.add_node("respond", respond)
+    workflow.set_entry_point("respond")
+    workflow.add_edge("respond", END)
+    return workflow.compile(checkpointer=SqliteCheckpointSaver(db_path, shared=True))
+
+def _worker(worker_id, db_path, lock_dir, session_ids, turns_per_session, concurrency, use_locks, start_barrier, results):
+    from contextlib import nullcontext
+    from langchain_core.messages import HumanMessage
+    from app.locks import SessionLockManager
+
+    graph = _build_graph(db_path)
+    locks = SessionLockManager(lock_dir=lock_dir)
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def turn(session_id, n):
+            async with semaphore:
+                async with (locks.hold(session_id) if use_locks else nullcontext()):
+                    await graph.ainvoke({"messages": [HumanMessage(content=f"w{worker_id}-t{n}")]},
+                                        config={"configurable": {"thread_id": session_id}})
+
+        await asyncio.gather(*(turn(s, n) for n in range(turns_per_session) for s in session_ids))
+
+    start_barrier.wait()  # time the turns only, not interpreter start-up
+    asyncio.run(main())
+    results.put(time.perf_counter())
+
+def run_workers(workers, sessions_per_worker, turns_per_session, shared_sessions, use_locks=True, concurrency=8):
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, "checkpoints.db")
+        lock_dir = os.path.join(workdir, "locks")
+        _build_graph(db_path)  # create the schema once up front
+        results = ctx.Queue()
+        start_barrier = ctx.Barrier(workers + 1)
+        processes = []
+        for w in range(workers):
+            session_ids = ([f"shared-{i}" for i in range(sessions_per_worker)] if shared_sessions
+                           else [f"w{w}-session-{i}" for i in range(sessions_per_worker)])
+            processes.append(ctx.Process(target=_worker, args=(w, db_path, lock_dir, session_ids, turns_per_session,
+                                                                concurrency, use_locks, start_barrier, results)))
+        for p in processes:
+            p.start()
+        start_barrier.wait()
+        start = time.perf_counter()
+        finished = [results.get() for _ in processes]
+        for p in processes:
+            p.join()
+        elapsed = max(finished) - start
+        assert all(p.exitcode == 0 for p in processes), "a worker crashed"
+
+        from app.checkpoint import SqliteCheckpointSaver
+        saver = SqliteCheckpointSaver(db_path)
+        thread_ids = {t.config["configurable"]["thread_id"] for t in saver.list(None)}
+        lengths = {t: len(saver.get_tuple({"configurable": {"thread_id": t}}).checkpoint["channel_values"]["messages"])
+                   for t in thread_ids}
+        saver.close()
+        return elapsed, lengths
+
+if __name__ == "__main__":
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    print(f"--- Starting Multi-Worker Test ({workers} workers, {os.cpu_count()} CPU cores) ---")
+
+    turns = 5
+    expected = 2 * turns * workers  # one human + one AI message per turn, from every worker
+    for use_locks in (True, False):
+        _, lengths = run_workers(workers, sessions_per_worker=4, turns_per_session=turns, shared_sessions=True, use_locks=use_locks)
+        lost = sum(expected - n for n in lengths.values())
+        label = "with session locks   " if use_locks else "without session locks"
+        print(f"Correctness {label}: {len(lengths)} sessions, {lost} messages lost (expected {expected} per session)")
+        if use_locks:
+            assert lost == 0 and all(n == expected for n in lengths.values()), lengths
+
+    print("✅ Concurrent turns on shared sessions were serialized across workers.")
+
+    baseline = None
+    for n in (1, workers):
+        total_sessions = 64
+        elapsed, lengths = run_workers(n, sessions_per_worker=total_sessions // n, turns_per_session=3, shared_sessions=False)
+        assert all(v == 6 for v in lengths.values()), lengths
+        throughput = total_sessions * 3 / elapsed
+        baseline = baseline or throughput
+        print(f"Throughput with {n} worker(s): {throughput:7.1f} turns/s (x{throughput / baseline:.2f})")
+    print("\n--- Test Complete ---")
@@ -0,0 +1,180 @@
+# benchmarks/bench_overload.py
+#
+# /chat under overload. Serves the real FastAPI app with uvicorn; the LLM is
+# a stub provider that serves LLM_CAPACITY calls at once (benchmarks/
+# fake_llm.py), so the API can answer about LLM_CAPACITY / LLM_SECONDS turns
+# a second. New conversations arrive open-loop at `overload` times that rate:
+#
+#   before: no admission control - every request is let in and queues in
+#           front of the LLM; latency grows for as long as the overload
+#           lasts and clients time out
+#   after:  the request governor - a bounded queue, fast 429/503 for the
+#           excess, and a p99 for admitted turns that stays flat
+#
+# Then checks per-session serialization (FIFO order, at most
+# MAX_TURNS_PER_SESSION queued), 503 after the queue timeout, and
+# Idempotency-Key replays on /chat and /chat/stream:
+#
+#   python -m benchmarks.bench_overload [seconds] [overload]
+
+import asyncio
+import math
+import os
+import sys
+import time
+import uuid
+
+os.environ.setdefault("CHECKPOINT_BACKEND", "memory")
+os.environ.setdefault("DECISION_CACHE_SIZE", "0")  # Every turn should reach the model
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx
+
+from benchmarks.bench_streaming import start_server
+from benchmarks.fake_llm import StubChatModel
+
+LLM_SECONDS = 0.5
+LLM_CAPACITY = 8
+CLIENT_TIMEOUT = 10.0
+MESSAGE = "Hello, I'd like to book an appointment"
+
+def quantile(values, q):
+    """Nearest-rank quantile in seconds; 0 for no values."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)] if ordered else 0.0
+
+async def post_chat(client, base_url, session_id, message=MESSAGE, key=None):
+    """(status, seconds, body); status is "timeout" when the client gave up."""
+    start = time.perf_counter()
+    try:
+        response = await client.post(f"{base_url}/chat", json={"message": message, "session_id": session_id},
+                                     headers={"Idempotency-Key": key} if key else {}, timeout=CLIENT_TIMEOUT)
+        body = response.json() if response.headers.get("content-type") == "application/json" else None
+        return response.status_code, time.perf_counter() - start, body
+    except httpx.TimeoutException:
+        return "timeout", time.perf_counter() - start, None
+
+async def open_loop(client, base_url, rate, seconds):
+    """A new conversation every 1/rate seconds, whether or not earlier ones were answered."""
+    async def one(sent_at):
+        status, elapsed, _ = await post_chat(client, base_url, f"load-{uuid.uuid4().hex}")
+        return sent_at, status, elapsed
+
+    tasks, start = [], time.perf_counter()
+    for i in range(int(rate * seconds)):
+        delay = start + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(i / rate)))
+    return await asyncio.gather(*tasks)
+
+def summarize(label, results, seconds, model):
+    ok = [elapsed for _, status, elapsed in results if status == 200]
+    late = [elapsed for sent_at, status, elapsed in results if status == 200 and sent_at >= seconds / 2]
+    early = [elapsed for sent_at, status, elapsed in results if status == 200 and sent_at < seconds / 2]
+    rejected = [elapsed for _, status, elapsed in results if status in (429, 503)]
+    counts = {status: sum(1 for _, s, _ in results if s == status) for status in (200, 429, 503, "timeout")}
+    print(f"{label:<13} | {len(results)} sent | 200: {counts[200]:4d} ({counts[200] / seconds:5.1f}/s) | 429: {counts[429]:4d} | "
+          f"503: {counts[503]:3d} | timeouts: {counts['timeout']:4d} | ok p50 {quantile(ok, 0.5) * 1e3:6.0f} ms p99 {quantile(ok, 0.99) * 1e3:6.0f} ms | "
+          f"p99 first/second half {quantile(early, 0.99):.2f}/{quantile(late, 0.99):.2f} s | "
+          f"rejections p99 {quantile(rejected, 0.99) * 1e3:.0f} ms | LLM queue peak {model.peak_waiting}")
+    return counts, ok, early, late, rejected
+
+async def drain(controller):
+    while controller.in_flight:
+        await asyncio.sleep(0.1)
+
+async def overload_test(main, agent, base_url, seconds, overload):
+    capacity = LLM_CAPACITY / LLM_SECONDS
+    rate = capacity * overload
+    print(f"LLM serves {LLM_CAPACITY} calls at once, {LLM_SECONDS * 1e3:.0f} ms each: ~{capacity:.0f} turns/s | "
+          f"offered {rate:.0f} conversations/s for {seconds:g} s")
+    async with httpx.AsyncClient(limits=httpx.Limits(max_connections=None, max_keepalive_connections=None)) as client:
+        agent.llm_with_tools = StubChatModel(first_token_delay=0, token_delay=0)
+        await post_chat(client, base_url, "warm-up")
+        runs = {}
+        for label, controller in (
+            ("ungoverned", main.AdmissionController(max_in_flight=10**6, max_queued=10**6, queue_timeout=3600)),
+            ("governed", main.AdmissionController(max_in_flight=LLM_CAPACITY, max_queued=2 * LLM_CAPACITY, queue_timeout=2.0)),
+        ):
+            main.admission = controller
+            agent.llm_with_tools = model = StubChatModel(first_token_delay=LLM_SECONDS, token_delay=0, capacity=LLM_CAPACITY)
+            results = await open_loop(client, base_url, rate, seconds)
+            runs[label] = summarize(label, results, seconds, model)
+            await drain(controller)  # Abandoned turns still run to completion
+
+    counts, ok, early, late, rejected = runs["governed"]
+    p99 = quantile(ok, 0.99)
+    assert counts["timeout"] == 0 and p99 < 2.0 + 2 * LLM_SECONDS, f"governed p99 {p99:.2f} s"
+    assert quantile(late, 0.99) < quantile(early, 0.99) * 1.5 + 0.2, "governed p99 grew during the run"
+    assert counts[200] / seconds > 0.8 * capacity, "the governor should keep the LLM busy"
+    assert quantile(rejected, 0.99) < 0.5, "rejections should be fast"
+    before_counts, before_ok = runs["ungoverned"][:2]
+    assert before_counts["timeout"] or quantile(before_ok, 0.99) > 2 * p99, "expected the ungoverned run to degrade"
+    print("✅ Under overload the governor rejects the excess quickly and admitted turns keep a flat p99.")
+
+async def session_tests(main, agent, base_url):
+    from app.agent import get_app_graph
+    main.admission = main.AdmissionController(max_in_flight=LLM_CAPACITY, max_queued=2 * LLM_CAPACITY, queue_timeout=2.0)
+    agent.llm_with_tools = model = StubChatModel(first_token_delay=0.2, token_delay=0)
+    async with httpx.AsyncClient() as client:
+        # Per-session FIFO: three messages sent 20 ms apart run one after another, in order
+        session_id = f"fifo-{uuid.uuid4().hex}"
+        messages = [f"Message {i}: I'd like to book an appointment" for i in range(main.MAX_TURNS_PER_SESSION)]
+        tasks, start = [], time.perf_counter()
+        for message in messages:
+            tasks.append(asyncio.create_task(post_chat(client, base_url, session_id, message)))
+            await asyncio.sleep(0.02)
+        results = await asyncio.gather(*tasks)
+        assert [status for status, _, _ in results] == [200] * len(messages)
+        elapsed = time.perf_counter() - start
+        assert elapsed >= 0.2 * len(messages), "turns of one session should not overlap"
+        state = get_app_graph().get_state({"configurable": {"thread_id": session_id}})
+        assert [m.content for m in state.values["messages"] if m.type == "human"] == messages
+        print(f"✅ A session's turns run one at a time, in arrival order ({elapsed:.2f} s for {len(messages)}).")
+
+        # At most MAX_TURNS_PER_SESSION running or queued per session
+        session_id = f"burst-{uuid.uuid4().hex}"
+        results = await asyncio.gather(*(post_chat(client, base_url, session_id) for _ in range(main.MAX_TURNS_PER_SESSION + 2)))
+        statuses = sorted(status for status, _, _ in results)
+        assert statuses == [200] * main.MAX_TURNS_PER_SESSION + [429] * 2, statuses
+        print(f"✅ A session with {main.MAX_TURNS_PER_SESSION} turns pending gets 429 for more.")
+
+        # Idempotency: a double-send runs once, a retry later replays, on /chat and /chat/stream
+        session_id, key = f"idem-{uuid.uuid4().hex}", uuid.uuid4().hex
+        calls = model.calls
+        first, second = await asyncio.gather(post_chat(client, base_url, session_id, key=key), post_chat(client, base_url, session_id, key=key))
+        retry = await post_chat(client, base_url, session_id, key=key)
+        assert first[0] == second[0] == retry[0] == 200 and first[2] == second[2] == retry[2]
+        async with client.stream("POST", f"{base_url}/chat/stream", json={"message": MESSAGE, "session_id": session_id},
+                                 headers={"Idempotency-Key": key}) as response:
+            body = "".join([chunk async for chunk in response.aiter_text()])
+        assert first[2]["response"] in body and "event: done" in body
+        state = get_app_graph().get_state({"configurable": {"thread_id": session_id}})
+        assert model.calls == calls + 1 and sum(m.type == "human" for m in state.values["messages"]) == 1
+        print("✅ Messages with the same Idempotency-Key run the graph once; retries get the cached reply.")
+
+        # Queue timeout: 503 with Retry-After
+        main.admission = main.AdmissionController(max_in_flight=1, max_queued=4, queue_timeout=0.2)
+        agent.llm_with_tools = StubChatModel(first_token_delay=0.6, token_delay=0)
+        responses = await asyncio.gather(*(client.post(f"{base_url}/chat", json={"message": MESSAGE, "session_id": f"slow-{i}"},
+                                                      timeout=CLIENT_TIMEOUT) for i in range(3)))
+        assert sorted(r.status_code for r in responses) == [200, 503, 503]
+        assert all(int(r.headers["Retry-After"]) >= 1 for r in responses if r.status_code == 503)
+        metrics = (await client.get(f"{base_url}/metrics")).text
+        assert 'chat_turns_total{result="rejected_timeout"} 2' in metrics, metrics
+        print("✅ Turns that wait past the queue timeout get 503 with Retry-After; /metrics counts them.")
+
+if __name__ == "__main__":
+    print("--- Starting Overload Test ---")
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+    overload = float(sys.argv[2]) if len(sys.argv) > 2 else 2.5
+    from app import agent, main
+
+    server, base_url = start_server(main.app)
+    try:
+        asyncio.run(overload_test(main, agent, base_url, seconds, overload))
+        asyncio.run(session_tests(main, agent, base_url))
+    finally:
+        server.should_exit = True
+    print("\n--- Test Complete ---")
@@ -0,0 +1,100 @@
+# benchmarks/bench_parallel_tools.py
+#
+# Wall time of `call_tool_and_update_state` for one message carrying several
+# independent tool calls, using stub tools with known latency (sync tools
+# run in worker threads, async ones on the loop). Running the calls
+# concurrently should cost the slowest call, not the sum. Also checks that a
+# timed-out or failing call is isolated and that state merges in call order:
+#
+#   python -m benchmarks.bench_parallel_tools [calls] [latency_ms]
+
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+os.environ.setdefault("CHECKPOINT_BACKEND", "memory")
+
+from langchain_core.messages import AIMessage, ToolCall
+from langchain_core.tools import StructuredTool
+
+from app import agent
+from app.results import AvailableSlots, DoctorList
+
+CONFIG = {"configurable": {"thread_id": "bench"}}
+
+def stub_tools(latency):
+    """Sync and async stand-ins that sleep `latency` seconds and return a typed result."""
+    def sync_doctors(tag: str) -> DoctorList:
+        time.sleep(latency)
+        return DoctorList([{"name": f"Dr. {tag}", "specialty": "General Health"}])
+
+    async def async_slots(tag: str) -> AvailableSlots:
+        await asyncio.sleep(latency)
+        return AvailableSlots([f"Monday, October 19, 2026 at 09:00 AM ({tag})"])
+
+    def broken(tag: str) -> DoctorList:
+        raise RuntimeError("stub failure")
+
+    def stuck(tag: str) -> DoctorList:
+        time.sleep(agent.TOOL_TIMEOUT_SECONDS * 3)
+        return DoctorList([])
+
+    return {
+        "stub_sync": StructuredTool.from_function(sync_doctors, name="stub_sync", description="Sleeps in a thread."),
+        "stub_async": StructuredTool.from_function(coroutine=async_slots, name="stub_async", description="Sleeps on the loop."),
+        "stub_broken": StructuredTool.from_function(broken, name="stub_broken", description="Raises."),
+        "stub_stuck": StructuredTool.from_function(stuck, name="stub_stuck", description="Outlives the timeout."),
+    }
+
+def message(names):
+    return AIMessage(content="", tool_calls=[ToolCall(name=name, args={"tag": str(i)}, id=f"call_{uuid.uuid4().hex[:8]}")
+                                             for i, name in enumerate(names)])
+
+async def sequential(state):
+    """The node as it was: one call after another."""
+    for tool_call in state["messages"][-1].tool_calls:
+        await agent.tool_map[tool_call["name"]].ainvoke(tool_call["args"], config=CONFIG)
+
+async def timed(coro):
+    start = time.perf_counter()
+    result = await coro
+    return time.perf_counter() - start, result
+
+async def main(calls, latency):
+    agent.tool_map.update(stub_tools(latency))
+    names = [("stub_sync", "stub_async")[i % 2] for i in range(calls)]
+    state = {"messages": [message(names)]}
+    await agent.call_tool_and_update_state(state, CONFIG)  # Warm up the thread pool
+
+    serial, _ = await timed(sequential(state))
+    concurrent, updates = await timed(agent.call_tool_and_update_state(state, CONFIG))
+    print(f"{calls} calls x {latency * 1e3:.0f} ms | sequential {serial * 1e3:6.1f} ms | concurrent {concurrent * 1e3:6.1f} ms "
+          f"| speed-up {serial / concurrent:.1f}x")
+    assert concurrent < latency * 1.5 + 0.05, "concurrent calls should cost about one call"
+    # The last call of each kind wins, as it did when the calls ran in order
+    last_sync = max(i for i, name in enumerate(names) if name == "stub_sync")
+    assert updates["doctor_list"][0]["name"] == f"Dr. {last_sync}", updates["doctor_list"]
+    assert [m.tool_call_id for m in updates["messages"]] == [c["id"] for c in state["messages"][-1].tool_calls]
+    print("✅ Wall time is the slowest call, not the sum; state merged in call order.")
+
+    # One failing and one stuck call do not take the others down
+    agent.TOOL_TIMEOUT_SECONDS = latency * 2
+    state = {"messages": [message(["stub_sync", "stub_broken", "stub_stuck", "stub_async"])]}
+    elapsed, updates = await timed(agent.call_tool_and_update_state(state, CONFIG))
+    contents = [m.content for m in updates["messages"]]
+    for content in contents:
+        print(f"   {content[:90]}")
+    assert contents[1].startswith("ERROR: stub_broken failed") and contents[2].startswith("ERROR: stub_stuck did not finish")
+    assert not contents[0].startswith("ERROR") and contents[3].startswith("SUCCESS") and "doctor_list" in updates
+    assert elapsed < agent.TOOL_TIMEOUT_SECONDS + 0.1, elapsed
+    print(f"✅ Errors and timeouts are isolated per call (turn took {elapsed * 1e3:.0f} ms with a {agent.TOOL_TIMEOUT_SECONDS * 1e3:.0f} ms timeout).")
+
+if __name__ == "__main__":
+    print("--- Starting Parallel Tool Call Benchmark ---")
+    args = sys.argv[1:]
+    calls = int(args[0]) if args else 4
+    latency = float(args[1]) / 1000 if len(args) > 1 else 0.2
+    asyncio.run(main(calls, latency))
+    print("\n--- Benchmark Complete ---")
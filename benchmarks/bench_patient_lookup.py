@@ -0,0 +1,78 @@
+# benchmarks/bench_patient_lookup.py
+#
+# Compares EMR lookup latency of the original per-call CSV scan against the
+# indexed PatientRepository. Run from the project root:
+#
+#   python -m benchmarks.bench_patient_lookup [sizes...]
+#
+# Synthetic patient files are produced with generate_data.py and cached under
+# benchmarks/.data, so only the first run at a given size pays the Faker cost.
+
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+from app.patients import PatientRepository
+from generate_data import generate_doctors, generate_patients
+
+BENCH_DATA_DIR = os.path.join("benchmarks", ".data")
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+INDEXED_LOOKUPS = 10_000
+
+def synthetic_patients_csv(num_patients):
+    """Returns the path of a cached synthetic patients file with `num_patients` rows."""
+    os.makedirs(BENCH_DATA_DIR, exist_ok=True)
+    path = os.path.join(BENCH_DATA_DIR, f"patients_{num_patients}.csv")
+    if not os.path.exists(path):
+        print(f"Generating {num_patients} synthetic patients (cached at {path})...")
+        doctor_names = generate_doctors()['name'].tolist()
+        generate_patients(num_patients, doctor_names).to_csv(path, index=False)
+    return path
+
+def legacy_search(csv_path, full_name, normalized_dob):
+    """The lookup as search_patient_in_emr originally performed it."""
+    patients_df = pd.read_csv(csv_path, encoding='utf-8')
+    patients_df['dob'] = pd.to_datetime(patients_df['dob']).dt.strftime('%Y-%m-%d')
+    patient = patients_df[
+        (patients_df['name'].str.lower() == full_name.lower()) &
+        (patients_df['dob'] == normalized_dob)
+    ]
+    return None if patient.empty else patient.to_dict('records')[0]
+
+def _time_per_call(fn, queries):
+    start = time.perf_counter()
+    for name, dob in queries:
+        fn(name, dob)
+    return (time.perf_counter() - start) / len(queries)
+
+def run(num_patients):
+    csv_path = synthetic_patients_csv(num_patients)
+    sample = pd.read_csv(csv_path, usecols=['name', 'dob']).sample(n=min(num_patients, INDEXED_LOOKUPS), replace=True, random_state=7)
+    queries = list(sample.itertuples(index=False, name=None))
+
+    legacy_queries = queries[:max(1, min(20, 20_000_000 // num_patients))]
+    legacy = _time_per_call(lambda n, d: legacy_search(csv_path, n, d), legacy_queries)
+
+    repository = PatientRepository(csv_path)
+    start = time.perf_counter()
+    repository.refresh()
+    load_time = time.perf_counter() - start
+
+    indexed = _time_per_call(repository.find, queries)
+    misses = [(name + " X", dob) for name, dob in random.sample(queries, min(len(queries), 1000))]
+    assert all(repository.find(n, d) for n, d in queries[:100]), "indexed lookup missed a known patient"
+    assert not any(repository.find(n, d) for n, d in misses), "indexed lookup matched an unknown patient"
+
+    print(f"{num_patients:>10,} rows | legacy {legacy * 1e3:10.2f} ms/lookup | "
+          f"indexed {indexed * 1e6:7.2f} µs/lookup | index build {load_time:6.2f} s | "
+          f"speedup {legacy / indexed:,.0f}x")
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    print("--- Starting Patient Lookup Benchmark ---")
+    for size in sizes:
+        run(size)
+    print("\n--- Benchmark Complete ---")
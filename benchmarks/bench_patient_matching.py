@@ -0,0 +1,63 @@
+# benchmarks/bench_patient_matching.py
+#
+# Measures fuzzy patient matching latency and recall on misspelled names:
+#
+#   python -m benchmarks.bench_patient_matching [sizes...]
+
+import random
+import statistics
+import sys
+import time
+
+from app.matching import PatientMatcher
+from app.patients import PatientRepository
+from benchmarks.bench_patient_lookup import synthetic_patients_csv
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+NUM_QUERIES = 2_000
+
+def misspell(name, rng):
+    """Applies one typo (drop, double or swap a letter) to the first name."""
+    first, _, rest = name.partition(" ")
+    if len(first) < 3:
+        return name
+    i = rng.randrange(1, len(first) - 1)
+    edit = rng.choice(["drop", "double", "swap"])
+    if edit == "drop":
+        first = first[:i] + first[i + 1:]
+    elif edit == "double":
+        first = first[:i] + first[i] + first[i:]
+    else:
+        first = first[:i - 1] + first[i] + first[i - 1] + first[i + 1:]
+    return f"{first} {rest}"
+
+def run(num_patients):
+    repository = PatientRepository(synthetic_patients_csv(num_patients))
+    matcher = PatientMatcher(repository)
+    start = time.perf_counter()
+    matcher.search("warm up", "2000-01-01")
+    build_time = time.perf_counter() - start
+
+    rng = random.Random(42)
+    targets = rng.sample(repository.records(), min(NUM_QUERIES, len(repository)))
+    latencies, hits = [], 0
+    for record in targets:
+        query = misspell(record['name'], rng)
+        t0 = time.perf_counter()
+        candidates = matcher.search(query, record['dob'])
+        latencies.append(time.perf_counter() - t0)
+        hits += any(c.record['name'] == record['name'] and c.record['dob'] == record['dob'] for c in candidates)
+
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1e3
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1e3
+    largest_block = max(len(block) for block in matcher._blocks.values())
+    print(f"{num_patients:>10,} rows | p50 {p50:6.3f} ms | p99 {p99:6.3f} ms | "
+          f"recall {hits / len(targets):6.1%} | largest block {largest_block:,} | index build {build_time:6.2f} s")
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    print("--- Starting Patient Matching Benchmark ---")
+    for size in sizes:
+        run(size)
+    print("\n--- Benchmark Complete ---")
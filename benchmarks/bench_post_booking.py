@@ -0,0 +1,100 @@
+# benchmarks/bench_post_booking.py
+#
+# Latency of the booking turn (slot pick -> book_appointment -> intake forms +
+# reminders -> final confirmation) while the email provider is a deliberately
+# slow local SMTP stand-in (benchmarks/smtp_stub.py). The intake-forms email
+# runs as a background job, so the turn should take the same time whatever
+# the SMTP latency. Also checks job retries and dead-lettering:
+#
+#   python -m benchmarks.bench_post_booking [slow_smtp_seconds]
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.smtp_stub import SmtpStub
+
+SLOT_FORMAT = '%A, %B %d, %Y at %I:%M %p'
+
+async def booking_turn(app_graph, index):
+    """Seeds a session that has just been shown a slot, then picks it. Returns (seconds, reply)."""
+    from langchain_core.messages import AIMessage, HumanMessage
+    slot = (datetime.now(timezone.utc) + timedelta(days=2, hours=index)).strftime(SLOT_FORMAT)
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+    await app_graph.aupdate_state(config, {
+        "patient_status": "RETURNING",
+        "patient_info": {"full_name": f"Patient {index}", "email": f"patient{index}@example.com", "phone": "555-0100"},
+        "insurance_info": "Confirmed",
+        "doctor_name": "Dr. Bench",
+        "available_slots": [slot],
+        "messages": [AIMessage(content=f"Great, here are the available slots: {slot}. Please choose your preferred time.")],
+    }, as_node="present_slots")
+    start = time.perf_counter()
+    final_state = await app_graph.ainvoke({"messages": [HumanMessage(content=slot)]}, config=config)
+    return time.perf_counter() - start, final_state
+
+async def wait_for(job_queue, job_id, statuses=("done", "dead"), timeout=60):
+    deadline = time.monotonic() + timeout
+    while (job := job_queue.status(job_id)).status not in statuses:
+        assert time.monotonic() < deadline, f"job {job_id} stuck as {job.status}"
+        await asyncio.sleep(0.01)
+    return job
+
+async def main(stub, slow):
+    from app.agent import get_app_graph
+    from app.tools import get_job_queue, get_reminder_scheduler
+    app_graph, job_queue, reminder_scheduler = get_app_graph(), get_job_queue(), get_reminder_scheduler()
+    job_queue.retry_seconds = 0.05
+    await job_queue.start()
+
+    turns = {}
+    for i, latency in enumerate([0.0, slow]):
+        stub.latency = latency
+        await booking_turn(app_graph, 100 + i)  # Warm-up
+        seconds, final_state = await booking_turn(app_graph, i)
+        reply = final_state["messages"][-1].content
+        start = time.perf_counter()
+        job = await wait_for(job_queue, final_state["intake_forms_job"])
+        delivered = time.perf_counter() - start + seconds
+        turns[latency] = seconds
+        print(f"SMTP latency {latency:4.1f} s | booking turn {seconds * 1e3:7.1f} ms | intake email {job.status} after {delivered:5.2f} s "
+              f"| reply: ...{reply[reply.index('also'):]}")
+        assert "queued the intake forms" in reply or latency == 0.0, reply
+    assert turns[slow] < turns[0.0] + 0.5, turns
+    print(f"✅ Turn latency does not depend on the SMTP provider ({slow:.1f} s per message).")
+
+    # A provider hiccup is retried; a provider that keeps failing dead-letters the job
+    stub.latency = 0.0
+    stub.fail_next(1)
+    _, final_state = await booking_turn(app_graph, 200)
+    job = await wait_for(job_queue, final_state["intake_forms_job"])
+    print(f"1 rejected send  | job {job.status} after {job.attempts} attempts")
+    assert job.status == "done" and job.attempts == 2, job
+    stub.fail_next(job_queue.max_attempts)
+    _, final_state = await booking_turn(app_graph, 201)
+    job = await wait_for(job_queue, final_state["intake_forms_job"])
+    print(f"always rejected  | job {job.status} after {job.attempts} attempts: {job.error}")
+    assert job.status == "dead" and job in job_queue.dead_letters(), job
+    assert await wait_for(job_queue, final_state["reminders_job"]) and reminder_scheduler.pending() > 0
+    print(f"✅ Retries and dead-lettering work; job counts {job_queue.counts()}.")
+    await job_queue.stop()
+
+if __name__ == "__main__":
+    print("--- Starting Post-Booking Side Effects Test ---")
+    slow = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    with tempfile.TemporaryDirectory() as workdir, SmtpStub() as stub:
+        os.environ.update({
+            "CHECKPOINT_BACKEND": "memory",
+            "BOOKINGS_LEDGER_PATH": os.path.join(workdir, "bookings.db"),
+            "REMINDERS_DB_PATH": os.path.join(workdir, "reminders.db"),
+            "REMINDER_OUTBOX_DIR": os.path.join(workdir, "outbox"),
+            "JOBS_DB_PATH": os.path.join(workdir, "jobs.db"),
+            "SMTP_HOST": stub.host,
+            "SMTP_PORT": str(stub.port),
+        })
+        asyncio.run(main(stub, slow))
+    print("\n--- Test Complete ---")
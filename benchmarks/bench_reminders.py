@@ -0,0 +1,130 @@
+# benchmarks/bench_reminders.py
+#
+# 1. Throughput: enqueue N pending reminders spread over the next 30 days,
+#    then dispatch a burst of due reminders with all N still pending, and
+#    compare the cost of one dispatcher poll with a full scan of the table.
+# 2. Restart test: a dispatcher process is killed mid-batch (after sending,
+#    before marking sent); a new scheduler on the same database must deliver
+#    every reminder exactly once.
+#
+#   python -m benchmarks.bench_reminders [pending] [due_burst] [restart_reminders]
+
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from app.reminders import OutboxSender, Reminder, ReminderScheduler
+
+class CountingSender:
+    def __init__(self):
+        self.sent = 0
+
+    async def send(self, delivery):
+        self.sent += 1
+
+def _reminders(prefix, count, start, spread):
+    return [Reminder(f"{prefix}-{i}", start + spread * i / count, ("email", "sms")[i % 2], f"patient{i}@example.com",
+                     "Reminder: you have an appointment tomorrow.") for i in range(count)]
+
+async def _drain(scheduler):
+    while await scheduler.dispatch_due():
+        pass
+
+def throughput(pending, burst):
+    with tempfile.TemporaryDirectory() as workdir:
+        sender = CountingSender()
+        scheduler = ReminderScheduler(os.path.join(workdir, "reminders.db"), senders={"email": sender, "sms": sender})
+        now = time.time()
+        future = _reminders("future", pending, now + 3 * 3600, 30 * 86400)
+        start = time.perf_counter()
+        for i in range(0, pending, 10_000):
+            scheduler.schedule(future[i:i + 10_000])
+        enqueue = time.perf_counter() - start
+        print(f"enqueue  | {pending:,} reminders in {enqueue:.1f} s | {pending / enqueue:,.0f} reminders/s")
+        assert scheduler.schedule(future[:1000]) == 0, "re-scheduled reminders were added twice"
+
+        asyncio.run(_drain(scheduler))  # First poll loads the horizon
+        scheduler.schedule(_reminders("due", burst, now - 60, 59))
+        start = time.perf_counter()
+        asyncio.run(_drain(scheduler))
+        dispatch = time.perf_counter() - start
+        print(f"dispatch | {burst:,} due reminders with {pending:,} pending in {dispatch:.2f} s | {burst / dispatch:,.0f} reminders/s "
+              f"| heap holds {len(scheduler._heap):,} entries")
+        assert sender.sent == burst, (sender.sent, burst)
+
+        # One poll (index range queries) against a naive full scan of pending rows
+        polls = []
+        for _ in range(20):
+            t0 = time.perf_counter()
+            scheduler._poll(time.time())
+            polls.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        with scheduler._lock:
+            scheduler._conn.execute("SELECT id, due_at FROM reminders WHERE status = 'pending'").fetchall()
+        scan = time.perf_counter() - t0
+        print(f"per tick | indexed poll {sorted(polls)[len(polls) // 2] * 1e3:.2f} ms vs full scan {scan * 1e3:.0f} ms")
+        scheduler.close()
+    print(f"✅ {burst:,} reminders dispatched with {pending:,} pending; duplicates rejected on re-schedule.")
+
+class CrashingSender(OutboxSender):
+    """Dies like a killed worker after `crash_after` deliveries, before they are marked sent."""
+
+    def __init__(self, channel, outbox_path, crash_after):
+        super().__init__(channel, outbox_path, echo=False)
+        self.crash_after = crash_after
+
+    async def send(self, delivery):
+        await super().send(delivery)
+        self.crash_after -= 1
+        if self.crash_after == 0:
+            os._exit(1)
+
+def _crashing_worker(workdir, crash_after):
+    scheduler = ReminderScheduler(os.path.join(workdir, "reminders.db"), lease_seconds=0.5, senders={
+        channel: CrashingSender(channel, os.path.join(workdir, f"{channel}.jsonl"), crash_after) for channel in ("email", "sms")
+    })
+    asyncio.run(_drain(scheduler))
+
+def restart(count):
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, "reminders.db")
+        scheduler = ReminderScheduler(db_path, senders={})
+        reminders = _reminders("restart", count, time.time() - 60, 59)
+        scheduler.schedule(reminders)
+        scheduler.close()
+
+        worker = multiprocessing.get_context("spawn").Process(target=_crashing_worker, args=(workdir, count // 4))
+        worker.start()
+        worker.join()
+        assert worker.exitcode == 1, "worker was expected to crash"
+
+        senders = {channel: OutboxSender(channel, os.path.join(workdir, f"{channel}.jsonl"), echo=False) for channel in ("email", "sms")}
+        scheduler = ReminderScheduler(db_path, senders=senders, lease_seconds=0.5)
+        before = scheduler.status_counts()
+        time.sleep(0.6)  # Let the dead worker's leases expire
+        asyncio.run(_drain(scheduler))
+        after = scheduler.status_counts()
+        scheduler.close()
+
+        delivered = []
+        for channel in ("email", "sms"):
+            with open(os.path.join(workdir, f"{channel}.jsonl")) as f:
+                delivered += [json.loads(line)["id"] for line in f]
+        suppressed = sum(sender.suppressed for sender in senders.values())
+        print(f"restart  | before restart {before} | after {after} | {len(delivered):,} delivered, "
+              f"{suppressed} re-sends after the crash dropped as duplicates")
+        assert after == {"sent": count}, after
+        assert len(delivered) == len(set(delivered)) == count, (len(delivered), len(set(delivered)))
+    print(f"✅ All {count:,} reminders delivered exactly once across a crash and restart.")
+
+if __name__ == "__main__":
+    print("--- Starting Reminder Scheduler Benchmark ---")
+    args = [int(arg) for arg in sys.argv[1:]]
+    pending, burst, restart_count = args + [1_000_000, 50_000, 2_000][len(args):]
+    throughput(pending, burst)
+    restart(restart_count)
+    print("\n--- Benchmark Complete ---")
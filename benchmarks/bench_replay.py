@@ -0,0 +1,324 @@
+# benchmarks/bench_replay.py
+#
+# Offline replay and load test. Serves the real FastAPI app with uvicorn and
+# drives /chat with scripted conversations (benchmarks/conversations.json:
+# new patient, returning patient, insurance skip, change doctor) at a given
+# concurrency. The LLM is a scripted stub (benchmarks/fake_llm.py) and
+# Calendly a local stub server, so runs are repeatable and need no network.
+# A run fails when a reply misses what the script expects or when any tool
+# call in a conversation comes back as an error.
+#
+# Reports turns/sec, turn latency and per-node / per-tool p50/p95/p99, LLM
+# calls and tokens, Calendly requests and memory growth. `--output` writes
+# the report as JSON; `--compare` checks it against an earlier one and exits
+# non-zero on a regression:
+#
+#   python -m benchmarks.bench_replay --conversations 200 --concurrency 16 --output baseline.json
+#   python -m benchmarks.bench_replay --conversations 200 --concurrency 16 --compare baseline.json
+
+import argparse
+import asyncio
+import csv
+import json
+import math
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+# Report fields checked by --compare: (path, better, smallest difference that counts).
+# Calendly requests are reported but not checked: bookings invalidate the
+# availability cache, so the count depends on how turns interleave.
+REGRESSION_CHECKS = [
+    ("turns_per_sec", "higher", 0.0),
+    ("turn_latency_ms.p50", "lower", 1.0),
+    ("turn_latency_ms.p95", "lower", 1.0),
+    ("turn_latency_ms.p99", "lower", 1.0),
+    ("llm.calls", "lower", 0.0),
+    ("llm.input_tokens", "lower", 0.0),
+    ("memory_mb.growth", "lower", 5.0),
+]
+SLOT_RE = re.compile(r"[A-Z][a-z]+day, [A-Z][a-z]+ \d{2}, \d{4} at \d{2}:\d{2} [AP]M")
+DOCTOR_RE = re.compile(r"^- (Dr\. .+?) \(", re.MULTILINE)
+PLACEHOLDER_RE = re.compile(r"\{(\w+)\}")
+FIRST_NAMES = ("Avery", "Jordan", "Riley", "Casey", "Morgan", "Quinn", "Rowan", "Harper")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay scripted conversations against /chat.")
+    parser.add_argument("--conversations", type=int, default=40, help="conversations to run (scripts are used in turn)")
+    parser.add_argument("--concurrency", type=int, default=8, help="conversations in flight at once")
+    parser.add_argument("--scripts", default=os.path.join(os.path.dirname(__file__), "conversations.json"))
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0, help="stub LLM latency per call")
+    parser.add_argument("--calendly-latency-ms", type=float, default=50.0, help="stub Calendly latency per request")
+    parser.add_argument("--checkpoint-backend", default="sqlite", choices=("sqlite", "memory"))
+    parser.add_argument("--seed", type=int, default=7, help="seeds patients, doctor and slot picks")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="baseline JSON report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative change that counts as a regression")
+    return parser.parse_args(argv)
+
+
+def configure_environment(tmp_dir, checkpoint_backend):
+    """Keeps every store of the run in `tmp_dir`; must run before app modules are imported."""
+    os.environ["CHECKPOINT_BACKEND"] = checkpoint_backend
+    os.environ["LOG_LEVEL"] = "WARNING"
+    os.environ["CHECKPOINT_DB_PATH"] = os.path.join(tmp_dir, "checkpoints.db")
+    os.environ["BOOKINGS_LEDGER_PATH"] = os.path.join(tmp_dir, "bookings.db")
+    os.environ["REMINDERS_DB_PATH"] = os.path.join(tmp_dir, "reminders.db")
+    os.environ["REMINDER_OUTBOX_DIR"] = os.path.join(tmp_dir, "outbox")
+    os.environ["JOBS_DB_PATH"] = os.path.join(tmp_dir, "jobs.db")
+    os.environ.pop("SMTP_HOST", None)
+
+
+# --- Conversations ---
+
+def returning_patients(path="data/patients.csv"):
+    """EMR rows a script can introduce itself as: plain two-word names that occur once, ISO dates of birth."""
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    names = [row["name"] for row in rows]
+    return [row for row in rows
+            if re.fullmatch(r"[A-Z][a-z]+ [A-Z][a-z]+", row["name"]) and names.count(row["name"]) == 1
+            and re.fullmatch(r"\d{4}-\d{2}-\d{2}", row["dob"]) and row["email"] and row["phone"] and row["last_visit_doctor"]]
+
+
+def new_patient(index, rng):
+    """A made-up patient; the surname spells out `index` so it matches nobody in the EMR."""
+    surname = "Zan" + "".join(chr(ord("a") + int(d)) for d in str(index))
+    first = rng.choice(FIRST_NAMES)
+    return {
+        "name": f"{first} {surname}",
+        "dob": f"{rng.randint(1950, 2005)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "email": f"{first}.{surname}@example.com".lower(),
+        "phone": f"555-{rng.randint(1000, 9999)}",
+        "member_id": f"M{rng.randint(100000, 999999)}",
+        "group_number": f"G{rng.randint(100, 999)}",
+    }
+
+
+def plan(scripts, count, seed, pool):
+    """(session_id, script name, variables, rng) per conversation, the same for a given seed."""
+    names = list(scripts)
+    pool = list(pool)
+    random.Random(seed).shuffle(pool)
+    conversations = []
+    for i in range(count):
+        name = names[i % len(names)]
+        rng = random.Random(f"{seed}-{i}")
+        if scripts[name]["patient"] == "returning":
+            row = pool[i % len(pool)]
+            variables = {"name": row["name"], "dob": row["dob"], "email": row["email"], "phone": row["phone"],
+                         "last_doctor": row["last_visit_doctor"]}
+        else:
+            variables = new_patient(i, rng)
+        conversations.append((f"replay-{seed}-{i}", name, variables, rng))
+    return conversations
+
+
+def fill(value, variables):
+    """Substitutes {placeholders} in a string or in the strings of a JSON-like structure."""
+    if isinstance(value, str):
+        return PLACEHOLDER_RE.sub(lambda m: str(variables.get(m.group(1), m.group(0))), value)
+    if isinstance(value, list):
+        return [fill(item, variables) for item in value]
+    if isinstance(value, dict):
+        return {key: fill(item, variables) for key, item in value.items()}
+    return value
+
+
+async def run_conversation(client, model, session_id, script, variables, rng):
+    """Plays one script. Returns (turn latencies, failure or None)."""
+    latencies = []
+    for number, turn in enumerate(script["turns"], 1):
+        if turn.get("llm"):
+            model.script(session_id, fill(turn["llm"], variables))
+        message = fill(turn["user"], variables)
+        start = time.perf_counter()
+        response = await client.post("/chat", json={"message": message, "session_id": session_id})
+        latencies.append(time.perf_counter() - start)
+        reply = response.json().get("response", "") if response.status_code == 200 else response.text
+        missing = [text for text in fill(turn.get("expect", []), variables) if text.lower() not in reply.lower()]
+        if response.status_code != 200 or missing:
+            return latencies, {"session_id": session_id, "turn": number, "message": message,
+                               "status": response.status_code, "missing": missing, "reply": reply[:300]}
+        # Later turns pick from what this reply offered
+        doctors, slots = DOCTOR_RE.findall(reply), SLOT_RE.findall(reply)
+        if doctors:
+            variables["doctor"] = rng.choice(doctors)
+        if slots:
+            variables["slot"] = rng.choice(slots)
+    return latencies, None
+
+
+def tool_failures(app_graph, session_id):
+    """The conversation's tool calls that came back as errors (ToolError results, failed validation, timeouts)."""
+    messages = app_graph.get_state({"configurable": {"thread_id": session_id}}).values.get("messages", [])
+    names = {call["id"]: call["name"] for message in messages for call in getattr(message, "tool_calls", None) or []}
+    return [{"session_id": session_id, "tool": names.get(message.tool_call_id), "error": str(message.content)[:300]}
+            for message in messages if message.type == "tool" and str(message.content).startswith("ERROR")]
+
+
+# --- Report ---
+
+def percentiles(values):
+    """Nearest-rank p50/p95/p99 and max, in milliseconds."""
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+    rank = lambda p: ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)] * 1e3
+    return {"count": len(ordered), "p50": round(rank(50), 3), "p95": round(rank(95), 3),
+            "p99": round(rank(99), 3), "max": round(ordered[-1] * 1e3, 3)}
+
+
+def lookup(report, path):
+    value = report
+    for key in path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def regressions(report, baseline, threshold):
+    """Report fields that got worse than `baseline` by more than `threshold` (relative)."""
+    checks = list(REGRESSION_CHECKS)
+    checks += [(f"nodes.{node}.p95", "lower", 1.0) for node in baseline.get("nodes", {})]
+    found = []
+    for path, better, floor in checks:
+        old, new = lookup(baseline, path), lookup(report, path)
+        if old is None or new is None:
+            continue
+        worse = old - new if better == "higher" else new - old
+        if worse > floor and worse > abs(old) * threshold:
+            found.append(f"{path}: {old:g} -> {new:g}")
+    return found
+
+
+def print_report(report):
+    turns = report["turn_latency_ms"]
+    print(f"{report['conversations']} conversations, {report['turns']} turns in {report['duration_s']:.2f} s "
+          f"at concurrency {report['config']['concurrency']} | {report['turns_per_sec']:.1f} turns/s")
+    print(f"turn latency  p50 {turns['p50']:8.1f} ms | p95 {turns['p95']:8.1f} ms | p99 {turns['p99']:8.1f} ms")
+    for title, section in (("node", report["nodes"]), ("tool", report["tools"])):
+        for name, stats in sorted(section.items()):
+            print(f"  {title} {name:<28} n={stats['count']:<5} p50 {stats['p50']:8.2f} ms | p95 {stats['p95']:8.2f} ms | p99 {stats['p99']:8.2f} ms")
+    llm, memory = report["llm"], report["memory_mb"]
+    print(f"LLM calls {llm['calls']} ({llm['unscripted']} unscripted), tokens in/out {llm['input_tokens']}/{llm['output_tokens']} "
+          f"| Calendly requests {report['calendly_requests']} | RSS {memory['start']:.1f} -> {memory['end']:.1f} MB "
+          f"(+{memory['growth']:.1f} MB)")
+
+
+# --- Run ---
+
+async def drive(base_url, model, scripts, conversations, concurrency):
+    import httpx
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        async def one(conversation):
+            session_id, name, variables, rng = conversation
+            async with semaphore:
+                return name, *(await run_conversation(client, model, session_id, scripts[name], dict(variables), rng))
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one(c) for c in conversations))
+        return results, time.perf_counter() - start
+
+
+def run(args):
+    from benchmarks.bench_availability_cache import configure_environment as configure_calendly
+    from benchmarks.bench_checkpointer import rss_mb
+    from benchmarks.bench_streaming import start_server
+    from benchmarks.calendly_stub import CalendlyStub
+    from benchmarks.fake_llm import ScriptedChatModel
+
+    with open(args.scripts) as f:
+        scripts = json.load(f)
+    with tempfile.TemporaryDirectory() as tmp_dir, CalendlyStub(latency=args.calendly_latency_ms / 1000) as stub:
+        configure_environment(tmp_dir, args.checkpoint_backend)
+        configure_calendly(stub)
+        from app import agent
+        from app.main import app
+        from app.metrics import NODE_LATENCY, TOOL_LATENCY
+
+        model = ScriptedChatModel(latency=args.llm_latency_ms / 1000)
+        agent.llm_with_tools = model
+        server, base_url = start_server(app)
+        try:
+            pool = returning_patients()
+            # One pass over every script warms caches, pools and imports; it is not measured
+            warm_up = plan(scripts, len(scripts), args.seed + 1, pool[::-1])
+            results, _ = asyncio.run(drive(base_url, model, scripts, warm_up, len(scripts)))
+            assert not any(failure for _, _, failure in results), [failure for _, _, failure in results if failure]
+            warm_up_errors = [error for session_id, *_ in warm_up for error in tool_failures(agent.get_app_graph(), session_id)]
+            assert not warm_up_errors, warm_up_errors
+
+            NODE_LATENCY.keep_values()
+            TOOL_LATENCY.keep_values()
+            calls, unscripted, tokens = model.calls, model.unscripted, (model.input_tokens, model.output_tokens)
+            calendly, rss = stub.calls, rss_mb()
+            conversations = plan(scripts, args.conversations, args.seed, pool)
+            results, duration = asyncio.run(drive(base_url, model, scripts, conversations, args.concurrency))
+            rss_end = rss_mb()
+            tool_errors = {session_id: tool_failures(agent.get_app_graph(), session_id) for session_id, *_ in conversations}
+        finally:
+            server.should_exit = True
+
+    latencies = [latency for _, turns, _ in results for latency in turns]
+    failures = [dict(failure, script=name) for name, _, failure in results if failure]
+    # A conversation can reach the expected replies while a tool call failed along the way
+    failures += [dict(error, script=name) for session_id, name, *_ in conversations for error in tool_errors[session_id]]
+    report = {
+        "config": {"conversations": args.conversations, "concurrency": args.concurrency, "seed": args.seed,
+                   "checkpoint_backend": args.checkpoint_backend,
+                   "llm_latency_ms": args.llm_latency_ms, "calendly_latency_ms": args.calendly_latency_ms,
+                   "scripts": sorted(scripts)},
+        "conversations": len(results),
+        "turns": len(latencies),
+        "duration_s": round(duration, 3),
+        "turns_per_sec": round(len(latencies) / duration, 2),
+        "turn_latency_ms": percentiles(latencies),
+        "nodes": {labels[0]: percentiles(values) for labels, values in NODE_LATENCY.values().items() if values},
+        "tools": {labels[0]: percentiles(values) for labels, values in TOOL_LATENCY.values().items() if values},
+        "llm": {"calls": model.calls - calls, "unscripted": model.unscripted - unscripted,
+                "input_tokens": model.input_tokens - tokens[0], "output_tokens": model.output_tokens - tokens[1]},
+        "calendly_requests": stub.calls - calendly,
+        "memory_mb": {"start": round(rss, 1), "end": round(rss_end, 1), "growth": round(rss_end - rss, 1)},
+        "failures": failures,
+    }
+    return report
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    print("--- Starting Conversation Replay Load Test ---")
+    report = run(args)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"Report written to {args.output}")
+
+    for failure in report["failures"][:5]:
+        if "tool" in failure:
+            print(f"   {failure['script']} ({failure['session_id']}): {failure['tool']} failed: {failure['error']!r}")
+        else:
+            print(f"   {failure['script']} turn {failure['turn']} ({failure['message']!r}): missing {failure['missing']} in {failure['reply']!r}")
+    assert not report["failures"], f"{len(report['failures'])} failures: replies off script or tool calls that failed"
+    assert report["llm"]["unscripted"] == 0, "the agent called the LLM on turns the scripts expect the fast path to serve"
+    print(f"✅ All {report['conversations']} conversations completed as scripted.")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != report["config"]:
+            print(f"⚠️ Baseline was run with a different configuration: {baseline.get('config')}")
+        found = regressions(report, baseline, args.threshold)
+        for line in found:
+            print(f"   regression: {line}")
+        if found:
+            sys.exit(f"{len(found)} metrics regressed by more than {args.threshold:.0%} against {args.compare}")
+        print(f"✅ No regressions beyond {args.threshold:.0%} against {args.compare}.")
+    print("\n--- Load Test Complete ---")
@@ -0,0 +1,117 @@
+# benchmarks/bench_reservations.py
+#
+# 1. Conflict-check latency of the per-doctor interval index at 1M existing
+#    bookings, against scanning the bookings table.
+# 2. Race test: 100 sessions spread over 4 worker processes contend for 10
+#    slots of one doctor through hold_slots() + book_appointment; every slot
+#    must be booked at most once.
+#
+#   python -m benchmarks.bench_reservations [existing_bookings] [sessions] [slots]
+
+import calendar
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from app.reservations import ReservationBook
+
+SLOT_FORMAT = '%A, %B %d, %Y at %I:%M %p'
+RACE_DOCTOR = "Dr. Race"
+PROCESSES = 4
+
+def _percentile(values, p):
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)]
+
+def conflict_latency(existing, checks=100_000, doctors=50):
+    rng = random.Random(7)
+    base = calendar.timegm((2026, 1, 1, 0, 0, 0))
+    # A 30-minute booking every hour per doctor, spread across doctors
+    rows = [(i, f"Dr. {i % doctors}", base + (i // doctors) * 3600, base + (i // doctors) * 3600 + 1800) for i in range(existing)]
+    book = ReservationBook()
+    start = time.perf_counter()
+    book.load(rows)
+    build = time.perf_counter() - start
+
+    probes = [(f"Dr. {rng.randrange(doctors)}", base + rng.randrange(existing // doctors * 4) * 900) for _ in range(checks)]
+    timings, conflicts = [], 0
+    for doctor_name, starts_at in probes:
+        t0 = time.perf_counter()
+        free = book.is_free(doctor_name, starts_at, starts_at + 1800)
+        timings.append(time.perf_counter() - t0)
+        conflicts += not free
+
+    # Before the index a check meant scanning every booking
+    df = pd.DataFrame(rows, columns=["id", "doctor_name", "starts_at", "ends_at"])
+    scan = []
+    for doctor_name, starts_at in probes[:20]:
+        t0 = time.perf_counter()
+        bool(((df.doctor_name == doctor_name) & (df.starts_at < starts_at + 1800) & (df.ends_at > starts_at)).any())
+        scan.append(time.perf_counter() - t0)
+
+    print(f"{existing:,} bookings | index build {build:.2f} s | conflict check p50 {statistics.median(timings) * 1e6:.1f} µs, "
+          f"p99 {_percentile(timings, 0.99) * 1e6:.1f} µs ({conflicts / checks:.0%} conflicts) | table scan p50 {statistics.median(scan) * 1e3:.1f} ms")
+
+def _race_worker(ledger_path, sessions, slots, barrier, results):
+    os.environ["BOOKINGS_LEDGER_PATH"] = ledger_path
+    from concurrent.futures import ThreadPoolExecutor
+    from app import tools
+
+    def session(session_id):
+        rng = random.Random(session_id)
+        barrier.wait()
+        shown = tools.hold_slots(RACE_DOCTOR, slots, session_id, is_new_patient=False)
+        choice = rng.choice(shown) if shown else rng.choice(slots)  # Some patients pick a stale slot
+        result = tools.book_appointment.invoke(
+            {"patient_name": f"Patient {session_id}", "doctor_name": RACE_DOCTOR, "appointment_time": choice, "is_new_patient": False},
+            config={"configurable": {"thread_id": session_id}},
+        )
+        return session_id, len(shown), choice, str(result)
+
+    with ThreadPoolExecutor(len(sessions)) as pool:
+        results.put(list(pool.map(session, sessions)))
+
+def race(sessions, num_slots):
+    day = datetime(2026, 11, 2, 8, 0)
+    slots = [(day + timedelta(minutes=30 * i)).strftime(SLOT_FORMAT) for i in range(num_slots)]
+    with tempfile.TemporaryDirectory() as workdir:
+        ledger_path = os.path.join(workdir, "bookings.db")
+        ctx = multiprocessing.get_context("spawn")
+        barrier, results = ctx.Barrier(sessions), ctx.Queue()
+        workers = [ctx.Process(target=_race_worker, args=(ledger_path, [f"session-{s}" for s in range(p, sessions, PROCESSES)], slots, barrier, results))
+                   for p in range(PROCESSES)]
+        for worker in workers:
+            worker.start()
+        outcomes = [outcome for _ in workers for outcome in results.get()]
+        for worker in workers:
+            worker.join()
+
+        from app.bookings import BookingLedger
+        ledger = BookingLedger(ledger_path)
+        booked = [row["appointment_time"] for row in ledger.records() if row["doctor_name"] == RACE_DOCTOR]
+        ledger.close()
+
+    wins = [o for o in outcomes if o[3].startswith("SUCCESS")]
+    rejected = [o for o in outcomes if "no longer available" in o[3]]
+    saw_slots = sum(1 for o in outcomes if o[1])
+    print(f"{sessions} sessions / {num_slots} slots over {PROCESSES} workers | {saw_slots} saw held slots | "
+          f"{len(wins)} booked | {len(rejected)} told the slot was taken")
+    assert len(booked) == len(set(booked)), "a slot was double-booked"
+    assert len(wins) == len(booked) <= num_slots, (len(wins), len(booked))
+    assert len(wins) + len(rejected) == sessions, [o for o in outcomes if o not in wins and o not in rejected][:3]
+    print("✅ No slot was booked twice.")
+
+if __name__ == "__main__":
+    print("--- Starting Reservation Engine Benchmark ---")
+    args = [int(arg) for arg in sys.argv[1:]]
+    existing, sessions, num_slots = args + [1_000_000, 100, 10][len(args):]
+    conflict_latency(existing)
+    race(sessions, num_slots)
+    print("\n--- Benchmark Complete ---")
@@ -0,0 +1,120 @@
+# benchmarks/bench_startup.py
+#
+# Cold start of the API process, measured in fresh interpreters:
+#
+#   1. Import - `python -X importtime -c "import app.main"` without a
+#      GROQ_API_KEY: total import time, the packages it is spent in, and a
+#      check that pandas, NumPy, the Groq client and the LangGraph graph
+#      builder are not imported (they load on first use or in the lifespan).
+#   2. First request - uvicorn started in a new process: time until GET /
+#      answers (imports + lifespan done) and until the first POST /chat (a
+#      fast-path patient lookup, which needs the patient index) returns.
+#
+# Targets (median of `runs`): ready to take requests within READY_TARGET_SECONDS
+# of the process starting, first /chat answered within FIRST_CHAT_TARGET_SECONDS.
+# With the graph, LLM client and stores built at import this was ~2.7 s to ready.
+#
+#   python -m benchmarks.bench_startup [runs]
+
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import requests
+
+READY_TARGET_SECONDS = 2.5
+FIRST_CHAT_TARGET_SECONDS = 3.0
+# Imported on first use only; none of these may load when app.main is imported
+# (requests is not listed: langsmith, under langchain_core, imports it)
+DEFERRED_MODULES = ("pandas", "numpy", "groq", "langchain_groq", "langgraph.graph", "openpyxl")
+FIRST_MESSAGE = "Hi, I'm Jane Doe, born 1990-01-01"
+
+def server_env(workdir):
+    env = {key: value for key, value in os.environ.items() if key != "GROQ_API_KEY"}
+    env.update({
+        "CHECKPOINT_BACKEND": "sqlite",
+        "CHECKPOINT_DB_PATH": os.path.join(workdir, "checkpoints.db"),
+        "BOOKINGS_LEDGER_PATH": os.path.join(workdir, "bookings.db"),
+        "REMINDERS_DB_PATH": os.path.join(workdir, "reminders.db"),
+        "REMINDER_OUTBOX_DIR": os.path.join(workdir, "outbox"),
+        "JOBS_DB_PATH": os.path.join(workdir, "jobs.db"),
+        "LOG_LEVEL": "WARNING",
+    })
+    return env
+
+def import_profile(env):
+    """(total seconds, self seconds per top-level package, modules imported) for `import app.main`."""
+    script = "import sys, app.main; print(' '.join(sys.modules))"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", script], env=env,
+                            capture_output=True, text=True, check=True)
+    total, packages = 0.0, Counter()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        packages[name.strip().split(".")[0]] += int(self_us) / 1e6
+        if not name.startswith("  "):  # Imported by the top-level script itself
+            total += int(cumulative_us) / 1e6
+    return total, packages, set(result.stdout.split())
+
+def cold_start(env):
+    """(seconds until GET / answers, seconds until the first /chat returns) for a new server process."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    base_url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+                               "--port", str(port), "--log-level", "warning"], env=env)
+    try:
+        while True:
+            assert server.poll() is None, "the server exited during startup"
+            try:
+                requests.get(f"{base_url}/", timeout=1).raise_for_status()
+                break
+            except requests.ConnectionError:
+                time.sleep(0.005)
+        ready = time.perf_counter() - start
+        response = requests.post(f"{base_url}/chat", json={"message": FIRST_MESSAGE, "session_id": "startup"}, timeout=30)
+        response.raise_for_status()
+        first_chat = time.perf_counter() - start
+        assert "insurance" in response.json()["response"] or "Welcome back" in response.json()["response"], response.json()
+        return ready, first_chat
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+def main(runs):
+    with tempfile.TemporaryDirectory() as workdir:
+        env = server_env(workdir)
+        total, packages, modules = import_profile(env)
+        top = ", ".join(f"{name} {seconds * 1e3:.0f}" for name, seconds in packages.most_common(6))
+        print(f"import app.main | {total * 1e3:.0f} ms without GROQ_API_KEY | by package (ms): {top}")
+        loaded = [name for name in DEFERRED_MODULES if name in modules]
+        assert not loaded, f"imported by app.main but only needed on first use: {loaded}"
+        print(f"✅ Not imported at startup: {', '.join(DEFERRED_MODULES)}.")
+
+        starts = []
+        for i in range(runs):
+            # A fresh data directory each time: no checkpoints, ledger or jobs to reuse
+            env = server_env(os.path.join(workdir, str(i)))
+            os.makedirs(os.path.join(workdir, str(i)))
+            starts.append(cold_start(env))
+            print(f"run {i + 1} | ready {starts[-1][0] * 1e3:6.0f} ms | first /chat {starts[-1][1] * 1e3:6.0f} ms")
+    ready = statistics.median(start[0] for start in starts)
+    first_chat = statistics.median(start[1] for start in starts)
+    print(f"median | ready {ready * 1e3:.0f} ms (target {READY_TARGET_SECONDS:g} s) | "
+          f"first /chat {first_chat * 1e3:.0f} ms (target {FIRST_CHAT_TARGET_SECONDS:g} s)")
+    assert ready < READY_TARGET_SECONDS, f"cold start to ready took {ready:.2f} s"
+    assert first_chat < FIRST_CHAT_TARGET_SECONDS, f"cold start to the first response took {first_chat:.2f} s"
+    print(f"✅ Ready within {READY_TARGET_SECONDS:g} s of a cold start, first response within {FIRST_CHAT_TARGET_SECONDS:g} s.")
+
+if __name__ == "__main__":
+    print("--- Starting Startup Time Benchmark ---")
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
+    print("\n--- Benchmark Complete ---")
@@ -0,0 +1,111 @@
+# benchmarks/bench_streaming.py
+#
+# Time-to-first-byte of /chat vs. /chat/stream with a stub chat model
+# (benchmarks/fake_llm.py) standing in for Groq. Serves the real FastAPI app
+# with uvicorn on a local port:
+#
+#   python -m benchmarks.bench_streaming [rounds]
+
+import json
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+import uuid
+
+os.environ.setdefault("CHECKPOINT_BACKEND", "memory")
+os.environ.setdefault("DECISION_CACHE_SIZE", "0")  # Every turn should stream from the model
+
+import requests
+import uvicorn
+
+from benchmarks.fake_llm import StubChatModel
+
+FIRST_TOKEN_DELAY = 0.5
+TOKEN_DELAY = 0.03
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(app):
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://127.0.0.1:{port}"
+
+def sse_events(response):
+    """Yields (event, data) pairs from a streaming requests response as they arrive."""
+    buffer = ""
+    for chunk in response.iter_content(chunk_size=None, decode_unicode=True):
+        buffer += chunk
+        while "\n\n" in buffer:
+            raw, buffer = buffer.split("\n\n", 1)
+            fields = dict(line.split(": ", 1) for line in raw.splitlines() if ": " in line)
+            yield fields.get("event"), json.loads(fields.get("data", "{}"))
+
+def measure_blocking(base_url, message):
+    start = time.perf_counter()
+    response = requests.post(f"{base_url}/chat", json={"message": message, "session_id": str(uuid.uuid4())}, stream=True)
+    chunks = response.iter_content(chunk_size=None)
+    first = next(chunks)
+    ttfb = time.perf_counter() - start
+    body = json.loads(first + b"".join(chunks))
+    return ttfb, time.perf_counter() - start, body["response"]
+
+def measure_streaming(base_url, message):
+    start = time.perf_counter()
+    response = requests.post(f"{base_url}/chat/stream", json={"message": message, "session_id": str(uuid.uuid4())}, stream=True)
+    ttfb = first_token = None
+    events, final = [], None
+    for event, data in sse_events(response):
+        now = time.perf_counter() - start
+        ttfb = now if ttfb is None else ttfb
+        if event == "token" and first_token is None:
+            first_token = now
+        if event == "done":
+            final = data["response"]
+        events.append(event)
+    return ttfb, first_token, time.perf_counter() - start, final, events
+
+def run_scenario(base_url, label, message, rounds):
+    blocking = [measure_blocking(base_url, message) for _ in range(rounds)]
+    streaming = [measure_streaming(base_url, message) for _ in range(rounds)]
+    assert all(s[3] == blocking[0][2] for s in streaming), "streamed final response differs from /chat"
+    assert all(s[4][0] == "node" and s[4][-1] == "done" for s in streaming), streaming[0][4]
+    median = lambda values: statistics.median(values) * 1e3
+    print(f"{label}")
+    print(f"  /chat        | TTFB {median([b[0] for b in blocking]):7.1f} ms | "
+          f"first token {median([b[0] for b in blocking]):7.1f} ms | total {median([b[1] for b in blocking]):7.1f} ms")
+    print(f"  /chat/stream | TTFB {median([s[0] for s in streaming]):7.1f} ms | "
+          f"first token {median([s[1] for s in streaming]):7.1f} ms | total {median([s[2] for s in streaming]):7.1f} ms")
+    print(f"  events: {' '.join(streaming[0][4])}")
+    return streaming[0][4]
+
+if __name__ == "__main__":
+    print("--- Starting Streaming TTFB Test ---")
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    from app import agent
+    from app.main import app
+
+    server, base_url = start_server(app)
+    try:
+        # Free-form turn: the fast path falls back and agent_brain answers in text
+        agent.llm_with_tools = StubChatModel(first_token_delay=FIRST_TOKEN_DELAY, token_delay=TOKEN_DELAY)
+        run_scenario(base_url, "LLM reply streamed from agent_brain", "Hello, I'd like to book an appointment", rounds)
+
+        # Tool turn: agent_brain calls search_patient_in_emr, a hardcoded node replies
+        agent.llm_with_tools = StubChatModel(reply="", first_token_delay=FIRST_TOKEN_DELAY, token_delay=TOKEN_DELAY,
+                                             tool_call={"name": "search_patient_in_emr",
+                                                        "args": {"full_name": "Michael Good", "dob": "2011-02-11"}})
+        events = run_scenario(base_url, "Tool call + hardcoded reply", "It's Michael Good, dob is the 11th of Feb 2011", rounds)
+        assert "tool" in events, "expected a tool-finished event"
+        print("✅ /chat/stream sends progress immediately and ends with the same response as /chat.")
+    finally:
+        server.should_exit = True
+    print("\n--- Test Complete ---")
@@ -0,0 +1,139 @@
+# benchmarks/calendly_stub.py
+#
+# A local stand-in for the Calendly REST API, used by the offline benchmarks.
+# It serves `event_type_available_times` with deterministic 30-minute slots,
+# can add artificial latency (per Calendly user too, e.g. one user per doctor),
+# and counts the requests it receives.
+
+import json
+import socket
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class CalendlyStub:
+    """
+    Usage:
+
+        with CalendlyStub(latency=0.05) as stub:
+            os.environ["CALENDLY_API_BASE"] = stub.base_url
+            ...
+            print(stub.calls)
+    """
+
+    def __init__(self, latency: float = 0.0, slots_per_day: int = 16, user_latency: dict = None, user_first_hour: dict = None):
+        self.latency = latency
+        self.slots_per_day = slots_per_day
+        self.user_latency = user_latency or {}          # Calendly user URI -> seconds, instead of `latency`
+        self.user_first_hour = user_first_hour or {}    # Calendly user URI -> hour (UTC) of the day's first slot
+        self.calls = 0
+        self.calls_by_user = Counter()
+        self.max_concurrent = 0
+        self._active = 0
+        self._failures = []  # (status, Retry-After) to answer the next requests with
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def available_times(self, start: datetime, end: datetime, first_hour: float = 9):
+        """Slots every 30 minutes from 09:00 UTC (or `first_hour`), `slots_per_day` per day."""
+        collection = []
+        day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+        while day < end:
+            for i in range(self.slots_per_day):
+                slot = day + timedelta(hours=first_hour, minutes=30 * i)
+                if start <= slot < end:
+                    collection.append({"status": "available", "invitees_remaining": 1,
+                                       "start_time": slot.strftime('%Y-%m-%dT%H:%M:%SZ')})
+            day += timedelta(days=1)
+        return collection
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+
+            def setup(self):
+                super().setup()
+                # Headers and body go out in separate writes; don't let Nagle delay the body
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.calls += 1
+                    stub._active += 1
+                    stub.max_concurrent = max(stub.max_concurrent, stub._active)
+                try:
+                    url = urlparse(self.path)
+                    if url.path != "/event_type_available_times":
+                        self._reply(404, {"message": "Not Found"})
+                        return
+                    query = parse_qs(url.query)
+                    user = query.get("user", [""])[0]
+                    with stub._lock:
+                        stub.calls_by_user[user] += 1
+                    latency = stub.user_latency.get(user, stub.latency)
+                    if latency:
+                        time.sleep(latency)
+                    with stub._lock:
+                        failure = stub._failures.pop(0) if stub._failures else None
+                    if failure:
+                        status, retry_after = failure
+                        self._reply(status, {"message": "Injected failure"},
+                                    {"Retry-After": str(retry_after)} if retry_after is not None else {})
+                        return
+                    start = datetime.fromisoformat(query["start_time"][0].replace("Z", "+00:00"))
+                    end = datetime.fromisoformat(query["end_time"][0].replace("Z", "+00:00"))
+                    self._reply(200, {"collection": stub.available_times(start, end, stub.user_first_hour.get(user, 9))})
+                finally:
+                    with stub._lock:
+                        stub._active -= 1
+
+            def _reply(self, status, payload, headers=None):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # The client timed out and hung up
+
+        return Handler
+
+    def fail_next(self, count: int, status: int = 429, retry_after: int = None):
+        """Answers the next `count` requests with `status`, and a Retry-After if given (e.g. to exercise retries)."""
+        with self._lock:
+            self._failures.extend([(status, retry_after)] * count)
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.calls_by_user.clear()
+            self.max_concurrent = 0
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,167 @@
+# benchmarks/fake_llm.py
+#
+# Stub chat models for benchmarking the agent without calling Groq: one with
+# a configurable time-to-first-token and per-token delay, and one that
+# replays scripted replies and tool calls per conversation. Swap one in with
+#   app.agent.llm_with_tools = StubChatModel(...)
+
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Replies with `reply` (and optionally one tool call), paced like a real
+    model. With `capacity`, the provider serves that many async calls at
+    once and the rest queue, as a rate-limited API would.
+    """
+
+    reply: str = "I can help with that. Could you share your full name and date of birth so I can look you up?"
+    tool_call: Optional[Dict[str, Any]] = None   # {"name": ..., "args": {...}}
+    first_token_delay: float = 0.3
+    token_delay: float = 0.02
+    capacity: Optional[int] = None
+    calls: int = 0
+    waiting: int = 0        # Calls queued for capacity, and the most at once
+    peak_waiting: int = 0
+    _slots: Any = PrivateAttr(default=None)
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _tokens(self) -> List[str]:
+        words = self.reply.split(" ")
+        return [word + " " for word in words[:-1]] + words[-1:]
+
+    def _message(self) -> AIMessage:
+        tool_calls = [{**self.tool_call, "id": f"stub_{self.calls}"}] if self.tool_call else []
+        return AIMessage(content=self.reply, tool_calls=tool_calls)
+
+    @asynccontextmanager
+    async def _serving(self):
+        """Waits for provider capacity (the semaphore belongs to the server's event loop)."""
+        if self.capacity is None:
+            yield
+            return
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.capacity)
+        self.waiting += 1
+        self.peak_waiting = max(self.peak_waiting, self.waiting)
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self.calls += 1
+        time.sleep(self.first_token_delay + self.token_delay * len(self._tokens()))
+        return ChatResult(generations=[ChatGeneration(message=self._message())])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self.calls += 1
+        async with self._serving():
+            await asyncio.sleep(self.first_token_delay + self.token_delay * len(self._tokens()))
+        return ChatResult(generations=[ChatGeneration(message=self._message())])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        async with self._serving():
+            await asyncio.sleep(self.first_token_delay)
+            for token in self._tokens():
+                chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+                if run_manager:
+                    await run_manager.on_llm_new_token(token, chunk=chunk)
+                yield chunk
+                await asyncio.sleep(self.token_delay)
+        if self.tool_call:
+            tool_call_chunk = {"name": self.tool_call["name"], "args": json.dumps(self.tool_call["args"]),
+                               "id": f"stub_{self.calls}", "index": 0}
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[tool_call_chunk]))
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Replays scripted responses per conversation, for deterministic load
+    tests. Before sending a turn, the harness queues what the model should
+    answer with `script(thread_id, responses)`; each call pops the next
+    response for the graph's thread_id. A response is `{"reply": text}` or
+    `{"tool_calls": [{"name": ..., "args": {...}}]}`. A call with nothing
+    queued gets `fallback` and is counted in `unscripted`.
+    """
+
+    latency: float = 0.3
+    fallback: str = "Could you tell me a bit more about what you would like to do?"
+    calls: int = 0
+    unscripted: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    _queues: Dict[str, Deque[Dict[str, Any]]] = PrivateAttr(default_factory=dict)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def script(self, thread_id: str, responses: List[Dict[str, Any]]):
+        """Queues the responses for the next calls made on `thread_id` (called from any thread)."""
+        with self._lock:
+            self._queues.setdefault(thread_id, deque()).extend(responses)
+
+    def reset(self):
+        """Drops every queued response."""
+        with self._lock:
+            self._queues.clear()
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def _next(self, messages, run_manager) -> AIMessage:
+        thread_id = (run_manager.metadata if run_manager else {}).get("thread_id")
+        with self._lock:
+            self.calls += 1
+            queue = self._queues.get(thread_id)
+            response = queue.popleft() if queue else None
+            if queue is not None and not queue:
+                del self._queues[thread_id]
+            if response is None:
+                self.unscripted += 1
+                response = {"reply": self.fallback}
+            tool_calls = [{**call, "id": f"scripted_{self.calls}_{i}"} for i, call in enumerate(response.get("tool_calls", []))]
+            content = response.get("reply", "")
+            # About four characters per token, so counts are stable between runs
+            usage = {"input_tokens": sum(len(str(m.content)) for m in messages) // 4,
+                     "output_tokens": (len(content) + len(json.dumps(tool_calls))) // 4}
+            usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+            self.input_tokens += usage["input_tokens"]
+            self.output_tokens += usage["output_tokens"]
+        return AIMessage(content=content, tool_calls=tool_calls, usage_metadata=usage)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._next(messages, run_manager))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._next(messages, run_manager))])
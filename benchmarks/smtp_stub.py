@@ -0,0 +1,92 @@
+# benchmarks/smtp_stub.py
+#
+# A local stand-in for an SMTP provider, used by the offline benchmarks. It
+# speaks just enough SMTP for smtplib, can be made deliberately slow (the
+# reply to each message is delayed) and can reject the next messages.
+
+import socketserver
+import threading
+import time
+
+
+class SmtpStub:
+    """
+    Usage:
+
+        with SmtpStub(latency=2.0) as stub:
+            os.environ["SMTP_HOST"], os.environ["SMTP_PORT"] = stub.host, str(stub.port)
+            ...
+            print(len(stub.messages))
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.messages = []
+        self._failures = 0  # Messages to reject next
+        self._lock = threading.Lock()
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def host(self) -> str:
+        return self._server.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line: str):
+                self.wfile.write(f"{line}\r\n".encode())
+
+            def handle(self):
+                self.reply("220 smtp-stub ESMTP")
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    command = line[:4].upper()
+                    if command in (b"EHLO", b"HELO"):
+                        self.reply("250 smtp-stub")
+                    elif command in (b"MAIL", b"RCPT", b"RSET", b"NOOP"):
+                        self.reply("250 OK")
+                    elif command == b"DATA":
+                        self.reply("354 End data with <CR><LF>.<CR><LF>")
+                        body = []
+                        for data in self.rfile:
+                            if data in (b".\r\n", b".\n"):
+                                break
+                            body.append(data)
+                        if stub.latency:
+                            time.sleep(stub.latency)
+                        with stub._lock:
+                            failing = stub._failures > 0
+                            stub._failures -= failing
+                            if not failing:
+                                stub.messages.append(b"".join(body).decode(errors="replace"))
+                        self.reply("554 Injected failure" if failing else "250 OK queued")
+                    elif command == b"QUIT":
+                        self.reply("221 Bye")
+                        return
+                    else:
+                        self.reply("502 Command not implemented")
+
+        return Handler
+
+    def fail_next(self, count: int):
+        """Rejects the next `count` messages with a 554 (e.g. to exercise retries)."""
+        with self._lock:
+            self._failures += count
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
@@ -13,35 +13,45 @@ NUM_PATIENTS = 50
 # --- Initialize Faker ---
 fake = Faker()
 
-# --- Create Directory ---
-os.makedirs(DATA_DIR, exist_ok=True)
-
-# --- Generate Doctor Schedules ---
-print("Generating doctor schedules...")
-doctors_data = {
-    'name': ['Dr. Adams', 'Dr. Chen', 'Dr. Patel', 'Dr. Lee'],
-    'specialty': ['General Health', 'Cardiology', 'Orthopedics', 'Pediatrics']
-}
-doctors_df = pd.DataFrame(doctors_data)
-doctors_df.to_excel(DOCTOR_SCHEDULE_PATH, index=False)
-print(f"✅ Doctor schedules saved to {DOCTOR_SCHEDULE_PATH}")
-
-# --- Generate Patient Database ---
-print(f"Generating {NUM_PATIENTS} synthetic patients...")
-patients = []
-doctor_names = doctors_df['name'].tolist()
-
-for _ in range(NUM_PATIENTS):
-    patients.append({
-        'name': fake.name(),
-        'dob': fake.date_of_birth(minimum_age=1, maximum_age=90).strftime('%Y-%m-%d'),
-        'email': fake.email(),
-        'phone': fake.phone_number(),
-        'last_visit_doctor': random.choice(doctor_names)
-    })
-
-patients_df = pd.DataFrame(patients)
-patients_df.to_csv(PATIENT_DB_PATH, index=False)
-print(f"✅ Patient database saved to {PATIENT_DB_PATH}")
-
-print("\nData generation complete!")
\ No newline at end of file
+def generate_doctors():
+    """Builds the doctor schedule table."""
+    doctors_data = {
+        'name': ['Dr. Adams', 'Dr. Chen', 'Dr. Patel', 'Dr. Lee'],
+        'specialty': ['General Health', 'Cardiology', 'Orthopedics', 'Pediatrics'],
+        'availability': ['Monday, Wednesday', 'Tuesday, Thursday', 'Monday-Friday', 'Monday-Saturday'],
+        'hours': ['09:00-17:00', '08:00-16:00', '09:00-17:00', '10:00-18:00'],
+        'breaks': ['12:00-13:00', '12:00-12:30', '12:30-13:30', 'none'],
+        'time_off': ['', '', '', '']
+    }
+    return pd.DataFrame(doctors_data)
+
+def generate_patients(num_patients, doctor_names):
+    """Builds a table of `num_patients` synthetic patients."""
+    patients = []
+    for _ in range(num_patients):
+        patients.append({
+            'name': fake.name(),
+            'dob': fake.date_of_birth(minimum_age=1, maximum_age=90).strftime('%Y-%m-%d'),
+            'email': fake.email(),
+            'phone': fake.phone_number(),
+            'last_visit_doctor': random.choice(doctor_names)
+        })
+    return pd.DataFrame(patients)
+
+if __name__ == "__main__":
+    # --- Create Directory ---
+    os.makedirs(DATA_DIR, exist_ok=True)
+
+    # --- Generate Doctor Schedules ---
+    print("Generating doctor schedules...")
+    doctors_df = generate_doctors()
+    doctors_df.to_excel(DOCTOR_SCHEDULE_PATH, index=False)
+    print(f"✅ Doctor schedules saved to {DOCTOR_SCHEDULE_PATH}")
+
+    # --- Generate Patient Database ---
+    print(f"Generating {NUM_PATIENTS} synthetic patients...")
+    patients_df = generate_patients(NUM_PATIENTS, doctors_df['name'].tolist())
+    patients_df.to_csv(PATIENT_DB_PATH, index=False)
+    print(f"✅ Patient database saved to {PATIENT_DB_PATH}")
+
+    print("\nData generation complete!")
@@ -0,0 +1,104 @@
+# tests/test_availability_cache.py
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.calendly import AvailabilityCache, CalendlyClient
+from benchmarks.calendly_stub import CalendlyStub
+
+USER, EVENT = "https://api.calendly.com/users/dr-adams", "https://api.calendly.com/event_types/30min"
+SLOTS = ["2030-01-07T09:00:00Z", "2030-01-07T09:30:00Z"]
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def counting_fetch(delay=0.0):
+    calls = []
+
+    def fetch(user_uri, event_type_uri):
+        calls.append((user_uri, event_type_uri))
+        time.sleep(delay)
+        return list(SLOTS)
+    return fetch, calls
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = AvailabilityCache(ttl_seconds=30)
+    fetch, calls = counting_fetch(delay=0.05)
+    results = [None] * 20
+
+    def worker(i):
+        results[i] = cache.get(USER, EVENT, fetch)
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(results))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1 and results == [SLOTS] * len(results)
+
+
+def test_entries_expire_and_are_invalidated():
+    clock = Clock()
+    cache = AvailabilityCache(ttl_seconds=30, clock=clock)
+    fetch, calls = counting_fetch()
+    cache.get(USER, EVENT, fetch)
+    clock.now += 29
+    cache.get(USER, EVENT, fetch)
+    assert len(calls) == 1
+    clock.now += 2
+    cache.get(USER, EVENT, fetch)
+    assert len(calls) == 2
+    cache.invalidate()
+    cache.get(USER, EVENT, fetch)
+    assert len(calls) == 3
+
+
+def test_keys_are_per_user_and_event_type():
+    cache = AvailabilityCache(ttl_seconds=30)
+    fetch, calls = counting_fetch()
+    for user_uri, event_type_uri in ((USER, EVENT), (USER, f"{EVENT}-60"), (f"{USER}-2", EVENT), (USER, EVENT)):
+        cache.get(user_uri, event_type_uri, fetch)
+    assert len(calls) == 3
+
+
+def test_failed_fetch_reaches_every_waiter_and_is_not_cached():
+    cache = AvailabilityCache(ttl_seconds=30)
+    attempts = []
+
+    async def failing(user_uri, event_type_uri):
+        attempts.append(user_uri)
+        await asyncio.sleep(0.05)
+        raise RuntimeError("Calendly is down")
+
+    async def run():
+        return await asyncio.gather(*(cache.aget(USER, EVENT, failing) for _ in range(5)), return_exceptions=True)
+    results = asyncio.run(run())
+    assert len(attempts) == 1 and all(isinstance(result, RuntimeError) for result in results)
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.aget(USER, EVENT, failing))
+    assert len(attempts) == 2
+
+
+def test_concurrent_lookups_against_the_stub_make_one_upstream_call():
+    cache = AvailabilityCache(ttl_seconds=30)
+
+    async def run(stub):
+        client = CalendlyClient(stub.base_url, "test-key")
+        try:
+            return await asyncio.gather(*(cache.aget(USER, EVENT, client.available_times) for _ in range(50)))
+        finally:
+            await client.aclose()
+
+    with CalendlyStub(latency=0.05) as stub:
+        results = asyncio.run(run(stub))
+        assert stub.calls == 1
+    assert results[0] and all(result == results[0] for result in results)
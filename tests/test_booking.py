@@ -0,0 +1,99 @@
+# tests/test_booking.py
+#
+# book_appointment against a ledger and reservation book in a temporary
+# directory; data/ is never touched.
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from app import tools
+from app.bookings import BookingLedger, appointment_timestamp, idempotency_key
+from app.intents import classify_turn
+from app.reservations import ReservationBook
+from app.results import Booking, ToolError
+
+SLOT = "Monday, September 08, 2025 at 10:00 AM"
+HALF_PAST = "Monday, September 08, 2025 at 10:30 AM"
+
+
+@pytest.fixture
+def ledger(tmp_path, monkeypatch):
+    ledger = BookingLedger(str(tmp_path / "bookings.db"))
+    monkeypatch.setattr(tools, "booking_ledger", ledger)
+    monkeypatch.setattr(tools, "reservation_book", ReservationBook())
+    yield ledger
+    ledger.close()
+
+
+def book(session_id, patient_name="Ana Lopez", doctor_name="Dr. Smith", appointment_time=SLOT, is_new_patient=False):
+    args = {"patient_name": patient_name, "doctor_name": doctor_name, "appointment_time": appointment_time,
+            "is_new_patient": is_new_patient}
+    return tools.book_appointment.invoke(args, config={"configurable": {"thread_id": session_id}})
+
+
+def test_idempotency_key_includes_the_doctor():
+    assert idempotency_key("s1", "Dr. Smith", SLOT) != idempotency_key("s1", "Dr. Jones", SLOT)
+    assert idempotency_key(None, "Dr. Smith", SLOT) != idempotency_key(None, "Dr. Smith", SLOT)
+
+
+def test_retry_confirms_the_original_booking_once(ledger):
+    first, retry = book("s1"), book("s1")
+    assert isinstance(first, Booking) and isinstance(retry, Booking)
+    assert len(ledger) == 1
+
+
+def test_same_slot_with_another_doctor_is_a_new_booking(ledger):
+    assert isinstance(book("s1", doctor_name="Dr. Smith"), Booking)
+    assert isinstance(book("s1", doctor_name="Dr. Jones"), Booking)
+    assert [r["doctor_name"] for r in ledger.records()] == ["Dr. Smith", "Dr. Jones"]
+
+
+def test_retry_for_another_patient_is_not_confirmed(ledger):
+    assert isinstance(book("s1", patient_name="Ana Lopez"), Booking)
+    result = book("s1", patient_name="Ben Lopez")
+    assert isinstance(result, ToolError)
+    assert [r["patient_name"] for r in ledger.records()] == ["Ana Lopez"]
+
+
+def test_another_session_cannot_take_a_booked_slot(ledger):
+    assert isinstance(book("s1"), Booking)
+    assert isinstance(book("s2", patient_name="Ben Lopez"), ToolError)
+    assert len(ledger) == 1
+
+
+def test_new_patient_booking_without_a_hold_takes_an_hour(ledger):
+    assert isinstance(book("s1", is_new_patient=True), Booking)
+    assert isinstance(book("s2", patient_name="Ben Lopez", appointment_time=HALF_PAST), ToolError)
+    starts_at = appointment_timestamp(SLOT)
+    assert [b.ends_at - b.starts_at for b in ledger.bookings_between("Dr. Smith", starts_at, starts_at + 3600)] == [3600]
+
+
+def test_held_slot_is_kept_for_its_session(ledger):
+    assert tools.hold_slots("Dr. Smith", [SLOT, HALF_PAST], "s1", is_new_patient=False) == [SLOT, HALF_PAST]
+    assert tools.hold_slots("Dr. Smith", [SLOT, HALF_PAST], "s2", is_new_patient=False) == []
+    assert isinstance(book("s2", patient_name="Ben Lopez"), ToolError)
+    assert isinstance(book("s1"), Booking)
+    # Booking releases the session's other holds
+    assert tools.hold_slots("Dr. Smith", [SLOT, HALF_PAST], "s2", is_new_patient=False) == [HALF_PAST]
+
+
+def test_sessions_racing_for_few_slots_book_each_once(ledger):
+    slots = [SLOT, HALF_PAST, "Monday, September 08, 2025 at 11:00 AM"]
+
+    def session(i):
+        return book(f"s{i}", patient_name=f"Patient {i}", appointment_time=slots[i % len(slots)])
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(session, range(30)))
+    assert sum(isinstance(r, Booking) for r in results) == len(slots)
+    assert sorted(r["appointment_time"] for r in ledger.records()) == sorted(slots)
+
+
+def test_fast_path_books_for_the_patient_type():
+    state = {"patient_info": {"full_name": "Ana Lopez"}, "insurance_info": "Not Provided", "doctor_name": "Dr. Smith",
+             "available_slots": [SLOT], "messages": [HumanMessage(content="10:00 AM please")]}
+    for status, is_new_patient in (("NEW", True), ("RETURNING", False)):
+        intent = classify_turn({**state, "patient_status": status})
+        assert intent.tool_calls[0]["args"]["is_new_patient"] is is_new_patient
@@ -0,0 +1,56 @@
+# tests/test_calendly_client.py
+
+import asyncio
+import time
+
+import httpx
+
+from app.calendly import CalendlyClient
+from benchmarks.calendly_stub import CalendlyStub
+
+USER, EVENT = "https://api.calendly.com/users/dr-adams", "https://api.calendly.com/event_types/30min"
+
+
+def fetch(stub, **options):
+    """(seconds, result or exception) for one available_times call."""
+    async def run():
+        client = CalendlyClient(stub.base_url, "test-key", **options)
+        try:
+            return await client.available_times(USER, EVENT)
+        finally:
+            await client.aclose()
+    start = time.perf_counter()
+    try:
+        result = asyncio.run(run())
+    except Exception as e:
+        result = e
+    return time.perf_counter() - start, result
+
+
+def test_transient_failures_are_retried():
+    with CalendlyStub() as stub:
+        stub.fail_next(2, status=503)
+        _, result = fetch(stub, backoff_seconds=0.01)
+        assert stub.calls == 3 and result
+
+
+def test_retry_after_is_capped():
+    with CalendlyStub() as stub:
+        stub.fail_next(1, status=429, retry_after=3600)
+        seconds, result = fetch(stub, max_retry_delay=0.2)
+        assert stub.calls == 2 and result and seconds < 2
+
+
+def test_retries_stop_at_the_budget():
+    with CalendlyStub() as stub:
+        stub.fail_next(100, status=503, retry_after=1)
+        seconds, result = fetch(stub, timeout=0.5, max_retries=100, retry_budget_seconds=3)
+        assert isinstance(result, httpx.HTTPStatusError) and result.response.status_code == 503
+        assert seconds <= 3 and stub.calls == 3  # Attempts at 0, 1 and 2 s; a fourth could end after 3.5 s
+
+
+def test_timed_out_requests_are_not_retried_past_the_budget():
+    with CalendlyStub(latency=0.5) as stub:
+        seconds, result = fetch(stub, timeout=0.2, max_retries=100, backoff_seconds=0.01, retry_budget_seconds=0.6)
+        assert isinstance(result, httpx.TimeoutException)
+        assert seconds < 1 and stub.calls == 2
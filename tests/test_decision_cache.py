@@ -0,0 +1,36 @@
+# tests/test_decision_cache.py
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.decisions import DecisionCache
+
+
+def state(name, dob, text):
+    return {"patient_status": "RETURNING", "patient_info": {"full_name": name, "dob": dob},
+            "messages": [HumanMessage(content=text)]}
+
+
+def test_reply_with_a_patient_detail_is_not_cached():
+    cache = DecisionCache()
+    decision = cache.decision(state("Ana Lopez", "1990-04-02", "what is on file for me?"), "test")
+    reply = AIMessage(content="Ana Lopez, your insurance on file is Aetna, member ID AET123456.")
+    assert not cache.put(decision, reply, 0.1)
+    assert cache.get(decision) is None and cache.stats["uncacheable"] == 1
+
+
+def test_free_form_reply_is_not_cached():
+    cache = DecisionCache()
+    decision = cache.decision(state("Ana Lopez", "1990-04-02", "hello"), "test")
+    assert not cache.put(decision, AIMessage(content="Could you tell me a bit more so I can help with that?"), 0.1)
+
+
+def test_tool_calls_are_filled_in_for_the_next_patient():
+    cache = DecisionCache()
+    call = {"name": "search_patient_in_emr", "id": "x", "args": {"full_name": "Ana Lopez", "dob": "1990-04-02"}}
+    first = cache.decision(state("Ana Lopez", "1990-04-02", "I'm Ana Lopez, born 1990-04-02"), "test")
+    assert cache.put(first, AIMessage(content="", tool_calls=[call]), 0.1)
+
+    second = cache.decision(state("Ben Ortiz", "1985-11-30", "I'm Ben Ortiz, born 1985-11-30"), "test")
+    assert second.key == first.key
+    hit = cache.get(second)
+    assert hit.content == "" and hit.tool_calls[0]["args"] == {"full_name": "Ben Ortiz", "dob": "1985-11-30"}
@@ -0,0 +1,154 @@
+# tests/test_fanout.py
+#
+# find_first_available against the local Calendly stub, every doctor a
+# Calendly user with their own latency; first_available's stopping rule
+# against fake lookups that sleep for a set latency.
+
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+
+from app import tools
+from app.bookings import BookingLedger
+from app.calendly import AvailabilityCache
+from app.doctors import DoctorDirectory
+from app.fanout import Slot, earliest, first_available
+from app.reservations import ReservationBook
+from benchmarks.bench_first_available import sequential
+from benchmarks.calendly_stub import CalendlyStub
+
+CONFIG = {"configurable": {"thread_id": "fanout"}}
+# Per doctor: Calendly latency (s) and hour (UTC) of each day's first slot
+LATENCIES = [(0.10, 11), (0.30, 9.5), (0.15, 10), (0.35, 13), (0.20, 9), (0.25, 12)]
+SLOW_LATENCY = 1.0
+
+
+@pytest.fixture
+def stub(tmp_path, monkeypatch):
+    with CalendlyStub() as stub:
+        monkeypatch.setattr(tools, "booking_ledger", BookingLedger(str(tmp_path / "bookings.db")))
+        monkeypatch.setattr(tools, "reservation_book", ReservationBook())
+        monkeypatch.setattr(tools, "availability_engine", None)
+        monkeypatch.setattr(tools, "availability_cache", AvailabilityCache(ttl_seconds=30))
+        monkeypatch.setattr(tools, "_calendly_client", None)
+        monkeypatch.setattr(tools, "CALENDLY_API_BASE", stub.base_url)
+        monkeypatch.setattr(tools, "CALENDLY_API_KEY", "stub-key")
+        monkeypatch.setattr(tools, "AVAILABILITY_SOURCE", "calendly")
+        for minutes in (30, 60):
+            monkeypatch.setenv(f"CALENDLY_EVENT_TYPE_{minutes}_MIN_URI", f"{stub.base_url}/event_types/{minutes}min")
+        yield stub
+        tools.booking_ledger.close()
+
+
+def doctors(stub, tmp_path, monkeypatch, latencies, slow=0):
+    """A doctor workbook with one Calendly user per doctor; the last `slow` are slow and off for three days."""
+    today = datetime.now(timezone.utc).date()
+    rows = []
+    for i, (latency, first_hour) in enumerate(latencies + [(SLOW_LATENCY, 9)] * slow):
+        user_uri = f"{stub.base_url}/users/doctor-{i}"
+        stub.user_latency[user_uri], stub.user_first_hour[user_uri] = latency, first_hour
+        off = f"{today.isoformat()}..{(today + timedelta(days=3)).isoformat()}" if i >= len(latencies) else ""
+        rows.append({"name": f"Dr. Stub {i}", "specialty": "Cardiology", "availability": "Monday-Sunday",
+                     "hours": "08:00-18:00", "breaks": "none", "time_off": off, "calendly_user_uri": user_uri})
+    pd.DataFrame(rows).to_excel(tmp_path / "doctors.xlsx", index=False)
+    monkeypatch.setattr(tools, "doctor_directory", DoctorDirectory(str(tmp_path / "doctors.xlsx")))
+    return [row["name"] for row in rows]
+
+
+def search(stub, names, is_new_patient=False):
+    """(seconds, find_first_available's slots, the slots a one-by-one search finds)."""
+    async def run():
+        try:
+            expected = await sequential(tools, names, is_new_patient)  # Also warms the pooled connections
+            tools.availability_cache.invalidate()
+            stub.reset()
+            start = time.perf_counter()
+            result = await tools.find_first_available.ainvoke({"is_new_patient": is_new_patient}, config=CONFIG)
+            return time.perf_counter() - start, result.slots, expected
+        finally:
+            await tools.close_calendly_client()
+    return asyncio.run(run())
+
+
+def test_latency_is_the_slowest_calendly_lookup_not_the_sum(stub, tmp_path, monkeypatch):
+    names = doctors(stub, tmp_path, monkeypatch, LATENCIES)
+    elapsed, slots, expected = search(stub, names)
+    slowest = max(latency for latency, _ in LATENCIES)
+    assert slots and slots == expected
+    assert stub.max_concurrent == len(names)
+    assert elapsed < slowest * 1.3 + 0.1, f"{elapsed:.2f} s; slowest lookup {slowest} s"
+
+
+def test_concurrency_is_capped(stub, tmp_path, monkeypatch):
+    names = doctors(stub, tmp_path, monkeypatch, LATENCIES)
+    monkeypatch.setattr(tools, "FIRST_AVAILABLE_CONCURRENCY", 2)
+    elapsed, slots, expected = search(stub, names)
+    assert slots == expected and stub.max_concurrent == 2
+    assert elapsed > max(latency for latency, _ in LATENCIES)
+
+
+def test_overlay_stops_before_slow_doctors_who_cannot_be_earlier(stub, tmp_path, monkeypatch):
+    names = doctors(stub, tmp_path, monkeypatch, LATENCIES, slow=2)
+    monkeypatch.setattr(tools, "AVAILABILITY_SOURCE", "overlay")
+    elapsed, slots, expected = search(stub, names, is_new_patient=True)
+    assert slots and slots == expected
+    assert elapsed < SLOW_LATENCY, f"{elapsed:.2f} s; the slow doctors take {SLOW_LATENCY} s"
+
+
+class Lookups:
+    """fetch(name) for doctors given as {name: (latency, start times)}; records peak concurrency."""
+
+    def __init__(self, doctors):
+        self.doctors = doctors
+        self.in_flight = self.peak = 0
+        self.cancelled = []
+
+    async def fetch(self, name):
+        latency, starts = self.doctors[name]
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(latency)
+            if isinstance(starts, Exception):
+                raise starts
+            return starts
+        except asyncio.CancelledError:
+            self.cancelled.append(name)
+            raise
+        finally:
+            self.in_flight -= 1
+
+
+def run(lookups, limit, **kwargs):
+    start = time.perf_counter()
+    result = asyncio.run(first_available(list(lookups.doctors), lookups.fetch, limit, **kwargs))
+    return result, time.perf_counter() - start
+
+
+def test_earliest_merges_and_breaks_ties_by_listing_order():
+    slots = earliest({"B": [10, 30], "A": [10, 20], "C": []}, 3)
+    assert slots == [Slot(10, "B"), Slot(10, "A"), Slot(20, "A")]
+
+
+def test_stops_once_no_unanswered_doctor_can_beat_the_slots_found():
+    lookups = Lookups({"Fast": (0.01, [100, 200]), "Slow": (1.0, [500]), "Slower": (2.0, [600])})
+    result, elapsed = run(lookups, 2, lower_bounds={"Fast": 100, "Slow": 500, "Slower": 600})
+    assert result.slots == [Slot(100, "Fast"), Slot(200, "Fast")]
+    assert result.answered == 1 and result.skipped == 2
+    assert sorted(lookups.cancelled) == ["Slow", "Slower"] and elapsed < 0.5
+
+
+def test_waits_for_a_slow_doctor_who_could_be_earlier():
+    lookups = Lookups({"Fast": (0.01, [300]), "Slow": (0.2, [100])})
+    result, _ = run(lookups, 1, lower_bounds={"Fast": 300, "Slow": 50})
+    assert result.slots == [Slot(100, "Slow")] and not lookups.cancelled
+
+
+def test_failed_lookup_is_left_out():
+    error = RuntimeError("Calendly is down")
+    lookups = Lookups({"Down": (0.01, error), "Up": (0.02, [100])})
+    result, _ = run(lookups, 2)
+    assert result.slots == [Slot(100, "Up")] and result.errors == {"Down": error}
@@ -0,0 +1,96 @@
+# tests/test_fast_path.py
+
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from app import agent
+from app.intents import classify_turn, find_full_name, find_insurance
+from app.results import Booking, ToolError
+
+SLOTS = ["Monday, October 19, 2026 at 09:00 AM", "Monday, October 19, 2026 at 09:30 AM"]
+
+
+def classify(text, **state):
+    return classify_turn({**state, "messages": [HumanMessage(content=text)]})
+
+
+def served(intent):
+    return intent is not None and intent.confidence >= agent.FAST_PATH_MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize("text", [
+    "Need appointment 10/20/2025",
+    "Book appointment tomorrow 2026-10-19",
+    "My name is John Smith, born 2031-01-01",  # A DOB in the future
+])
+def test_messages_that_are_not_a_name_and_dob_go_to_the_llm(text):
+    assert not served(classify(text))
+
+
+def test_bare_name_is_left_to_the_llm():
+    assert find_full_name("Robert Martinez, 1977-05-14") == ("Robert Martinez", 0.75)
+    intent = classify("Robert Martinez, 1977-05-14")
+    assert intent.label == "patient_lookup" and not served(intent)
+
+
+def test_introduced_name_is_served():
+    intent = classify("Hi, my name is Michael Good and my DOB is 2011-02-11")
+    assert served(intent) and intent.tool_calls[0]["args"] == {"full_name": "Michael Good", "dob": "2011-02-11"}
+
+
+class FailingBooking:
+    name = "book_appointment"
+
+    async def ainvoke(self, args, config=None):
+        return ToolError(f"ERROR: {args['appointment_time']} with {args['doctor_name']} is no longer available.")
+
+
+def pick(state, text):
+    """One slot-pick turn through fast_path and call_tool; returns the new state."""
+    state = {**state, "messages": state["messages"] + [HumanMessage(content=text)]}
+    updates = agent.fast_path(state)
+    assert isinstance(updates["messages"][-1], AIMessage) and "confirmed_time" not in updates
+    state = {**state, **updates, "messages": state["messages"] + updates["messages"]}
+    updates = asyncio.run(agent.call_tool_and_update_state(state, {"configurable": {"thread_id": "t"}}))
+    return {**state, **updates, "messages": state["messages"] + updates["messages"]}
+
+
+def test_failed_booking_leaves_the_slot_pick_open(monkeypatch):
+    monkeypatch.setitem(agent.tool_map, "book_appointment", FailingBooking())
+    state = {"patient_status": "NEW", "patient_info": {"full_name": "Ada Lovelace"}, "insurance_info": "Not Provided",
+             "doctor_name": "Dr. Adams", "available_slots": SLOTS, "messages": []}
+    state = pick(state, "9:00 AM please")
+    assert not state.get("confirmed_time")
+    # The next pick is still served by the fast path
+    assert classify_turn({**state, "messages": state["messages"] + [HumanMessage(content="9:30 AM then")]}).label == "slot_pick"
+
+
+def test_successful_booking_sets_the_confirmed_time():
+    updates = Booking("Ada Lovelace", "Dr. Adams", SLOTS[0]).state_updates({})
+    assert updates == {"doctor_name": "Dr. Adams", "confirmed_time": SLOTS[0]}
+
+
+def test_returning_patient_without_a_last_doctor_gets_the_doctor_list():
+    lookup = AIMessage(content="", tool_calls=[{"name": "search_patient_in_emr", "args": {}, "id": "emr"}])
+    state = {"patient_status": "RETURNING", "doctor_name": None, "messages": [lookup, ToolMessage(content="SUCCESS", tool_call_id="emr")]}
+    assert agent.router(state) == "call_get_doctor_list"
+    assert agent.router({**state, "doctor_name": "Dr. Adams"}) == "ask_or_confirm_doctor"
+
+    doctors = [{"name": "Dr. Adams", "specialty": "Cardiology"}]
+    reply = agent.ask_or_confirm_doctor({**state, "doctor_list": doctors})["messages"][0].content
+    assert "- Dr. Adams (Cardiology)" in reply
+    intent = classify("Dr. Adams please", patient_status="RETURNING", doctor_list=doctors)
+    assert intent.label == "doctor_pick" and intent.tool_calls[0]["args"]["doctor_name"] == "Dr. Adams"
+
+
+def test_doctor_question_survives_a_missing_list():
+    assert agent.ask_or_confirm_doctor({"patient_status": "RETURNING", "doctor_list": None})["messages"]
+
+
+def test_insurance_details_are_parsed_once_for_both_callers():
+    assert find_insurance("Aetna, member ID AET123456, group G-77") == \
+        {"carrier": "Aetna", "member_id": "AET123456", "group_number": "G-77"}
+    intent = classify("Aetna, member ID AET123456, group G-77", patient_status="NEW")
+    assert intent.label == "insurance_details" and intent.tool_calls[0]["args"]["group_number"] == "G-77"
@@ -0,0 +1,112 @@
+# tests/test_multiworker.py
+#
+# Two "workers" in one process: each has its own checkpointer and lock
+# manager, sharing the SQLite database and the lock directory as separate
+# uvicorn workers would.
+
+import asyncio
+import operator
+import os
+import subprocess
+import sys
+from typing import Annotated, List, TypedDict
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import END, StateGraph
+
+from app.checkpoint import SqliteCheckpointSaver, create_checkpointer
+from app.locks import SessionLockManager
+
+
+class TurnState(TypedDict):
+    messages: Annotated[List, operator.add]
+
+
+def build_graph(db_path):
+    async def respond(state: TurnState):
+        await asyncio.sleep(0.005)  # Lets other turns interleave
+        return {"messages": [AIMessage(content=f"reply to {state['messages'][-1].content}")]}
+
+    workflow = StateGraph(TurnState)
+    workflow.add_node("respond", respond)
+    workflow.set_entry_point("respond")
+    workflow.add_edge("respond", END)
+    return workflow.compile(checkpointer=SqliteCheckpointSaver(db_path, shared=True))
+
+
+def config(session_id):
+    return {"configurable": {"thread_id": session_id}}
+
+
+def test_workers_see_each_others_turns(tmp_path):
+    db_path = str(tmp_path / "checkpoints.db")
+    first, second = build_graph(db_path), build_graph(db_path)
+
+    async def run():
+        await first.ainvoke({"messages": [HumanMessage(content="one")]}, config("s"))
+        await second.ainvoke({"messages": [HumanMessage(content="two")]}, config("s"))
+        await first.ainvoke({"messages": [HumanMessage(content="three")]}, config("s"))  # Its cached checkpoint is stale
+    asyncio.run(run())
+    humans = [m.content for m in second.get_state(config("s")).values["messages"] if m.type == "human"]
+    assert humans == ["one", "two", "three"]
+
+
+def test_session_locks_prevent_lost_updates(tmp_path):
+    db_path, lock_dir = str(tmp_path / "checkpoints.db"), str(tmp_path / "locks")
+    workers = [(build_graph(db_path), SessionLockManager(lock_dir=lock_dir)) for _ in range(4)]
+    sessions, turns = ["a", "b", "c"], 8
+
+    async def turn(worker, session_id, n):
+        graph, locks = worker
+        async with locks.hold(session_id):
+            await graph.ainvoke({"messages": [HumanMessage(content=f"{session_id}-{n}")]}, config(session_id))
+
+    async def run():
+        await asyncio.gather(*(turn(workers[n % len(workers)], session_id, n) for session_id in sessions for n in range(turns)))
+    asyncio.run(run())
+    for session_id in sessions:
+        messages = workers[0][0].get_state(config(session_id)).values["messages"]
+        humans = sorted(m.content for m in messages if m.type == "human")
+        assert humans == sorted(f"{session_id}-{n}" for n in range(turns))
+        assert len(messages) == 2 * turns
+
+
+def test_file_lock_excludes_other_workers(tmp_path):
+    lock_dir = str(tmp_path / "locks")
+    first, second = SessionLockManager(lock_dir=lock_dir), SessionLockManager(lock_dir=lock_dir)
+    events = []
+
+    async def hold(locks, name, seconds):
+        async with locks.hold("session"):
+            events.append(f"{name} in")
+            await asyncio.sleep(seconds)
+            events.append(f"{name} out")
+
+    async def run():
+        await asyncio.gather(hold(first, "first", 0.1), hold(second, "second", 0))
+    asyncio.run(run())
+    assert events == ["first in", "first out", "second in", "second out"]
+    assert len(first) == len(second) == 0  # Idle locks are dropped
+
+
+def test_memory_backend_is_rejected_with_several_workers(monkeypatch, tmp_path):
+    monkeypatch.setenv("CHECKPOINT_BACKEND", "memory")
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    with pytest.raises(ValueError):
+        create_checkpointer(str(tmp_path))
+
+
+def test_api_import_builds_nothing_with_several_workers(tmp_path):
+    # Run from an empty directory: importing app.main must not need ./data, and the
+    # stores create their directories when they are first built
+    script = (
+        "import os, app.main, app.tools as tools\n"
+        "assert not [f for f in os.listdir('.') if f != '__pycache__'], os.listdir('.')\n"
+        "assert tools.get_session_locks().lock_dir and tools.get_reply_cache().get('s', 'k') is None\n"
+        "assert os.path.isdir('state/locks') and os.path.exists('state/replies.db')\n"
+    )
+    env = {**os.environ, "PYTHONPATH": os.getcwd(), "WEB_CONCURRENCY": "2", "CHECKPOINT_BACKEND": "sqlite",
+           "SESSION_LOCK_DIR": "state/locks", "IDEMPOTENCY_DB_PATH": "state/replies.db"}
+    result = subprocess.run([sys.executable, "-c", script], cwd=tmp_path, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr[-2000:]
@@ -0,0 +1,85 @@
+# tests/test_patient_lookup.py
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from app import agent, tools
+from app.intents import classify_turn
+from app.matching import PatientMatcher
+from app.patients import PatientRepository
+
+PATIENTS = """name,dob,email,phone,last_visit_doctor
+John Smith,1980-05-01,john@example.org,555-0100,Dr. Adams
+Maria Garcia,1975-11-23,maria@example.org,555-0101,Dr. Lee
+"""
+
+
+@pytest.fixture(autouse=True)
+def patients(tmp_path, monkeypatch):
+    path = tmp_path / "patients.csv"
+    path.write_text(PATIENTS)
+    repository = PatientRepository(str(path))
+    monkeypatch.setattr(tools, "patient_repository", repository)
+    monkeypatch.setattr(tools, "patient_matcher", PatientMatcher(repository))
+
+
+def lookup(full_name, dob, **kwargs):
+    return tools.search_patient_in_emr.invoke({"full_name": full_name, "dob": dob, **kwargs})
+
+
+def test_exact_match_is_a_returning_patient():
+    result = lookup("john  smith", "1980-05-01")
+    assert result.patient["email"] == "john@example.org" and not result.candidates
+    updates = result.state_updates({"full_name": "john  smith", "dob": "1980-05-01"})
+    assert updates["patient_status"] == "RETURNING" and updates["doctor_name"] == "Dr. Adams"
+
+
+@pytest.mark.parametrize("full_name, dob", [
+    ("John Smith", "1980-05-12"),  # Same name, different DOB in the same month
+    ("Joan Smith", "1980-05-01"),  # Similar name, same DOB
+    ("Jon Smith", "1980-05-01"),
+])
+def test_near_miss_is_offered_not_merged(full_name, dob):
+    result = lookup(full_name, dob)
+    assert result.patient is None
+    assert [candidate.record["name"] for candidate in result.candidates] == ["John Smith"]
+    updates = result.state_updates({"full_name": full_name, "dob": dob})
+    assert updates["patient_status"] is None and updates["patient_candidates"] == ["John Smith"]
+    assert updates["patient_info"] == {"full_name": full_name, "dob": dob}
+    # The other patient's contact details and DOB are not shown
+    assert "john@example.org" not in str(result) and "555-0100" not in str(result) and "1980-05-01" not in str(result)
+
+
+def test_unknown_patient_is_new():
+    result = lookup("Ada Lovelace", "1815-12-10")
+    assert result.patient is None and not result.candidates
+    assert result.state_updates({"full_name": "Ada Lovelace", "dob": "1815-12-10"})["patient_status"] == "NEW"
+
+
+def test_declining_the_suggestions_registers_a_new_patient():
+    result = lookup("John Smith", "1980-05-12", new_patient=True)
+    assert result.patient is None and not result.candidates
+    updates = result.state_updates({"full_name": "John Smith", "dob": "1980-05-12", "new_patient": True})
+    assert updates == {"patient_status": "NEW", "patient_info": {"full_name": "John Smith", "dob": "1980-05-12"},
+                       "patient_candidates": None}
+
+
+def _after_lookup(result, args):
+    call = {"name": "search_patient_in_emr", "args": args, "id": "call"}
+    return {**result.state_updates(args), "messages": [HumanMessage(content="John Smith 1980-05-12"),
+                                                       AIMessage(content="", tool_calls=[call]),
+                                                       ToolMessage(content=str(result), tool_call_id="call")]}
+
+
+def test_near_miss_asks_the_patient_to_confirm():
+    args = {"full_name": "John Smith", "dob": "1980-05-12"}
+    state = _after_lookup(lookup(**args), args)
+    assert agent.router(state) == "confirm_patient"
+    assert "Did you mean John Smith?" in agent.confirm_patient(state)["messages"][0].content
+
+    intent = classify_turn({**state, "messages": state["messages"] + [HumanMessage(content="No, I'm a new patient")]})
+    assert intent.label == "new_patient" and intent.tool_calls[0]["args"] == {**args, "new_patient": True}
+    assert classify_turn({**state, "messages": state["messages"] + [HumanMessage(content="I'm not a new patient")]}) is None
+    # A corrected DOB is looked up again
+    intent = classify_turn({**state, "messages": state["messages"] + [HumanMessage(content="John Smith 1980-05-01")]})
+    assert intent.label == "patient_lookup" and intent.tool_calls[0]["args"]["dob"] == "1980-05-01"
@@ -0,0 +1,57 @@
+# tests/test_post_booking.py
+#
+# Intake forms and reminders are queued once per booking: a retried turn
+# reuses the job, a later booking in the same session gets its own.
+
+import pytest
+
+from app import tools
+from app.jobs import JobQueue
+from app.results import IntakeFormsSent, RemindersScheduled, ToolError
+
+SLOT = "Monday, September 08, 2025 at 10:00 AM"
+LATER_SLOT = "Tuesday, September 09, 2025 at 02:00 PM"
+
+
+async def _noop(job):
+    pass
+
+
+@pytest.fixture
+def job_queue(tmp_path, monkeypatch):
+    # Never started: jobs stay queued, nothing is sent
+    queue = JobQueue(str(tmp_path / "jobs.db"), handlers={"intake_forms": _noop, "reminders": _noop})
+    monkeypatch.setattr(tools, "job_queue", queue)
+    yield queue
+    queue.close()
+
+
+def send_forms(session_id, appointment_time=SLOT):
+    args = {"patient_name": "Ana Lopez", "patient_email": "ana@example.com", "appointment_time": appointment_time}
+    return tools.send_intake_forms.invoke(args, config={"configurable": {"thread_id": session_id}})
+
+
+def schedule(session_id, appointment_time=SLOT):
+    args = {"patient_name": "Ana Lopez", "patient_email": "ana@example.com", "patient_phone": "555-0100",
+            "appointment_time": appointment_time}
+    return tools.schedule_reminders.invoke(args, config={"configurable": {"thread_id": session_id}})
+
+
+@pytest.mark.parametrize("notify", [send_forms, schedule])
+def test_retried_turn_reuses_the_job(job_queue, notify):
+    first, retry = notify("s1"), notify("s1")
+    assert isinstance(first, (IntakeFormsSent, RemindersScheduled)) and first.status == "queued"
+    assert retry.job_id == first.job_id
+
+
+@pytest.mark.parametrize("notify", [send_forms, schedule])
+def test_each_booking_gets_its_own_job(job_queue, notify):
+    first, second = notify("s1"), notify("s1", LATER_SLOT)
+    assert second.job_id != first.job_id
+    assert notify("s2").job_id not in (first.job_id, second.job_id)
+    assert job_queue.counts().get("queued") == 3
+
+
+def test_invalid_appointment_time_queues_nothing(job_queue):
+    assert isinstance(send_forms("s1", "next Monday"), ToolError)
+    assert not job_queue.counts()
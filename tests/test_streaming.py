@@ -0,0 +1,85 @@
+# tests/test_streaming.py
+
+import asyncio
+import json
+import time
+import uuid
+
+import httpx
+import pytest
+
+from app import agent, main, tools
+from app.admission import AdmissionController, ReplyCache
+from app.decisions import DecisionCache
+from app.matching import PatientMatcher
+from app.patients import PatientRepository
+from benchmarks.fake_llm import StubChatModel
+
+FIRST_TOKEN_DELAY = 0.3
+MESSAGE = "Hello, I'd like to book an appointment"
+
+
+@pytest.fixture(autouse=True)
+def stub_graph(monkeypatch):
+    monkeypatch.setenv("CHECKPOINT_BACKEND", "memory")
+    monkeypatch.setattr(agent, "_app_graph", None)
+    monkeypatch.setattr(agent, "decision_cache", DecisionCache(max_entries=0))
+    monkeypatch.setattr(main, "admission", AdmissionController())
+    monkeypatch.setattr(tools, "reply_cache", ReplyCache())
+    model = StubChatModel(first_token_delay=FIRST_TOKEN_DELAY, token_delay=0.01)
+    monkeypatch.setattr(agent, "llm_with_tools", model)
+    return model
+
+
+def parse(chunk):
+    fields = dict(line.split(": ", 1) for line in chunk.strip().splitlines())
+    return fields["event"], json.loads(fields["data"])
+
+
+async def stream(message=MESSAGE, session_id=None):
+    """[(seconds since the request, event, data)] for one turn."""
+    request = main.ChatRequest(message=message, session_id=session_id or uuid.uuid4().hex)
+    start, events = time.perf_counter(), []
+    async for chunk in main._stream_turn(request):
+        events.append((time.perf_counter() - start, *parse(chunk)))
+    return events
+
+
+def test_stream_sends_progress_before_the_model_answers(stub_graph):
+    events = asyncio.run(stream())
+    first_at, first_event, first_data = events[0]
+    assert first_event == "node" and first_data == {"node": "fast_path"}
+    assert first_at < FIRST_TOKEN_DELAY / 2
+    tokens = [data["text"] for _, event, data in events if event == "token"]
+    assert len(tokens) > 1 and "".join(tokens) == stub_graph.reply
+    assert events[-1][1] == "done" and events[-1][2]["response"] == stub_graph.reply
+    token_times = [at for at, event, _ in events if event == "token"]
+    assert token_times[0] < token_times[-1] - 0.05  # Sent as generated, not all at the end
+
+
+def test_stream_and_chat_return_the_same_reply(stub_graph):
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            blocking = await client.post("/chat", json={"message": MESSAGE, "session_id": uuid.uuid4().hex})
+            streamed = await client.post("/chat/stream", json={"message": MESSAGE, "session_id": uuid.uuid4().hex})
+        return blocking, streamed
+    blocking, streamed = asyncio.run(run())
+    assert blocking.json()["response"] == stub_graph.reply
+    assert streamed.headers["content-type"].startswith("text/event-stream")
+    events = [parse(chunk) for chunk in streamed.text.split("\n\n") if chunk.strip()]
+    assert events[-1] == ("done", {"response": stub_graph.reply, "session_id": events[-1][1]["session_id"]})
+
+
+def test_hardcoded_replies_arrive_as_one_token(tmp_path, monkeypatch):
+    path = tmp_path / "patients.csv"
+    path.write_text("name,dob,email,phone,last_visit_doctor\nJohn Smith,1980-05-01,john@example.org,555-0100,Dr. Adams\n")
+    repository = PatientRepository(str(path))
+    monkeypatch.setattr(tools, "patient_repository", repository)
+    monkeypatch.setattr(tools, "patient_matcher", PatientMatcher(repository))
+    events = asyncio.run(stream("My name is John Smith, born 1980-05-12"))
+    assert [data["node"] for _, event, data in events if event == "node"] == ["fast_path", "call_tool", "confirm_patient"]
+    assert [data["tool"] for _, event, data in events if event == "tool"] == ["search_patient_in_emr"]
+    tokens = [data for _, event, data in events if event == "token"]
+    assert len(tokens) == 1 and tokens[0]["node"] == "confirm_patient"
+    assert events[-1][2]["response"] == tokens[0]["text"]
@@ -4,7 +4,18 @@ import streamlit as st
 import requests
 import uuid
 import os
-from app.utils import generate_admin_report # Import the utility function
+import json
+import time
+
+def _sse_events(response):
+    """Yields (event, data) pairs from a server-sent event stream as they arrive."""
+    buffer = ""
+    for chunk in response.iter_content(chunk_size=None, decode_unicode=True):
+        buffer += chunk
+        while "\n\n" in buffer:
+            raw, buffer = buffer.split("\n\n", 1)
+            fields = dict(line.split(": ", 1) for line in raw.splitlines() if ": " in line)
+            yield fields.get("event"), json.loads(fields.get("data", "{}"))
 
 # --- Page Configuration ---
 st.set_page_config(page_title="AI Medical Scheduler", layout="centered")
@@ -32,19 +43,42 @@ if prompt := st.chat_input("How can I help you?"):
     # Get assistant response
     with st.chat_message("assistant"):
         message_placeholder = st.empty()
+        status_placeholder = st.empty()
         
         try:
-            # Call the FastAPI backend
-            api_url = "http://127.0.0.1:8000/chat"
-            response = requests.post(api_url, json={"message": prompt, "session_id": st.session_state.session_id})
+            # Call the streaming endpoint and render progress and tokens as they arrive
+            api_url = "http://127.0.0.1:8000/chat/stream"
+            # One key per message: if this request is retried, the backend replies without running the turn again
+            response = requests.post(api_url, json={"message": prompt, "session_id": st.session_state.session_id},
+                                     headers={"Idempotency-Key": str(uuid.uuid4())}, stream=True)
+            if response.status_code in (429, 503):
+                retry_after = response.headers.get("Retry-After", "a few")
+                raise RuntimeError(f"{response.json()['detail']} (retry in {retry_after} seconds)")
             response.raise_for_status() # Raise an exception for bad status codes
             
-            full_response = response.json().get("response", "Sorry, I encountered an error.")
+            full_response, streamed_text = "Sorry, I encountered an error.", ""
+            for event, data in _sse_events(response):
+                if event == "node":
+                    status_placeholder.caption(f"⏳ {data['node'].replace('_', ' ')}...")
+                elif event == "tool":
+                    status_placeholder.caption(f"🛠️ {data['tool']} finished")
+                elif event == "token":
+                    streamed_text += data["text"]
+                    message_placeholder.markdown(streamed_text + "▌")
+                elif event == "done":
+                    full_response = data["response"]
+                elif event == "error":
+                    full_response = f"Error: {data['detail']}"
+            status_placeholder.empty()
             message_placeholder.markdown(full_response)
             
         except requests.exceptions.RequestException as e:
             full_response = f"Error: Could not connect to the backend. Please ensure it's running. Details: {e}"
             message_placeholder.markdown(full_response)
+        except RuntimeError as e:
+            # Turned away by the backend's admission control
+            full_response = f"Sorry, I'm busy right now. {e}"
+            message_placeholder.markdown(full_response)
 
     # Add assistant response to state
     st.session_state.messages.append({"role": "assistant", "content": full_response})
@@ -53,7 +87,26 @@ if prompt := st.chat_input("How can I help you?"):
 st.sidebar.title("Admin Panel")
 st.sidebar.write("Manage system reports and data.")
 
+REPORT_STAGES = {"export": "Exporting new bookings", "render": "Writing the workbook", "done": "Done"}
+
 if st.sidebar.button("Generate Admin Report"):
-    with st.spinner("Generating report..."):
-        report_status = generate_admin_report()
-        st.sidebar.success(report_status)
\ No newline at end of file
+    # The report is built by a background job on the backend; poll it for progress
+    try:
+        report_url = "http://127.0.0.1:8000/admin/report"
+        job = requests.post(report_url).json()
+        progress_bar = st.sidebar.progress(0.0, text="Queued...")
+        while True:
+            report = requests.get(f"{report_url}/{job['job_id']}").json()
+            progress = report["progress"]
+            if report["status"] == "running" and progress and progress["total"]:
+                progress_bar.progress(min(progress["done"] / progress["total"], 1.0), text=f"{REPORT_STAGES[progress['stage']]}...")
+            if report["status"] in ("done", "dead"):
+                break
+            time.sleep(0.5)
+        progress_bar.empty()
+        if report["status"] == "done":
+            st.sidebar.success(f"✅ Report successfully generated: {report['path']} ({progress['done']} bookings)")
+        else:
+            st.sidebar.error(f"❌ Failed to generate report. Error: {report['error']}")
+    except requests.exceptions.RequestException as e:
+        st.sidebar.error(f"Error: Could not connect to the backend. Please ensure it's running. Details: {e}")
\ No newline at end of file